@@ -0,0 +1,13 @@
+"""
+Analysis engine benchmark suite
+分析引擎基准测试套件
+
+Times the CPU-bound analysis path (segmentation, fingerprint detection,
+RiskScorer, layer orchestrators, text parsing, PPL) in-process over
+test_documents/ and synthetic documents of 1k-50k words, with LLM calls
+stubbed out. See benchmarks/run.py for usage.
+
+在进程内对CPU密集的分析路径（分句、指纹检测、RiskScorer、各层编排器、文本解析、PPL）
+计时，语料为 test_documents/ 和 1k-50k 词的合成文档，LLM 调用被替换为桩。
+用法见 benchmarks/run.py。
+"""
@@ -0,0 +1,175 @@
+"""
+Benchmark cases
+基准测试用例
+
+Each case turns a document into a list of timed units (zero-argument
+callables). Setup (construction, pre-segmentation) happens in prepare()
+and is not timed. Whole-document operations yield one unit; per-sentence
+and per-paragraph operations yield one unit per item so the latency
+percentiles describe the unit the API actually serves.
+
+每个用例将文档转换为一组计时单元（无参可调用对象）。准备工作（构造、预分句）在
+prepare() 中完成且不计时。整文档操作产生一个单元；逐句/逐段操作每项产生一个单元，
+使延迟百分位反映 API 实际处理的单位。
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import BenchDocument
+
+Unit = Callable[[], object]
+
+
+@dataclass
+class BenchCase:
+    """
+    A named benchmark: prepare(doc) -> timed units
+    一个具名基准：prepare(doc) -> 计时单元
+    """
+    name: str
+    unit: str  # "document", "sentence" or "paragraph"
+    prepare: Callable[[BenchDocument], List[Unit]]
+    description: str = ""
+
+
+_loop = None
+
+
+def _run_async(coro_factory: Callable[[], object]) -> Unit:
+    """
+    Wrap an async call as a unit run on one shared event loop
+    将异步调用包装为在同一事件循环上运行的单元
+    """
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    loop = _loop
+
+    def unit():
+        return loop.run_until_complete(coro_factory())
+
+    return unit
+
+
+def _prepare_segmentation(doc: BenchDocument) -> List[Unit]:
+    from src.core.preprocessor.segmenter import SentenceSegmenter
+
+    segmenter = SentenceSegmenter()
+    return [lambda: segmenter.segment_with_paragraphs(doc.text)]
+
+
+def _prepare_fingerprint(doc: BenchDocument) -> List[Unit]:
+    from src.core.analyzer.fingerprint import FingerprintDetector
+
+    detector = FingerprintDetector()
+    return [
+        (lambda p=paragraph: detector.detect(p))
+        for paragraph in doc.paragraphs
+    ]
+
+
+def _scorer_case(profile: str) -> Callable[[BenchDocument], List[Unit]]:
+    """
+    RiskScorer.analyze per processable sentence, as the upload route calls it
+    按上传路由的方式对每个可处理句子调用 RiskScorer.analyze
+    """
+    def prepare(doc: BenchDocument) -> List[Unit]:
+        from src.api.routes.documents import _build_paragraph_contexts
+        from src.core.analyzer.scorer import RiskScorer
+        from src.core.preprocessor.segmenter import SentenceSegmenter
+
+        scorer = RiskScorer()
+        sentences = SentenceSegmenter().segment_with_paragraphs(doc.text)
+        contexts = _build_paragraph_contexts(sentences)
+        return [
+            (lambda s=sent: scorer.analyze(
+                s.text,
+                tone_level=4,
+                whitelist=set(),
+                paragraph_context=contexts.get(s.paragraph_index),
+                profile=profile,
+            ))
+            for sent in sentences
+            if sent.should_process
+        ]
+
+    return prepare
+
+
+def _orchestrator_case(import_path: str) -> Callable[[BenchDocument], List[Unit]]:
+    module_name, class_name = import_path.rsplit(".", 1)
+
+    def prepare(doc: BenchDocument) -> List[Unit]:
+        import importlib
+
+        from src.core.analyzer.layers.base import LayerContext
+
+        orchestrator = getattr(importlib.import_module(module_name), class_name)()
+        paragraphs = doc.paragraphs
+
+        # Fresh context per call: orchestrators write their results into it
+        # 每次调用使用新上下文：编排器会将结果写入上下文
+        return [_run_async(lambda: orchestrator.analyze(
+            LayerContext(full_text=doc.text, paragraphs=list(paragraphs))
+        ))]
+
+    return prepare
+
+
+def _prepare_text_parsing(doc: BenchDocument) -> List[Unit]:
+    from src.services.text_parsing_service import TextParsingService
+
+    service = TextParsingService()
+    return [lambda: service.parse_document(doc.text)]
+
+
+def _prepare_ppl(doc: BenchDocument) -> List[Unit]:
+    """
+    Paragraph PPL through RiskScorer (ONNX if a model is present, else zlib)
+    通过 RiskScorer 计算段落PPL（有模型时用ONNX，否则用zlib）
+    """
+    from src.core.analyzer.scorer import RiskScorer
+
+    scorer = RiskScorer()
+    return [
+        (lambda p=paragraph: scorer._calculate_ppl(p))
+        for paragraph in doc.paragraphs
+    ]
+
+
+CASES: Dict[str, BenchCase] = {
+    case.name: case
+    for case in (
+        BenchCase("segmentation", "document", _prepare_segmentation,
+                  "SentenceSegmenter.segment_with_paragraphs"),
+        BenchCase("fingerprint", "paragraph", _prepare_fingerprint,
+                  "FingerprintDetector.detect"),
+        BenchCase("scorer", "sentence", _scorer_case("full"),
+                  "RiskScorer.analyze with paragraph context"),
+        BenchCase("scorer.score_only", "sentence", _scorer_case("score_only"),
+                  "RiskScorer.analyze, score_only profile (candidate validation)"),
+        BenchCase("scorer.prefilter", "sentence", _scorer_case("prefilter"),
+                  "RiskScorer.analyze, prefilter profile (YOLO skip decision)"),
+        BenchCase("layer.document", "document",
+                  _orchestrator_case("src.core.analyzer.layers.document_orchestrator.DocumentOrchestrator"),
+                  "DocumentOrchestrator.analyze (layer 5)"),
+        BenchCase("layer.section", "document",
+                  _orchestrator_case("src.core.analyzer.layers.section_analyzer.SectionAnalyzer"),
+                  "SectionAnalyzer.analyze (layer 4)"),
+        BenchCase("layer.paragraph", "document",
+                  _orchestrator_case("src.core.analyzer.layers.paragraph_orchestrator.ParagraphOrchestrator"),
+                  "ParagraphOrchestrator.analyze (layer 3)"),
+        BenchCase("layer.sentence", "document",
+                  _orchestrator_case("src.core.analyzer.layers.sentence_orchestrator.SentenceOrchestrator"),
+                  "SentenceOrchestrator.analyze (layer 2)"),
+        BenchCase("layer.lexical", "document",
+                  _orchestrator_case("src.core.analyzer.layers.lexical_orchestrator.LexicalOrchestrator"),
+                  "LexicalOrchestrator.analyze (layer 1)"),
+        BenchCase("text_parsing", "document", _prepare_text_parsing,
+                  "TextParsingService.parse_document"),
+        BenchCase("ppl", "paragraph", _prepare_ppl,
+                  "RiskScorer._calculate_ppl (ONNX or zlib fallback)"),
+    )
+}
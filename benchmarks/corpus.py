@@ -0,0 +1,124 @@
+"""
+Benchmark corpus: test_documents/ plus deterministic synthetic documents
+基准语料：test_documents/ 加上确定性生成的合成文档
+
+Synthetic documents are assembled from the English sentences of
+test_documents/ with a fixed seed, grouped into paragraphs and numbered
+sections, so every run (and every machine) sees byte-identical input.
+合成文档由 test_documents/ 中的英文句子按固定种子组装，划分为段落和编号章节，
+因此每次运行（以及每台机器）的输入完全一致。
+"""
+
+import random
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Sequence
+
+DEFAULT_DOCS_DIR = Path(__file__).parent.parent / "test_documents"
+
+DEFAULT_SIZES = (1000, 5000, 10000, 50000)
+
+SECTION_TITLES = (
+    "Introduction",
+    "Literature Review",
+    "Methodology",
+    "Results",
+    "Discussion",
+    "Conclusion",
+)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+
+
+@dataclass
+class BenchDocument:
+    """
+    One benchmark input document
+    一个基准输入文档
+    """
+    name: str
+    text: str
+
+    @property
+    def words(self) -> int:
+        return len(self.text.split())
+
+    @property
+    def paragraphs(self) -> List[str]:
+        return [p.strip() for p in re.split(r"\n\s*\n", self.text) if p.strip()]
+
+
+def load_test_documents(docs_dir: Path = DEFAULT_DOCS_DIR) -> List[BenchDocument]:
+    """
+    Load every .txt document under docs_dir
+    加载 docs_dir 下的所有 .txt 文档
+    """
+    documents = []
+    for path in sorted(docs_dir.rglob("*.txt")):
+        text = path.read_text(encoding="utf-8", errors="ignore").replace("\r\n", "\n").strip()
+        if text:
+            name = path.relative_to(docs_dir).as_posix().replace(" ", "_")
+            documents.append(BenchDocument(name=f"docs/{name}", text=text))
+    return documents
+
+
+def _sentence_pool(documents: Sequence[BenchDocument]) -> List[str]:
+    """
+    English body sentences usable as synthetic building blocks
+    可用作合成素材的英文正文句子
+    """
+    pool = []
+    for doc in documents:
+        for paragraph in doc.paragraphs:
+            paragraph = " ".join(paragraph.split())
+            if len(paragraph.split()) < 12:
+                continue  # titles, headings, keywords
+            for sentence in _SENTENCE_SPLIT.split(paragraph):
+                if len(sentence.split()) >= 6 and sentence.isascii():
+                    pool.append(sentence)
+    return pool
+
+
+def synthetic_document(words: int, pool: Sequence[str], seed: int = 42) -> BenchDocument:
+    """
+    Build a document of roughly `words` words with sections and paragraphs
+    构建约 `words` 词、含章节和段落的文档
+    """
+    if not pool:
+        raise ValueError("No source sentences available for synthetic documents")
+
+    rng = random.Random(f"{seed}:{words}")
+    blocks = ["A Synthetic Study of Benchmark Text", "Abstract"]
+    total = 0
+    section = 0
+    paragraphs_in_section = rng.randint(3, 8)
+    while total < words:
+        if paragraphs_in_section == 0:
+            blocks.append(f"{section + 1}. {SECTION_TITLES[section % len(SECTION_TITLES)]}")
+            section += 1
+            paragraphs_in_section = rng.randint(3, 8)
+        sentences = [rng.choice(pool) for _ in range(rng.randint(3, 8))]
+        paragraph = " ".join(sentences)
+        blocks.append(paragraph)
+        total += len(paragraph.split())
+        paragraphs_in_section -= 1
+
+    return BenchDocument(name=f"synthetic/{words // 1000}k", text="\n\n".join(blocks))
+
+
+def build_corpus(
+    docs_dir: Path = DEFAULT_DOCS_DIR,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    include_docs: bool = True,
+    seed: int = 42,
+) -> List[BenchDocument]:
+    """
+    test_documents/ (optional) followed by one synthetic document per size
+    test_documents/（可选）加上每个规模一个合成文档
+    """
+    documents = load_test_documents(docs_dir)
+    pool = _sentence_pool(documents)
+    corpus = list(documents) if include_docs else []
+    corpus.extend(synthetic_document(size, pool, seed) for size in sizes)
+    return corpus
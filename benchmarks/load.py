@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the full user flow
+完整用户流程的端到端负载测试
+
+Virtual users run the flow of the web client concurrently, each one looping
+upload -> session start -> substep analyses -> YOLO -> export over documents
+drawn from a size mix, with think time between requests. simulate_flow.py and
+full_flow_test.py drive one document serially; this sizes deployments.
+
+虚拟用户并发执行网页客户端的流程，每个用户循环执行 上传 -> 启动会话 -> 子步骤分析 -> YOLO -> 导出，
+文档按规模配比抽取，请求之间有思考时间。simulate_flow.py 和 full_flow_test.py 只串行处理一个文档；
+本工具用于容量规划。
+
+Targets:
+- in-process (default): requests go through httpx.ASGITransport into
+  src.main:app with its lifespan running, and every LLM provider call is
+  answered by the fake LLM (src/tools/fake_llm.py) in the same process. Uses
+  DATABASE_URL like the app (SQLite ./academicguard.db by default).
+- --base-url: a running server. Start it with its provider base URLs pointing
+  at `python -m src.tools.fake_llm`; pass --fake-llm-url to include the fake
+  server's counters in the report.
+目标：
+- 进程内（默认）：请求经 httpx.ASGITransport 直接进入 src.main:app（运行其生命周期），所有LLM提供商
+  调用由同进程内的模拟LLM（src/tools/fake_llm.py）应答。与应用一样使用 DATABASE_URL。
+- --base-url：已运行的服务器。启动时将其提供商 base URL 指向 `python -m src.tools.fake_llm`；
+  传入 --fake-llm-url 可在报告中包含模拟服务器的计数。
+
+Documents come from test_documents/ grouped by word count into small /
+medium / large; a class without a real document gets a synthetic one
+(benchmarks/corpus.py). The report holds throughput, p50/p95/p99 and error
+rates per endpoint, and the DB statement and LLM call counts taken from the
+app's Prometheus metrics (before/after difference; over HTTP, /metrics must
+be reachable from the load generator).
+文档来自 test_documents/，按词数分为 small / medium / large；没有真实文档的类别使用合成文档
+（benchmarks/corpus.py）。报告包含各端点的吞吐量、p50/p95/p99 和错误率，以及从应用 Prometheus
+指标（前后差值；HTTP 模式下负载机需能访问 /metrics）得到的数据库语句数和LLM调用数。
+
+--check-prefetch runs the same flows twice in fresh processes, without and
+with substep prefetch at zero think time, and fails if prefetch adds LLM calls.
+--check-prefetch 在全新进程中以零思考时间分别关闭和开启子步骤预取运行相同流程，
+若预取增加了LLM调用则失败。
+
+Usage:
+    python -m benchmarks.load --users 20 --duration 120 --output load.json
+    python -m benchmarks.load --users 5 --flows 1 --think-ms 0 --mix small=1
+    python -m benchmarks.load --users 1 --flows 2 --mix small=1 --check-prefetch
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --fake-llm-url http://127.0.0.1:8900 \\
+        --users 50 --ramp-up 30 --duration 300
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.corpus import DEFAULT_DOCS_DIR, BenchDocument, _sentence_pool, load_test_documents, synthetic_document
+from benchmarks.run import _git_commit, _peak_rss_kb, percentile
+
+REPORT_VERSION = 1
+
+API = "/api/v1"
+
+# Analysis endpoint of each step as the web client calls it (frontend/src/services/analysisApi.ts):
+# layers 5-2 use the /analysis routes, layer 1 the substep routes (which also take the locked terms)
+# 网页客户端调用的各步骤分析端点（frontend/src/services/analysisApi.ts）：
+# 第5-2层使用 /analysis 路由，第1层使用子步骤路由（同时接收锁定术语）
+STEP_ENDPOINTS = {
+    "layer5-step1-1": "analysis/document/structure",
+    "layer5-step1-2": "analysis/document/paragraph-length",
+    "layer5-step1-3": "analysis/document/progression-closure",
+    "layer5-step1-4": "analysis/document/connectors",
+    "layer5-step1-5": "analysis/document/content-substantiality",
+    "layer4-step2-0": "analysis/section/step2-0/identify",
+    "layer4-step2-1": "analysis/section/step2-1/order",
+    "layer4-step2-2": "analysis/section/step2-2/length",
+    "layer4-step2-3": "analysis/section/step2-3/similarity",
+    "layer4-step2-4": "analysis/section/step2-4/transition",
+    "layer4-step2-5": "analysis/section/step2-5/logic",
+    "layer3-step3-0": "analysis/paragraph/step3-0/identify",
+    "layer3-step3-1": "analysis/paragraph/role",
+    "layer3-step3-2": "analysis/paragraph/coherence",
+    "layer3-step3-3": "analysis/paragraph/anchor",
+    "layer3-step3-4": "analysis/paragraph/sentence-length",
+    "layer3-step3-5": "analysis/paragraph/step3-5/transition",
+    "layer2-step4-0": "analysis/sentence/step4-0/identify",
+    "layer2-step4-1": "analysis/sentence/step4-1/pattern",
+    "layer1-step5-0": "layer1/step5-0/prepare",
+    "layer1-step5-1": "layer1/step5-1/analyze",
+    "layer1-step5-2": "layer1/step5-2/analyze",
+    "layer1-step5-3": "layer1/step5-3/analyze",
+    "layer1-step5-4": "layer1/step5-4/analyze",
+    "layer1-step5-5": "layer1/step5-5/validate",
+}
+
+# Steps analyzed per flow: every whole-document step in the client's order (the
+# sentence console's per-paragraph steps 4-2 ... 4-5 are not part of the flow)
+# 每个流程分析的步骤：按客户端顺序的所有全文步骤（句子控制台中按段落运行的步骤 4-2 ... 4-5 不在流程内）
+DEFAULT_STEPS = tuple(STEP_ENDPOINTS)
+
+# name -> (min words, max words, words of a synthetic stand-in)
+# 名称 ->（最少词数，最多词数，合成替代文档的词数）
+SIZE_CLASSES = {
+    "small": (0, 800, 500),
+    "medium": (800, 2500, 1500),
+    "large": (2500, None, 4000),
+}
+
+FAKE_LLM_HOST = "fake-llm.local"
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][\w:]*)(\{.*\})?\s+([-+\d.eE]+|NaN|\+Inf|-Inf)$")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# =============================================================================
+# Documents
+# 文档
+# =============================================================================
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'small=6,medium=3,large=1' -> weights"""
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SIZE_CLASSES:
+            raise argparse.ArgumentTypeError(f"unknown size class {name!r} (choose from {', '.join(SIZE_CLASSES)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def size_class(doc: BenchDocument) -> str:
+    for name, (low, high, _) in SIZE_CLASSES.items():
+        if doc.words >= low and (high is None or doc.words < high):
+            return name
+    return "large"
+
+
+def build_documents(docs_dir: Path, mix: Dict[str, float], seed: int) -> Dict[str, List[BenchDocument]]:
+    """
+    Documents per size class of the mix; empty classes get a synthetic document
+    配比中各规模类别的文档；没有文档的类别使用合成文档
+    """
+    documents = load_test_documents(docs_dir) if docs_dir.exists() else []
+    by_class: Dict[str, List[BenchDocument]] = defaultdict(list)
+    for doc in documents:
+        if doc.words >= 50:
+            by_class[size_class(doc)].append(doc)
+    pool = _sentence_pool(documents)
+    for name in mix:
+        if not by_class.get(name):
+            by_class[name] = [synthetic_document(SIZE_CLASSES[name][2], pool, seed)]
+    return {name: by_class[name] for name in mix}
+
+
+# =============================================================================
+# Measurements
+# 测量
+# =============================================================================
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        count = len(self.latencies_ms)
+        return {
+            "count": count,
+            "per_second": round(count / wall_seconds, 3) if wall_seconds else 0.0,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items(), key=lambda i: str(i[0]))},
+            "ms": {
+                "p50": round(percentile(self.latencies_ms, 50), 1),
+                "p95": round(percentile(self.latencies_ms, 95), 1),
+                "p99": round(percentile(self.latencies_ms, 99), 1),
+                "mean": round(sum(self.latencies_ms) / count, 1) if count else 0.0,
+                "max": round(max(self.latencies_ms), 1) if count else 0.0,
+            },
+        }
+
+
+class LoadStats:
+    """
+    Per-endpoint latencies and outcomes, and flow counts
+    各端点的延迟与结果，以及流程计数
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.flows_completed = 0
+        self.flows_failed = 0
+        self.documents: Counter = Counter()
+
+    def record(self, endpoint: str, elapsed_ms: float, status: Any) -> None:
+        stats = self.endpoints[endpoint]
+        stats.latencies_ms.append(elapsed_ms)
+        stats.statuses[status] += 1
+        if not isinstance(status, int) or status >= 400:
+            stats.errors += 1
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        total = sum(len(s.latencies_ms) for s in self.endpoints.values())
+        errors = sum(s.errors for s in self.endpoints.values())
+        flows = self.flows_completed + self.flows_failed
+        return {
+            "flows": {
+                "completed": self.flows_completed,
+                "failed": self.flows_failed,
+                "per_second": round(self.flows_completed / wall_seconds, 3) if wall_seconds else 0.0,
+                "failure_rate": round(self.flows_failed / flows, 4) if flows else 0.0,
+            },
+            "requests": {
+                "total": total,
+                "per_second": round(total / wall_seconds, 3) if wall_seconds else 0.0,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+            },
+            "documents": dict(self.documents),
+            "endpoints": {name: s.to_dict(wall_seconds) for name, s in sorted(self.endpoints.items())},
+        }
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """
+    Prometheus text format -> {(name, labels): value}
+    Prometheus 文本格式 -> {（名称，标签）: 值}
+    """
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line.strip())
+        if not match:
+            continue
+        labels = tuple(sorted(_LABEL.findall(match.group(2) or "")))
+        samples[(match.group(1), labels)] = float(match.group(3))
+    return samples
+
+
+def metric_delta(before: Dict, after: Dict, name: str, label_keys: Tuple[str, ...]) -> Dict[str, int]:
+    """
+    Growth of one counter series between two scrapes, keyed by label values
+    两次抓取之间某计数序列的增长，按标签值分组
+    """
+    delta: Dict[str, int] = {}
+    for (sample, labels), value in after.items():
+        if sample != name:
+            continue
+        grown = value - before.get((sample, labels), 0.0)
+        if grown <= 0:
+            continue
+        label_map = dict(labels)
+        key = "/".join(label_map.get(k, "") for k in label_keys) or "total"
+        delta[key] = delta.get(key, 0) + int(round(grown))
+    return dict(sorted(delta.items()))
+
+
+# =============================================================================
+# Virtual users
+# 虚拟用户
+# =============================================================================
+
+class VirtualUser:
+    """
+    One simulated user looping over the full flow
+    循环执行完整流程的一个模拟用户
+    """
+
+    def __init__(
+        self,
+        index: int,
+        client: httpx.AsyncClient,
+        stats: LoadStats,
+        documents: Dict[str, List[BenchDocument]],
+        args: argparse.Namespace,
+    ):
+        self.index = index
+        self.client = client
+        self.stats = stats
+        self.documents = documents
+        self.args = args
+        self.rng = random.Random(f"{args.seed}:{index}")
+        self.classes = list(args.mix)
+        self.weights = [args.mix[name] for name in self.classes]
+
+    async def run(self, deadline: float) -> None:
+        flows = 0
+        while time.monotonic() < deadline and (not self.args.flows or flows < self.args.flows):
+            if await self.flow():
+                self.stats.flows_completed += 1
+            else:
+                self.stats.flows_failed += 1
+            flows += 1
+
+    async def think(self) -> None:
+        mean = self.args.think_ms / 1000
+        if mean <= 0:
+            return
+        if self.args.think_dist == "exponential":
+            delay = self.rng.expovariate(1 / mean)
+        elif self.args.think_dist == "uniform":
+            delay = self.rng.uniform(0, 2 * mean)
+        else:
+            delay = mean
+        await asyncio.sleep(delay)
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status: Any = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.stats.record(endpoint, (time.perf_counter() - started) * 1000, status)
+        if response is not None and response.status_code >= 400 and self.args.verbose:
+            print(f"  [user {self.index}] {endpoint}: {response.status_code} {response.text[:200]}")
+        return response if response is not None and response.status_code < 400 else None
+
+    async def flow(self) -> bool:
+        """
+        upload -> session start -> substeps -> YOLO -> export; False if the flow broke off
+        上传 -> 启动会话 -> 子步骤 -> YOLO -> 导出；流程中断时返回 False
+        """
+        size = self.rng.choices(self.classes, self.weights)[0]
+        doc = self.rng.choice(self.documents[size])
+        self.stats.documents[size] += 1
+
+        response = await self.request(
+            "upload", "POST", f"{API}/documents/upload",
+            files={"file": (f"load_{self.index}.txt", doc.text.encode("utf-8"), "text/plain")},
+        )
+        if response is None:
+            return False
+        document_id = response.json()["id"]
+        await self.think()
+
+        response = await self.request(
+            "session_start", "POST", f"{API}/session/start",
+            json={
+                "document_id": document_id,
+                "mode": "intervention",
+                "process_levels": ["high", "medium"],
+                "colloquialism_level": 4,
+                "target_lang": "zh",
+            },
+        )
+        if response is None:
+            return False
+        session_id = response.json()["session_id"]
+        await self.think()
+
+        ok = True
+        for step in self.args.steps:
+            payload = {"text": doc.text, "session_id": session_id}
+            if step.startswith("layer1-"):
+                payload["locked_terms"] = []
+            response = await self.request(
+                f"analyze:{step}", "POST", f"{API}/{STEP_ENDPOINTS[step]}", json=payload,
+            )
+            ok = ok and response is not None
+            await self.think()
+
+        if not self.args.no_yolo:
+            response = await self.request("yolo", "POST", f"{API}/session/{session_id}/yolo-process")
+            ok = ok and response is not None
+            await self.think()
+
+        response = await self.request(
+            "export", "POST", f"{API}/export/document", params={"session_id": session_id, "format": "txt"},
+        )
+        if response is not None:
+            download = await self.request("download", "GET", response.json()["download_url"])
+            ok = ok and download is not None
+        else:
+            ok = False
+        await self.think()
+        return ok
+
+
+# =============================================================================
+# Targets
+# 目标
+# =============================================================================
+
+@contextlib.contextmanager
+def fake_llm_routing(fake_app) -> Iterator[None]:
+    """
+    Send every provider call to the in-process fake LLM
+    将所有提供商调用发送到进程内的模拟LLM
+
+    Provider keys and base URLs are pointed at FAKE_LLM_HOST and httpx
+    requests for that host are served by the fake app; all other requests
+    (including the load client's own) go through unchanged.
+    提供商密钥和 base URL 指向 FAKE_LLM_HOST，发往该主机的 httpx 请求由模拟应用处理；
+    其他请求（包括负载客户端自身的请求）不受影响。
+    """
+    from src.config import get_settings
+
+    settings = get_settings()
+    overrides = {"llm_provider": settings.llm_provider if settings.llm_provider in ("volcengine", "dashscope", "deepseek") else "dashscope"}
+    for provider in ("volcengine", "dashscope", "deepseek"):
+        overrides[f"{provider}_api_key"] = "fake"
+        overrides[f"{provider}_base_url"] = f"http://{FAKE_LLM_HOST}/v1"
+    saved = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+    fake_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app))
+    original_send = httpx.AsyncClient.send
+
+    async def send(self, request, *args, **kwargs):
+        if request.url.host == FAKE_LLM_HOST:
+            return await original_send(fake_client, request, *args, **kwargs)
+        return await original_send(self, request, *args, **kwargs)
+
+    httpx.AsyncClient.send = send
+    try:
+        yield
+    finally:
+        httpx.AsyncClient.send = original_send
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+async def _scrape(client: Optional[httpx.AsyncClient]) -> Optional[Dict]:
+    """App metrics: rendered in-process, or GET /metrics over HTTP 应用指标"""
+    if client is None:
+        from src.services.tracing import render_metrics
+        return parse_metrics(render_metrics())
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    return parse_metrics(response.text) if response.status_code == 200 else None
+
+
+async def _fake_llm_stats(fake_app, fake_llm_url: Optional[str]) -> Optional[Dict]:
+    if fake_app is not None:
+        return fake_app.state.fake_llm.stats()
+    if not fake_llm_url:
+        return None
+    try:
+        async with httpx.AsyncClient(base_url=fake_llm_url, timeout=10.0, trust_env=False) as client:
+            return (await client.get("/fake/stats")).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the virtual users against the chosen target and build the report
+    针对所选目标运行虚拟用户并生成报告
+    """
+    documents = build_documents(args.docs, args.mix, args.seed)
+    stats = LoadStats()
+
+    async with contextlib.AsyncExitStack() as stack:
+        fake_app = None
+        if args.base_url:
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, trust_env=False)
+            )
+            metrics_client: Optional[httpx.AsyncClient] = client
+        else:
+            from src.main import app
+            from src.tools.fake_llm import FakeLLMConfig, create_app
+
+            fake_app = create_app(FakeLLMConfig(
+                latency_ms=args.llm_latency_ms,
+                tokens_per_second=args.llm_tokens_per_second,
+                error_rate=args.llm_error_rate,
+                rate_limit_rate=args.llm_rate_limit_rate,
+                seed=args.seed,
+            ))
+            stack.enter_context(fake_llm_routing(fake_app))
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout
+            ))
+            metrics_client = None
+
+        before = await _scrape(metrics_client)
+        started = time.monotonic()
+        deadline = started + args.duration
+        users = [VirtualUser(i, client, stats, documents, args) for i in range(args.users)]
+
+        async def start(user: VirtualUser) -> None:
+            if args.ramp_up and args.users > 1:
+                await asyncio.sleep(args.ramp_up * user.index / (args.users - 1))
+            await user.run(deadline)
+
+        await asyncio.gather(*(start(user) for user in users))
+        wall_seconds = time.monotonic() - started
+        after = await _scrape(metrics_client)
+        fake_stats = await _fake_llm_stats(fake_app, args.fake_llm_url)
+        prefetch_stats = None
+        if fake_app is not None:
+            from src.api.routes.substeps.prefetch import get_substep_prefetcher
+            prefetch_stats = get_substep_prefetcher().stats()
+
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "environment": {"git_commit": _git_commit(), "cpu_count": os.cpu_count(), "peak_rss_kb": _peak_rss_kb()},
+        "config": {
+            "users": args.users,
+            "duration": args.duration,
+            "flows_per_user": args.flows,
+            "ramp_up": args.ramp_up,
+            "think_ms": args.think_ms,
+            "think_dist": args.think_dist,
+            "mix": args.mix,
+            "steps": list(args.steps),
+            "yolo": not args.no_yolo,
+            "seed": args.seed,
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        **stats.to_dict(wall_seconds),
+    }
+    if before is not None and after is not None:
+        report["db_statements"] = metric_delta(before, after, "academicguard_db_query_duration_seconds_count", ("operation",))
+        report["llm_calls"] = metric_delta(before, after, "academicguard_llm_call_duration_seconds_count", ("provider", "step"))
+        report["llm_tokens"] = metric_delta(before, after, "academicguard_llm_tokens_total", ("kind",))
+    else:
+        report["db_statements"] = report["llm_calls"] = report["llm_tokens"] = None
+    report["fake_llm"] = fake_stats
+    report["substep_prefetch"] = prefetch_stats
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    flows, requests = report["flows"], report["requests"]
+    print(f"Target: {report['target']}  users={report['config']['users']}  wall={report['wall_seconds']:.1f}s")
+    print(
+        f"Flows: {flows['completed']} completed, {flows['failed']} failed ({flows['per_second']:.2f}/s)  "
+        f"Requests: {requests['total']} ({requests['per_second']:.2f}/s, error rate {requests['error_rate']:.1%})"
+    )
+    print(f"{'endpoint':<24} {'count':>7} {'rps':>7} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, e in report["endpoints"].items():
+        print(
+            f"{name:<24} {e['count']:>7} {e['per_second']:>7.2f} {e['error_rate']:>6.1%} "
+            f"{e['ms']['p50']:>9.1f} {e['ms']['p95']:>9.1f} {e['ms']['p99']:>9.1f}"
+        )
+    if report["db_statements"] is not None:
+        print(f"DB statements: {sum(report['db_statements'].values())} {report['db_statements']}")
+        print(f"LLM calls: {sum(report['llm_calls'].values())} {report['llm_calls']}")
+    else:
+        print("DB/LLM counts unavailable (/metrics not reachable from the load generator)")
+    if report["fake_llm"]:
+        print(f"Fake LLM: {report['fake_llm'].get('kinds')} statuses={report['fake_llm'].get('statuses')}")
+    if report.get("substep_prefetch"):
+        print(f"Substep prefetch: {report['substep_prefetch']}")
+
+
+def check_prefetch(argv: List[str]) -> int:
+    """
+    Run the flows without and with substep prefetch at zero think time, each in
+    a fresh process (no caches shared), and fail if prefetch adds LLM calls
+    以零思考时间分别关闭和开启子步骤预取运行流程，每次使用全新进程（不共享缓存），
+    若预取增加了LLM调用则失败
+
+    Returns:
+        Process exit code
+    """
+    totals: Dict[str, int] = {}
+    for enabled in ("false", "true"):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "report.json"
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.load", *argv, "--think-ms", "0", "--output", str(output)],
+                cwd=PROJECT_ROOT,
+                env={**os.environ, "SUBSTEP_PREFETCH_ENABLED": enabled},
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            report = json.loads(output.read_text(encoding="utf-8"))
+        if report["llm_calls"] is None:
+            print("Prefetch check: LLM call counts unavailable")
+            return 2
+        totals[enabled] = sum(report["llm_calls"].values())
+        print(f"Prefetch {'on ' if enabled == 'true' else 'off'}: {totals[enabled]} LLM calls, "
+              f"{report['requests']['total']} requests, prefetch={report.get('substep_prefetch')}")
+
+    if totals["true"] > totals["false"]:
+        print(f"FAIL: prefetch added {totals['true'] - totals['false']} LLM calls at zero think time")
+        return 1
+    print("OK: prefetch added no LLM calls at zero think time")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Main entry point
+    主入口点
+    """
+    parser = argparse.ArgumentParser(description="End-to-end load test of the full user flow")
+    parser.add_argument("--base-url", default=None, help="Running server to test (default: the app in-process)")
+    parser.add_argument("--fake-llm-url", default=None, help="Fake LLM server whose counters join the report")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds after which no new flow starts")
+    parser.add_argument("--flows", type=int, default=0, help="Flows per user (0 = until --duration)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users start")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="Mean think time between requests")
+    parser.add_argument("--think-dist", choices=("exponential", "uniform", "fixed"), default="exponential")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("small=6,medium=3,large=1"),
+                        help="Document size mix, e.g. small=6,medium=3,large=1")
+    parser.add_argument("--docs", type=Path, default=DEFAULT_DOCS_DIR)
+    parser.add_argument("--steps", nargs="*", choices=list(STEP_ENDPOINTS), default=list(DEFAULT_STEPS),
+                        help="Steps analyzed per flow")
+    parser.add_argument("--no-yolo", action="store_true", help="Skip the YOLO request")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="In-process fake LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Print failed responses and keep app logging")
+    parser.add_argument("--check-prefetch", action="store_true",
+                        help="Fail if substep prefetch adds LLM calls at zero think time (in-process only)")
+    args = parser.parse_args(argv)
+
+    if args.check_prefetch:
+        if args.base_url:
+            parser.error("--check-prefetch toggles prefetch in the app and needs the in-process target")
+        rest = [arg for arg in (sys.argv[1:] if argv is None else argv) if arg != "--check-prefetch"]
+        sys.exit(check_prefetch(rest))
+
+    if not args.verbose:
+        import logging
+        logging.disable(logging.WARNING)
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
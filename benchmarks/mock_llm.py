@@ -0,0 +1,80 @@
+"""
+Mocked LLM provider for benchmarks
+基准测试使用的模拟LLM提供方
+
+Patches httpx (which the OpenAI/Anthropic SDKs and the direct provider
+calls all go through) so any LLM request made while benchmarking returns a
+canned OpenAI-compatible completion immediately instead of touching the
+network. Calls are counted so a run can report whether the measured path
+reached an LLM at all.
+
+对 httpx 打补丁（OpenAI/Anthropic SDK 以及直接调用提供方的代码都经过它），
+基准测试期间的任何LLM请求都会立即返回固定的 OpenAI 兼容响应，而不访问网络。
+调用会被计数，以便报告被测路径是否调用了LLM。
+"""
+
+import contextlib
+import json
+from typing import Iterator
+
+import httpx
+
+CANNED_CONTENT = json.dumps({
+    "rewritten": "This is a mocked rewrite.",
+    "suggestions": [],
+    "explanation": "mock",
+})
+
+
+class MockLLM:
+    """
+    Call counter and canned response factory
+    调用计数器和固定响应工厂
+    """
+
+    def __init__(self, content: str = CANNED_CONTENT):
+        self.content = content
+        self.calls = 0
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        return httpx.Response(
+            200,
+            json={
+                "id": "mock",
+                "object": "chat.completion",
+                "model": "mock",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            },
+            request=request,
+        )
+
+
+@contextlib.contextmanager
+def mocked_llm(content: str = CANNED_CONTENT) -> Iterator[MockLLM]:
+    """
+    Route every httpx request to the mock for the duration of the block
+    在代码块执行期间将所有 httpx 请求路由到模拟对象
+    """
+    mock = MockLLM(content)
+    original_async_send = httpx.AsyncClient.send
+    original_send = httpx.Client.send
+
+    async def async_send(self, request, *args, **kwargs):
+        return mock.response(request)
+
+    def send(self, request, *args, **kwargs):
+        return mock.response(request)
+
+    httpx.AsyncClient.send = async_send
+    httpx.Client.send = send
+    try:
+        yield mock
+    finally:
+        httpx.AsyncClient.send = original_async_send
+        httpx.Client.send = original_send
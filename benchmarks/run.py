@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Run the analysis engine benchmarks or compare two benchmark reports
+运行分析引擎基准测试，或对比两份基准报告
+
+Every case runs in-process over test_documents/ and synthetic documents of
+the requested sizes, with LLM calls mocked (benchmarks/mock_llm.py). For
+each (case, document) the report holds per-iteration totals, per-unit
+latency percentiles (unit = document, paragraph or sentence, see
+benchmarks/cases.py), throughput and the peak Python allocation of one
+extra traced iteration.
+
+所有用例在进程内针对 test_documents/ 和指定规模的合成文档运行，LLM 调用被模拟
+（benchmarks/mock_llm.py）。对每个（用例，文档）组合，报告包含每轮总耗时、
+每单元延迟百分位（单元为文档、段落或句子，见 benchmarks/cases.py）、吞吐量，
+以及额外一轮追踪运行的 Python 内存分配峰值。
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --cases scorer ppl --sizes 1000 10000 --no-docs
+    python -m benchmarks.run compare baseline.json bench.json --threshold 0.2
+    python -m benchmarks.run --output bench.json --compare baseline.json
+
+compare (and run --compare) exit with code 1 when a metric of a
+(case, document) present in both reports regressed past its threshold.
+当两份报告中都存在的（用例，文档）的某项指标退化超过阈值时，compare（以及
+run --compare）以退出码1结束。
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import CASES, BenchCase
+from benchmarks.corpus import DEFAULT_DOCS_DIR, DEFAULT_SIZES, BenchDocument, build_corpus
+from benchmarks.mock_llm import mocked_llm
+
+REPORT_VERSION = 1
+
+# metric path -> (threshold option, absolute noise floor)
+# 指标路径 -> （阈值选项，绝对噪声下限）
+COMPARED_METRICS = {
+    "total_ms.mean": ("threshold", "min_ms"),
+    "unit_ms.p50": ("threshold", "min_ms"),
+    "unit_ms.p95": ("threshold", "min_ms"),
+    "peak_alloc_kb": ("mem_threshold", "min_kb"),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile / 最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak / 1024) if sys.platform == "darwin" else int(peak)
+
+
+def _environment() -> Dict:
+    from src.core.analyzer.ppl_calculator import is_onnx_available
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": _git_commit(),
+        "ppl_backend": "onnx" if is_onnx_available() else "zlib",
+    }
+
+
+def run_case(
+    case: BenchCase,
+    doc: BenchDocument,
+    iterations: int,
+    warmup: int,
+    max_seconds: float,
+) -> Dict:
+    """
+    Time one case on one document
+    在一个文档上对一个用例计时
+    """
+    units = case.prepare(doc)
+
+    for _ in range(warmup):
+        for unit in units:
+            unit()
+
+    totals: List[float] = []
+    unit_latencies: List[float] = []
+    budget_start = time.perf_counter()
+    for i in range(iterations):
+        iteration_start = time.perf_counter()
+        for unit in units:
+            start = time.perf_counter()
+            unit()
+            unit_latencies.append((time.perf_counter() - start) * 1000)
+        totals.append((time.perf_counter() - iteration_start) * 1000)
+        # Large documents: stop early once the budget is spent (keep >= 2 samples)
+        # 大文档：预算用尽后提前结束（至少保留2个样本）
+        if i >= 1 and time.perf_counter() - budget_start > max_seconds:
+            break
+
+    # One extra traced iteration for peak allocation (tracing skews timings)
+    # 额外一轮追踪运行获取分配峰值（追踪会影响计时）
+    tracemalloc.start()
+    try:
+        for unit in units:
+            unit()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    mean_total = sum(totals) / len(totals)
+    return {
+        "case": case.name,
+        "document": doc.name,
+        "unit": case.unit,
+        "words": doc.words,
+        "units": len(units),
+        "iterations": len(totals),
+        "total_ms": {
+            "mean": round(mean_total, 3),
+            "min": round(min(totals), 3),
+            "max": round(max(totals), 3),
+        },
+        "unit_ms": {
+            "mean": round(sum(unit_latencies) / max(1, len(unit_latencies)), 4),
+            "p50": round(percentile(unit_latencies, 50), 4),
+            "p95": round(percentile(unit_latencies, 95), 4),
+            "p99": round(percentile(unit_latencies, 99), 4),
+            "max": round(max(unit_latencies, default=0.0), 4),
+        },
+        "words_per_second": round(doc.words / (mean_total / 1000), 1) if mean_total else 0.0,
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(args) -> Dict:
+    """
+    Run the selected cases over the corpus and build the report
+    在语料上运行所选用例并生成报告
+    """
+    corpus = build_corpus(args.docs, args.sizes, include_docs=not args.no_docs, seed=args.seed)
+    cases = [CASES[name] for name in args.cases]
+
+    results = []
+    with mocked_llm() as llm:
+        environment = _environment()
+        print(f"Benchmarking {len(cases)} cases x {len(corpus)} documents "
+              f"(PPL backend: {environment['ppl_backend']})")
+        for doc in corpus:
+            for case in cases:
+                result = run_case(case, doc, args.iterations, args.warmup, args.max_seconds)
+                results.append(result)
+                print(
+                    f"  {case.name:<16} {doc.name:<32} {doc.words:>6} words  "
+                    f"total {result['total_ms']['mean']:>10.2f} ms  "
+                    f"{case.unit} p50 {result['unit_ms']['p50']:>8.3f} / p95 {result['unit_ms']['p95']:>8.3f} ms  "
+                    f"peak {result['peak_alloc_kb']:>9.1f} KB"
+                )
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment,
+        "settings": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "sizes": list(args.sizes),
+            "seed": args.seed,
+        },
+        "llm_calls": llm.calls,
+        "peak_rss_kb": _peak_rss_kb(),
+        "results": results,
+    }
+
+
+def _metric(result: Dict, path: str) -> Optional[float]:
+    value = result
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return float(value)
+
+
+def compare_reports(
+    baseline: Dict,
+    candidate: Dict,
+    threshold: float = 0.2,
+    mem_threshold: float = 0.25,
+    min_ms: float = 0.5,
+    min_kb: float = 64.0,
+) -> Tuple[List[Dict], List[str]]:
+    """
+    Regressions of candidate vs baseline, plus entries present in only one report
+    候选报告相对基线的退化项，以及只存在于一份报告中的条目
+
+    A metric regresses when it grew by more than its relative threshold AND
+    by more than the absolute noise floor (so sub-millisecond jitter on tiny
+    documents does not fail the gate).
+    指标同时超过相对阈值和绝对噪声下限时视为退化（避免小文档上的亚毫秒抖动触发失败）。
+    """
+    limits = {"threshold": threshold, "mem_threshold": mem_threshold, "min_ms": min_ms, "min_kb": min_kb}
+    base_index = {(r["case"], r["document"]): r for r in baseline.get("results", [])}
+    cand_index = {(r["case"], r["document"]): r for r in candidate.get("results", [])}
+
+    regressions = []
+    for key in sorted(base_index.keys() & cand_index.keys()):
+        for path, (ratio_option, floor_option) in COMPARED_METRICS.items():
+            before = _metric(base_index[key], path)
+            after = _metric(cand_index[key], path)
+            if before is None or after is None:
+                continue
+            delta = after - before
+            if delta <= limits[floor_option]:
+                continue
+            change = delta / before if before > 0 else float("inf")
+            if change > limits[ratio_option]:
+                regressions.append({
+                    "case": key[0],
+                    "document": key[1],
+                    "metric": path,
+                    "baseline": before,
+                    "candidate": after,
+                    "change": round(change, 4),
+                })
+
+    unmatched = [f"{case} / {doc} (baseline only)" for case, doc in sorted(base_index.keys() - cand_index.keys())]
+    unmatched += [f"{case} / {doc} (candidate only)" for case, doc in sorted(cand_index.keys() - base_index.keys())]
+    return regressions, unmatched
+
+
+def print_comparison(regressions: List[Dict], unmatched: List[str], baseline: Dict, candidate: Dict) -> None:
+    base_env = baseline.get("environment", {})
+    cand_env = candidate.get("environment", {})
+    print(f"Baseline:  {base_env.get('git_commit')} ({baseline.get('created_at')})")
+    print(f"Candidate: {cand_env.get('git_commit')} ({candidate.get('created_at')})")
+    for field in ("platform", "cpu_count", "ppl_backend"):
+        if base_env.get(field) != cand_env.get(field):
+            print(f"  warning: {field} differs ({base_env.get(field)} vs {cand_env.get(field)})")
+    if unmatched:
+        print(f"  skipped {len(unmatched)} entries present in only one report, e.g.:")
+        for entry in unmatched[:5]:
+            print(f"    {entry}")
+    if not regressions:
+        print("No regressions")
+        return
+    print(f"{len(regressions)} regression(s):")
+    for r in regressions:
+        print(
+            f"  {r['case']:<16} {r['document']:<32} {r['metric']:<14} "
+            f"{r['baseline']:>12.3f} -> {r['candidate']:>12.3f}  (+{r['change']:.1%})"
+        )
+
+
+def _add_compare_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Max relative slowdown of latency metrics (default 0.2 = +20%%)")
+    parser.add_argument("--mem-threshold", type=float, default=0.25,
+                        help="Max relative growth of peak allocation (default 0.25)")
+    parser.add_argument("--min-ms", type=float, default=0.5,
+                        help="Ignore latency increases smaller than this many ms")
+    parser.add_argument("--min-kb", type=float, default=64.0,
+                        help="Ignore allocation increases smaller than this many KB")
+
+
+def _load_report(path: Path) -> Dict:
+    report = json.loads(path.read_text(encoding="utf-8"))
+    if report.get("version") != REPORT_VERSION:
+        print(f"{path}: unsupported report version {report.get('version')}")
+        sys.exit(2)
+    return report
+
+
+def _gate(baseline: Dict, candidate: Dict, args) -> int:
+    regressions, unmatched = compare_reports(
+        baseline, candidate,
+        threshold=args.threshold,
+        mem_threshold=args.mem_threshold,
+        min_ms=args.min_ms,
+        min_kb=args.min_kb,
+    )
+    print_comparison(regressions, unmatched, baseline, candidate)
+    return 1 if regressions else 0
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Main entry point
+    主入口点
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(
+            prog="python -m benchmarks.run compare",
+            description="Fail when a candidate benchmark report regresses against a baseline",
+        )
+        parser.add_argument("baseline", type=Path)
+        parser.add_argument("candidate", type=Path)
+        _add_compare_options(parser)
+        args = parser.parse_args(argv[1:])
+        sys.exit(_gate(_load_report(args.baseline), _load_report(args.candidate), args))
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the analysis engine (use 'compare' to diff two reports)",
+    )
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(DEFAULT_SIZES),
+                        help="Synthetic document sizes in words")
+    parser.add_argument("--docs", type=Path, default=DEFAULT_DOCS_DIR)
+    parser.add_argument("--no-docs", action="store_true", help="Only run synthetic documents")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--max-seconds", type=float, default=20.0,
+                        help="Stop iterating a (case, document) after this long (min 2 iterations)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep analysis logging enabled")
+    parser.add_argument("--compare", type=Path, default=None, metavar="BASELINE",
+                        help="Gate this run against a baseline report")
+    _add_compare_options(parser)
+    args = parser.parse_args(argv)
+
+    # Keep analysis logging out of the timing loop
+    # 避免分析日志进入计时循环
+    if not args.verbose:
+        import logging
+        logging.disable(logging.ERROR)
+
+    report = run_benchmarks(args)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Report written to {args.output}")
+    if report["llm_calls"]:
+        print(f"Note: the measured path made {report['llm_calls']} (mocked) LLM calls")
+
+    if args.compare:
+        sys.exit(_gate(_load_report(args.compare), report, args))
+
+
+if __name__ == "__main__":
+    main()
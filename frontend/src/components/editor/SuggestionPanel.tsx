@@ -67,11 +67,13 @@ export default function SuggestionPanel({
 }: SuggestionPanelProps) {
   const [expandedTrack, setExpandedTrack] = useState<'llm' | 'rule' | 'custom' | null>('llm');
 
-  // Reset to Track A when sentence changes
-  // 切换句子时重置为轨道A
+  // Reset to Track A when sentence changes; Track B when the rule rewrite met
+  // the targets and no LLM suggestion was generated
+  // 切换句子时重置为轨道A；规则改写已达标、未生成LLM建议时展开轨道B
+  const hasLlmSuggestion = !!suggestions?.llmSuggestion;
   useEffect(() => {
-    setExpandedTrack('llm');
-  }, [sentenceId]);
+    setExpandedTrack(hasLlmSuggestion ? 'llm' : 'rule');
+  }, [sentenceId, hasLlmSuggestion]);
 
   // Subscribe to analysisCache directly from store for reactivity
   // 直接从store订阅analysisCache以获得响应性
@@ -216,6 +218,12 @@ export default function SuggestionPanel({
 
       {/* Track B: Rule Suggestion - hide when only showing analysis */}
       {/* 轨道B: 规则建议 - 仅显示分析时隐藏 */}
+      {!showOnlyAnalysis && !suggestions.llmSuggestion && suggestions.cascadeDecisions?.[0]?.decision === 'accept' && (
+        <p className="px-1 text-xs text-gray-500">
+          规则改写已达到风险目标，未调用LLM
+          <span className="ml-1 text-gray-400">Rule rewrite met the risk target; no LLM call was made</span>
+        </p>
+      )}
       {!showOnlyAnalysis && suggestions.ruleSuggestion && (
         <SuggestionTrack
           title="轨道B: 规则建议"
@@ -52,10 +52,12 @@ export default function History() {
     setIsLoading(true);
     setError(null);
     try {
-      const [sessionsData, documentsData] = await Promise.all([
-        sessionApi.list(),
-        documentApi.list(),
-      ]);
+      // Risk counts for exactly the documents of the listed sessions
+      // 只获取所列会话对应文档的风险计数
+      const sessionsData = await sessionApi.list();
+      const documentsData = await documentApi.listByIds(
+        sessionsData.map((session: SessionInfo) => session.documentId)
+      );
 
       // Create a map of document info by id
       // 创建文档信息映射
@@ -117,10 +117,9 @@ export default function Review() {
         result = await exportApi.exportReport(sessionId, format);
       }
 
-      // Trigger download
-      // 触发下载
-      const downloadUrl = exportApi.download(result.filename);
-      window.open(downloadUrl, '_blank');
+      // Trigger download (streamed, content-addressed URL)
+      // 触发下载（流式、按内容寻址的链接）
+      window.open(result.downloadUrl, '_blank');
     } catch (error) {
       console.error('Export failed:', error);
     } finally {
@@ -46,6 +46,10 @@ const transformKeys = <T>(obj: unknown): T => {
   return obj as T;
 };
 
+// Largest page of GET /documents/ (LIST_PAGE_SIZE_MAX on the server)
+// GET /documents/ 的最大页大小（服务端 LIST_PAGE_SIZE_MAX）
+const DOCUMENT_PAGE_SIZE = 100;
+
 // Create axios instance
 // 创建 axios 实例
 const api: AxiosInstance = axios.create({
@@ -113,13 +117,31 @@ export const documentApi = {
   },
 
   /**
-   * List all documents
-   * 列出所有文档
+   * List the newest documents (one page)
+   * 列出最新的文档（一页）
    */
   list: async (): Promise<DocumentInfo[]> => {
     const response = await api.get('/documents/');
     return transformKeys<DocumentInfo[]>(response.data);
   },
+
+  /**
+   * Get the listing entries (risk counts, no text) of specific documents
+   * 获取指定文档的列表条目（风险计数，不含正文）
+   */
+  listByIds: async (documentIds: string[]): Promise<DocumentInfo[]> => {
+    const ids = Array.from(new Set(documentIds));
+    const pages: Promise<DocumentInfo[]>[] = [];
+    for (let start = 0; start < ids.length; start += DOCUMENT_PAGE_SIZE) {
+      const chunk = ids.slice(start, start + DOCUMENT_PAGE_SIZE);
+      pages.push(
+        api
+          .get('/documents/', { params: { ids: chunk, limit: chunk.length }, paramsSerializer: { indexes: null } })
+          .then((response) => transformKeys<DocumentInfo[]>(response.data))
+      );
+    }
+    return (await Promise.all(pages)).flat();
+  },
 };
 
 // Analysis APIs
@@ -633,8 +655,8 @@ export const exportApi = {
   },
 
   /**
-   * Download file
-   * 下载文件
+   * Download a file exported to disk by earlier versions (legacy)
+   * 下载旧版本导出到磁盘的文件（兼容旧链接）
    */
   download: (filename: string): string => {
     return `/api/v1/export/download/${filename}`;
@@ -114,6 +114,17 @@ export interface SuggestResponse {
   llmSuggestion?: Suggestion;
   ruleSuggestion?: Suggestion;
   lockedTerms: string[];
+  cascadeDecisions?: CascadeDecision[];
+}
+
+// One suggestion-cascade tier decision (rule tier first, LLM only on escalation)
+// 建议级联的单层决策（先规则层，仅在升级时调用LLM）
+export interface CascadeDecision {
+  tier: 'rule' | 'llm';
+  decision: 'accept' | 'escalate' | 'reject';
+  reason: string;
+  risk: number | null;
+  semantic: number | null;
 }
 
 // Validation result
@@ -11,19 +11,30 @@ to ONNX format for efficient inference without PyTorch dependency at runtime.
 
 Usage:
     python scripts/download_onnx_model.py
+    python scripts/download_onnx_model.py --variants int8 fp16
+    python scripts/download_onnx_model.py --variants int8 --skip-export
 
 Requirements (install before running):
     pip install torch transformers onnx
+    pip install onnxruntime onnxconverter-common  # for --variants
 
 Output:
     models/distilgpt2.onnx - ONNX model file (~200MB)
+    models/distilgpt2.int8.onnx - Dynamic INT8 quantized variant (~60MB)
+    models/distilgpt2.fp16.onnx - Half-precision variant with fp16 KV inputs (~100MB)
     models/tokenizer.json - Tokenizer file
 
+Select the variant at runtime with PPL_MODEL_VARIANT=fp32|int8|fp16, then run
+scripts/evaluate_ppl_variants.py to check PPL drift against fp32.
+运行时通过 PPL_MODEL_VARIANT=fp32|int8|fp16 选择变体，
+然后运行 scripts/evaluate_ppl_variants.py 检查相对fp32的PPL偏移。
+
 Author: AcademicGuard Team
 Date: 2026-01-02
 """
 
 import sys
+import argparse
 import logging
 from pathlib import Path
 
@@ -156,7 +167,90 @@ def download_and_convert():
     logger.info("  pip install onnxruntime tokenizers")
 
 
-def verify_model():
+def quantize_int8(source_path: Path, target_path: Path):
+    """
+    Build the dynamic INT8 variant (weights quantized, activations quantized at runtime)
+    构建动态INT8变体（权重量化，激活值在运行时量化）
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    logger.info(f"Quantizing {source_path.name} to dynamic INT8...")
+    quantize_dynamic(
+        model_input=str(source_path),
+        model_output=str(target_path),
+        weight_type=QuantType.QInt8,
+        # MatMul/Gemm dominate GPT-2 latency; leave Gather (embeddings) in fp32
+        # MatMul/Gemm 占据 GPT-2 主要耗时；Gather（嵌入层）保持fp32
+        op_types_to_quantize=["MatMul", "Gemm"],
+        per_channel=False,
+    )
+    logger.info(f"INT8 model saved to {target_path}")
+
+
+def convert_fp16(source_path: Path, target_path: Path):
+    """
+    Build the fp16 variant (weights and past_key_values inputs in half precision)
+    构建fp16变体（权重和past_key_values输入为半精度）
+    """
+    import onnx
+    from onnxconverter_common import float16
+
+    logger.info(f"Converting {source_path.name} to fp16...")
+    model = onnx.load(str(source_path))
+    # keep_io_types=False so float inputs (the KV cache) become float16 as well;
+    # int64 inputs (input_ids, attention_mask) are not touched
+    # keep_io_types=False 使浮点输入（KV缓存）也变为float16；int64输入不受影响
+    model_fp16 = float16.convert_float_to_float16(model, keep_io_types=False)
+    onnx.save(model_fp16, str(target_path))
+    logger.info(f"FP16 model saved to {target_path}")
+
+
+def build_variants(variants):
+    """
+    Build the requested model variants from models/distilgpt2.onnx
+    从 models/distilgpt2.onnx 构建请求的模型变体
+    """
+    project_root = Path(__file__).parent.parent
+    model_dir = project_root / "models"
+    source_path = model_dir / "distilgpt2.onnx"
+
+    if not source_path.exists():
+        logger.error(f"Base model not found at {source_path}; run without --skip-export first")
+        return False
+
+    builders = {
+        "int8": (quantize_int8, model_dir / "distilgpt2.int8.onnx"),
+        "fp16": (convert_fp16, model_dir / "distilgpt2.fp16.onnx"),
+    }
+
+    ok = True
+    for variant in variants:
+        builder, target_path = builders[variant]
+        try:
+            builder(source_path, target_path)
+            logger.info(
+                f"{variant}: {target_path.stat().st_size / 1024 / 1024:.1f} MB "
+                f"(fp32: {source_path.stat().st_size / 1024 / 1024:.1f} MB)"
+            )
+        except ImportError as e:
+            logger.error(f"Cannot build {variant} variant, missing dependency: {e}")
+            ok = False
+        except Exception as e:
+            logger.error(f"Failed to build {variant} variant: {e}")
+            ok = False
+
+    # Any previously serialized optimized graphs are now stale
+    # 之前序列化的优化计算图已过期
+    optimized_dir = model_dir / "optimized"
+    if optimized_dir.exists():
+        for stale in optimized_dir.glob("*.opt.onnx"):
+            stale.unlink()
+            logger.info(f"Removed stale optimized graph {stale.name}")
+
+    return ok
+
+
+def verify_model(model_name: str = "distilgpt2.onnx"):
     """
     Verify the exported ONNX model
     验证导出的ONNX模型
@@ -164,7 +258,7 @@ def verify_model():
     import onnx
 
     project_root = Path(__file__).parent.parent
-    model_path = project_root / "models" / "distilgpt2.onnx"
+    model_path = project_root / "models" / model_name
 
     if not model_path.exists():
         logger.error(f"Model not found at {model_path}")
@@ -261,26 +355,49 @@ def main():
     Main entry point
     主入口点
     """
+    parser = argparse.ArgumentParser(description="Download distilgpt2 and build ONNX PPL model variants")
+    parser.add_argument(
+        "--variants", nargs="*", choices=["int8", "fp16"], default=[],
+        help="Additional model variants to build from the fp32 export"
+    )
+    parser.add_argument(
+        "--skip-export", action="store_true",
+        help="Reuse an existing models/distilgpt2.onnx instead of downloading again"
+    )
+    args = parser.parse_args()
+
     logger.info("=" * 60)
     logger.info("AcademicGuard ONNX Model Downloader")
     logger.info("=" * 60)
 
-    # Check dependencies
-    # 检查依赖
-    if not check_dependencies():
-        sys.exit(1)
-
-    # Download and convert
-    # 下载并转换
-    download_and_convert()
-
-    # Verify model
-    # 验证模型
-    verify_model()
-
-    # Test inference
-    # 测试推理
-    test_inference()
+    if not args.skip_export:
+        # Check dependencies
+        # 检查依赖
+        if not check_dependencies():
+            sys.exit(1)
+
+        # Download and convert
+        # 下载并转换
+        download_and_convert()
+
+        # Verify model
+        # 验证模型
+        verify_model()
+
+        # Test inference
+        # 测试推理
+        test_inference()
+
+    # Build quantized / half-precision variants
+    # 构建量化/半精度变体
+    if args.variants:
+        if not build_variants(args.variants):
+            sys.exit(1)
+        for variant in args.variants:
+            verify_model(f"distilgpt2.{variant}.onnx")
+        logger.info("")
+        logger.info("Compare variants against fp32 with:")
+        logger.info(f"  python scripts/evaluate_ppl_variants.py --variants {' '.join(args.variants)}")
 
     logger.info("")
     logger.info("Setup complete! You can now use ONNX-based PPL calculation.")
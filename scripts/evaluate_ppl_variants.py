@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Evaluate quantized / optimized PPL model variants against the fp32 baseline
+评估量化/优化后的PPL模型变体与fp32基线的差异
+
+Runs every paragraph of the documents in test_documents/ through the fp32
+model and each requested variant, then reports:
+- PPL drift (mean / p95 / max relative difference vs fp32)
+- PPL risk-level agreement (same high/medium/low verdict as fp32, using the
+  thresholds RiskScorer._score_ppl applies)
+- Latency per paragraph (mean / p50 / p95) and speedup vs fp32
+
+对 test_documents/ 中每个段落分别用fp32模型和各变体计算PPL，报告：
+- PPL偏移（相对fp32的平均/p95/最大相对差异）
+- PPL风险等级一致率（使用与 RiskScorer._score_ppl 相同的阈值）
+- 每段延迟（平均/p50/p95）及相对fp32的加速比
+
+Usage:
+    python scripts/evaluate_ppl_variants.py --variants int8 fp16
+    python scripts/evaluate_ppl_variants.py --variants int8 --json report.json
+
+Exit code is 1 when a variant's risk-level agreement falls below --min-agreement.
+当变体的风险等级一致率低于 --min-agreement 时退出码为1。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import get_settings
+from src.core.analyzer.ppl_calculator import (
+    PPL_MODEL_VARIANTS,
+    _get_model_paths,
+    _load_tokenizer,
+    create_ppl_session,
+    compute_ppl,
+)
+
+settings = get_settings()
+
+DEFAULT_DOCS_DIR = Path(__file__).parent.parent / "test_documents"
+
+
+def load_paragraphs(docs_dir: Path, min_chars: int = 80) -> List[str]:
+    """
+    Split every .txt document into paragraphs long enough for PPL
+    将每个 .txt 文档切分为足够长的段落
+    """
+    paragraphs = []
+    for path in sorted(docs_dir.rglob("*.txt")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        for block in text.replace("\r\n", "\n").split("\n\n"):
+            block = " ".join(block.split())
+            if len(block) >= min_chars:
+                paragraphs.append(block)
+    return paragraphs
+
+
+def ppl_risk_level(ppl: float) -> str:
+    """
+    Map PPL to risk level exactly as RiskScorer does (after its 5-100 clamp)
+    与 RiskScorer 相同的方式将PPL映射为风险等级（含5-100截断）
+    """
+    ppl = max(5.0, min(100.0, ppl))
+    if ppl < settings.ppl_threshold_high:
+        return "high"
+    if ppl < settings.ppl_threshold_medium:
+        return "medium"
+    return "low"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile / 最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_variant(variant: str, paragraphs: List[str], tokenizer, warmup: int) -> Dict:
+    """
+    Compute PPL and latency for each paragraph with one variant
+    使用一个变体计算每个段落的PPL和延迟
+    """
+    model_path, _ = _get_model_paths(variant)
+    if not model_path.exists():
+        raise FileNotFoundError(f"{variant} model not found at {model_path}")
+
+    load_start = time.perf_counter()
+    session = create_ppl_session(model_path)
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    for text in paragraphs[:warmup]:
+        compute_ppl(session, tokenizer, text)
+
+    ppls: List[Optional[float]] = []
+    latencies: List[float] = []
+    for text in paragraphs:
+        start = time.perf_counter()
+        ppls.append(compute_ppl(session, tokenizer, text))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "variant": variant,
+        "model_path": str(model_path),
+        "session_load_ms": round(load_ms, 1),
+        "ppls": ppls,
+        "latencies_ms": latencies,
+    }
+
+
+def compare(baseline: Dict, candidate: Dict) -> Dict:
+    """
+    Compare a variant run against the fp32 run
+    将变体结果与fp32结果对比
+    """
+    drifts = []
+    agree = 0
+    total = 0
+    disagreements = []
+    for i, (base_ppl, cand_ppl) in enumerate(zip(baseline["ppls"], candidate["ppls"])):
+        if base_ppl is None or cand_ppl is None:
+            continue
+        total += 1
+        drifts.append(abs(cand_ppl - base_ppl) / base_ppl)
+        base_level = ppl_risk_level(base_ppl)
+        cand_level = ppl_risk_level(cand_ppl)
+        if base_level == cand_level:
+            agree += 1
+        else:
+            disagreements.append({
+                "paragraph": i,
+                "fp32_ppl": round(base_ppl, 2),
+                "variant_ppl": round(cand_ppl, 2),
+                "fp32_level": base_level,
+                "variant_level": cand_level,
+            })
+
+    base_mean = sum(baseline["latencies_ms"]) / max(1, len(baseline["latencies_ms"]))
+    cand_mean = sum(candidate["latencies_ms"]) / max(1, len(candidate["latencies_ms"]))
+
+    return {
+        "variant": candidate["variant"],
+        "paragraphs": total,
+        "ppl_drift_mean": round(sum(drifts) / max(1, len(drifts)), 4),
+        "ppl_drift_p95": round(percentile(drifts, 95), 4),
+        "ppl_drift_max": round(max(drifts) if drifts else 0.0, 4),
+        "risk_level_agreement": round(agree / max(1, total), 4),
+        "latency_mean_ms": round(cand_mean, 2),
+        "latency_p50_ms": round(percentile(candidate["latencies_ms"], 50), 2),
+        "latency_p95_ms": round(percentile(candidate["latencies_ms"], 95), 2),
+        "speedup_vs_fp32": round(base_mean / cand_mean, 2) if cand_mean else 0.0,
+        "session_load_ms": candidate["session_load_ms"],
+        "disagreements": disagreements,
+    }
+
+
+def main():
+    """
+    Main entry point
+    主入口点
+    """
+    parser = argparse.ArgumentParser(description="Evaluate PPL model variants against fp32")
+    parser.add_argument(
+        "--variants", nargs="+", default=["int8"],
+        choices=[v for v in PPL_MODEL_VARIANTS if v != "fp32"],
+    )
+    parser.add_argument("--docs", type=Path, default=DEFAULT_DOCS_DIR)
+    parser.add_argument("--warmup", type=int, default=3, help="Warm-up paragraphs per variant")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--json", type=Path, default=None, help="Write full report to this file")
+    args = parser.parse_args()
+
+    paragraphs = load_paragraphs(args.docs)
+    if not paragraphs:
+        print(f"No paragraphs found under {args.docs}")
+        sys.exit(1)
+
+    _, tokenizer_path = _get_model_paths("fp32")
+    tokenizer = _load_tokenizer(tokenizer_path)
+    if tokenizer is None:
+        print("Tokenizer unavailable; run scripts/download_onnx_model.py first")
+        sys.exit(1)
+
+    print(f"Evaluating {len(paragraphs)} paragraphs from {args.docs}")
+    baseline = run_variant("fp32", paragraphs, tokenizer, args.warmup)
+    base_mean = sum(baseline["latencies_ms"]) / len(baseline["latencies_ms"])
+    print(f"  fp32: mean {base_mean:.2f} ms/paragraph, load {baseline['session_load_ms']} ms")
+
+    reports = []
+    failed = False
+    for variant in args.variants:
+        try:
+            candidate = run_variant(variant, paragraphs, tokenizer, args.warmup)
+        except FileNotFoundError as e:
+            print(f"  {variant}: skipped ({e})")
+            failed = True
+            continue
+
+        report = compare(baseline, candidate)
+        reports.append(report)
+        print(
+            f"  {variant}: agreement {report['risk_level_agreement']:.2%}, "
+            f"drift mean {report['ppl_drift_mean']:.2%} / p95 {report['ppl_drift_p95']:.2%}, "
+            f"mean {report['latency_mean_ms']} ms (x{report['speedup_vs_fp32']} vs fp32), "
+            f"load {report['session_load_ms']} ms"
+        )
+        for item in report["disagreements"][:5]:
+            print(
+                f"    paragraph {item['paragraph']}: fp32 {item['fp32_ppl']} ({item['fp32_level']}) "
+                f"-> {variant} {item['variant_ppl']} ({item['variant_level']})"
+            )
+        if report["risk_level_agreement"] < args.min_agreement:
+            failed = True
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "paragraphs": len(paragraphs),
+            "fp32_latency_mean_ms": round(base_mean, 2),
+            "variants": reports,
+        }, indent=2), encoding="utf-8")
+        print(f"Report written to {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
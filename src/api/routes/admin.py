@@ -8,13 +8,15 @@ This module provides admin statistics and dashboard endpoints.
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, case
+from sqlalchemy import select, func, and_, or_, case
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
+import math
 
 from src.db.database import get_db
-from src.db.models import User, Task, Document, Session, Feedback, PaymentStatus, TaskStatus
+from src.db.models import User, Task, Document, Session, Feedback, PaymentStatus, TaskStatus, AdminDailyRollup
+from src.services.admin_rollup import PRICE_BUCKETS, get_rollup_refresher, price_bucket_condition, price_bucket_expr
 from src.config import get_settings
 from src.middleware.admin_middleware import get_admin_user, create_admin_token, verify_admin_secret
 
@@ -186,20 +188,22 @@ async def get_overview_stats(
     week_start = today_start - timedelta(days=now.weekday())
     month_start = today_start.replace(day=1)
 
-    # Revenue statistics
-    # 营收统计
+    # Revenue and usage statistics from the daily rollups
+    # 从每日汇总读取营收和使用量统计
+    await get_rollup_refresher().ensure_built()
     revenue_query = select(
-        func.coalesce(func.sum(Task.price_final), 0).label("total"),
+        func.coalesce(func.sum(AdminDailyRollup.revenue), 0).label("total"),
         func.coalesce(func.sum(
-            case((Task.paid_at >= today_start, Task.price_final), else_=0)
+            case((AdminDailyRollup.day >= today_start.date(), AdminDailyRollup.revenue), else_=0)
         ), 0).label("today"),
         func.coalesce(func.sum(
-            case((Task.paid_at >= week_start, Task.price_final), else_=0)
+            case((AdminDailyRollup.day >= week_start.date(), AdminDailyRollup.revenue), else_=0)
         ), 0).label("week"),
         func.coalesce(func.sum(
-            case((Task.paid_at >= month_start, Task.price_final), else_=0)
-        ), 0).label("month")
-    ).where(Task.payment_status == PaymentStatus.PAID.value)
+            case((AdminDailyRollup.day >= month_start.date(), AdminDailyRollup.revenue), else_=0)
+        ), 0).label("month"),
+        func.coalesce(func.sum(AdminDailyRollup.words), 0).label("total_words")
+    )
 
     revenue_result = await db.execute(revenue_query)
     revenue_row = revenue_result.first()
@@ -229,15 +233,6 @@ async def get_overview_stats(
     user_result = await db.execute(user_query)
     user_row = user_result.first()
 
-    # Usage statistics
-    # 使用量统计
-    usage_query = select(
-        func.coalesce(func.sum(Task.word_count_billable), 0).label("total_words")
-    ).where(Task.payment_status == PaymentStatus.PAID.value)
-
-    usage_result = await db.execute(usage_query)
-    usage_row = usage_result.first()
-
     doc_count_result = await db.execute(select(func.count(Document.id)))
     doc_count = doc_count_result.scalar() or 0
 
@@ -259,7 +254,7 @@ async def get_overview_stats(
         active_users_week=int(user_row.active_week or 0),
         new_users_today=int(user_row.new_today or 0),
         # Usage
-        total_words_processed=int(usage_row.total_words or 0),
+        total_words_processed=int(revenue_row.total_words or 0),
         total_documents=doc_count,
         # Time range
         data_from="2024-01-01",
@@ -288,56 +283,45 @@ async def get_revenue_stats(
     now = datetime.utcnow()
     start_date = now - timedelta(days=days)
 
-    # Query revenue by date
-    # 按日期查询营收
-    if period == "daily":
-        date_format = func.date(Task.paid_at)
-    elif period == "weekly":
-        # SQLite week grouping
-        date_format = func.strftime('%Y-W%W', Task.paid_at)
-    else:  # monthly
-        date_format = func.strftime('%Y-%m', Task.paid_at)
-
+    # Daily rows come from the rollup table; weeks/months are merged here
+    # 每日数据来自汇总表；周/月在此合并
+    await get_rollup_refresher().ensure_built()
     query = select(
-        date_format.label("date"),
-        func.sum(Task.price_final).label("revenue"),
-        func.count(Task.task_id).label("task_count"),
-        func.avg(Task.price_final).label("avg_price")
+        AdminDailyRollup.day.label("day"),
+        func.sum(AdminDailyRollup.revenue).label("revenue"),
+        func.sum(AdminDailyRollup.task_count).label("task_count")
     ).where(
-        and_(
-            Task.payment_status == PaymentStatus.PAID.value,
-            Task.paid_at >= start_date,
-            Task.paid_at.isnot(None)
-        )
-    ).group_by(date_format).order_by(date_format.desc())
+        AdminDailyRollup.day >= start_date.date()
+    ).group_by(AdminDailyRollup.day).order_by(AdminDailyRollup.day)
 
     result = await db.execute(query)
     rows = result.all()
 
-    # Convert to data points
-    # 转换为数据点
-    data = []
-    total_revenue = 0.0
-    total_tasks = 0
-
+    # Merge into periods (oldest first, for charts)
+    # 合并为周期（最旧的在前，用于图表）
+    periods: Dict[str, List[float]] = {}
     for row in rows:
-        revenue = float(row.revenue or 0)
-        task_count = int(row.task_count or 0)
-        avg_price = float(row.avg_price or 0)
-
-        total_revenue += revenue
-        total_tasks += task_count
-
-        data.append(RevenueDataPoint(
-            date=str(row.date) if row.date else "",
-            revenue=revenue,
+        if period == "daily":
+            key = row.day.isoformat()
+        elif period == "weekly":
+            key = row.day.strftime('%Y-W%W')
+        else:  # monthly
+            key = row.day.strftime('%Y-%m')
+        totals = periods.setdefault(key, [0.0, 0])
+        totals[0] += float(row.revenue or 0)
+        totals[1] += int(row.task_count or 0)
+
+    data = [
+        RevenueDataPoint(
+            date=key,
+            revenue=round(revenue, 2),
             task_count=task_count,
-            avg_price=round(avg_price, 2)
-        ))
-
-    # Reverse to show oldest first (for charts)
-    # 反转以显示最旧的数据在前（用于图表）
-    data.reverse()
+            avg_price=round(revenue / task_count, 2) if task_count else 0.0
+        )
+        for key, (revenue, task_count) in periods.items()
+    ]
+    total_revenue = sum(revenue for revenue, _ in periods.values())
+    total_tasks = sum(task_count for _, task_count in periods.values())
 
     # Calculate average order value
     # 计算平均订单金额
@@ -589,9 +573,6 @@ async def get_feedback_stats(
 # 异常检测端点
 # ==========================================
 
-import statistics
-
-
 class OrderPoint(BaseModel):
     """Order data point for scatter chart 订单数据点（散点图用）"""
     task_id: str
@@ -644,16 +625,28 @@ class AnomalyOrder(BaseModel):
     status: str
 
 
-def calculate_stats(call_counts: List[int], sigma: float = 2.0) -> Optional[Dict[str, float]]:
+# Call count of a task (NULL counts as 0)
+# 任务的调用次数（NULL 视为 0）
+CALLS = func.coalesce(Task.api_call_count, 0)
+
+
+def calculate_stats(count: int, total: float, total_sq: float, sigma: float = 2.0) -> Optional[Dict[str, float]]:
     """
-    Calculate mean, std, and threshold for anomaly detection
-    计算均值、标准差和异常阈值
+    Calculate mean, sample std, and threshold from SQL aggregates
+    根据SQL聚合值计算均值、样本标准差和异常阈值
+
+    Args:
+        count: COUNT(calls)
+        total: SUM(calls)
+        total_sq: SUM(calls * calls)
+        sigma: Standard deviation multiplier
     """
-    if len(call_counts) < 2:
+    if count < 2:
         return None
 
-    mean = statistics.mean(call_counts)
-    std = statistics.stdev(call_counts) if len(call_counts) > 1 else 0
+    mean = total / count
+    variance = max(0.0, (total_sq - count * mean * mean) / (count - 1))
+    std = math.sqrt(variance)
     threshold = mean + sigma * std
 
     return {
@@ -664,6 +657,32 @@ def calculate_stats(call_counts: List[int], sigma: float = 2.0) -> Optional[Dict
     }
 
 
+def _priced_task_conditions(min_price: Optional[float] = None, max_price: Optional[float] = None) -> list:
+    """
+    Conditions for priced tasks with optional price filters
+    有价格任务的条件（含可选价格筛选）
+    """
+    conditions = [
+        Task.price_final.isnot(None),
+        Task.price_final > 0
+    ]
+    if min_price is not None:
+        conditions.append(Task.price_final >= min_price)
+    if max_price is not None:
+        conditions.append(Task.price_final <= max_price)
+    return conditions
+
+
+def _call_aggregates():
+    """COUNT / SUM / SUM of squares / MAX of call counts 调用次数的聚合列"""
+    return (
+        func.count(Task.task_id).label("n"),
+        func.coalesce(func.sum(CALLS), 0).label("total"),
+        func.coalesce(func.sum(CALLS * CALLS), 0).label("total_sq"),
+        func.coalesce(func.max(CALLS), 0).label("max_calls"),
+    )
+
+
 @router.get("/anomaly/overview")
 async def get_anomaly_overview(
     sigma: float = Query(2.0, description="Standard deviation multiplier | 标准差倍数", ge=1.0, le=4.0),
@@ -677,18 +696,20 @@ async def get_anomaly_overview(
     Returns:
         Overview statistics with anomaly count and price range breakdown
     """
-    # Get all tasks with price and api_call_count
-    # 获取所有有价格和调用次数的任务
-    query = select(Task).where(
-        and_(
-            Task.price_final.isnot(None),
-            Task.price_final > 0
-        )
+    conditions = _priced_task_conditions()
+
+    # Per-bucket aggregates in one GROUP BY
+    # 一次 GROUP BY 得到各价格区间的聚合值
+    bucket = price_bucket_expr(else_=None)
+    result = await db.execute(
+        select(bucket.label("bucket"), *_call_aggregates())
+        .where(and_(*conditions))
+        .group_by(bucket)
     )
-    result = await db.execute(query)
-    tasks = result.scalars().all()
+    rows = {row.bucket: row for row in result.all()}
+    total_tasks = sum(int(row.n) for row in rows.values())
 
-    if not tasks:
+    if not total_tasks:
         return {
             "total_tasks": 0,
             "anomaly_count": 0,
@@ -696,49 +717,44 @@ async def get_anomaly_overview(
             "price_ranges": []
         }
 
-    # Define price ranges
-    # 定义价格区间
-    price_ranges_def = [
-        (50, 100, "¥50-100"),
-        (100, 200, "¥100-200"),
-        (200, 500, "¥200-500"),
-        (500, 1000, "¥500-1000"),
-        (1000, float('inf'), "¥1000+")
-    ]
-
-    price_ranges_stats = []
-    total_anomalies = 0
-
-    for min_p, max_p, label in price_ranges_def:
-        tasks_in_range = [
-            t for t in tasks
-            if min_p <= (t.price_final or 0) < max_p
-        ]
-
-        if not tasks_in_range:
+    bucket_stats = {}
+    for min_p, max_p, label in PRICE_BUCKETS:
+        row = rows.get(label)
+        if row is None:
             continue
-
-        call_counts = [t.api_call_count or 0 for t in tasks_in_range]
-        stats = calculate_stats(call_counts, sigma)
-
+        stats = calculate_stats(int(row.n), float(row.total), float(row.total_sq), sigma)
         if stats:
-            threshold = stats["threshold"]
-            anomalies = [t for t in tasks_in_range if (t.api_call_count or 0) > threshold]
-            anomaly_count = len(anomalies)
-            total_anomalies += anomaly_count
-
-            price_ranges_stats.append(PriceRangeStats(
-                range_label=label,
-                min_price=min_p,
-                max_price=min(max_p, 99999),
-                task_count=len(tasks_in_range),
-                mean_calls=stats["mean"],
-                std_calls=stats["std"],
-                threshold=stats["threshold"],
-                anomaly_count=anomaly_count
-            ))
-
-    total_tasks = len(tasks)
+            bucket_stats[label] = (min_p, max_p, int(row.n), stats)
+
+    # Count tasks above their own bucket's threshold in a second GROUP BY
+    # 第二次 GROUP BY 统计超过所在区间阈值的任务
+    anomaly_counts = {}
+    if bucket_stats:
+        above_threshold = or_(*[
+            and_(price_bucket_condition(min_p, max_p), CALLS > stats["threshold"])
+            for min_p, max_p, _, stats in bucket_stats.values()
+        ])
+        result = await db.execute(
+            select(bucket.label("bucket"), func.count(Task.task_id).label("n"))
+            .where(and_(*conditions, above_threshold))
+            .group_by(bucket)
+        )
+        anomaly_counts = {row.bucket: int(row.n) for row in result.all()}
+
+    price_ranges_stats = [
+        PriceRangeStats(
+            range_label=label,
+            min_price=min_p,
+            max_price=min(max_p or float('inf'), 99999),
+            task_count=task_count,
+            mean_calls=stats["mean"],
+            std_calls=stats["std"],
+            threshold=stats["threshold"],
+            anomaly_count=anomaly_counts.get(label, 0)
+        )
+        for label, (min_p, max_p, task_count, stats) in bucket_stats.items()
+    ]
+    total_anomalies = sum(anomaly_counts.values())
     anomaly_rate = round(total_anomalies / total_tasks * 100, 2) if total_tasks > 0 else 0
 
     return {
@@ -755,6 +771,7 @@ async def get_anomaly_distribution(
     min_price: Optional[float] = Query(None, description="Minimum price filter | 最小金额"),
     max_price: Optional[float] = Query(None, description="Maximum price filter | 最大金额"),
     sigma: float = Query(2.0, description="Standard deviation multiplier | 标准差倍数", ge=1.0, le=4.0),
+    scatter_limit: int = Query(2000, description="Max scatter points | 散点数上限", ge=100, le=20000),
     db: AsyncSession = Depends(get_db),
     admin: dict = Depends(get_admin_user)
 ):
@@ -762,36 +779,20 @@ async def get_anomaly_distribution(
     Get order distribution data for charts
     获取订单分布数据（用于图表）
 
+    Statistics and histogram bins are computed in SQL. The scatter plot is
+    capped at scatter_limit points: anomalies first, then the most recent orders.
+    统计值和直方图分组在SQL中计算。散点图最多 scatter_limit 个点：优先异常订单，其次最近订单。
+
     Returns:
         Scatter plot data, histogram data, and statistics
     """
-    # Build query with optional price filters
-    # 构建带可选价格筛选的查询
-    conditions = [
-        Task.price_final.isnot(None),
-        Task.price_final > 0
-    ]
-
-    if min_price is not None:
-        conditions.append(Task.price_final >= min_price)
-    if max_price is not None:
-        conditions.append(Task.price_final <= max_price)
-
-    query = select(Task).where(and_(*conditions))
-    result = await db.execute(query)
-    tasks = result.scalars().all()
-
-    if not tasks:
-        return {
-            "scatter_data": [],
-            "histogram_data": [],
-            "stats": None
-        }
+    conditions = _priced_task_conditions(min_price, max_price)
 
     # Calculate statistics
     # 计算统计值
-    call_counts = [t.api_call_count or 0 for t in tasks]
-    stats = calculate_stats(call_counts, sigma)
+    result = await db.execute(select(*_call_aggregates()).where(and_(*conditions)))
+    agg = result.first()
+    stats = calculate_stats(int(agg.n or 0), float(agg.total or 0), float(agg.total_sq or 0), sigma) if agg else None
 
     if not stats:
         return {
@@ -801,29 +802,49 @@ async def get_anomaly_distribution(
         }
 
     threshold = stats["threshold"]
+    total_count = int(agg.n)
 
     # Build scatter plot data
     # 构建散点图数据
+    is_anomaly = case((CALLS > threshold, 1), else_=0)
+    result = await db.execute(
+        select(
+            Task.task_id,
+            Task.price_final,
+            CALLS.label("calls"),
+            Task.word_count_billable
+        )
+        .where(and_(*conditions))
+        .order_by(is_anomaly.desc(), Task.created_at.desc())
+        .limit(scatter_limit)
+    )
     scatter_data = [
         OrderPoint(
-            task_id=t.task_id,
-            price=float(t.price_final or 0),
-            calls=t.api_call_count or 0,
-            is_anomaly=(t.api_call_count or 0) > threshold,
-            word_count=t.word_count_billable
+            task_id=row.task_id,
+            price=float(row.price_final or 0),
+            calls=int(row.calls),
+            is_anomaly=int(row.calls) > threshold,
+            word_count=row.word_count_billable
         ).model_dump()
-        for t in tasks
+        for row in result.all()
     ]
 
     # Build histogram data
     # 构建直方图数据
-    max_calls = max(call_counts) if call_counts else 0
+    max_calls = int(agg.max_calls or 0)
     bin_size = max(10, int(max_calls / 10)) if max_calls > 0 else 10
+    bin_index = CALLS // bin_size
+    result = await db.execute(
+        select(bin_index.label("bin"), func.count(Task.task_id).label("count"))
+        .where(and_(*conditions))
+        .group_by(bin_index)
+    )
+    bin_counts = {int(row.bin): int(row.count) for row in result.all()}
 
     histogram_bins = []
-    for bin_start in range(0, max(int(max_calls) + bin_size, bin_size), bin_size):
+    for bin_start in range(0, max(max_calls + bin_size, bin_size), bin_size):
         bin_end = bin_start + bin_size
-        count = len([c for c in call_counts if bin_start <= c < bin_end])
+        count = bin_counts.get(bin_start // bin_size, 0)
         if count > 0 or bin_start == 0:
             histogram_bins.append(HistogramBin(
                 range_label=f"{bin_start}-{bin_end}",
@@ -835,13 +856,14 @@ async def get_anomaly_distribution(
 
     return {
         "scatter_data": scatter_data,
+        "scatter_truncated": total_count > len(scatter_data),
         "histogram_data": histogram_bins,
         "stats": DistributionStats(
             mean=stats["mean"],
             std=stats["std"],
             threshold=stats["threshold"],
             sigma=sigma,
-            total_count=len(tasks)
+            total_count=total_count
         ).model_dump()
     }
 
@@ -863,35 +885,13 @@ async def get_anomaly_orders(
     Returns:
         Paginated list of anomaly orders
     """
-    # Build query with optional price filters
-    # 构建带可选价格筛选的查询
-    conditions = [
-        Task.price_final.isnot(None),
-        Task.price_final > 0
-    ]
-
-    if min_price is not None:
-        conditions.append(Task.price_final >= min_price)
-    if max_price is not None:
-        conditions.append(Task.price_final <= max_price)
-
-    query = select(Task).where(and_(*conditions))
-    result = await db.execute(query)
-    tasks = result.scalars().all()
-
-    if not tasks:
-        return {
-            "orders": [],
-            "total": 0,
-            "page": page,
-            "page_size": page_size,
-            "stats": None
-        }
+    conditions = _priced_task_conditions(min_price, max_price)
 
     # Calculate statistics
     # 计算统计值
-    call_counts = [t.api_call_count or 0 for t in tasks]
-    stats = calculate_stats(call_counts, sigma)
+    result = await db.execute(select(*_call_aggregates()).where(and_(*conditions)))
+    agg = result.first()
+    stats = calculate_stats(int(agg.n or 0), float(agg.total or 0), float(agg.total_sq or 0), sigma) if agg else None
 
     if not stats:
         return {
@@ -904,27 +904,23 @@ async def get_anomaly_orders(
 
     threshold = stats["threshold"]
     mean = stats["mean"]
-
-    # Filter anomaly orders
-    # 筛选异常订单
-    anomaly_tasks = [
-        t for t in tasks
-        if (t.api_call_count or 0) > threshold
-    ]
-
-    # Sort by deviation (highest first)
-    # 按偏离程度排序（最高优先）
-    anomaly_tasks.sort(
-        key=lambda t: (t.api_call_count or 0) / max(mean, 1),
-        reverse=True
+    anomaly_conditions = and_(*conditions, CALLS > threshold)
+
+    # Count and page anomaly orders in SQL; deviation = calls / mean, so
+    # ordering by calls is ordering by deviation (highest first)
+    # 在SQL中统计并分页异常订单；偏离度 = 调用次数 / 均值，按调用次数排序即按偏离度排序
+    total = (await db.execute(
+        select(func.count(Task.task_id)).where(anomaly_conditions)
+    )).scalar() or 0
+
+    result = await db.execute(
+        select(Task)
+        .where(anomaly_conditions)
+        .order_by(CALLS.desc(), Task.task_id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
     )
-
-    # Paginate
-    # 分页
-    total = len(anomaly_tasks)
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_tasks = anomaly_tasks[start_idx:end_idx]
+    paginated_tasks = result.scalars().all()
 
     # Build response
     # 构建响应
@@ -12,11 +12,13 @@ Layer 1: Lexical (词汇层) - /api/v1/analysis/lexical
 Plus: Pipeline (全流水线) - /api/v1/analysis/pipeline
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-# Create main router for analysis module
-# 创建分析模块的主路由
-router = APIRouter()
+from src.api.routes.substeps.prefetch import schedule_substep_prefetch
+
+# Create main router for analysis module; a successful step analysis prefetches the next step
+# 创建分析模块的主路由；步骤分析成功后预取下一步骤
+router = APIRouter(dependencies=[Depends(schedule_substep_prefetch)])
 
 # Import sub-routers
 # 导入子路由
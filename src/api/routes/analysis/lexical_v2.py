@@ -21,11 +21,16 @@ Provides endpoints for Layer 1 sub-steps:
 - 完整流程
 """
 
+import asyncio
 import logging
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
+from src.core.component_registry import (
+    get_enhanced_fingerprint_detector,
+    get_lexical_context_preparer,
+)
 from src.core.analyzer.layers.lexical.context_preparation import (
     LexicalContextPreparer,
     LexicalContext,
@@ -111,13 +116,15 @@ class FullPipelineRequest(BaseModel):
 # ============== Step 5.0: Context Preparation ==============
 
 @router.post("/step5-0/context")
-async def prepare_context(request: ContextRequest):
+async def prepare_context(
+    request: ContextRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+):
     """
     Step 5.0: Prepare lexical analysis context
     步骤5.0：准备词汇分析上下文
     """
     try:
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -255,7 +262,11 @@ def _calculate_ppl_analysis(text: str) -> dict:
 
 
 @router.post("/step5-1/fingerprint")
-async def detect_fingerprints(request: FingerprintRequest):
+async def detect_fingerprints(
+    request: FingerprintRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Step 5.1: Detect AIGC fingerprint words and phrases
     步骤5.1：检测AIGC指纹词汇和短语
@@ -265,7 +276,6 @@ async def detect_fingerprints(request: FingerprintRequest):
     """
     try:
         # Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -273,7 +283,6 @@ async def detect_fingerprints(request: FingerprintRequest):
         )
 
         # Detect fingerprints
-        detector = EnhancedFingerprintDetector()
         result = detector.detect(context)
 
         # Get detection summary
@@ -281,7 +290,7 @@ async def detect_fingerprints(request: FingerprintRequest):
 
         # PPL Analysis Integration
         # PPL 分析集成
-        ppl_analysis = _calculate_ppl_analysis(request.document_text)
+        ppl_analysis = await asyncio.to_thread(_calculate_ppl_analysis, request.document_text)
         detection_summary["ppl_score"] = ppl_analysis.get("ppl_score")
         detection_summary["ppl_risk_level"] = ppl_analysis.get("ppl_risk_level")
         detection_summary["ppl_used_onnx"] = ppl_analysis.get("used_onnx", False)
@@ -303,14 +312,16 @@ async def detect_fingerprints(request: FingerprintRequest):
 # ============== Step 5.2: Human Feature Analysis ==============
 
 @router.post("/step5-2/human-features")
-async def analyze_human_features(request: HumanFeatureRequest):
+async def analyze_human_features(
+    request: HumanFeatureRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+):
     """
     Step 5.2: Analyze human academic writing feature coverage
     步骤5.2：分析人类学术写作特征覆盖率
     """
     try:
         # Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -337,14 +348,17 @@ async def analyze_human_features(request: HumanFeatureRequest):
 # ============== Step 5.3: Candidate Generation ==============
 
 @router.post("/step5-3/candidates")
-async def generate_candidates(request: CandidateRequest):
+async def generate_candidates(
+    request: CandidateRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Step 5.3: Generate replacement candidates for fingerprints
     步骤5.3：为指纹词生成替换候选
     """
     try:
         # Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -352,7 +366,6 @@ async def generate_candidates(request: CandidateRequest):
         )
 
         # Detect fingerprints
-        detector = EnhancedFingerprintDetector()
         fingerprint_result = detector.detect(context)
 
         # Analyze human features
@@ -379,14 +392,17 @@ async def generate_candidates(request: CandidateRequest):
 # ============== Step 5.4: LLM Rewriting ==============
 
 @router.post("/step5-4/rewrite")
-async def rewrite_paragraphs(request: RewriteRequest):
+async def rewrite_paragraphs(
+    request: RewriteRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Step 5.4: Rewrite paragraphs using LLM
     步骤5.4：使用LLM改写段落
     """
     try:
         # Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -394,7 +410,6 @@ async def rewrite_paragraphs(request: RewriteRequest):
         )
 
         # Detect fingerprints
-        detector = EnhancedFingerprintDetector()
         fingerprint_result = detector.detect(context)
 
         # Analyze human features
@@ -427,21 +442,23 @@ async def rewrite_paragraphs(request: RewriteRequest):
 # ============== Step 5.5: Validation ==============
 
 @router.post("/step5-5/validate")
-async def validate_results(request: RewriteRequest):
+async def validate_results(
+    request: RewriteRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Step 5.5: Validate rewrite results
     步骤5.5：验证改写结果
     """
     try:
         # Run full pipeline up to rewriting
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
             colloquialism_level=request.colloquialism_level,
         )
 
-        detector = EnhancedFingerprintDetector()
         fingerprint_result = detector.detect(context)
 
         human_analyzer = HumanFeatureAnalyzer()
@@ -477,7 +494,11 @@ async def validate_results(request: RewriteRequest):
 # ============== Full Pipeline ==============
 
 @router.post("/full-pipeline")
-async def run_full_pipeline(request: FullPipelineRequest):
+async def run_full_pipeline(
+    request: FullPipelineRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Run complete Layer 1 analysis and rewriting pipeline
     运行完整的Layer 1分析和改写流程
@@ -486,7 +507,6 @@ async def run_full_pipeline(request: FullPipelineRequest):
         results = {}
 
         # Step 5.0: Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -499,7 +519,6 @@ async def run_full_pipeline(request: FullPipelineRequest):
         }
 
         # Step 5.1: Detect fingerprints
-        detector = EnhancedFingerprintDetector()
         fingerprint_result = detector.detect(context)
         results["step_5_1"] = {
             "name": "Fingerprint Detection",
@@ -591,14 +610,17 @@ async def run_full_pipeline(request: FullPipelineRequest):
 # ============== Analysis Only (No Rewrite) ==============
 
 @router.post("/analyze-only")
-async def analyze_only(request: ContextRequest):
+async def analyze_only(
+    request: ContextRequest,
+    preparer: LexicalContextPreparer = Depends(get_lexical_context_preparer),
+    detector: EnhancedFingerprintDetector = Depends(get_enhanced_fingerprint_detector),
+):
     """
     Run analysis steps only (5.0-5.3), no rewriting
     仅运行分析步骤（5.0-5.3），不改写
     """
     try:
         # Step 5.0: Prepare context
-        preparer = LexicalContextPreparer()
         context = preparer.prepare_context(
             document_text=request.document_text,
             session_id=request.session_id,
@@ -606,7 +628,6 @@ async def analyze_only(request: ContextRequest):
         )
 
         # Step 5.1: Detect fingerprints
-        detector = EnhancedFingerprintDetector()
         fingerprint_result = detector.detect(context)
 
         # Step 5.2: Analyze human features
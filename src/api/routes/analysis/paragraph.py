@@ -27,7 +27,8 @@ from src.api.routes.analysis.schemas import (
     IssueSeverity,
 )
 from src.core.analyzer.layers import ParagraphOrchestrator, LayerContext
-from src.core.preprocessor.segmenter import SentenceSegmenter, ContentType
+from src.core.preprocessor.segmenter import ContentType
+from src.core.component_registry import get_sentence_segmenter
 
 # Import LLM handlers for Layer 3 substeps
 # 导入 Layer 3 子步骤的 LLM handler
@@ -52,7 +53,7 @@ step3_5_handler = Step3_5Handler()
 
 # Reusable segmenter instance
 # 可重用的分句器实例
-_segmenter = SentenceSegmenter()
+_segmenter = get_sentence_segmenter()
 
 
 # =============================================================================
@@ -62,7 +62,8 @@ from src.api.routes.analysis.schemas import (
     ProgressionPatternInfo,
 )
 from src.core.analyzer.layers import SectionAnalyzer, LayerContext
-from src.core.preprocessor.segmenter import SentenceSegmenter, ContentType
+from src.core.preprocessor.segmenter import ContentType
+from src.core.component_registry import get_sentence_segmenter
 from src.services.text_parsing_service import get_text_parsing_service
 
 # Import LLM handlers for Layer 4 substeps
@@ -88,7 +89,7 @@ step2_5_handler = Step2_5Handler()
 
 # Reusable segmenter instance
 # 可重用的分句器实例
-_segmenter = SentenceSegmenter()
+_segmenter = get_sentence_segmenter()
 
 
 # Patterns for detecting section headers (main vs subsection)
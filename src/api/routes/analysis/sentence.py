@@ -55,7 +55,8 @@ from src.core.analyzer.sentence_context import (
     SentenceContextProvider,
     create_sentence_context_from_layer_results,
 )
-from src.core.preprocessor.segmenter import SentenceSegmenter, ContentType
+from src.core.preprocessor.segmenter import ContentType
+from src.core.component_registry import get_sentence_segmenter
 
 # Import Syntactic Void Detector for detecting semantically empty AI patterns
 # 导入句法空洞检测器用于检测语义空洞的AI模式
@@ -82,7 +83,7 @@ router = APIRouter()
 
 # Reusable segmenter instance
 # 可重用的分句器实例
-_segmenter = SentenceSegmenter()
+_segmenter = get_sentence_segmenter()
 
 # Initialize Layer 2 sub-step handlers
 # 初始化 Layer 2 子步骤处理器
@@ -19,6 +19,8 @@ Text analysis API routes
 文本分析API路由
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -34,10 +36,12 @@ from src.api.schemas import (
     IssueDetail,
     DetectorView
 )
-from src.core.preprocessor.segmenter import SentenceSegmenter
-from src.core.preprocessor.term_locker import TermLocker
-from src.core.analyzer.fingerprint import FingerprintDetector
-from src.core.analyzer.scorer import RiskScorer
+from src.core.component_registry import (
+    get_fingerprint_detector,
+    get_risk_scorer,
+    get_sentence_segmenter,
+    get_term_locker,
+)
 
 router = APIRouter()
 
@@ -51,12 +55,12 @@ async def analyze_text(
     Analyze text for AIGC characteristics
     分析文本的AIGC特征
     """
-    # Initialize components
-    # 初始化组件
-    segmenter = SentenceSegmenter()
-    term_locker = TermLocker()
-    fingerprint_detector = FingerprintDetector()
-    risk_scorer = RiskScorer()
+    # Shared components (built once per process)
+    # 共享组件（每个进程构建一次）
+    segmenter = get_sentence_segmenter()
+    term_locker = get_term_locker()
+    fingerprint_detector = get_fingerprint_detector()
+    risk_scorer = get_risk_scorer()
 
     # Segment text into sentences
     # 将文本分割为句子
@@ -74,7 +78,8 @@ async def analyze_text(
 
         # Calculate risk score (CAASS v2.0)
         # 计算风险分数（CAASS v2.0）
-        analysis = risk_scorer.analyze(
+        analysis = await asyncio.to_thread(
+            risk_scorer.analyze,
             sentence.text,
             fingerprints=fingerprints,
             include_turnitin=request.include_turnitin,
@@ -123,7 +128,8 @@ async def analyze_text(
                 key_issues=analysis.gptzero_issues,
                 key_issues_zh=analysis.gptzero_issues_zh
             ) if request.include_gptzero else None,
-            locked_terms=[t.term for t in locked_terms]
+            locked_terms=[t.term for t in locked_terms],
+            lexicon_version=analysis.lexicon_version
         )
         results.append(result)
 
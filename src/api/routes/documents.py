@@ -8,16 +8,27 @@ Security Features:
 - File size limit validation
 - File extension validation
 - MIME type validation (if python-magic is installed)
+- Parsing and word counting in rlimited, killable ingestion workers
+
+Listing reads the risk summary materialized on each document at ingestion
+(src.db.models.refresh_risk_summary) with keyset pagination and ETags.
+列表读取导入时物化在文档上的风险汇总（src.db.models.refresh_risk_summary），
+使用键集分页和 ETag。
 """
 
+import os
 import uuid
-import io
+import base64
+import asyncio
+import hashlib
 import logging
+import tempfile
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Dict, Optional
+from sqlalchemy import select, and_, or_, literal, String
+from typing import List, Dict, Optional, Tuple
 from pydantic import BaseModel
 
 from src.db.database import get_db
@@ -34,28 +45,26 @@ except ImportError:
         "Install with: pip install python-magic (Linux/macOS) or pip install python-magic-bin (Windows)"
     )
 
-# Try to import python-docx for additional .docx validation
-# 尝试导入python-docx进行额外的.docx验证
-try:
-    from docx import Document as DocxDocument
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-from src.db.models import Document, Sentence as SentenceModel
+from src.db.models import Document, DocumentSource, Sentence as SentenceModel, refresh_risk_summary
 from src.api.schemas import DocumentInfo
-from src.core.preprocessor.segmenter import SentenceSegmenter
+from src.core.component_registry import get_risk_scorer, get_sentence_segmenter
 from src.core.preprocessor.reference_handler import ReferenceHandler
 from src.core.preprocessor.paraphrase_detector import ParaphraseDetector
-from src.core.analyzer.scorer import RiskScorer, ParagraphContext, calculate_context_baseline
+from src.core.analyzer.scorer import ParagraphContext, calculate_context_baseline
 from src.core.preprocessor.whitelist_extractor import WhitelistExtractor
+from src.services.ingestion import get_ingestion_pool, IngestionError
 
 router = APIRouter()
-segmenter = SentenceSegmenter()
+segmenter = get_sentence_segmenter()
 ref_handler = ReferenceHandler()
 paraphrase_detector = ParaphraseDetector()
-scorer = RiskScorer()
+scorer = get_risk_scorer()
 whitelist_extractor = WhitelistExtractor()
 
+# Largest page of GET /documents/
+# GET /documents/ 的最大页大小
+LIST_PAGE_SIZE_MAX = 100
+
 
 class TextUploadRequest(BaseModel):
     """
@@ -65,44 +74,137 @@ class TextUploadRequest(BaseModel):
     text: str
 
 
+def _encode_cursor(created_at: datetime, document_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{document_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, document_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), document_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "invalid_cursor",
+                "message": "Invalid pagination cursor",
+                "message_zh": "分页游标无效"
+            }
+        )
+
+
+def _created_at_param(db: AsyncSession, created_at: datetime):
+    """
+    Cursor timestamp as a comparable parameter
+    可比较的游标时间戳参数
+
+    SQLite stores the CURRENT_TIMESTAMP default as "YYYY-MM-DD HH:MM:SS" text,
+    which a bound datetime (always with microseconds) does not compare equal
+    to, so there the value is compared in its stored text form.
+    SQLite 将 CURRENT_TIMESTAMP 默认值存为 "YYYY-MM-DD HH:MM:SS" 文本，与绑定的 datetime
+    （总带微秒）无法相等比较，因此在 SQLite 上按存储的文本形式比较。
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return literal(created_at.isoformat(sep=" "), String)
+    return created_at
+
+
 @router.get("/", response_model=List[DocumentInfo])
 async def list_documents(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, description="Page size | 每页数量", ge=1, le=LIST_PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page | 上一页的 X-Next-Cursor"),
+    ids: Optional[List[str]] = Query(
+        None, description="Only these documents (repeatable) | 仅这些文档（可重复）", max_length=LIST_PAGE_SIZE_MAX
+    ),
+    status: Optional[str] = Query(None, description="Document status filter | 文档状态过滤"),
+    min_high_risk: Optional[int] = Query(None, description="Minimum high-risk sentences | 最少高风险句子数", ge=0),
+    created_after: Optional[datetime] = Query(None, description="Created at or after | 创建时间不早于"),
+    created_before: Optional[datetime] = Query(None, description="Created before | 创建时间早于"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    List all documents
-    列出所有文档
+    List documents, newest first, one page at a time
+    按时间倒序分页列出文档
+
+    One indexed keyset query over the materialized risk summary columns; the
+    document text and sentences are never loaded. The next page's cursor is
+    returned in X-Next-Cursor (and a Link rel="next" header); a matching
+    If-None-Match gets 304. Pass ids to fetch specific documents, e.g. those
+    of a session list.
+    基于物化风险汇总列的单条带索引键集查询，不加载文档正文和句子。下一页游标通过
+    X-Next-Cursor（以及 Link rel="next" 头）返回；If-None-Match 匹配时返回304。传入 ids
+    可获取指定文档，例如会话列表中的文档。
     """
-    result = await db.execute(
-        select(Document).order_by(Document.created_at.desc())
+    query = select(
+        Document.id,
+        Document.filename,
+        Document.status,
+        Document.total_sentences,
+        Document.high_risk_count,
+        Document.medium_risk_count,
+        Document.low_risk_count,
+        Document.created_at,
+        Document.updated_at,
     )
-    docs = result.scalars().all()
-
-    documents = []
-    for doc in docs:
-        # Count sentences by risk level
-        # 按风险等级统计句子
-        sentences_result = await db.execute(
-            select(SentenceModel).where(SentenceModel.document_id == doc.id)
-        )
-        sentences = sentences_result.scalars().all()
-
-        high_count = sum(1 for s in sentences if s.risk_level == "high")
-        medium_count = sum(1 for s in sentences if s.risk_level == "medium")
-        low_count = sum(1 for s in sentences if s.risk_level == "low")
-
-        documents.append(DocumentInfo(
-            id=doc.id,
-            filename=doc.filename,
-            status=doc.status,
-            total_sentences=len(sentences),
-            high_risk_count=high_count,
-            medium_risk_count=medium_count,
-            low_risk_count=low_count,
-            created_at=doc.created_at
+    if ids:
+        query = query.where(Document.id.in_(ids))
+    if status:
+        query = query.where(Document.status == status)
+    if min_high_risk is not None:
+        query = query.where(Document.high_risk_count >= min_high_risk)
+    if created_after is not None:
+        query = query.where(Document.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Document.created_at < created_before)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        cursor_created_at = _created_at_param(db, cursor_created_at)
+        query = query.where(or_(
+            Document.created_at < cursor_created_at,
+            and_(Document.created_at == cursor_created_at, Document.id < cursor_id),
         ))
-
-    return documents
+    query = query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    page = rows[:limit]
+
+    headers = {"Cache-Control": "private, no-cache"}
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(page[-1].created_at, page[-1].id)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+    # The page's identity: its rows, their versions and where it continues
+    # 本页的标识：其中的行、行版本以及下一页位置
+    digest = hashlib.sha256()
+    for row in page:
+        digest.update(f"{row.id}|{row.status}|{row.updated_at}|{row.total_sentences}|{row.high_risk_count}|"
+                      f"{row.medium_risk_count}|{row.low_risk_count}\n".encode("utf-8"))
+    digest.update(headers.get("X-Next-Cursor", "").encode("ascii"))
+    headers["ETag"] = f'"{digest.hexdigest()[:32]}"'
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return [
+        DocumentInfo(
+            id=row.id,
+            filename=row.filename,
+            status=row.status,
+            total_sentences=row.total_sentences,
+            high_risk_count=row.high_risk_count,
+            medium_risk_count=row.medium_risk_count,
+            low_risk_count=row.low_risk_count,
+            created_at=row.created_at
+        )
+        for row in page
+    ]
 
 
 @router.post("/upload", response_model=DocumentInfo)
@@ -119,6 +221,7 @@ async def upload_document(
     Security (安全措施):
     - File size limit: max_file_size_mb (default 5MB)
     - File type validation: .txt and .docx only
+    - Parsing in a sandboxed worker process, killed after ingestion_timeout_seconds
     """
     from src.config import get_settings
     settings = get_settings()
@@ -139,155 +242,98 @@ async def upload_document(
             }
         )
 
-    # Security: Stream-read file with size limit to prevent memory exhaustion DoS
-    # 安全：流式读取文件并限制大小，防止内存耗尽DoS攻击
+    # Security: Stream the upload to a temp file with a size limit (no in-memory copy)
+    # 安全：将上传流式写入临时文件并限制大小（不在内存中拼接）
     max_size_bytes = settings.max_file_size_mb * 1024 * 1024
     chunk_size = 64 * 1024  # 64KB chunks
-    content_chunks = []
     total_size = 0
+    header = b''
+    tmp = tempfile.NamedTemporaryFile(prefix="upload_", suffix=file_ext, delete=False)
+    tmp_path = tmp.name
+
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                total_size += len(chunk)
+
+                # CRITICAL: Check size BEFORE writing
+                # 关键：在写入之前检查大小
+                if total_size > max_size_bytes:
+                    # Immediately stop reading and reject
+                    # 立即停止读取并拒绝
+                    raise HTTPException(
+                        status_code=413,
+                        detail={
+                            "error": "file_too_large",
+                            "message": f"File size exceeds {settings.max_file_size_mb}MB limit",
+                            "message_zh": f"文件大小超过 {settings.max_file_size_mb}MB 限制"
+                        }
+                    )
+
+                if len(header) < 8192:
+                    header += chunk[:8192 - len(header)]
+                tmp.write(chunk)
+
+        # Security: MIME type validation (if python-magic is available)
+        # 安全：MIME类型验证（如果python-magic可用）
+        if MAGIC_AVAILABLE:
+            mime_type = magic.from_buffer(header, mime=True)
+            allowed_mimes = {
+                'text/plain',  # .txt files
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # .docx files
+                'application/octet-stream',  # Sometimes returned for binary files, will verify extension
+            }
 
-    while True:
-        chunk = await file.read(chunk_size)
-        if not chunk:
-            break
-        total_size += len(chunk)
-
-        # CRITICAL: Check size BEFORE storing in memory
-        # 关键：在存入内存之前检查大小
-        if total_size > max_size_bytes:
-            # Immediately stop reading and reject
-            # 立即停止读取并拒绝
-            raise HTTPException(
-                status_code=413,
-                detail={
-                    "error": "file_too_large",
-                    "message": f"File size exceeds {settings.max_file_size_mb}MB limit",
-                    "message_zh": f"文件大小超过 {settings.max_file_size_mb}MB 限制"
-                }
-            )
-
-        content_chunks.append(chunk)
-
-    # Combine chunks into final content
-    # 将分块组合为最终内容
-    content = b''.join(content_chunks)
-
-    # Security: MIME type validation (if python-magic is available)
-    # 安全：MIME类型验证（如果python-magic可用）
-    if MAGIC_AVAILABLE:
-        mime_type = magic.from_buffer(content, mime=True)
-        allowed_mimes = {
-            'text/plain',  # .txt files
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',  # .docx files
-            'application/octet-stream',  # Sometimes returned for binary files, will verify extension
-        }
-
-        # Allow application/octet-stream only for .docx files
-        # 仅对.docx文件允许application/octet-stream
-        if mime_type == 'application/octet-stream' and file_ext != '.docx':
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "invalid_file_content",
-                    "message": f"File content does not match expected type. Detected: {mime_type}",
-                    "message_zh": f"文件内容与预期类型不匹配。检测到: {mime_type}"
-                }
-            )
-        elif mime_type not in allowed_mimes:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "invalid_file_content",
-                    "message": f"Invalid file content type. Detected: {mime_type}",
-                    "message_zh": f"文件内容类型无效。检测到: {mime_type}"
-                }
-            )
-
-    # Security: Validate .docx structure (if python-docx is available)
-    # 安全：验证.docx结构（如果python-docx可用）
-    if file_ext == '.docx' and DOCX_AVAILABLE:
-        try:
-            # Try to parse the docx file to ensure it's valid
-            # 尝试解析docx文件以确保其有效
-            DocxDocument(io.BytesIO(content))
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "invalid_docx",
-                    "message": f"Invalid or corrupted DOCX file: {str(e)}",
-                    "message_zh": f"无效或损坏的DOCX文件: {str(e)}"
-                }
-            )
-
-    # Extract text based on file type
-    # 根据文件类型提取文本
-    if file_ext == '.docx':
-        # For .docx files, extract text using python-docx to avoid XML/metadata
-        # 对于.docx文件，使用python-docx提取文本以避免XML/元数据
-        if not DOCX_AVAILABLE:
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "docx_library_missing",
-                    "message": "python-docx library is required to process .docx files",
-                    "message_zh": "处理.docx文件需要python-docx库"
-                }
-            )
-
-        try:
-            # Parse .docx and extract only paragraph text (excludes headers, footers, comments, etc.)
-            # 解析.docx并只提取段落文本（排除页眉、页脚、批注等）
-            doc = DocxDocument(io.BytesIO(content))
-            paragraphs = []
-            for para in doc.paragraphs:
-                # Only include non-empty paragraphs
-                # 只包含非空段落
-                para_text = para.text.strip()
-                if para_text:
-                    paragraphs.append(para_text)
-
-            # Join paragraphs with double newline to preserve paragraph structure
-            # 使用双换行连接段落以保留段落结构
-            text = '\n\n'.join(paragraphs)
-
-            if not text:
+            # Allow application/octet-stream only for .docx files
+            # 仅对.docx文件允许application/octet-stream
+            if mime_type == 'application/octet-stream' and file_ext != '.docx':
                 raise HTTPException(
                     status_code=400,
                     detail={
-                        "error": "empty_document",
-                        "message": "No text content found in DOCX file",
-                        "message_zh": "DOCX文件中未找到文本内容"
+                        "error": "invalid_file_content",
+                        "message": f"File content does not match expected type. Detected: {mime_type}",
+                        "message_zh": f"文件内容与预期类型不匹配。检测到: {mime_type}"
                     }
                 )
-        except Exception as e:
-            # If already an HTTPException, re-raise it
-            # 如果已经是HTTPException，重新抛出
-            if isinstance(e, HTTPException):
-                raise
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "docx_parsing_failed",
-                    "message": f"Failed to extract text from DOCX: {str(e)}",
-                    "message_zh": f"从DOCX提取文本失败: {str(e)}"
-                }
-            )
-    else:
-        # For .txt files, decode as text
-        # 对于.txt文件，解码为文本
+            elif mime_type not in allowed_mimes:
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "error": "invalid_file_content",
+                        "message": f"Invalid file content type. Detected: {mime_type}",
+                        "message_zh": f"文件内容类型无效。检测到: {mime_type}"
+                    }
+                )
+
+        # Parse, strip references, extract whitelist, count and hash in a sandboxed worker
+        # 在沙箱工作进程中解析、剥离参考文献、提取白名单、计数和哈希
         try:
-            text = content.decode("utf-8")
-        except UnicodeDecodeError:
-            text = content.decode("latin-1")
+            ingested = await get_ingestion_pool().ingest(tmp_path, file_ext)
+        except IngestionError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail())
+
+        # Keep the original DOCX package for formatting-preserving export
+        # 保留原始DOCX包，用于保留格式的导出
+        package = None
+        if ingested.paragraph_index is not None:
+            package = await asyncio.to_thread(Path(tmp_path).read_bytes)
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+    text = ingested.text
 
     doc_id = str(uuid.uuid4())
     now = datetime.utcnow()
 
-    # CAASS v2.0 Phase 2: Extract whitelist from document
-    # CAASS v2.0 第二阶段：从文档提取白名单
-    whitelist_result = whitelist_extractor.extract_from_document(text)
-    whitelist_terms = whitelist_result.terms
+    # CAASS v2.0 Phase 2: Whitelist extracted from document by the ingestion worker
+    # CAASS v2.0 第二阶段：白名单已由导入工作进程从文档提取
+    whitelist_terms = ingested.whitelist_terms
 
     # Create document record with status "analyzing"
     # 创建文档记录，状态为"analyzing"
@@ -298,11 +344,18 @@ async def upload_document(
         status="analyzing"
     )
     db.add(doc)
+    if package is not None:
+        db.add(DocumentSource(
+            document_id=doc_id,
+            package=package,
+            package_sha256=ingested.file_sha256,
+            paragraph_index=ingested.paragraph_index,
+        ))
     await db.commit()
 
-    # Extract reference section
-    # 提取参考文献部分
-    body_text, ref_section = ref_handler.extract(text)
+    # Reference section was split off by the ingestion worker
+    # 参考文献部分已由导入工作进程分离
+    body_text, ref_section = ingested.body_text, ingested.reference_section
 
     # CAASS v2.0 Phase 2: Segment text with paragraph info
     # CAASS v2.0 第二阶段：带段落信息分割文本
@@ -335,7 +388,8 @@ async def upload_document(
 
             # Analyze sentence risk (CAASS v2.0 Phase 2)
             # 分析句子风险（CAASS v2.0 第二阶段）
-            analysis = scorer.analyze(
+            analysis = await asyncio.to_thread(
+                scorer.analyze,
                 sent.text,
                 tone_level=4,
                 whitelist=whitelist_terms,
@@ -373,7 +427,9 @@ async def upload_document(
                     "connector_count": getattr(analysis, 'connector_count', 0),
                     "connector_word": getattr(analysis, 'connector_match', None).connector if getattr(analysis, 'connector_match', None) else None,
                     # Paraphrase info
-                    "is_paraphrase": para_info.is_paraphrase
+                    "is_paraphrase": para_info.is_paraphrase,
+                    # Lexicon snapshot version (cache key component)
+                    "lexicon_version": analysis.lexicon_version
                 }
             )
 
@@ -427,6 +483,11 @@ async def upload_document(
         )
         db.add(ref_sentence)
 
+    # Materialize the risk summary read by the document list
+    # 物化文档列表读取的风险汇总
+    await db.flush()
+    await db.execute(refresh_risk_summary(Document.id == doc_id))
+
     # Update document status to "ready" and store whitelist
     # 更新文档状态为"ready"并存储白名单
     result = await db.execute(
@@ -444,7 +505,8 @@ async def upload_document(
         high_risk_count=high_count,
         medium_risk_count=medium_count,
         low_risk_count=low_count,
-        created_at=now
+        created_at=now,
+        word_count=ingested.word_count.clean_word_count
     )
 
 
@@ -493,25 +555,14 @@ async def get_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # Count sentences by risk level
-    # 按风险等级统计句子
-    sentences_result = await db.execute(
-        select(SentenceModel).where(SentenceModel.document_id == document_id)
-    )
-    sentences = sentences_result.scalars().all()
-
-    high_count = sum(1 for s in sentences if s.risk_level == "high")
-    medium_count = sum(1 for s in sentences if s.risk_level == "medium")
-    low_count = sum(1 for s in sentences if s.risk_level == "low")
-
     return DocumentInfo(
         id=doc.id,
         filename=doc.filename,
         status=doc.status,
-        total_sentences=len(sentences),
-        high_risk_count=high_count,
-        medium_risk_count=medium_count,
-        low_risk_count=low_count,
+        total_sentences=doc.total_sentences,
+        high_risk_count=doc.high_risk_count,
+        medium_risk_count=doc.medium_risk_count,
+        low_risk_count=doc.low_risk_count,
         created_at=doc.created_at,
         original_text=doc.original_text  # Include text for 5-layer analysis
     )
@@ -599,7 +650,8 @@ async def upload_text(
 
             # CAASS v2.0 Phase 2: Use paragraph context and whitelist
             # CAASS v2.0 第二阶段：使用段落上下文和白名单
-            analysis = scorer.analyze(
+            analysis = await asyncio.to_thread(
+                scorer.analyze,
                 sent.text,
                 tone_level=4,
                 whitelist=whitelist_terms,
@@ -631,7 +683,9 @@ async def upload_text(
                     "connector_count": getattr(analysis, 'connector_count', 0),
                     "connector_word": getattr(analysis, 'connector_match', None).connector if getattr(analysis, 'connector_match', None) else None,
                     # Paraphrase info
-                    "is_paraphrase": para_info.is_paraphrase
+                    "is_paraphrase": para_info.is_paraphrase,
+                    # Lexicon snapshot version (cache key component)
+                    "lexicon_version": analysis.lexicon_version
                 }
             )
 
@@ -681,6 +735,11 @@ async def upload_text(
         )
         db.add(ref_sentence)
 
+    # Materialize the risk summary read by the document list
+    # 物化文档列表读取的风险汇总
+    await db.flush()
+    await db.execute(refresh_risk_summary(Document.id == doc_id))
+
     # Update document status to "ready"
     # 更新文档状态为"ready"
     result = await db.execute(
@@ -1,20 +1,43 @@
 """
 Export API routes
 导出API路由
+
+Exports are rendered on request and streamed; nothing is written to local
+disk. Each artifact is addressed by a hash of its content (see
+src.services.export_store), which doubles as the ETag and the filename
+suffix, and rendered DOCX/report bytes are cached so repeat downloads of an
+unchanged session are served without re-rendering.
+导出按请求渲染并流式输出，不写入本地磁盘。每个产物按内容哈希寻址（见
+src.services.export_store），该哈希同时用作 ETag 和文件名后缀；渲染后的 DOCX/报告
+会被缓存，未变化会话的重复下载无需重新渲染。
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import os
+import asyncio
 import json
-from datetime import datetime
+import logging
+import os
 import re
+from typing import Callable, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 
 from src.db.database import get_db
-from src.db.models import Document, Session, Sentence, Modification, SubstepState
+from src.db.models import Document, DocumentSource, Session, Sentence, Modification, SubstepState
 from src.api.schemas import ExportResult
+from src.services.export_store import (
+    STREAM_CHUNK_SIZE,
+    content_key,
+    get_export_cache,
+    iter_buffered,
+    iter_file,
+    iter_text_chunks,
+    spooled_buffer,
+)
+from src.services.docx_roundtrip import DOCX_INDEX_VERSION, patch_docx, split_paragraphs
 
 # Import python-docx for Word document export
 # 导入python-docx用于Word文档导出
@@ -25,21 +48,49 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+MEDIA_TYPES = {
+    "txt": "text/plain; charset=utf-8",
+    "json": "application/json",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
 
-@router.post("/document", response_model=ExportResult)
-async def export_document(
-    session_id: str,
-    format: str = "txt",
-    db: AsyncSession = Depends(get_db)
-):
+
+class _Artifact:
     """
-    Export processed document
-    导出处理后的文档
+    A renderable export: content key, download filename and renderers
+    可渲染的导出产物：内容键、下载文件名和渲染函数
     """
-    # Get session
-    # 获取会话
+
+    def __init__(
+        self,
+        key: str,
+        filename: str,
+        fmt: str,
+        stream: Callable[[], Iterator[bytes]],
+        render: Optional[Callable[[], bytes]] = None,
+        cacheable: bool = True,
+    ):
+        self.key = key
+        self.filename = filename
+        self.format = fmt
+        self.stream = stream
+        self.render = render or (lambda: b"".join(stream()))
+        self.cacheable = cacheable
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES.get(self.format, "application/octet-stream")
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key}"'
+
+
+async def _get_session(db: AsyncSession, session_id: str) -> Session:
     session_result = await db.execute(
         select(Session).where(Session.id == session_id)
     )
@@ -47,6 +98,19 @@ async def export_document(
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+async def _load_final_text(db: AsyncSession, session: Session) -> Tuple[Document, str]:
+    """
+    Resolve the text to export for a session
+    解析会话要导出的文本
+
+    Latest substep modified text first, then accepted sentence modifications,
+    then the original document text.
+    优先使用最新子步骤的修改文本，其次是已接受的句子修改，最后是原始文档文本。
+    """
+    session_id = session.id
 
     # Get document
     # 获取文档
@@ -54,6 +118,8 @@ async def export_document(
         select(Document).where(Document.id == session.document_id)
     )
     doc = doc_result.scalar_one_or_none()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
 
     # First, try to get modified text from SubstepState (5-layer analysis)
     # 首先尝试从SubstepState获取修改后的文本（5层分析）
@@ -144,13 +210,14 @@ async def export_document(
         final_text = doc.original_text or ""
         print("[Export] Using original document text")
 
-    # Create export file
-    # 创建导出文件
-    export_dir = "exports"
-    os.makedirs(export_dir, exist_ok=True)
+    return doc, final_text
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+def _export_basename(doc: Document, session: Session) -> str:
+    """
+    Download filename stem: status prefix plus the original name without yolo_step prefixes
+    下载文件名主干：状态前缀加上去除 yolo_step 前缀的原始文件名
+    """
     # Clean up filename: remove yolo_step prefixes recursively
     # 清理文件名：递归移除yolo_step前缀
     base_name = doc.filename.rsplit('.', 1)[0]
@@ -167,75 +234,98 @@ async def export_document(
     # Add prefix based on status
     # 根据状态添加前缀
     prefix = "processed" if session.status == "completed" else "partial"
-    final_filename_base = f"{prefix}_{clean_name}_{timestamp}"
+    return f"{prefix}_{clean_name}"
 
-    # Handle docx format with python-docx
-    # 使用python-docx处理docx格式
-    if format == "docx":
-        if not DOCX_AVAILABLE:
-            raise HTTPException(
-                status_code=500,
-                detail="python-docx library not installed. Please install it with: pip install python-docx"
-            )
 
-        filename = f"{final_filename_base}.docx"
-        filepath = os.path.join(export_dir, filename)
+def _render_docx(text: str):
+    """
+    Build a Word document into a spooled buffer (run in a worker thread)
+    在 spooled 缓冲区中构建Word文档（在工作线程中运行）
+    """
+    # Create Word document with proper paragraph formatting
+    # 创建带有正确段落格式的Word文档
+    docx_doc = DocxDocument()
 
-        # Create Word document with proper paragraph formatting
-        # 创建带有正确段落格式的Word文档
-        docx_doc = DocxDocument()
+    # Set default font style
+    # 设置默认字体样式
+    style = docx_doc.styles['Normal']
+    font = style.font
+    font.size = Pt(12)
 
-        # Set default font style
-        # 设置默认字体样式
-        style = docx_doc.styles['Normal']
-        font = style.font
-        font.size = Pt(12)
+    # Add each paragraph as a separate Word paragraph
+    # 将每个段落添加为单独的Word段落
+    for para_text in re.split(r'\n\s*\n', text):
+        if para_text.strip():
+            docx_doc.add_paragraph(para_text.strip())
 
-        # Add each paragraph as a separate Word paragraph
-        # 将每个段落添加为单独的Word段落
-        for para_text in final_paragraphs:
-            if para_text.strip():
-                docx_doc.add_paragraph(para_text.strip())
+    buffer = spooled_buffer()
+    docx_doc.save(buffer)
+    return buffer
 
-        docx_doc.save(filepath)
-    else:
-        # Text format (txt or other)
-        # 文本格式（txt或其他）
-        filename = f"{final_filename_base}.{format}"
-        filepath = os.path.join(export_dir, filename)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(final_text)
+def _render_docx_from_source(source: Optional[DocumentSource], text: str):
+    """
+    Patch the uploaded DOCX when available, else build a fresh document
+    有原始DOCX时对其进行修补，否则生成新文档
+    """
+    if source is not None:
+        try:
+            return patch_docx(source.package, source.paragraph_index, split_paragraphs(text))
+        except Exception as e:
+            logger.warning(f"DOCX patch failed for document {source.document_id}, rendering plain: {e}")
+    return _render_docx(text)
+
+
+async def _document_artifact(db: AsyncSession, session_id: str, fmt: str) -> _Artifact:
+    session = await _get_session(db, session_id)
+    doc, final_text = await _load_final_text(db, session)
+
+    # Uploaded DOCX files are exported by patching the original package
+    # 上传的DOCX文件通过修补原始包导出
+    source = None
+    key_parts = [final_text]
+    if fmt == "docx":
+        result = await db.execute(
+            select(DocumentSource).where(DocumentSource.document_id == doc.id)
+        )
+        source = result.scalar_one_or_none()
+        if source is not None:
+            key_parts += [source.package_sha256, DOCX_INDEX_VERSION]
 
-    file_size = os.path.getsize(filepath)
+    key = content_key("document", fmt, key_parts)
+    filename = f"{_export_basename(doc, session)}_{key[:12]}.{fmt}"
 
-    return ExportResult(
-        filename=filename,
-        format=format,
-        size=file_size,
-        download_url=f"/api/v1/export/download/{filename}"
-    )
+    if fmt == "docx":
+        # Handle docx format with python-docx
+        # 使用python-docx处理docx格式
+        if not DOCX_AVAILABLE:
+            raise HTTPException(
+                status_code=500,
+                detail="python-docx library not installed. Please install it with: pip install python-docx"
+            )
 
+        def render() -> bytes:
+            buffer = _render_docx_from_source(source, final_text)
+            try:
+                buffer.seek(0)
+                return buffer.read()
+            finally:
+                buffer.close()
 
-@router.post("/report", response_model=ExportResult)
-async def export_report(
-    session_id: str,
-    format: str = "json",
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    Export analysis and modification report
-    导出分析和修改报告
-    """
-    # Get session
-    # 获取会话
-    session_result = await db.execute(
-        select(Session).where(Session.id == session_id)
-    )
-    session = session_result.scalar_one_or_none()
+        def stream() -> Iterator[bytes]:
+            # Generator body runs on first iteration, i.e. in the threadpool
+            # 生成器主体在首次迭代时运行，即在线程池中
+            yield from iter_file(_render_docx_from_source(source, final_text))
 
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+        return _Artifact(key, filename, fmt, stream=stream, render=render)
+
+    # Text format (txt or other): cheap to re-encode, so not cached
+    # 文本格式（txt或其他）：重新编码开销很小，因此不缓存
+    return _Artifact(key, filename, fmt, stream=lambda: iter_text_chunks(final_text), cacheable=False)
+
+
+async def _report_artifact(db: AsyncSession, session_id: str, fmt: str) -> _Artifact:
+    session = await _get_session(db, session_id)
 
     # Get all sentences
     # 获取所有句子
@@ -296,44 +386,186 @@ async def export_report(
 
         report["sentences"].append(sentence_report)
 
-    # Create export file
-    # 创建导出文件
-    export_dir = "exports"
-    os.makedirs(export_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"report_{session_id[:8]}_{timestamp}.{format}"
-    filepath = os.path.join(export_dir, filename)
-
-    with open(filepath, "w", encoding="utf-8") as f:
-        if format == "json":
-            json.dump(report, f, ensure_ascii=False, indent=2)
-        else:
-            # Simple text format
-            # 简单文本格式
-            f.write(f"AcademicGuard Report\n")
-            f.write(f"=" * 50 + "\n\n")
-            f.write(f"Session: {session_id}\n")
-            f.write(f"Total Sentences: {report['statistics']['total_sentences']}\n")
-            f.write(f"Modified: {report['statistics']['modified']}\n\n")
-
-    file_size = os.path.getsize(filepath)
+    canonical = json.dumps(report, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    key = content_key("report", fmt, [canonical])
+    filename = f"report_{session_id[:8]}_{key[:12]}.{fmt}"
+
+    if fmt == "json":
+        def stream() -> Iterator[bytes]:
+            encoder = json.JSONEncoder(ensure_ascii=False, indent=2, default=str)
+            return iter_buffered(encoder.iterencode(report))
+    else:
+        # Simple text format
+        # 简单文本格式
+        summary = (
+            f"AcademicGuard Report\n"
+            + "=" * 50 + "\n\n"
+            + f"Session: {session_id}\n"
+            + f"Total Sentences: {report['statistics']['total_sentences']}\n"
+            + f"Modified: {report['statistics']['modified']}\n\n"
+        )
+
+        def stream() -> Iterator[bytes]:
+            return iter_text_chunks(summary)
+
+    return _Artifact(key, filename, fmt, stream=stream)
+
+
+def _render_through_cache(artifact: _Artifact, cache, lookup: bool = True) -> bytes:
+    """
+    Cached bytes of an artifact, rendering and storing them on a miss (blocking)
+    产物的缓存字节，未命中时渲染并存入缓存（阻塞调用）
+    """
+    data = cache.get(artifact.key) if cache is not None and lookup else None
+    if data is None:
+        data = artifact.render()
+        if cache is not None:
+            cache.put(artifact.key, data)
+    return data
+
+
+async def _cache_get(cache, key: str) -> Optional[bytes]:
+    """
+    Cache lookup off the event loop for network backends (S3)
+    网络后端（S3）的缓存查询在事件循环外执行
+    """
+    if cache.backend == "memory":
+        return cache.get(key)
+    return await asyncio.to_thread(cache.get, key)
+
+
+async def _rendered_bytes(artifact: _Artifact) -> bytes:
+    """
+    Cached bytes of an artifact; cache I/O and rendering run off the event loop
+    产物的缓存字节；缓存读写与渲染都在事件循环外执行
+    """
+    cache = get_export_cache() if artifact.cacheable else None
+    return await asyncio.to_thread(_render_through_cache, artifact, cache)
+
+
+def _iter_bytes(data: bytes) -> Iterator[bytes]:
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield bytes(view[start:start + STREAM_CHUNK_SIZE])
+
+
+async def _stream_artifact(artifact: _Artifact, request: Request) -> Response:
+    """
+    Stream an artifact: 304 on a matching If-None-Match, cached bytes when
+    available, otherwise render while streaming
+    流式输出产物：If-None-Match 匹配时返回304，有缓存时直接输出，否则边渲染边输出
+    """
+    headers = {
+        "ETag": artifact.etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(artifact.filename)}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if artifact.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    cache = get_export_cache() if artifact.cacheable else None
+    data = await _cache_get(cache, artifact.key) if cache is not None else None
+    if data is None and cache is not None and artifact.format == "docx":
+        # DOCX has to be fully built before the first byte anyway; keep it
+        # DOCX 在输出第一个字节前必须完整构建；顺便缓存
+        data = await asyncio.to_thread(_render_through_cache, artifact, cache, False)
+    if data is not None:
+        headers["Content-Length"] = str(len(data))
+        return StreamingResponse(_iter_bytes(data), media_type=artifact.media_type, headers=headers)
+
+    # Sync generators are iterated in Starlette's threadpool, off the event loop
+    # 同步生成器在 Starlette 线程池中迭代，不占用事件循环
+    return StreamingResponse(artifact.stream(), media_type=artifact.media_type, headers=headers)
+
+
+@router.post("/document", response_model=ExportResult)
+async def export_document(
+    session_id: str,
+    format: str = "txt",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Prepare processed document export and return its download URL
+    准备处理后文档的导出并返回下载链接
+
+    The artifact is rendered (and cached) here so that the size is known;
+    the download URL streams it from GET /document/{session_id}.
+    产物在此渲染（并缓存）以获得大小；下载链接通过 GET /document/{session_id} 流式获取。
+    """
+    artifact = await _document_artifact(db, session_id, format)
+    data = await _rendered_bytes(artifact)
 
     return ExportResult(
-        filename=filename,
+        filename=artifact.filename,
+        format=format,
+        size=len(data),
+        download_url=f"/api/v1/export/document/{session_id}?format={format}&v={artifact.key[:16]}"
+    )
+
+
+@router.get("/document/{session_id}")
+async def download_document(
+    session_id: str,
+    request: Request,
+    format: str = "txt",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream processed document (txt streamed in chunks, docx built in a worker thread)
+    流式下载处理后的文档（txt 分块输出，docx 在工作线程中构建）
+    """
+    artifact = await _document_artifact(db, session_id, format)
+    return await _stream_artifact(artifact, request)
+
+
+@router.post("/report", response_model=ExportResult)
+async def export_report(
+    session_id: str,
+    format: str = "json",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Prepare analysis and modification report export and return its download URL
+    准备分析和修改报告的导出并返回下载链接
+    """
+    artifact = await _report_artifact(db, session_id, format)
+    data = await _rendered_bytes(artifact)
+
+    return ExportResult(
+        filename=artifact.filename,
         format=format,
-        size=file_size,
-        download_url=f"/api/v1/export/download/{filename}"
+        size=len(data),
+        download_url=f"/api/v1/export/report/{session_id}?format={format}&v={artifact.key[:16]}"
     )
 
 
+@router.get("/report/{session_id}")
+async def download_report(
+    session_id: str,
+    request: Request,
+    format: str = "json",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream analysis and modification report (JSON encoded incrementally)
+    流式下载分析和修改报告（JSON 增量编码）
+    """
+    artifact = await _report_artifact(db, session_id, format)
+    return await _stream_artifact(artifact, request)
+
+
 @router.get("/download/{filename}")
 async def download_file(filename: str):
     """
-    Download exported file
-    下载导出的文件
+    Download a file exported by earlier versions to exports/ (legacy)
+    下载旧版本导出到 exports/ 的文件（兼容旧链接）
+
+    New exports are streamed from /document/{session_id} and
+    /report/{session_id} and never written to disk.
+    新的导出通过 /document/{session_id} 和 /report/{session_id} 流式提供，不再写入磁盘。
     """
-    filepath = os.path.join("exports", filename)
+    filepath = os.path.join("exports", os.path.basename(filename))
 
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="File not found")
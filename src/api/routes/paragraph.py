@@ -26,12 +26,13 @@ Provides endpoints for:
 
 import json
 import logging
+import time
 from typing import List, Optional, Literal
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
-from src.core.analyzer.scorer import RiskScorer
+from src.core.component_registry import get_risk_scorer
 from src.core.analyzer.paragraph_logic import (
     ParagraphLogicAnalyzer,
     analyze_paragraph_logic_framework
@@ -40,6 +41,7 @@ from src.prompts.paragraph_logic import (
     get_paragraph_logic_prompt,
     STRATEGY_DESCRIPTIONS,
 )
+from src.prompts.prefix_cache import CachedPrompt, gemini_usage, record_response_usage, record_usage
 from src.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -48,7 +50,7 @@ settings = get_settings()
 
 # Global instances for reuse
 # 全局实例以便重用
-_scorer = RiskScorer()
+_scorer = get_risk_scorer()
 _analyzer = ParagraphLogicAnalyzer()
 
 
@@ -436,7 +438,7 @@ def _split_into_sentences(text: str) -> List[str]:
 
 
 async def _call_llm_for_restructure(
-    prompt: str,
+    prompt: CachedPrompt,
     strategy: str
 ) -> tuple:
     """
@@ -465,12 +467,13 @@ async def _call_llm_for_restructure(
             ) as client:
                 response = await client.post("/chat/completions", json={
                     "model": settings.dashscope_model,
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": prompt.messages(),
                     "max_tokens": 2000,
                     "temperature": 0.4
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage(f"paragraph:{strategy}", prompt, "dashscope", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
 
         elif settings.llm_provider == "volcengine" and settings.volcengine_api_key:
@@ -487,12 +490,13 @@ async def _call_llm_for_restructure(
             ) as client:
                 response = await client.post("/chat/completions", json={
                     "model": settings.volcengine_model,
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": prompt.messages(),
                     "max_tokens": 2000,
                     "temperature": 0.4
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage(f"paragraph:{strategy}", prompt, "volcengine", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
 
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
@@ -500,14 +504,20 @@ async def _call_llm_for_restructure(
             # 调用Gemini API
             from google import genai
             client = genai.Client(api_key=settings.gemini_api_key)
+            started = time.perf_counter()
             response = await client.aio.models.generate_content(
                 model=settings.llm_model,
-                contents=prompt,
+                contents=prompt.user,
                 config={
                     "max_output_tokens": 2000,
-                    "temperature": 0.4
+                    "temperature": 0.4,
+                    "system_instruction": prompt.system or None
                 }
             )
+            record_usage(
+                f"paragraph:{strategy}", prompt, gemini_usage(response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
             content = response.text.strip()
 
         elif settings.llm_provider == "deepseek" or settings.deepseek_api_key:
@@ -524,12 +534,13 @@ async def _call_llm_for_restructure(
             ) as client:
                 response = await client.post("/chat/completions", json={
                     "model": settings.llm_model if settings.llm_provider == "deepseek" else "deepseek-chat",
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": prompt.messages(),
                     "max_tokens": 2000,
                     "temperature": 0.4
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage(f"paragraph:{strategy}", prompt, "deepseek", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
 
         else:
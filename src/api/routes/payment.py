@@ -25,6 +25,7 @@ from src.db.database import get_db
 from src.db.models import Task, TaskStatus, PaymentStatus
 from src.config import get_settings
 from src.services.payment_service import get_payment_provider, PlatformOrderStatus
+from src.services.entitlement_cache import invalidate_task_entitlements
 from src.middleware.auth_middleware import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -251,6 +252,7 @@ async def initiate_payment(
         task.paid_at = datetime.utcnow()
         task.platform_order_id = f"debug_order_{task_id}"
         await db.commit()
+        await invalidate_task_entitlements(task_id)
 
         return PaymentInitResponse(
             task_id=task_id,
@@ -291,6 +293,7 @@ async def initiate_payment(
     task.platform_order_id = order_result.platform_order_id
     task.expires_at = datetime.utcnow() + timedelta(hours=settings.task_expiry_hours)
     await db.commit()
+    await invalidate_task_entitlements(task_id)
 
     return PaymentInitResponse(
         task_id=task_id,
@@ -357,6 +360,7 @@ async def check_payment_status(
                 task.payment_status = PaymentStatus.PAID.value
                 task.paid_at = datetime.utcnow()
                 await db.commit()
+                await invalidate_task_entitlements(task_id)
         except Exception as e:
             # Log error but don't fail the request
             # 记录错误但不使请求失败
@@ -469,4 +473,8 @@ async def payment_callback(
         task.payment_status = PaymentStatus.REFUNDED.value
         await db.commit()
 
+    # Drop cached entitlements so every worker re-reads the new status
+    # 删除缓存的权限，使所有工作进程重新读取新状态
+    await invalidate_task_entitlements(task.task_id)
+
     return {"status": "processed", "task_id": task.task_id}
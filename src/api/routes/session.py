@@ -5,13 +5,15 @@ Session management API routes
 CAASS v2.0 Phase 2: Added whitelist storage and context support
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
 
 from src.db.database import get_db
-from src.db.models import Session, Document, Sentence, Modification
+from src.db.models import Session, Document, Sentence, Modification, refresh_risk_summary
 from src.api.schemas import (
     SessionStartRequest,
     SessionState,
@@ -22,6 +24,13 @@ from src.api.schemas import (
     RiskLevel
 )
 from src.core.preprocessor.whitelist_extractor import WhitelistExtractor
+from src.core.validator.quality_gate import QualityGate
+from src.core.component_registry import (
+    get_fingerprint_detector,
+    get_quality_gate,
+    get_risk_scorer,
+    get_sentence_segmenter,
+)
 from typing import List
 
 router = APIRouter()
@@ -686,28 +695,31 @@ async def update_session_step(
 @router.post("/{session_id}/yolo-process")
 async def yolo_auto_process(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    quality_gate: QualityGate = Depends(get_quality_gate)
 ):
     """
     YOLO auto-processing: Automatically process all sentences using LLM
     YOLO 自动处理：使用 LLM 自动处理所有句子
 
-    This endpoint processes sentences one by one, calling LLM for each,
-    selecting the best suggestion, and applying it automatically.
-    此端点逐句处理，为每个句子调用 LLM，选择最佳建议并自动应用。
+    High-risk sentences go through the suggestion cascade first: a rule
+    rewrite that meets the cascade targets is applied directly, and only the
+    remaining sentences are sent to the LLM in batched requests
+    (LLMTrack.generate_suggestions_batch). The best suggestion for each
+    sentence is then applied automatically.
+    高风险句子先经过建议级联：达到级联目标的规则改写直接应用，其余句子以批量请求
+    发送给 LLM，然后为每个句子选择最佳建议并自动应用。
 
     Returns a generator for streaming progress updates.
     返回生成器用于流式进度更新。
     """
-    from src.core.suggester.llm_track import LLMTrack
+    from src.core.suggester.llm_track import LLMTrack, BatchSuggestionItem
     from src.core.suggester.rule_track import RuleTrack
-    from src.core.analyzer.scorer import RiskScorer
-    from src.core.validator.quality_gate import QualityGate
+    from src.core.suggester.cascade import SuggestionCascade
     import json
     import logging
 
     logger = logging.getLogger(__name__)
-    quality_gate = QualityGate()
 
     # Get session
     # 获取会话
@@ -741,9 +753,78 @@ async def yolo_auto_process(
     # 初始化组件
     llm_track = LLMTrack(colloquialism_level=tone_level)
     rule_track = RuleTrack(colloquialism_level=tone_level)
-    scorer = RiskScorer()
+    scorer = get_risk_scorer()
+    cascade = SuggestionCascade(route="yolo")
     whitelist_set = set(whitelist) if whitelist else None
 
+    # Score every sentence and run the cascade rule tier first, so only the
+    # escalated sentences go out to the LLM, in batched requests
+    # 先为所有句子评分并运行级联规则层，仅将升级的句子以批量请求发送给LLM
+    original_risks = {}
+    inexact_ids = set()
+    rule_outcomes = {}
+    batch_sentence_ids = []
+    batch_items = []
+    for sentence in sentences:
+        existing_mod = existing_mods.get(sentence.id)
+        if existing_mod and existing_mod.accepted:
+            continue
+        # Prefilter decides "risk < 25" without PPL where it can; sentences that
+        # will be rewritten need the exact score the candidates are compared to
+        # 预筛选尽可能不计算PPL即判定 "风险 < 25"；需要改写的句子需要精确分数以便与候选比较
+        analysis = await asyncio.to_thread(
+            scorer.analyze,
+            sentence.original_text,
+            tone_level=tone_level,
+            whitelist=whitelist_set,
+            profile="prefilter",
+            threshold=25
+        )
+        if analysis.risk_score >= 25 and not analysis.score_exact:
+            analysis = await asyncio.to_thread(
+                scorer.analyze,
+                sentence.original_text,
+                tone_level=tone_level,
+                whitelist=whitelist_set,
+                profile="score_only"
+            )
+        original_risks[sentence.id] = analysis.risk_score
+        if not analysis.score_exact:
+            inexact_ids.add(sentence.id)
+        if original_risks[sentence.id] >= 25:
+            try:
+                rule_outcomes[sentence.id] = await asyncio.to_thread(
+                    cascade.run_rule_tier,
+                    rule_track,
+                    sentence.original_text,
+                    original_risks[sentence.id],
+                    locked_terms=sentence.locked_terms_json or [],
+                    tone_level=tone_level,
+                    whitelist=whitelist_set
+                )
+            except Exception as e:
+                logger.error(f"Rule track error for sentence {sentence.index + 1}: {e}")
+            outcome = rule_outcomes.get(sentence.id)
+            if outcome and not outcome.escalate:
+                continue
+            batch_sentence_ids.append(sentence.id)
+            batch_items.append(BatchSuggestionItem(
+                sentence=sentence.original_text,
+                locked_terms=sentence.locked_terms_json or [],
+                is_paraphrase=bool(sentence.analysis_json and sentence.analysis_json.get("is_paraphrase"))
+            ))
+
+    escalated_ids = set(batch_sentence_ids)
+    llm_results = {}
+    if batch_items:
+        try:
+            batch_results = await llm_track.generate_suggestions_batch(
+                batch_items, target_lang=session.target_lang or "zh"
+            )
+            llm_results = dict(zip(batch_sentence_ids, batch_results))
+        except Exception as e:
+            logger.error(f"LLM batch error: {e}")
+
     # Process results
     # 处理结果
     processed_count = 0
@@ -767,58 +848,48 @@ async def yolo_auto_process(
                 })
                 continue
 
-        # Calculate original risk
-        # 计算原始风险分数
-        original_analysis = scorer.analyze(
-            sentence.original_text,
-            tone_level=tone_level,
-            whitelist=whitelist_set
-        )
-        original_risk = original_analysis.risk_score
+        # Original risk (scored in the pre-pass above)
+        # 原始风险分数（已在上方预处理中计算）
+        original_risk = original_risks[sentence.id]
 
         # Skip low risk sentences (score < 25)
         # 跳过低风险句子 (分数 < 25)
         if original_risk < 25:
-            # Record as skipped
-            # 记录为跳过
+            # A prefilter score without PPL is only a lower bound: store NULL
+            # rather than a number that reads as the sentence's real score
+            # 未计算PPL的预筛选分数只是下界：存储 NULL，而非看似真实分数的数值
+            exact = sentence.id not in inexact_ids
             mod = Modification(
                 sentence_id=sentence.id,
                 session_id=session_id,
                 source="skip",
                 modified_text="",
                 accepted=False,
-                new_risk_score=original_risk
+                new_risk_score=original_risk if exact else None
             )
             db.add(mod)
             skipped_count += 1
-            logs.append({
+            log = {
                 "index": idx + 1,
                 "action": "skipped",
-                "message": f"句子 {idx + 1} 风险较低 ({original_risk})，已跳过",
-                "original_risk": original_risk,
-                "new_risk": original_risk,
-            })
+                "message": f"句子 {idx + 1} 风险较低 ({original_risk if exact else '< 25'})，已跳过",
+            }
+            if exact:
+                log.update(original_risk=original_risk, new_risk=original_risk)
+            logs.append(log)
             continue
 
-        # Try LLM suggestion first
-        # 首先尝试 LLM 建议
+        # LLM suggestion (escalated sentences only)
+        # LLM 建议（仅限升级的句子）
         best_text = None
         best_risk = original_risk
         best_source = "llm"
-
-        # Check if paraphrase
-        is_paraphrase = False
-        if sentence.analysis_json and sentence.analysis_json.get("is_paraphrase"):
-            is_paraphrase = True
+        llm_decision = None
 
         try:
-            llm_result = await llm_track.generate_suggestion(
-                sentence=sentence.original_text,
-                issues=[],
-                locked_terms=sentence.locked_terms_json or [],
-                target_lang=session.target_lang or "zh",
-                is_paraphrase=is_paraphrase
-            )
+            llm_result = llm_results.get(sentence.id)
+            if sentence.id in escalated_ids and not (llm_result and llm_result.rewritten):
+                llm_decision = ("no_result", None)
             if llm_result and llm_result.rewritten:
                 # DEAI Engine 2.0: Verify suggestion for P0 words and first-person pronouns
                 # DEAI Engine 2.0: 验证建议是否包含P0词或第一人称代词
@@ -834,13 +905,20 @@ async def yolo_auto_process(
                     logger.warning(
                         f"[YOLO] Sentence {idx + 1} LLM suggestion rejected: {validation.message}"
                     )
+                    llm_decision = ("validation_failed", None)
                     # Don't use this LLM suggestion, will try rule-based instead
                     # 不使用此LLM建议，将尝试规则建议
                 else:
-                    llm_analysis = scorer.analyze(
+                    llm_analysis = await asyncio.to_thread(
+                        scorer.analyze,
                         llm_result.rewritten,
                         tone_level=tone_level,
-                        whitelist=whitelist_set
+                        whitelist=whitelist_set,
+                        profile="score_only"
+                    )
+                    llm_decision = (
+                        cascade.llm_reason(llm_analysis.risk_score, original_risk),
+                        llm_analysis.risk_score
                     )
                     if llm_analysis.risk_score < best_risk:
                         best_text = llm_result.rewritten
@@ -848,36 +926,17 @@ async def yolo_auto_process(
                         best_source = "llm"
         except Exception as e:
             logger.error(f"LLM track error for sentence {idx + 1}: {e}")
-
-        # Also try rule-based suggestion
-        # 同时尝试规则建议
-        try:
-            rule_result = rule_track.generate_suggestion(
-                sentence=sentence.original_text,
-                issues=[],
-                locked_terms=sentence.locked_terms_json or []
-            )
-            if rule_result and rule_result.rewritten:
-                # DEAI Engine 2.0: Also validate rule-based suggestions
-                # DEAI Engine 2.0: 同样验证规则建议
-                rule_validation = quality_gate.verify_suggestion(
-                    original=sentence.original_text,
-                    suggestion=rule_result.rewritten,
-                    colloquialism_level=tone_level
-                )
-
-                if rule_validation.passed:
-                    rule_analysis = scorer.analyze(
-                        rule_result.rewritten,
-                        tone_level=tone_level,
-                        whitelist=whitelist_set
-                    )
-                    if rule_analysis.risk_score < best_risk:
-                        best_text = rule_result.rewritten
-                        best_risk = rule_analysis.risk_score
-                        best_source = "rule"
-        except Exception as e:
-            logger.error(f"Rule track error for sentence {idx + 1}: {e}")
+            llm_decision = ("error", None)
+        if llm_decision:
+            cascade.record_llm(llm_decision[0] == "targets_met", llm_decision[0], risk=llm_decision[1])
+
+        # Rule-based suggestion (verified and scored by the cascade rule tier)
+        # 规则建议（已由级联规则层验证并评分）
+        rule_outcome = rule_outcomes.get(sentence.id)
+        if rule_outcome and rule_outcome.usable and rule_outcome.risk < best_risk:
+            best_text = rule_outcome.rule_result.rewritten
+            best_risk = rule_outcome.risk
+            best_source = "rule"
 
         # Apply the best suggestion
         # 应用最佳建议
@@ -951,14 +1010,13 @@ def _build_sentence_analysis(sentence: Sentence) -> SentenceAnalysis:
     Build SentenceAnalysis from Sentence model
     从Sentence模型构建SentenceAnalysis
     """
-    from src.core.analyzer.fingerprint import FingerprintDetector
     from src.api.schemas import FingerprintMatch
 
     analysis = sentence.analysis_json or {}
 
     # Detect fingerprints in the sentence text
     # 检测句子文本中的指纹词
-    detector = FingerprintDetector()
+    detector = get_fingerprint_detector()
     detected_fps = detector.detect(sentence.original_text)
     fingerprints = [
         FingerprintMatch(
@@ -995,7 +1053,8 @@ def _build_sentence_analysis(sentence: Sentence) -> SentenceAnalysis:
 @router.post("/{session_id}/yolo-full-auto")
 async def yolo_full_auto_process(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    quality_gate: QualityGate = Depends(get_quality_gate)
 ):
     """
     YOLO Full Automation: Process all levels automatically from Step 1-1 to Step 3
@@ -1475,11 +1534,8 @@ async def yolo_full_auto_process(
         try:
             # Re-analyze and segment the updated document
             # 重新分析和分句更新后的文档
-            from src.core.preprocessor.segmenter import SentenceSegmenter
-            from src.core.analyzer.scorer import RiskScorer
-
-            segmenter = SentenceSegmenter()
-            scorer = RiskScorer()
+            segmenter = get_sentence_segmenter()
+            scorer = get_risk_scorer()
             whitelist = session.config_json.get("whitelist", [])
             whitelist_set = set(whitelist) if whitelist else None
 
@@ -1498,10 +1554,12 @@ async def yolo_full_auto_process(
                 sentence_text = sent_data.text
                 paragraph_idx = sent_data.paragraph_index or 0
 
-                analysis = scorer.analyze(
+                analysis = await asyncio.to_thread(
+                    scorer.analyze,
                     sentence_text,
                     tone_level=colloquialism_level,
-                    whitelist=whitelist_set
+                    whitelist=whitelist_set,
+                    profile="score_only"
                 )
 
                 sent = Sentence(
@@ -1514,13 +1572,18 @@ async def yolo_full_auto_process(
                     analysis_json={
                         "ppl": analysis.ppl,
                         "fingerprint_density": analysis.fingerprint_density,
-                        "paragraph_index": paragraph_idx
+                        "paragraph_index": paragraph_idx,
+                        "lexicon_version": analysis.lexicon_version
                     }
                 )
                 db.add(sent)
                 await db.flush()
                 new_sentence_ids.append(sent.id)
 
+            # Materialize the new document's risk summary for the document list
+            # 为文档列表物化新文档的风险汇总
+            await db.execute(refresh_risk_summary(Document.id == current_document_id))
+
             # Update session config with new sentence IDs
             # 更新会话配置使用新的句子ID
             session.config_json["sentence_ids"] = new_sentence_ids
@@ -1529,13 +1592,13 @@ async def yolo_full_auto_process(
 
             # Now run the yolo-process logic
             # 现在运行 yolo-process 逻辑
-            from src.core.suggester.llm_track import LLMTrack
+            from src.core.suggester.llm_track import LLMTrack, BatchSuggestionItem
             from src.core.suggester.rule_track import RuleTrack
-            from src.core.validator.quality_gate import QualityGate
+            from src.core.suggester.cascade import SuggestionCascade
 
-            quality_gate = QualityGate()
             llm_track = LLMTrack(colloquialism_level=colloquialism_level)
             rule_track = RuleTrack(colloquialism_level=colloquialism_level)
+            cascade = SuggestionCascade(route="yolo_full_auto")
 
             # Get new sentences
             # 获取新句子
@@ -1544,6 +1607,54 @@ async def yolo_full_auto_process(
             )
             sentences = sentences_result.scalars().all()
 
+            def _is_trivial(text: str) -> bool:
+                # Skip only very short sentences (< 10 chars) or pure numbers
+                # 只跳过非常短的句子（< 10字符）或纯数字
+                text = text.strip()
+                return len(text) < 10 or text.replace('.', '').replace(',', '').isdigit()
+
+            # Run the cascade rule tier on all non-trivial sentences, then rewrite
+            # the escalated ones in batched LLM requests
+            # 对所有非平凡句子运行级联规则层，再以批量LLM请求改写升级的句子
+            rule_outcomes = {}
+            batch_sentences = []
+            for s in sentences:
+                if _is_trivial(s.original_text):
+                    continue
+                try:
+                    rule_outcomes[s.id] = await asyncio.to_thread(
+                        cascade.run_rule_tier,
+                        rule_track,
+                        s.original_text,
+                        s.risk_score or 0,
+                        locked_terms=s.locked_terms_json or [],
+                        tone_level=colloquialism_level,
+                        whitelist=whitelist_set
+                    )
+                except Exception as e:
+                    logger.error(f"Rule track error for sentence {s.index + 1}: {e}")
+                outcome = rule_outcomes.get(s.id)
+                if not outcome or outcome.escalate:
+                    batch_sentences.append(s)
+            escalated_ids = {s.id for s in batch_sentences}
+
+            llm_results = {}
+            if batch_sentences:
+                try:
+                    batch_results = await llm_track.generate_suggestions_batch(
+                        [
+                            BatchSuggestionItem(
+                                sentence=s.original_text,
+                                locked_terms=s.locked_terms_json or []
+                            )
+                            for s in batch_sentences
+                        ],
+                        target_lang=session.target_lang or "zh"
+                    )
+                    llm_results = {s.id: r for s, r in zip(batch_sentences, batch_results)}
+                except Exception as e:
+                    logger.error(f"LLM batch error: {e}")
+
             processed_count = 0
             skipped_count = 0
             total_risk_reduction = 0
@@ -1553,10 +1664,7 @@ async def yolo_full_auto_process(
 
                 # YOLO mode: Try to improve ALL sentences, not just high-risk ones
                 # YOLO模式：尝试改进所有句子，而不仅仅是高风险句子
-                # Skip only very short sentences (< 10 chars) or pure numbers
-                # 只跳过非常短的句子（< 10字符）或纯数字
-                sentence_text = sentence.original_text.strip()
-                if len(sentence_text) < 10 or sentence_text.replace('.', '').replace(',', '').isdigit():
+                if _is_trivial(sentence.original_text):
                     mod = Modification(
                         sentence_id=sentence.id,
                         session_id=session_id,
@@ -1569,31 +1677,33 @@ async def yolo_full_auto_process(
                     skipped_count += 1
                     continue
 
-                # Try LLM suggestion
-                # 尝试 LLM 建议
+                # Try LLM suggestion (escalated sentences only)
+                # 尝试 LLM 建议（仅限升级的句子）
                 best_text = None
                 best_risk = original_risk
                 best_source = "llm"
+                llm_decision = ("no_result", None) if sentence.id in escalated_ids else None
 
                 try:
-                    llm_result = await llm_track.generate_suggestion(
-                        sentence=sentence.original_text,
-                        issues=[],
-                        locked_terms=sentence.locked_terms_json or [],
-                        target_lang=session.target_lang or "zh",
-                        is_paraphrase=False
-                    )
+                    llm_result = llm_results.get(sentence.id)
                     if llm_result and llm_result.rewritten:
                         validation = quality_gate.verify_suggestion(
                             original=sentence.original_text,
                             suggestion=llm_result.rewritten,
                             colloquialism_level=colloquialism_level
                         )
+                        llm_decision = ("validation_failed", None)
                         if validation.passed:
-                            llm_analysis = scorer.analyze(
+                            llm_analysis = await asyncio.to_thread(
+                                scorer.analyze,
                                 llm_result.rewritten,
                                 tone_level=colloquialism_level,
-                                whitelist=whitelist_set
+                                whitelist=whitelist_set,
+                                profile="score_only"
+                            )
+                            llm_decision = (
+                                cascade.llm_reason(llm_analysis.risk_score, original_risk),
+                                llm_analysis.risk_score
                             )
                             if llm_analysis.risk_score < best_risk:
                                 best_text = llm_result.rewritten
@@ -1601,33 +1711,17 @@ async def yolo_full_auto_process(
                                 best_source = "llm"
                 except Exception as e:
                     logger.error(f"LLM track error for sentence {idx + 1}: {e}")
-
-                # Try rule-based suggestion
-                # 尝试规则建议
-                try:
-                    rule_result = rule_track.generate_suggestion(
-                        sentence=sentence.original_text,
-                        issues=[],
-                        locked_terms=sentence.locked_terms_json or []
-                    )
-                    if rule_result and rule_result.rewritten:
-                        rule_validation = quality_gate.verify_suggestion(
-                            original=sentence.original_text,
-                            suggestion=rule_result.rewritten,
-                            colloquialism_level=colloquialism_level
-                        )
-                        if rule_validation.passed:
-                            rule_analysis = scorer.analyze(
-                                rule_result.rewritten,
-                                tone_level=colloquialism_level,
-                                whitelist=whitelist_set
-                            )
-                            if rule_analysis.risk_score < best_risk:
-                                best_text = rule_result.rewritten
-                                best_risk = rule_analysis.risk_score
-                                best_source = "rule"
-                except Exception as e:
-                    logger.error(f"Rule track error for sentence {idx + 1}: {e}")
+                    llm_decision = ("error", None)
+                if llm_decision:
+                    cascade.record_llm(llm_decision[0] == "targets_met", llm_decision[0], risk=llm_decision[1])
+
+                # Rule-based suggestion (verified and scored by the cascade rule tier)
+                # 规则建议（已由级联规则层验证并评分）
+                rule_outcome = rule_outcomes.get(sentence.id)
+                if rule_outcome and rule_outcome.usable and rule_outcome.risk < best_risk:
+                    best_text = rule_outcome.rule_result.rewritten
+                    best_risk = rule_outcome.risk
+                    best_source = "rule"
 
                 # Apply best suggestion
                 # 应用最佳建议
@@ -29,6 +29,7 @@ from sqlalchemy.orm.attributes import flag_modified
 from typing import Optional
 import logging
 import re
+import time
 import httpx
 
 from src.api.schemas import (
@@ -80,6 +81,7 @@ from src.api.schemas import (
 from src.core.analyzer.structure import StructureAnalyzer
 from src.core.analyzer.smart_structure import SmartStructureAnalyzer
 from src.prompts.structure import DISRUPTION_LEVELS, DISRUPTION_STRATEGIES
+from src.prompts.prefix_cache import gemini_usage, record_response_usage, record_usage
 from src.db.database import get_db
 from src.db.models import Document, Session
 from src.services.document_service import get_working_text, save_modified_text
@@ -1450,6 +1452,7 @@ async def _call_llm_for_suggestion(prompt: str, settings) -> str:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure:_call_llm_for_suggestion", prompt, "dashscope", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use Volcengine
@@ -1472,6 +1475,7 @@ async def _call_llm_for_suggestion(prompt: str, settings) -> str:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure:_call_llm_for_suggestion", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use DeepSeek
@@ -1494,6 +1498,7 @@ async def _call_llm_for_suggestion(prompt: str, settings) -> str:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure:_call_llm_for_suggestion", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use Gemini
@@ -1501,11 +1506,16 @@ async def _call_llm_for_suggestion(prompt: str, settings) -> str:
     elif settings.llm_provider == "gemini" and settings.gemini_api_key:
         from google import genai
         client = genai.Client(api_key=settings.gemini_api_key)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=settings.llm_model,
             contents=prompt,
             config={"max_output_tokens": 2048, "temperature": 0.2}
         )
+        record_usage(
+            "structure:_call_llm_for_suggestion", prompt, gemini_usage(response),
+            provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return response.text
 
     else:
@@ -1657,6 +1667,7 @@ async def get_issue_suggestion(
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:get_issue_suggestion", prompt, "dashscope", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         # Use Volcengine
@@ -1679,6 +1690,7 @@ async def get_issue_suggestion(
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:get_issue_suggestion", prompt, "volcengine", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         # Use DeepSeek
@@ -1701,6 +1713,7 @@ async def get_issue_suggestion(
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:get_issue_suggestion", prompt, "deepseek", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         # Use Gemini
@@ -1708,11 +1721,16 @@ async def get_issue_suggestion(
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
             from google import genai
             client = genai.Client(api_key=settings.gemini_api_key)
+            started = time.perf_counter()
             gen_response = await client.aio.models.generate_content(
                 model=settings.llm_model,
                 contents=prompt,
                 config={"max_output_tokens": 4096, "temperature": 0.3}
             )
+            record_usage(
+                "structure:get_issue_suggestion", prompt, gemini_usage(gen_response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
             response_text = gen_response.text
 
         else:
@@ -2355,6 +2373,7 @@ async def _call_llm_for_merge_modify(prompt: str, settings, max_tokens: int = 40
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:_call_llm_for_merge_modify", prompt, "dashscope", response, data)
                 logger.info(f"DashScope response received, usage: {data.get('usage', {})}")
                 return data["choices"][0]["message"]["content"]
         except httpx.TimeoutException as e:
@@ -2387,6 +2406,7 @@ async def _call_llm_for_merge_modify(prompt: str, settings, max_tokens: int = 40
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure:_call_llm_for_merge_modify", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use DeepSeek
@@ -2409,6 +2429,7 @@ async def _call_llm_for_merge_modify(prompt: str, settings, max_tokens: int = 40
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure:_call_llm_for_merge_modify", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use Gemini
@@ -2416,11 +2437,16 @@ async def _call_llm_for_merge_modify(prompt: str, settings, max_tokens: int = 40
     elif settings.llm_provider == "gemini" and settings.gemini_api_key:
         from google import genai
         client = genai.Client(api_key=settings.gemini_api_key)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=settings.llm_model,
             contents=prompt,
             config={"max_output_tokens": max_tokens, "temperature": 0.3}
         )
+        record_usage(
+            "structure:_call_llm_for_merge_modify", prompt, gemini_usage(response),
+            provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return response.text
 
     else:
@@ -3060,6 +3086,7 @@ Return the complete modified document text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:apply_paragraph_strategies", prompt, "openai", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         elif settings.llm_provider == "volcengine" and settings.volcengine_api_key:
@@ -3080,6 +3107,7 @@ Return the complete modified document text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:apply_paragraph_strategies", prompt, "volcengine", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         elif settings.llm_provider == "deepseek" and settings.deepseek_api_key:
@@ -3100,16 +3128,22 @@ Return the complete modified document text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("structure:apply_paragraph_strategies", prompt, "deepseek", response, data)
                 response_text = data["choices"][0]["message"]["content"]
 
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
             from google import genai
             client = genai.Client(api_key=settings.gemini_api_key)
+            started = time.perf_counter()
             gen_response = await client.aio.models.generate_content(
                 model=settings.llm_model,
                 contents=prompt,
                 config={"max_output_tokens": 8192, "temperature": 0.3}
             )
+            record_usage(
+                "structure:apply_paragraph_strategies", prompt, gemini_usage(gen_response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
             response_text = gen_response.text
 
         else:
@@ -15,6 +15,7 @@ from sqlalchemy.orm.attributes import flag_modified
 from typing import Optional, Dict, Any, List
 import logging
 import json
+import time
 import uuid
 import httpx
 
@@ -40,6 +41,7 @@ from src.prompts.structure_guidance import (
     can_generate_reference,
     get_issue_specific_prompt,
 )
+from src.prompts.prefix_cache import CachedPrompt, build_prompt, join_prompts, record_response_usage, record_usage, gemini_usage
 from src.db.database import get_db
 from src.db.models import Document
 from src.config import get_settings
@@ -470,9 +472,10 @@ async def get_issue_guidance(
 
         # Build full prompt
         # 构建完整提示词
-        full_prompt = STRUCTURE_ISSUE_GUIDANCE_PROMPT.format(**context)
-        if specific_prompt:
-            full_prompt += "\n\n" + specific_prompt
+        full_prompt = join_prompts(
+            build_prompt(STRUCTURE_ISSUE_GUIDANCE_PROMPT, **context),
+            specific_prompt,
+        )
 
         # Call LLM
         # 调用 LLM
@@ -518,7 +521,7 @@ async def get_issue_guidance(
         )
 
 
-async def _call_llm_for_guidance(prompt: str, settings) -> str:
+async def _call_llm_for_guidance(prompt: CachedPrompt, settings) -> str:
     """
     Call LLM API for guidance generation
     调用 LLM API 生成指引
@@ -537,12 +540,13 @@ async def _call_llm_for_guidance(prompt: str, settings) -> str:
         ) as client:
             response = await client.post("/chat/completions", json={
                 "model": settings.dashscope_model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": 3000,
                 "temperature": 0.3
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure_guidance", prompt, "dashscope", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use Volcengine
@@ -559,12 +563,13 @@ async def _call_llm_for_guidance(prompt: str, settings) -> str:
         ) as client:
             response = await client.post("/chat/completions", json={
                 "model": settings.volcengine_model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": 3000,
                 "temperature": 0.3
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure_guidance", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use DeepSeek
@@ -581,12 +586,13 @@ async def _call_llm_for_guidance(prompt: str, settings) -> str:
         ) as client:
             response = await client.post("/chat/completions", json={
                 "model": settings.llm_model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": 3000,
                 "temperature": 0.3
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("structure_guidance", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
     # Use Gemini
@@ -594,10 +600,19 @@ async def _call_llm_for_guidance(prompt: str, settings) -> str:
     elif settings.llm_provider == "gemini" and settings.gemini_api_key:
         from google import genai
         client = genai.Client(api_key=settings.gemini_api_key)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=settings.llm_model,
-            contents=prompt,
-            config={"max_output_tokens": 3000, "temperature": 0.3}
+            contents=prompt.user,
+            config={
+                "max_output_tokens": 3000,
+                "temperature": 0.3,
+                "system_instruction": prompt.system or None
+            }
+        )
+        record_usage(
+            "structure_guidance", prompt, gemini_usage(response),
+            provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
         )
         return response.text
 
@@ -785,7 +800,7 @@ async def get_reorder_suggestion(
             "core_thesis": analysis.get("core_thesis", "未提取"),
         }
 
-        prompt = STRUCTURE_REORDER_PROMPT.format(**context)
+        prompt = build_prompt(STRUCTURE_REORDER_PROMPT, **context)
 
         # Call LLM
         # 调用 LLM
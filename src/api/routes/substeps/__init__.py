@@ -11,11 +11,13 @@ Organized by layer:
 - Layer 1 (Lexical): /api/v1/layer1/step5-x/...
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-# Create main router for substeps
-# 创建substeps主路由
-router = APIRouter()
+from src.api.routes.substeps.prefetch import schedule_substep_prefetch
+
+# Create main router for substeps; a successful step analysis prefetches the next step
+# 创建substeps主路由；步骤分析成功后预取下一步骤
+router = APIRouter(dependencies=[Depends(schedule_substep_prefetch)])
 
 # Import layer routers
 # 导入层级路由
@@ -15,14 +15,33 @@ Provides common functionality for all substeps:
 - 标准响应格式化
 """
 
+import asyncio
+import inspect
 import json
 import logging
+import math
 import httpx
 import re
-from typing import Dict, Any, List, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional
 from abc import ABC, abstractmethod
 
 from src.config import get_settings
+from src.prompts.prefix_cache import (
+    CachedPrompt,
+    PromptInput,
+    as_cached_prompt,
+    build_prompt,
+    gemini_usage,
+    record_response_usage,
+    record_usage,
+)
+from src.services.single_flight import coalesced
+from src.services.structured_output import get_structured_output
+from src.services.token_budget import BudgetPlan, get_token_budgeter
+from src.api.routes.substeps.prefetch import in_prefetch, prefetchable
+from src.api.routes.substeps.fusion import get_layer_fusion
+from src.api.routes.substeps.schemas import RewriteOutput, SectionStructureOutput, SubstepAnalysisOutput
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +54,45 @@ class BaseSubstepHandler(ABC):
     Each substep should inherit from this and implement:
     - get_analysis_prompt() - Returns analysis prompt template
     - get_rewrite_prompt() - Returns rewrite prompt template
+
+    analyze() calls made with only the text and locked terms are answered by
+    the layer's fused analysis when possible (see fusion). Set fused_analysis
+    = False on handlers whose route fills the prompt with computed statistics:
+    the fused run must not answer steps that are analyzed with extra inputs.
+    仅传入文本和锁定词的 analyze() 调用会尽量由该层的融合分析应答（见 fusion）。
+    若路由会向提示词填入计算出的统计数据，请在处理器上设置 fused_analysis = False：
+    融合运行不得替带额外输入分析的步骤作答。
+
+    The LLM entry points below are coalesced (see single_flight): identical
+    concurrent calls, e.g. a double-clicked "analyze", share one LLM run.
+    analyze additionally serves results prefetched for the next step (see
+    prefetch). Overrides in subclasses are wrapped the same way.
+    以下LLM入口会被合并（见 single_flight）：相同的并发调用（例如双击"分析"）共享一次LLM运行。
+    analyze 还会使用为下一步骤预取的结果（见 prefetch）。子类中的重写方法以同样方式包装。
     """
 
+    _COALESCED_METHODS = ("apply_rewrite", "identify_section_structure")
+
+    fused_analysis = True
+
+    # Share of the document an analysis answer lists or quotes (sizes max_tokens)
+    # 分析回答列出或引用的文档比例（用于确定 max_tokens）
+    analysis_output_ratio = 0.5
+
+    # Schema the analysis answer is requested in and validated against (see structured_output)
+    # 请求并校验分析回答所用的模式（见 structured_output）
+    analysis_output = SubstepAnalysisOutput
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for attr, value in list(vars(cls).items()):
+            if not inspect.isfunction(value):
+                continue
+            if attr == "analyze":
+                setattr(cls, attr, prefetchable(value))
+            elif attr in cls._COALESCED_METHODS:
+                setattr(cls, attr, coalesced(value))
+
     def __init__(self):
         """Initialize the handler"""
         self.settings = get_settings()
@@ -99,6 +155,7 @@ If you output more than 8 sections, you are probably including subsections by mi
 FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.Y format)!
 """
 
+    @coalesced
     async def identify_section_structure(
         self,
         document_text: str,
@@ -141,16 +198,18 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         if len(lines) > max_lines:
             truncated_text += f"\n\n[NOTE: Document continues beyond line {max_lines}. Total lines: {len(lines)}]"
 
-        prompt = self.SECTION_STRUCTURE_PROMPT.format(
+        prompt = build_prompt(
+            self.SECTION_STRUCTURE_PROMPT,
             document_text=truncated_text
         )
 
         # Call LLM with low temperature for consistency
         logger.info("Identifying section structure via LLM")
-        response_text = await self._call_llm(prompt, max_tokens=2048, temperature=0.2)
-
-        # Parse response
-        result = self._parse_json_response(response_text)
+        budgeter = get_token_budgeter()
+        plan = budgeter.plan(prompt, budgeter.expected_output(self.SECTION_STRUCTURE_PROMPT), floor=2048)
+        result = await self._call_llm_json(
+            prompt, SectionStructureOutput, max_tokens=plan.max_tokens, temperature=0.2, name="section_structure"
+        )
 
         # Validate result has required fields
         if "sections" not in result:
@@ -250,6 +309,7 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         """
         pass
 
+    @prefetchable
     async def analyze(
         self,
         document_text: str,
@@ -282,8 +342,38 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
                 logger.info(f"Using cached analysis result for {step_name}")
                 return cached_result
 
-        # Build locked terms string
         locked_terms = locked_terms or []
+
+        # Fused mode: one LLM call for the whole layer, individual prompt as fallback
+        # 融合模式：整层一次LLM调用，单独提示词作为回退
+        result = None
+        fusion = get_layer_fusion()
+        if not kwargs and self.fused_analysis and fusion.enabled:
+            result = await fusion.analyze(self, document_text, locked_terms)
+        if result is None:
+            result = await self._analyze_individually(document_text, locked_terms, step_name, **kwargs)
+
+        # Save to cache if session_id and step_name provided; this cache is not
+        # keyed by text, so prefetch runs keep their result in the prefetch store only
+        # 如果提供了 session_id 和 step_name，保存到缓存；该缓存不按文本区分，因此预取运行仅将结果保存在预取存储中
+        if use_cache and session_id and step_name and not in_prefetch():
+            await self._save_to_cache(session_id, step_name, result, status="completed")
+            logger.info(f"Saved analysis result to cache for {step_name}")
+
+        return result
+
+    async def _analyze_individually(
+        self,
+        document_text: str,
+        locked_terms: List[str],
+        step_name: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Run this substep's own analysis prompt
+        运行此子步骤自身的分析提示词
+        """
+        # Build locked terms string
         locked_terms_str = "\n".join(f"- {term}" for term in locked_terms) if locked_terms else "None"
 
         # Get analysis prompt template
@@ -292,7 +382,7 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         # Prepare template parameters
         # 准备模板参数
         template_params = {
-            "document_text": document_text[:10000],  # Limit text length
+            "document_text": self._fit_document(document_text),  # Limit to the analysis token budget
             "locked_terms": locked_terms_str,
             **kwargs
         }
@@ -302,24 +392,24 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         if "paragraph_count" in template_params:
             template_params["paragraph_count_minus_1"] = template_params["paragraph_count"] - 1
 
-        # Fill in placeholders
-        prompt = prompt_template.format(**template_params)
-
-        # Call LLM with higher max_tokens for analysis (sentence-level needs more space)
-        # 使用更高的 max_tokens 进行分析（句子级别需要更多空间）
-        logger.info(f"Calling LLM for analysis (step: {step_name})")
-        response_text = await self._call_llm(prompt, max_tokens=8192, temperature=0.3)
-
-        # Parse JSON response
-        result = self._parse_json_response(response_text)
-
-        # Save to cache if session_id and step_name provided
-        # 如果提供了 session_id 和 step_name，保存到缓存
-        if use_cache and session_id and step_name:
-            await self._save_to_cache(session_id, step_name, result, status="completed")
-            logger.info(f"Saved analysis result to cache for {step_name}")
-
-        return result
+        # Fill in placeholders (static rules become the cacheable system prefix)
+        # 填充占位符（静态规则作为可缓存的系统前缀）
+        prompt = build_prompt(prompt_template, **template_params)
+
+        # Size max_tokens from the expected answer; shrink the document up front if it cannot fit
+        # 按预期回答确定 max_tokens；若无法容纳则提前缩减文档
+        plan = self._analysis_plan(prompt, prompt_template)
+        if not plan.fits:
+            budgeter = get_token_budgeter()
+            document_tokens = budgeter.count(template_params["document_text"])
+            template_params["document_text"] = budgeter.fit_text(
+                template_params["document_text"], document_tokens // plan.chunks
+            )
+            prompt = build_prompt(prompt_template, **template_params)
+            plan = self._analysis_plan(prompt, prompt_template)
+
+        logger.info(f"Calling LLM for analysis (step: {step_name}, max_tokens: {plan.max_tokens})")
+        return await self._call_llm_json(prompt, max_tokens=plan.max_tokens, temperature=0.3)
 
     async def generate_rewrite_prompt(
         self,
@@ -371,6 +461,7 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
             "estimated_changes": len(selected_issues)
         }
 
+    @coalesced
     async def apply_rewrite(
         self,
         document_text: str,
@@ -383,6 +474,11 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         Apply AI modification directly
         直接应用AI修改
 
+        The answer echoes the whole document, so the call is planned up front:
+        a document whose rewrite cannot fit the output budget is rewritten in
+        paragraph-aligned chunks that are joined afterwards.
+        回答会复述整篇文档，因此预先规划调用：改写结果超出输出预算的文档按段落分块改写后再拼接。
+
         Args:
             document_text: Original document text
             selected_issues: List of selected issues to fix
@@ -403,19 +499,84 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
         # Get rewrite prompt template
         prompt_template = self.get_rewrite_prompt()
 
-        # Fill in placeholders
-        prompt = prompt_template.format(
-            document_text=document_text,
-            selected_issues=issues_list,
-            user_notes=user_notes or "No additional notes",
-            locked_terms=locked_terms_str,
+        prompt_params = {
+            "selected_issues": issues_list,
+            "user_notes": user_notes or "No additional notes",
+            "locked_terms": locked_terms_str,
             **kwargs
+        }
+        chunks = [document_text]
+        plan = self._rewrite_plan(prompt_template, document_text, prompt_params)
+        if not plan.fits:
+            budgeter = get_token_budgeter()
+            chunk_tokens = math.ceil(budgeter.count(document_text) / plan.chunks)
+            chunks = budgeter.split_text(document_text, chunk_tokens)
+            logger.info(f"Rewrite exceeds the output budget, rewriting in {len(chunks)} chunks")
+
+        results = await asyncio.gather(*(
+            self._rewrite_chunk(prompt_template, chunk, prompt_params) for chunk in chunks
+        ))
+        if len(results) == 1:
+            result = results[0]
+        else:
+            result = {
+                "modified_text": "\n\n".join(r["modified_text"] for r in results),
+                "changes_summary_zh": "；".join(dict.fromkeys(
+                    r["changes_summary_zh"] for r in results if r.get("changes_summary_zh")
+                )),
+            }
+            if all("changes_count" in r for r in results):
+                result["changes_count"] = sum(r["changes_count"] for r in results)
+            if any("issues_addressed" in r for r in results):
+                result["issues_addressed"] = list(dict.fromkeys(
+                    issue for r in results for issue in r.get("issues_addressed", [])
+                ))
+
+        # Verify locked terms are preserved
+        preserved = self._verify_locked_terms_preserved(
+            document_text, result["modified_text"], locked_terms
         )
 
-        # Call LLM for rewriting (higher max_tokens for full document)
-        response_text = await self._call_llm(prompt, max_tokens=8192, temperature=0.5)
+        if not preserved:
+            logger.warning("Some locked terms may have been lost during rewrite")
+
+        return {
+            "modified_text": result.get("modified_text", document_text),
+            "changes_summary_zh": result.get("changes_summary_zh", "修改完成"),
+            "changes_count": result.get("changes_count", len(selected_issues)),
+            "issues_addressed": result.get("issues_addressed", [issue["type"] for issue in selected_issues]),
+            "remaining_attempts": 3,
+            "locked_terms_preserved": preserved
+        }
+
+    async def _rewrite_chunk(
+        self,
+        prompt_template: str,
+        document_text: str,
+        prompt_params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Rewrite one document (or chunk) with the rewrite prompt
+        使用改写提示词改写一篇文档（或一个分块）
+        """
+        # Fill in placeholders (static rules become the cacheable system prefix)
+        # 填充占位符（静态规则作为可缓存的系统前缀）
+        prompt = build_prompt(prompt_template, document_text=document_text, **prompt_params)
+
+        # Call LLM for rewriting (max_tokens sized for the full echoed text)
+        # 调用LLM进行改写（max_tokens 按完整复述文本确定）
+        plan = self._rewrite_plan(prompt_template, document_text, prompt_params, prompt)
+        return await self._call_llm_json(
+            prompt, RewriteOutput, max_tokens=plan.max_tokens, temperature=0.5,
+            name=f"rewrite:{type(self).__name__}",
+            fallback=lambda response_text: self._parse_rewrite_response(response_text, document_text)
+        )
 
-        # Parse JSON response
+    def _parse_rewrite_response(self, response_text: str, document_text: str) -> Dict[str, Any]:
+        """
+        Tolerant parse of a rewrite answer that failed validation
+        对未通过校验的改写回答进行容错解析
+        """
         result = self._parse_json_response(response_text)
 
         # Handle missing modified_text - use original text as fallback
@@ -435,28 +596,50 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
                 result["modified_text"] = document_text
                 result["changes_summary_zh"] = "修改失败，保留原文"
 
-        # Verify locked terms are preserved
-        preserved = self._verify_locked_terms_preserved(
-            document_text, result["modified_text"], locked_terms
-        )
-
-        if not preserved:
-            logger.warning("Some locked terms may have been lost during rewrite")
-
-        return {
-            "modified_text": result.get("modified_text", document_text),
-            "changes_summary_zh": result.get("changes_summary_zh", "修改完成"),
-            "changes_count": result.get("changes_count", len(selected_issues)),
-            "issues_addressed": result.get("issues_addressed", [issue["type"] for issue in selected_issues]),
-            "remaining_attempts": 3,
-            "locked_terms_preserved": preserved
-        }
+        return result
 
     # =========================================================================
     # Helper Methods
     # 辅助方法
     # =========================================================================
 
+    def _fit_document(self, document_text: str) -> str:
+        """
+        Document cut to the analysis token budget (ANALYSIS_DOCUMENT_TOKENS)
+        截断到分析token预算（ANALYSIS_DOCUMENT_TOKENS）的文档
+        """
+        return get_token_budgeter().fit_text(document_text, self.settings.analysis_document_tokens)
+
+    def _analysis_plan(self, prompt: PromptInput, prompt_template: str, floor: int = 2048) -> BudgetPlan:
+        """
+        Token plan of an analysis call: schema-sized answer plus a share of the input
+        分析调用的token规划：按结构确定的回答加上输入的一部分
+        """
+        budgeter = get_token_budgeter()
+        input_tokens = budgeter.count(as_cached_prompt(prompt).user)
+        expected = budgeter.expected_output(prompt_template, input_tokens, self.analysis_output_ratio)
+        plan = budgeter.plan(prompt, expected, floor=floor)
+        if not plan.fits:
+            logger.warning(f"Analysis prompt over budget for {type(self).__name__}: {plan.to_dict()}")
+        return plan
+
+    def _rewrite_plan(
+        self,
+        prompt_template: str,
+        document_text: str,
+        prompt_params: Dict[str, Any],
+        prompt: Optional[PromptInput] = None
+    ) -> BudgetPlan:
+        """
+        Token plan of a rewrite call: the answer echoes the document (x1.2)
+        改写调用的token规划：回答复述整篇文档（x1.2）
+        """
+        budgeter = get_token_budgeter()
+        if prompt is None:
+            prompt = build_prompt(prompt_template, document_text=document_text, **prompt_params)
+        expected = budgeter.expected_output(prompt_template, budgeter.count(document_text), 1.2)
+        return budgeter.plan(prompt, expected, floor=2048)
+
     def _format_issues_list(self, selected_issues: List[Any]) -> str:
         """
         Format selected issues into a readable list
@@ -523,45 +706,117 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
 
     async def _call_llm(
         self,
-        prompt: str,
+        prompt: PromptInput,
         max_tokens: int = 4096,
-        temperature: float = 0.3
+        temperature: float = 0.3,
+        response_format: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Call LLM API
         调用LLM API
 
         Args:
-            prompt: Prompt text
+            prompt: Prompt text, or a CachedPrompt whose static prefix is sent
+                as the system message for provider prefix caching
             max_tokens: Maximum tokens in response
             temperature: Sampling temperature
+            response_format: OpenAI-style response_format (see structured_output);
+                dropped for good if the provider rejects it
 
         Returns:
             LLM response text
         """
+        prompt = as_cached_prompt(prompt)
+        provider = self._provider()
+        calls = {
+            "volcengine": self._call_volcengine,
+            "dashscope": self._call_dashscope,
+            "deepseek": self._call_deepseek,
+            "gemini": self._call_gemini,
+        }
         try:
-            # Determine provider and call appropriate API
-            if self.settings.llm_provider == "volcengine" and self.settings.volcengine_api_key:
-                return await self._call_volcengine(prompt, max_tokens, temperature)
-            elif self.settings.llm_provider == "dashscope" and self.settings.dashscope_api_key:
-                return await self._call_dashscope(prompt, max_tokens, temperature)
-            elif self.settings.llm_provider == "deepseek" and self.settings.deepseek_api_key:
-                return await self._call_deepseek(prompt, max_tokens, temperature)
-            elif self.settings.llm_provider == "gemini" and self.settings.gemini_api_key:
-                return await self._call_gemini(prompt, max_tokens, temperature)
-            # Fallback chain
-            elif self.settings.volcengine_api_key:
-                return await self._call_volcengine(prompt, max_tokens, temperature)
-            elif self.settings.dashscope_api_key:
-                return await self._call_dashscope(prompt, max_tokens, temperature)
-            else:
+            if provider is None:
                 raise ValueError("No LLM provider configured")
+            try:
+                return await calls[provider](prompt, max_tokens, temperature, response_format)
+            except httpx.HTTPStatusError as e:
+                if not response_format or e.response.status_code != 400:
+                    raise
+                get_structured_output().mark_unsupported(provider, e)
+                return await calls[provider](prompt, max_tokens, temperature, None)
 
         except Exception as e:
             logger.error(f"LLM call failed: {e}")
             raise
 
-    async def _call_volcengine(self, prompt: str, max_tokens: int, temperature: float) -> str:
+    def _provider(self) -> Optional[str]:
+        """
+        Provider _call_llm sends to: LLM_PROVIDER if its key is set, else the fallback chain
+        _call_llm 使用的提供商：LLM_PROVIDER 已配置密钥时使用它，否则按回退链选择
+        """
+        keys = {
+            "volcengine": self.settings.volcengine_api_key,
+            "dashscope": self.settings.dashscope_api_key,
+            "deepseek": self.settings.deepseek_api_key,
+            "gemini": self.settings.gemini_api_key,
+        }
+        if keys.get(self.settings.llm_provider):
+            return self.settings.llm_provider
+        # Fallback chain
+        for provider in ("volcengine", "dashscope"):
+            if keys[provider]:
+                return provider
+        return None
+
+    async def _call_llm_json(
+        self,
+        prompt: PromptInput,
+        output_model: Any = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.3,
+        name: Optional[str] = None,
+        fallback: Optional[Callable[[str], Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Call LLM for a JSON answer validated against output_model
+        调用LLM获取按 output_model 校验的JSON回答
+
+        The schema goes out as response_format where the provider supports it;
+        an invalid answer is re-asked once for only its broken keys, and
+        _parse_json_response (or fallback) is the last resort.
+        提供商支持时模式作为 response_format 发送；无效回答只针对出错的键重新询问一次，
+        _parse_json_response（或 fallback）作为最后手段。
+
+        Args:
+            prompt: Prompt text or CachedPrompt
+            output_model: Expected answer model, defaults to analysis_output
+            max_tokens: Maximum tokens in response
+            temperature: Sampling temperature
+            name: Caller name for metrics, defaults to the handler class name
+            fallback: Parser for answers that stay invalid, response_text -> dict
+
+        Returns:
+            Parsed answer
+        """
+        async def call(call_prompt: PromptInput, response_format: Optional[Dict[str, Any]]) -> str:
+            return await self._call_llm(call_prompt, max_tokens, temperature, response_format)
+
+        return await get_structured_output().complete(
+            call,
+            prompt,
+            output_model or self.analysis_output,
+            provider=self._provider() or "none",
+            name=name or type(self).__name__,
+            fallback=fallback or self._parse_json_response,
+        )
+
+    async def _call_volcengine(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Call Volcengine API"""
         async with httpx.AsyncClient(
             base_url=self.settings.volcengine_base_url,
@@ -572,17 +827,27 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
             timeout=300.0,  # 5 minutes for large documents
             trust_env=False
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": self.settings.volcengine_model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": max_tokens,
                 "temperature": temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage(f"substep:{type(self).__name__}", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_dashscope(self, prompt: str, max_tokens: int, temperature: float) -> str:
+    async def _call_dashscope(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Call DashScope API"""
         async with httpx.AsyncClient(
             base_url=self.settings.dashscope_base_url,
@@ -593,17 +858,27 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
             timeout=300.0,  # 5 minutes for large documents
             trust_env=False
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": self.settings.dashscope_model,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": max_tokens,
                 "temperature": temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage(f"substep:{type(self).__name__}", prompt, "dashscope", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_deepseek(self, prompt: str, max_tokens: int, temperature: float) -> str:
+    async def _call_deepseek(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Call DeepSeek API"""
         async with httpx.AsyncClient(
             base_url=self.settings.deepseek_base_url or "https://api.deepseek.com",
@@ -614,28 +889,48 @@ FINAL CHECK: If your output has more than 8 sections, DELETE the subsections (X.
             timeout=300.0,  # 5 minutes for large documents
             trust_env=False
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": self.settings.deepseek_model or "deepseek-chat",
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": prompt.messages(),
                 "max_tokens": max_tokens,
                 "temperature": temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage(f"substep:{type(self).__name__}", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_gemini(self, prompt: str, max_tokens: int, temperature: float) -> str:
+    async def _call_gemini(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Call Google Gemini API"""
         from google import genai
 
         client = genai.Client(api_key=self.settings.gemini_api_key)
+        config = {
+            "max_output_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if prompt.system:
+            config["system_instruction"] = prompt.system
+        if response_format:
+            config["response_mime_type"] = "application/json"
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=self.settings.llm_model,
-            contents=prompt,
-            config={
-                "max_output_tokens": max_tokens,
-                "temperature": temperature
-            }
+            contents=prompt.user,
+            config=config
+        )
+        record_usage(
+            f"substep:{type(self).__name__}", prompt, gemini_usage(response),
+            provider="gemini", model=self.settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
         )
         return response.text
 
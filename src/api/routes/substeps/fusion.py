@@ -0,0 +1,403 @@
+"""
+Fused Layer Analysis - one LLM call serving all substeps of a layer
+层级融合分析 - 一次LLM调用服务某层的所有子步骤
+
+Every substep of a layer (e.g. step3-0 ... step3-5 for paragraphs) used to
+send its own analysis prompt over the same document, so each layer cost five
+or six full-document round-trips. When a substep is analyzed, the fused mode
+instead builds one composite prompt: the static rules and JSON schema of each
+fusable substep in the layer (system prefix, identical across requests) plus
+the document and locked terms once (user message). The model answers with one
+JSON object keyed by step id, which is split into per-step results.
+
+过去某层的每个子步骤（例如段落层的 step3-0 ... step3-5）都对同一文档单独发送分析提示词，
+每层需要五到六次全文往返。融合模式在分析子步骤时改为构建一个组合提示词：该层每个可融合子步骤
+的静态规则和JSON结构（系统前缀，跨请求一致）加上只出现一次的文档和锁定词（用户消息）。
+模型返回以步骤ID为键的单个JSON对象，再拆分为各步骤的结果。
+
+- A substep is fusable when it uses the base analyze() and its analysis
+  template needs nothing beyond the text and locked terms. Steps whose routes
+  fill in computed statistics (parsed_statistics, cv, ...) set
+  fused_analysis = False and are also skipped here by their placeholders, so
+  a fused run never answers a step its real caller would ask differently.
+  Layer 4 handlers override analyze() (section detection first) and keep
+  their own prompts.
+- Per-step results are one-shot and keyed by (step, text hash), so an edited
+  text never sees them. Steps missing from the fused answer, repeat analyses
+  and failed fused calls use the individual prompt (the fallback).
+- Concurrent substeps of the same layer and text share one fused run
+  (single_flight), e.g. a real request and the next step's prefetch.
+- The fused call is planned up front (token_budget): when the combined
+  answer would not fit FUSED_ANALYSIS_MAX_TOKENS, the layer is not fused.
+- The answer is validated per step (structured_output); a step whose part is
+  invalid is re-asked on its own instead of failing the layer.
+
+- 当子步骤使用基类 analyze() 且其分析模板只需要文本和锁定词时可融合。路由会填入计算统计数据
+  （parsed_statistics、cv 等）的步骤设置了 fused_analysis = False，并且在此处也会按占位符被跳过，
+  因此融合运行不会替真实调用方以不同方式询问的步骤作答。
+  第4层处理器重写了 analyze()（先检测章节），保留各自的提示词。
+- 每步骤结果仅使用一次，按（步骤，文本哈希）作为键，因此修改后的文本不会拿到它们。融合响应中缺失的
+  步骤、重复分析以及融合调用失败时均使用单独提示词（回退）。
+- 同一层、同一文本的并发子步骤共享一次融合运行（single_flight），例如真实请求与下一步骤的预取。
+- 融合调用会预先规划（token_budget）：组合回答超出 FUSED_ANALYSIS_MAX_TOKENS 时该层不进行融合。
+- 回答按步骤校验（structured_output）；某步骤的部分无效时只单独重新询问该步骤，而不会让整层失败。
+"""
+
+import hashlib
+import importlib
+import logging
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ConfigDict, Field, create_model
+
+from src.config import get_settings
+from src.prompts.prefix_cache import CachedPrompt
+from src.services.document_service import STEP_ORDER
+from src.services.llm_usage import usage_scope
+from src.services.single_flight import flight_key, get_single_flight
+from src.services.token_budget import get_token_budgeter
+from src.services.tracing import FUSED_ANALYSIS
+
+logger = logging.getLogger(__name__)
+
+# "src.api.routes.substeps.layer3.step3_1_handler" -> layer3, step3-1
+_HANDLER_MODULE = re.compile(r"\.(layer\d)\.step(\d)_(\d)_handler$")
+
+FUSED_ANALYSIS_HEADER = """You are an expert academic writing analyst. Run the {task_count} independent analysis TASKS below on ONE academic document in a single pass.
+
+RULES:
+- Each TASK is self-contained: apply only its own criteria and scoring, exactly as if it were the only task.
+- The document and locked terms are given ONCE, after the last TASK. Every TASK refers to them.
+- Return ONE JSON object whose keys are the task ids ({task_ids}) and whose values are exactly the JSON each TASK asks for.
+- Output JSON only, no explanations outside the JSON."""
+
+FUSED_ANALYSIS_FOOTER = """Return the combined analysis as ONE JSON object:
+{schema}"""
+
+FUSED_ANALYSIS_INPUT = """<document>
+{document_text}
+</document>
+
+<locked_terms>
+{locked_terms}
+</locked_terms>"""
+
+_SHARED_DOCUMENT = "(the shared DOCUMENT given after the last TASK)"
+_SHARED_LOCKED_TERMS = "(the shared LOCKED TERMS given after the last TASK)"
+
+# The only inputs a fused task may take; anything else comes from the route
+# 融合任务仅可使用的输入；其他输入均由路由提供
+_SHARED_FIELDS = frozenset({"document_text", "locked_terms"})
+
+
+def _template_fields(template: str) -> set:
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+
+@dataclass
+class _LayerGroup:
+    """
+    Fusable substeps of one layer and their static composite prompt
+    某层的可融合子步骤及其静态组合提示词
+    """
+    layer: str
+    steps: List[str]
+    handlers: Dict[str, Any]
+    system: str
+    output_model: Any
+
+
+@dataclass
+class _FusedResult:
+    result: Dict[str, Any]
+    expires_at: float
+
+
+def step_of(handler: Any) -> Optional[Tuple[str, str]]:
+    """
+    (layer, step id) of a substep handler, e.g. ("layer3", "step3-1")
+    子步骤处理器的（层，步骤ID），例如 ("layer3", "step3-1")
+    """
+    match = _HANDLER_MODULE.search(type(handler).__module__)
+    if not match:
+        return None
+    return match.group(1), f"step{match.group(2)}-{match.group(3)}"
+
+
+def _uses_base_analyze(handler: Any) -> bool:
+    from src.api.routes.substeps.base_handler import BaseSubstepHandler
+
+    for cls in type(handler).__mro__:
+        if "analyze" in vars(cls):
+            return cls is BaseSubstepHandler
+    return False
+
+
+class LayerFusion:
+    """
+    Runs fused per-layer analyses and hands each substep its part
+    运行层级融合分析并将各部分交给对应子步骤
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_tokens: int = 16384,
+        ttl_seconds: float = 900.0,
+        max_entries: int = 512,
+    ):
+        self.enabled = enabled
+        self.max_tokens = max_tokens
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._groups: Dict[str, Optional[_LayerGroup]] = {}
+        self._groups_lock = threading.Lock()
+        # (step, text hash) -> unclaimed result of a fused run
+        # （步骤，文本哈希）-> 融合运行中尚未领取的结果
+        self._results: "OrderedDict[Tuple[str, str], _FusedResult]" = OrderedDict()
+        # (layer, text hash) -> expiry; a layer is fused at most once per text
+        # （层，文本哈希）-> 过期时间；每个文本每层最多融合一次
+        self._runs: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.runs = 0
+        self.served = 0
+        self.missing = 0
+        self.failed = 0
+        self.over_budget = 0
+
+    # ------------------------------------------------------------------
+    # Layer groups
+    # 层分组
+    # ------------------------------------------------------------------
+
+    def group(self, layer: str) -> Optional[_LayerGroup]:
+        """
+        Fusable substeps of a layer (None when fewer than two)
+        某层的可融合子步骤（少于两个时为 None）
+        """
+        if layer not in self._groups:
+            with self._groups_lock:
+                if layer not in self._groups:
+                    self._groups[layer] = self._build_group(layer)
+        return self._groups[layer]
+
+    def _build_group(self, layer: str) -> Optional[_LayerGroup]:
+        handlers: Dict[str, Any] = {}
+        tasks: List[str] = []
+        for name in STEP_ORDER:
+            step_layer, step = name.split("-", 1)
+            if step_layer != layer:
+                continue
+            try:
+                module = importlib.import_module(f"src.api.routes.substeps.{layer}.{step.replace('-', '_')}")
+            except ImportError:
+                continue
+            handler = getattr(module, "handler", None)
+            if handler is None or not getattr(handler, "fused_analysis", False) or not _uses_base_analyze(handler):
+                continue
+            try:
+                template = handler.get_analysis_prompt()
+                extra = _template_fields(template) - _SHARED_FIELDS
+                if extra:
+                    logger.warning(f"[fusion] {step} needs route inputs {sorted(extra)}; not fused")
+                    continue
+                task = template.format(document_text=_SHARED_DOCUMENT, locked_terms=_SHARED_LOCKED_TERMS)
+            except (ValueError, IndexError) as e:
+                logger.warning(f"[fusion] {step} template cannot be fused: {e}")
+                continue
+            handlers[step] = handler
+            tasks.append(f"=== TASK {step} ===\n\n{task.strip()}")
+
+        if len(handlers) < 2:
+            return None
+        steps = list(handlers)
+        schema = "{" + ", ".join(f'"{step}": {{...}}' for step in steps) + "}"
+        system = "\n\n".join([
+            FUSED_ANALYSIS_HEADER.format(task_count=len(steps), task_ids=", ".join(steps)),
+            *tasks,
+            FUSED_ANALYSIS_FOOTER.format(schema=schema),
+        ])
+        # Every step is optional: a missing part falls back, an invalid one is re-asked alone
+        # 每个步骤都是可选的：缺失的部分回退，无效的部分单独重新询问
+        output_model = create_model(
+            f"Fused{layer.capitalize()}Output",
+            __config__=ConfigDict(extra="allow", populate_by_name=True),
+            **{
+                step.replace("-", "_"): (Optional[handlers[step].analysis_output], Field(None, alias=step))
+                for step in steps
+            },
+        )
+        logger.info(f"[fusion] {layer} fuses {steps}")
+        return _LayerGroup(layer=layer, steps=steps, handlers=handlers, system=system, output_model=output_model)
+
+    # ------------------------------------------------------------------
+    # Analysis
+    # 分析
+    # ------------------------------------------------------------------
+
+    async def analyze(self, handler: Any, document_text: str, locked_terms: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        The handler's part of its layer's fused analysis, or None to use the individual prompt
+        处理器在其层融合分析中的部分；返回 None 时使用单独提示词
+        """
+        located = step_of(handler)
+        if located is None:
+            return None
+        layer, step = located
+        group = self.group(layer)
+        if group is None or step not in group.steps:
+            return None
+
+        budgeter = get_token_budgeter()
+        document_text = budgeter.fit_text(document_text, get_settings().analysis_document_tokens)
+        digest = hashlib.sha256(
+            (document_text + "\x00" + "\x00".join(locked_terms)).encode("utf-8")
+        ).hexdigest()[:16]
+
+        result = self._take(step, digest)
+        if result is not None:
+            return result
+        if self._has_run(layer, digest):
+            # Repeat analysis of this step, or missing from the fused answer
+            # 该步骤的重复分析，或融合响应中缺失
+            return None
+
+        # Decide up front: an answer that cannot fit would be truncated for every step
+        # 预先决定：无法容纳的回答会让每个步骤都被截断
+        prompt = self._prompt(group, document_text, locked_terms)
+        document_tokens = budgeter.count(document_text)
+        expected = sum(
+            budgeter.expected_output(
+                member.get_analysis_prompt(), document_tokens, member.analysis_output_ratio
+            )
+            for member in group.handlers.values()
+        )
+        plan = budgeter.plan(prompt, expected, floor=4096, output_cap=self.max_tokens)
+        if not plan.fits:
+            self._mark_run(layer, digest)
+            self.over_budget += 1
+            FUSED_ANALYSIS.inc(1, layer, "over_budget")
+            logger.info(f"[fusion] {layer} not fused, answer over budget: {plan.to_dict()}")
+            return None
+
+        try:
+            await get_single_flight().do(
+                flight_key("fused-analysis", None, layer, digest),
+                lambda: self._run_layer(group, handler, prompt, plan.max_tokens, digest),
+                name=f"fused:{layer}",
+            )
+        except Exception as e:
+            self.failed += 1
+            FUSED_ANALYSIS.inc(1, layer, "failed")
+            logger.warning(f"[fusion] {layer} fused analysis failed, using individual prompt: {e}")
+            return None
+        return self._take(step, digest)
+
+    @staticmethod
+    def _prompt(group: _LayerGroup, document_text: str, locked_terms: List[str]) -> CachedPrompt:
+        locked_terms_str = "\n".join(f"- {term}" for term in locked_terms) if locked_terms else "None"
+        return CachedPrompt(
+            system=group.system,
+            user=FUSED_ANALYSIS_INPUT.format(document_text=document_text, locked_terms=locked_terms_str),
+        )
+
+    async def _run_layer(
+        self,
+        group: _LayerGroup,
+        handler: Any,
+        prompt: CachedPrompt,
+        max_tokens: int,
+        digest: str,
+    ) -> int:
+        """
+        One LLM call for the whole layer; stores each step's part
+        整层一次LLM调用；保存每个步骤的部分
+        """
+        self._mark_run(group.layer, digest)
+        self.runs += 1
+        FUSED_ANALYSIS.inc(1, group.layer, "run")
+
+        logger.info(f"Calling LLM for fused analysis (layer: {group.layer}, steps: {len(group.steps)}, max_tokens: {max_tokens})")
+        # Bill the call to the layer, not to whichever step happened to trigger it
+        # 将调用计入整层，而非恰好触发它的步骤
+        with usage_scope(step=f"fused:{group.layer}"):
+            combined = await handler._call_llm_json(
+                prompt, group.output_model, max_tokens=max_tokens, temperature=0.3, name=f"fused:{group.layer}"
+            )
+
+        stored = 0
+        expires_at = time.monotonic() + self.ttl_seconds
+        for step in group.steps:
+            part = combined.get(step)
+            if not isinstance(part, dict) or "risk_score" not in part:
+                self.missing += 1
+                FUSED_ANALYSIS.inc(1, group.layer, "missing")
+                continue
+            self._results[(step, digest)] = _FusedResult(result=part, expires_at=expires_at)
+            self._results.move_to_end((step, digest))
+            stored += 1
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        logger.info(f"[fusion] {group.layer}: {stored}/{len(group.steps)} steps answered")
+        return stored
+
+    def _take(self, step: str, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self._results.pop((step, digest), None)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        self.served += 1
+        FUSED_ANALYSIS.inc(1, step.split("-")[0], "served")
+        return entry.result
+
+    def _has_run(self, layer: str, digest: str) -> bool:
+        expires_at = self._runs.get((layer, digest))
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def _mark_run(self, layer: str, digest: str) -> None:
+        self._runs[(layer, digest)] = time.monotonic() + self.ttl_seconds
+        self._runs.move_to_end((layer, digest))
+        while len(self._runs) > self.max_entries:
+            self._runs.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Fusion counters for health/metrics endpoints
+        供健康/指标端点使用的融合计数
+        """
+        return {
+            "enabled": self.enabled,
+            "layers": {layer: group.steps for layer, group in self._groups.items() if group is not None},
+            "stored": len(self._results),
+            "runs": self.runs,
+            "served": self.served,
+            "missing": self.missing,
+            "failed": self.failed,
+            "over_budget": self.over_budget,
+        }
+
+
+_fusion: Optional[LayerFusion] = None
+_fusion_lock = threading.Lock()
+
+
+def get_layer_fusion() -> LayerFusion:
+    """
+    Get the process-wide layer fusion
+    获取进程级层级融合
+    """
+    global _fusion
+    if _fusion is None:
+        with _fusion_lock:
+            if _fusion is None:
+                settings = get_settings()
+                _fusion = LayerFusion(
+                    enabled=settings.fused_analysis_enabled,
+                    max_tokens=settings.fused_analysis_max_tokens,
+                    ttl_seconds=settings.fused_analysis_ttl_seconds,
+                )
+    return _fusion
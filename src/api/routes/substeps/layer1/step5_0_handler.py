@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step5_0Handler(BaseSubstepHandler):
     """Handler for Step 5.0: Lexical Context Preparation"""
 
+    # The route fills the prompt with parsed statistics / 路由会向提示词填入解析出的统计数据
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """Generate prompt for lexical context preparation
 
@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step4_0Handler(BaseSubstepHandler):
     """Handler for Step 4.0: Sentence Identification"""
 
+    # The route passes parsed_statistics and simple_ratio itself / 路由自行传入 parsed_statistics、simple_ratio
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """Generate prompt for sentence identification
 
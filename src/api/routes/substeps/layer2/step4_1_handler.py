@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step4_1Handler(BaseSubstepHandler):
     """Handler for Step 4.1: Sentence Pattern Detection"""
 
+    # The route passes parsed_statistics, simple_ratio and opener_repetition_rate itself / 路由自行传入 parsed_statistics、simple_ratio、opener_repetition_rate
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """Generate prompt for sentence pattern detection
 
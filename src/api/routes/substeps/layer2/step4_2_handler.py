@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step4_2Handler(BaseSubstepHandler):
     """Handler for Step 4.2: In-Paragraph Sentence Length Analysis"""
 
+    # The route passes parsed_statistics and overall_cv itself / 路由自行传入 parsed_statistics、overall_cv
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """Generate prompt for in-paragraph length analysis
 
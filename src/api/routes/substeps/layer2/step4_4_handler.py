@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step4_4Handler(BaseSubstepHandler):
     """Handler for Step 4.4: Connector Optimization"""
 
+    # The route passes parsed_statistics and connector_density itself / 路由自行传入 parsed_statistics、connector_density
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """Generate prompt for connector optimization analysis
 
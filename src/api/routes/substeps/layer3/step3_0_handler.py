@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step3_0Handler(BaseSubstepHandler):
     """Handler for Step 3.0: Paragraph Identification"""
 
+    # The route passes parsed_statistics itself / 路由自行传入 parsed_statistics
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Generate prompt for paragraph identification analysis
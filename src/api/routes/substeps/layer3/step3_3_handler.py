@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step3_3Handler(BaseSubstepHandler):
     """Handler for Step 3.3: Anchor Density Analysis"""
 
+    # The route passes parsed_statistics and overall_density itself / 路由自行传入 parsed_statistics、overall_density
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Generate prompt for anchor density analysis
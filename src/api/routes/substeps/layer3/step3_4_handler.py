@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step3_4Handler(BaseSubstepHandler):
     """Handler for Step 3.4: Sentence Length Distribution"""
 
+    # The route passes parsed_statistics and overall_cv itself / 路由自行传入 parsed_statistics、overall_cv
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Generate prompt for sentence length analysis
@@ -12,6 +12,9 @@ from src.api.routes.substeps.base_handler import BaseSubstepHandler
 class Step3_5Handler(BaseSubstepHandler):
     """Handler for Step 3.5: Paragraph Transition Analysis"""
 
+    # The route passes parsed_statistics and explicit_ratio itself / 路由自行传入 parsed_statistics、explicit_ratio
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Generate prompt for paragraph transition analysis
@@ -11,6 +11,7 @@ import json
 import logging
 from typing import Dict, Any, List, Optional
 from src.api.routes.substeps.base_handler import BaseSubstepHandler
+from src.prompts.prefix_cache import build_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -168,8 +169,9 @@ Return the reorganized document as JSON:
 
         # Get analysis prompt and fill in
         prompt_template = self.get_analysis_prompt()
-        prompt = prompt_template.format(
-            document_text=document_text[:10000],
+        prompt = build_prompt(
+            prompt_template,
+            document_text=self._fit_document(document_text),
             locked_terms=locked_terms_str,
             sections_data=sections_data
         )
@@ -177,10 +179,9 @@ Return the reorganized document as JSON:
         # Call LLM for order analysis (semantic analysis only)
         # 调用LLM进行顺序分析（仅语义分析）
         logger.info("Step 2.1: Analyzing section order with LLM")
-        response_text = await self._call_llm(prompt, max_tokens=4096, temperature=0.3)
-
-        # Parse result
-        result = self._parse_json_response(response_text)
+        result = await self._call_llm_json(
+            prompt, max_tokens=self._analysis_plan(prompt, prompt_template).max_tokens, temperature=0.3
+        )
 
         # Include detected sections in result for reference
         result["detected_sections"] = sections
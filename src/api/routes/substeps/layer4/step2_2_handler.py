@@ -11,6 +11,7 @@ import json
 import logging
 from typing import Dict, Any, List, Optional
 from src.api.routes.substeps.base_handler import BaseSubstepHandler
+from src.prompts.prefix_cache import build_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -268,8 +269,9 @@ Return the adjusted document as JSON:
 
         # Get analysis prompt and fill in
         prompt_template = self.get_analysis_prompt()
-        prompt = prompt_template.format(
-            document_text=document_text[:10000],
+        prompt = build_prompt(
+            prompt_template,
+            document_text=self._fit_document(document_text),
             locked_terms=locked_terms_str,
             sections_data=sections_data,
             parsed_statistics=parsed_statistics,
@@ -279,10 +281,9 @@ Return the adjusted document as JSON:
         # Call LLM for length analysis (semantic analysis only)
         # 调用LLM进行长度分析（仅语义分析）
         logger.info("Step 2.2: Analyzing section lengths with LLM")
-        response_text = await self._call_llm(prompt, max_tokens=4096, temperature=0.3)
-
-        # Parse result
-        result = self._parse_json_response(response_text)
+        result = await self._call_llm_json(
+            prompt, max_tokens=self._analysis_plan(prompt, prompt_template).max_tokens, temperature=0.3
+        )
 
         # IMPORTANT: Override LLM's CV with our rule-based calculation (more accurate)
         # 重要：使用规则计算的CV覆盖LLM返回的值（更准确）
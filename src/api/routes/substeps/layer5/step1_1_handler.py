@@ -22,6 +22,9 @@ class Step1_1Handler(BaseSubstepHandler):
     步骤1.1处理器：结构框架检测
     """
 
+    # The route passes parsed_statistics and cv itself / 路由自行传入 parsed_statistics、cv
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Analysis prompt for detecting structural AI patterns
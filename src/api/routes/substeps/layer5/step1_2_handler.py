@@ -19,6 +19,9 @@ class Step1_2Handler(BaseSubstepHandler):
     步骤1.2处理器：段落长度规律性
     """
 
+    # The route passes parsed_statistics and cv itself / 路由自行传入 parsed_statistics、cv
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Analysis prompt for detecting paragraph length uniformity
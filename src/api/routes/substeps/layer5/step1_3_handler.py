@@ -20,6 +20,9 @@ class Step1_3Handler(BaseSubstepHandler):
     步骤1.3处理器：推进模式与闭合
     """
 
+    # The route passes parsed_statistics itself / 路由自行传入 parsed_statistics
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Analysis prompt for detecting progression and closure patterns
@@ -22,6 +22,9 @@ class Step1_4Handler(BaseSubstepHandler):
     - Abrupt topic changes without natural flow
     """
 
+    # The route passes parsed_statistics itself / 路由自行传入 parsed_statistics
+    fused_analysis = False
+
     def get_analysis_prompt(self) -> str:
         """
         Analysis prompt for detecting connector and transition issues
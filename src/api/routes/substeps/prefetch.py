@@ -0,0 +1,669 @@
+"""
+Substep Prefetch - speculative analysis of the next substep
+子步骤预取 - 推测性地分析下一个子步骤
+
+The substep flow (layer5 step1-1 ... layer1 step5-5, see STEP_ORDER) is
+strictly sequential in the UI, and each step's LLM analysis used to start
+only when the user clicked into it. Once step N's analysis response has been
+sent, the prefetcher calls the endpoint the UI uses for step N+1
+(UI_ANALYZE_ENDPOINTS, mirroring frontend/src/services/analysisApi.ts) with the
+same text and session in the background. The step handler's result is saved
+in the SubstepState table as a "prefetch:<step>" row tagged with the hash of
+the working text the handler analyzed, so:
+
+- the real request for step N+1 (any worker) claims the prefetched result
+  when its working text hashes the same, or waits for the prefetch's result
+  if it is still running or being stored in the same worker;
+- a different text (the user edited it) never matches the stored hash.
+
+A step is not prefetched when the client's own request for it is already in
+flight or its handler cache holds a completed result, so prefetching never
+adds LLM calls to a flow (checked by `benchmarks.load --check-prefetch`).
+
+子步骤流程在界面中严格按顺序进行，过去每个步骤的LLM分析只在用户点击进入时才开始。
+步骤N的分析响应发送后，预取器在后台以相同的文本和会话调用界面用于步骤N+1的端点
+（UI_ANALYZE_ENDPOINTS，与 frontend/src/services/analysisApi.ts 保持一致）。步骤处理器的结果
+以 "prefetch:<步骤>" 行保存在 SubstepState 表中，并标记处理器所分析工作文本的哈希，因此：
+- 步骤N+1的真实请求（任意工作进程）在工作文本哈希一致时领取预取结果；若预取仍在同一工作进程中
+  运行或存储，则等待其结果；
+- 文本不同（用户已修改）永远不会与存储的哈希匹配。
+若客户端对该步骤的请求已在进行中，或其处理器缓存已有完成的结果，则不预取该步骤，因此预取
+不会为流程增加LLM调用（由 `benchmarks.load --check-prefetch` 检查）。
+
+Prefetches are low priority: they start after the response is sent, only for
+requests with a session, at most SUBSTEP_PREFETCH_CONCURRENCY run per worker
+(extra ones are dropped, not queued), and save_modified_text() cancels a
+session's running prefetches. Prefetched rows are one-shot and expire after
+SUBSTEP_PREFETCH_TTL_SECONDS. Prefetch runs do not write the handler's own
+step cache, so a prefetched result never outlives a text edit.
+预取为低优先级：在响应发送后开始，仅针对带会话的请求，每个工作进程最多同时运行
+SUBSTEP_PREFETCH_CONCURRENCY 个（多余的直接丢弃而非排队），save_modified_text() 会取消会话
+正在运行的预取。预取行仅使用一次，并在 SUBSTEP_PREFETCH_TTL_SECONDS 后过期。预取运行不会写入
+处理器自身的步骤缓存，因此预取结果不会在文本修改后继续生效。
+"""
+
+import asyncio
+import contextvars
+import copy
+import functools
+import hashlib
+import importlib
+import inspect
+import logging
+import re
+import threading
+import typing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import BackgroundTasks, Request
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+
+from src.config import get_settings
+from src.db.database import AsyncSessionLocal
+from src.db.models import SubstepState
+from src.services.document_service import STEP_ORDER, get_step_index
+from src.services.single_flight import coalesced, get_single_flight
+from src.services.tracing import SUBSTEP_PREFETCH
+
+logger = logging.getLogger(__name__)
+
+# Endpoint the UI calls to analyze each step (frontend/src/services/analysisApi.ts).
+# Layer 2 steps 4-2 ... 4-5 run per paragraph in the sentence console and are not prefetched.
+# 界面分析每个步骤时调用的端点（frontend/src/services/analysisApi.ts）。
+# 第2层步骤 4-2 ... 4-5 在句子控制台中按段落运行，不进行预取。
+UI_ANALYZE_ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "layer5-step1-1": ("src.api.routes.analysis.document", "analyze_document_structure"),  # /analysis/document/structure
+    "layer5-step1-2": ("src.api.routes.analysis.document", "analyze_paragraph_length"),  # /analysis/document/paragraph-length
+    "layer5-step1-3": ("src.api.routes.analysis.document", "analyze_progression_closure"),  # /analysis/document/progression-closure
+    "layer5-step1-4": ("src.api.routes.analysis.document", "analyze_connectors"),  # /analysis/document/connectors
+    "layer5-step1-5": ("src.api.routes.analysis.document", "analyze_content_substantiality"),  # /analysis/document/content-substantiality
+    "layer4-step2-0": ("src.api.routes.analysis.section", "identify_sections"),  # /analysis/section/step2-0/identify
+    "layer4-step2-1": ("src.api.routes.analysis.section", "analyze_section_order"),  # /analysis/section/step2-1/order
+    "layer4-step2-2": ("src.api.routes.analysis.section", "analyze_section_length"),  # /analysis/section/step2-2/length
+    "layer4-step2-3": ("src.api.routes.analysis.section", "analyze_internal_structure_similarity"),  # /analysis/section/step2-3/similarity
+    "layer4-step2-4": ("src.api.routes.analysis.section", "analyze_section_transition"),  # /analysis/section/step2-4/transition
+    "layer4-step2-5": ("src.api.routes.analysis.section", "analyze_inter_section_logic"),  # /analysis/section/step2-5/logic
+    "layer3-step3-0": ("src.api.routes.analysis.paragraph", "identify_paragraphs"),  # /analysis/paragraph/step3-0/identify
+    "layer3-step3-1": ("src.api.routes.analysis.paragraph", "analyze_paragraph_roles"),  # /analysis/paragraph/role
+    "layer3-step3-2": ("src.api.routes.analysis.paragraph", "analyze_paragraph_coherence"),  # /analysis/paragraph/coherence
+    "layer3-step3-3": ("src.api.routes.analysis.paragraph", "analyze_anchor_density"),  # /analysis/paragraph/anchor
+    "layer3-step3-4": ("src.api.routes.analysis.paragraph", "analyze_sentence_length_distribution"),  # /analysis/paragraph/sentence-length
+    "layer3-step3-5": ("src.api.routes.analysis.paragraph", "analyze_paragraph_transitions"),  # /analysis/paragraph/step3-5/transition
+    "layer2-step4-0": ("src.api.routes.analysis.sentence", "identify_sentences"),  # /analysis/sentence/step4-0/identify
+    "layer2-step4-1": ("src.api.routes.analysis.sentence", "analyze_patterns"),  # /analysis/sentence/step4-1/pattern
+    "layer1-step5-0": ("src.api.routes.substeps.layer1.step5_0", "prepare_lexical_context"),  # /layer1/step5-0/prepare
+    "layer1-step5-1": ("src.api.routes.substeps.layer1.step5_1", "detect_fingerprints"),  # /layer1/step5-1/analyze
+    "layer1-step5-2": ("src.api.routes.substeps.layer1.step5_2", "analyze_human_features"),  # /layer1/step5-2/analyze
+    "layer1-step5-3": ("src.api.routes.substeps.layer1.step5_3", "generate_replacements"),  # /layer1/step5-3/analyze
+    "layer1-step5-4": ("src.api.routes.substeps.layer1.step5_4", "rewrite_paragraphs"),  # /layer1/step5-4/analyze
+    "layer1-step5-5": ("src.api.routes.substeps.layer1.step5_5", "validate_rewrite"),  # /layer1/step5-5/validate
+}
+
+# SubstepState rows holding prefetched results: "prefetch:layer3-step3-1"
+# 保存预取结果的 SubstepState 行："prefetch:layer3-step3-1"
+PREFETCH_ROW_PREFIX = "prefetch:"
+PREFETCHED_STATUS = "prefetched"
+
+# "src.api.routes.substeps.layer3.step3_1_handler" -> layer3-step3-1
+_HANDLER_MODULE = re.compile(r"\.(layer\d)\.step(\d)_(\d)_handler$")
+
+# Status of a handler's own step-cache row ("step3-1"), see BaseSubstepHandler._save_to_cache
+# 处理器自身步骤缓存行（"step3-1"）的状态，见 BaseSubstepHandler._save_to_cache
+COMPLETED_STATUS = "completed"
+
+# Result of a prefetch run that ended without one (cancelled or failed)
+# 预取运行未产生结果即结束（被取消或失败）
+_ABORTED = object()
+
+# Request fields a prefetch copies from the triggering request
+# 预取从触发请求中复制的请求字段
+_PAYLOAD_FIELDS = ("text", "session_id", "locked_terms")
+
+
+@dataclass
+class PrefetchJob:
+    """
+    One speculative run of a step's analysis endpoint
+    步骤分析端点的一次推测性运行
+    """
+    step: str
+    session_id: str
+    text_hash: str  # Hash of the request payload, used to supersede older texts
+    task: Optional[asyncio.Task] = None
+    keys: Set[str] = field(default_factory=set)  # Handler flight keys computed by this job
+    # Flight key -> result future, resolved before the result is stored
+    # 合并键 -> 结果 future，在存储结果之前完成
+    results: Dict[str, asyncio.Future] = field(default_factory=dict)
+    taken: Set[str] = field(default_factory=set)  # Flight keys whose result a real call took
+
+
+@dataclass
+class _StepCall:
+    """
+    The UI step a real request analyzes
+    真实请求所分析的界面步骤
+    """
+    step: str
+    session_id: Optional[str]
+
+
+# Set inside a prefetch task so handler calls know to store their result
+# 在预取任务内设置，使处理器调用知道需要存储结果
+_current_job: contextvars.ContextVar[Optional[PrefetchJob]] = contextvars.ContextVar(
+    "substep_prefetch_job", default=None
+)
+
+# Set by the router dependency so a real handler call can claim a prefetched result
+# 由路由依赖设置，使真实的处理器调用可以领取预取结果
+_current_call: contextvars.ContextVar[Optional[_StepCall]] = contextvars.ContextVar(
+    "substep_prefetch_call", default=None
+)
+
+
+def text_hash(text: str) -> str:
+    """
+    Short hash tagging a prefetch with the text it analyzed
+    标记预取所分析文本的短哈希
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def working_text_hash(document_text: str, locked_terms: Optional[List[str]] = None) -> str:
+    """
+    Hash of the inputs a step handler analyzes
+    步骤处理器所分析输入的哈希
+    """
+    return text_hash(document_text + "\x00" + "\x00".join(locked_terms or []))
+
+
+def handler_step(handler: Any) -> Optional[str]:
+    """
+    STEP_ORDER name of a substep handler, from its module
+    根据模块得出子步骤处理器在 STEP_ORDER 中的名称
+    """
+    match = _HANDLER_MODULE.search(type(handler).__module__)
+    if not match:
+        return None
+    return f"{match.group(1)}-step{match.group(2)}-{match.group(3)}"
+
+
+def in_prefetch() -> bool:
+    """
+    True inside a prefetch run
+    在预取运行内时为 True
+    """
+    return _current_job.get() is not None
+
+
+class SubstepPrefetcher:
+    """
+    Schedules next-step prefetches and serves their results
+    调度下一步骤的预取并提供其结果
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        concurrency: int = 2,
+        ttl_seconds: float = 900.0,
+    ):
+        self.enabled = enabled
+        self.concurrency = max(1, concurrency)
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, PrefetchJob] = {}
+        self._running_keys: Dict[str, PrefetchJob] = {}
+        # flight key -> number of real (non-prefetch) callers currently waiting on it
+        # 合并键 -> 当前等待该键的真实（非预取）调用方数量
+        self._claims: Dict[str, int] = {}
+        # (session_id, step) -> real requests for that step currently in flight
+        # （会话，步骤）-> 当前进行中的该步骤真实请求数量
+        self._live_steps: Dict[Tuple[str, str], int] = {}
+        self._endpoints: Dict[str, Optional[Tuple[Callable[..., Awaitable[Any]], type]]] = {}
+        self._steps_by_endpoint: Optional[Dict[Callable[..., Awaitable[Any]], str]] = None
+        self.scheduled = 0
+        self.skipped = 0
+        self.busy = 0
+        self.stored = 0
+        self.discarded = 0
+        self.hits = 0
+        self.joined = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------
+    # Handler side: serve or store results
+    # 处理器侧：提供或存储结果
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        step: Optional[str],
+        key: str,
+        digest: str,
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Run a handler analysis, claiming or storing a prefetched result
+        运行处理器分析，领取或存储预取结果
+
+        step is the handler's STEP_ORDER name, key its flight key and digest
+        the hash of the working text it analyzes.
+        step 为处理器在 STEP_ORDER 中的名称，key 为其合并键，digest 为其所分析工作文本的哈希。
+        """
+        job = _current_job.get()
+        if job is None:
+            self._claims[key] = self._claims.get(key, 0) + 1
+            try:
+                # A prefetch of this exact call is running (or storing): take its result.
+                # Checked before the store, which may not have committed yet.
+                # 此调用的预取正在运行（或存储）：直接使用其结果。先于存储检查，因为存储可能尚未提交。
+                running = self._running_keys.get(key)
+                if running is not None:
+                    result = await asyncio.shield(running.results[key])
+                    if result is not _ABORTED:
+                        running.taken.add(key)
+                        self.joined += 1
+                        SUBSTEP_PREFETCH.inc(1, running.step, "joined")
+                        return copy.deepcopy(result)
+                call = _current_call.get()
+                if call is not None and call.session_id and call.step == step:
+                    result = await self._claim(call.session_id, step, digest)
+                    if result is not None:
+                        self.hits += 1
+                        SUBSTEP_PREFETCH.inc(1, step, "hit")
+                        logger.debug(f"[prefetch] {step} served from prefetch")
+                        return result
+                return await fn()
+            finally:
+                remaining = self._claims.pop(key) - 1
+                if remaining:
+                    self._claims[key] = remaining
+
+        # Other handlers a prefetched route calls along the way are not the step's result
+        # 预取路由顺带调用的其他处理器不是该步骤的结果
+        if step != job.step:
+            return await fn()
+        job.keys.add(key)
+        future = asyncio.get_running_loop().create_future()
+        job.results[key] = future
+        # Stays registered until the result is stored, so a real call arriving
+        # in between waits for it instead of running the analysis again
+        # 在结果存储完成前保持注册，使期间到达的真实调用等待它而非再次运行分析
+        self._running_keys[key] = job
+        try:
+            result = await fn()
+            future.set_result(copy.deepcopy(result))
+            # A real caller that joined already has the result; store it only if nobody did
+            # 已加入的真实调用方已拿到结果；仅在无人加入时存储
+            if not self._claims.get(key):
+                await self._store(job.session_id, step, digest, result)
+                # A real call took the result while it was being stored: nobody will claim the row
+                # 存储期间真实调用已取走结果：该行不会再被领取
+                if key in job.taken:
+                    await self._discard(job.session_id, step)
+            return result
+        finally:
+            if not future.done():
+                future.set_result(_ABORTED)
+            if self._running_keys.get(key) is job:
+                del self._running_keys[key]
+
+    async def _store(self, session_id: str, step: str, digest: str, result: Any) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                existing = await db.execute(
+                    select(SubstepState).where(
+                        SubstepState.session_id == session_id,
+                        SubstepState.step_name == PREFETCH_ROW_PREFIX + step
+                    )
+                )
+                state = existing.scalar_one_or_none()
+                if state is None:
+                    state = SubstepState(session_id=session_id, step_name=PREFETCH_ROW_PREFIX + step)
+                    db.add(state)
+                state.analysis_result = result
+                state.text_hash = digest
+                state.status = PREFETCHED_STATUS
+                state.updated_at = datetime.utcnow()
+                await db.commit()
+            self.stored += 1
+            SUBSTEP_PREFETCH.inc(1, step, "stored")
+        except Exception as e:
+            self.failed += 1
+            SUBSTEP_PREFETCH.inc(1, step, "failed")
+            logger.info(f"[prefetch] {step} result not stored: {e}")
+
+    async def _discard(self, session_id: str, step: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(SubstepState).where(
+                        SubstepState.session_id == session_id,
+                        SubstepState.step_name == PREFETCH_ROW_PREFIX + step
+                    )
+                )
+                await db.commit()
+            self.discarded += 1
+            SUBSTEP_PREFETCH.inc(1, step, "discarded")
+        except Exception as e:
+            logger.info(f"[prefetch] {step} taken result not discarded: {e}")
+
+    async def _claim(self, session_id: str, step: str, digest: str) -> Optional[Any]:
+        """
+        Take a session's prefetched result for step if it was computed on the same text
+        若会话的预取结果基于相同文本计算，则领取该步骤的结果
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                found = await db.execute(
+                    select(SubstepState).where(
+                        SubstepState.session_id == session_id,
+                        SubstepState.step_name == PREFETCH_ROW_PREFIX + step,
+                        SubstepState.status == PREFETCHED_STATUS,
+                        SubstepState.text_hash == digest
+                    )
+                )
+                state = found.scalar_one_or_none()
+                if state is None:
+                    return None
+                # One-shot: a repeat analysis of the same text runs fresh
+                # 仅使用一次：对相同文本的重复分析会重新运行
+                await db.execute(delete(SubstepState).where(SubstepState.id == state.id))
+                await db.commit()
+                cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+                if state.updated_at is None or state.updated_at < cutoff:
+                    return None
+                return state.analysis_result
+        except Exception as e:
+            logger.warning(f"[prefetch] {step} prefetch lookup failed: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Scheduling and invalidation
+    # 调度与失效
+    # ------------------------------------------------------------------
+
+    def endpoint_for(self, step: str) -> Optional[Tuple[Callable[..., Awaitable[Any]], type]]:
+        """
+        (endpoint, request model) the UI uses for step, if it takes only the request body
+        界面用于该步骤的（端点，请求模型），仅当其只接收请求体时
+        """
+        if step not in self._endpoints:
+            target = None
+            if step in UI_ANALYZE_ENDPOINTS:
+                module_name, name = UI_ANALYZE_ENDPOINTS[step]
+                try:
+                    endpoint = getattr(importlib.import_module(module_name), name)
+                except (ImportError, AttributeError) as e:
+                    logger.warning(f"[prefetch] {step} endpoint {module_name}.{name} not found: {e}")
+                else:
+                    if list(inspect.signature(endpoint).parameters) == ["request"]:
+                        model = typing.get_type_hints(endpoint).get("request")
+                        if isinstance(model, type) and issubclass(model, BaseModel):
+                            target = (endpoint, model)
+            self._endpoints[step] = target
+        return self._endpoints[step]
+
+    def step_of(self, endpoint: Any) -> Optional[str]:
+        """
+        UI step an endpoint analyzes, if any
+        端点所分析的界面步骤（如有）
+        """
+        if self._steps_by_endpoint is None:
+            self._steps_by_endpoint = {}
+            for step in UI_ANALYZE_ENDPOINTS:
+                target = self.endpoint_for(step)
+                if target is not None:
+                    self._steps_by_endpoint[target[0]] = step
+        return self._steps_by_endpoint.get(endpoint)
+
+    async def schedule(
+        self,
+        step: str,
+        endpoint: Callable[..., Awaitable[Any]],
+        request_model: type,
+        payload: Dict[str, Any],
+    ) -> None:
+        """
+        Start a prefetch of step's analysis for payload (text, session_id, locked_terms)
+        为 payload 启动步骤分析的预取
+
+        Async only so BackgroundTasks runs it on the event loop, not in a thread.
+        声明为异步仅为让 BackgroundTasks 在事件循环上而非线程中运行它。
+        """
+        session_id = payload["session_id"]
+        digest = working_text_hash(payload["text"], payload.get("locked_terms"))
+        job_id = f"{step}:{session_id}:{digest}"
+        if job_id in self._jobs:
+            return
+        # A newer text for the session supersedes its older prefetches
+        # 会话的新文本会取代其旧的预取
+        self.invalidate_session(session_id, keep_hash=digest)
+        # The client already asked for the step, or its cached result would answer it
+        # 客户端已请求该步骤，或其缓存结果即可应答
+        if self._live_steps.get((session_id, step)) or await self._completed(session_id, step):
+            self.skipped += 1
+            SUBSTEP_PREFETCH.inc(1, step, "skipped")
+            return
+        if len(self._jobs) >= self.concurrency:
+            self.busy += 1
+            SUBSTEP_PREFETCH.inc(1, step, "busy")
+            return
+        try:
+            request = request_model(**{k: v for k, v in payload.items() if k in request_model.model_fields})
+        except ValueError as e:
+            logger.debug(f"[prefetch] {step} request not buildable: {e}")
+            return
+
+        job = PrefetchJob(step=step, session_id=session_id, text_hash=digest)
+        # Fresh context: the prefetch must not record into the finished request's trace
+        # 全新上下文：预取不应记录到已结束请求的追踪中
+        job.task = asyncio.get_running_loop().create_task(
+            self._run_job(job, endpoint, request), context=contextvars.Context()
+        )
+        self._jobs[job_id] = job
+        job.task.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+        self.scheduled += 1
+        SUBSTEP_PREFETCH.inc(1, step, "scheduled")
+        logger.debug(f"[prefetch] {step} scheduled for session {session_id}")
+
+    async def _completed(self, session_id: str, step: str) -> bool:
+        """
+        True if the step's handler cache already holds a completed analysis
+        若该步骤的处理器缓存已有完成的分析则为 True
+
+        Handlers cache under the short step name: "layer3-step3-1" -> "step3-1".
+        处理器以短步骤名缓存："layer3-step3-1" -> "step3-1"。
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                found = await db.execute(
+                    select(SubstepState.id).where(
+                        SubstepState.session_id == session_id,
+                        SubstepState.step_name == step.split("-", 1)[1],
+                        SubstepState.status == COMPLETED_STATUS
+                    ).limit(1)
+                )
+                return found.first() is not None
+        except Exception as e:
+            logger.debug(f"[prefetch] {step} cache check failed: {e}")
+            return False
+
+    def _enter_step(self, session_id: str, step: str) -> None:
+        key = (session_id, step)
+        self._live_steps[key] = self._live_steps.get(key, 0) + 1
+
+    def _leave_step(self, session_id: str, step: str) -> None:
+        key = (session_id, step)
+        remaining = self._live_steps.pop(key, 1) - 1
+        if remaining:
+            self._live_steps[key] = remaining
+
+    async def _run_job(self, job: PrefetchJob, endpoint: Callable[..., Awaitable[Any]], request: BaseModel) -> None:
+        _current_job.set(job)
+        try:
+            await endpoint(request)
+            SUBSTEP_PREFETCH.inc(1, job.step, "completed")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            SUBSTEP_PREFETCH.inc(1, job.step, "cancelled")
+        except Exception as e:
+            self.failed += 1
+            SUBSTEP_PREFETCH.inc(1, job.step, "failed")
+            logger.info(f"[prefetch] {job.step} failed: {e}")
+
+    def _cancel(self, job: PrefetchJob) -> None:
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        # Stop the shared LLM run too, unless a real request is waiting on it
+        # 同时停止共享的LLM运行，除非有真实请求正在等待
+        flight = get_single_flight()
+        for key in job.keys:
+            if not self._claims.get(key):
+                flight.cancel(key)
+
+    def invalidate_session(self, session_id: Optional[str], keep_hash: Optional[str] = None) -> None:
+        """
+        Cancel a session's running prefetches (text changed)
+        取消会话正在运行的预取（文本已改变）
+
+        Stored results need no cleanup: they are tagged with their text hash,
+        so a changed text never claims them, and the step's next prefetch
+        overwrites its row.
+        已存储的结果无需清理：它们带有文本哈希标记，修改后的文本永远不会领取它们，
+        且该步骤的下一次预取会覆盖其行。
+        """
+        if not session_id:
+            return
+        for job in list(self._jobs.values()):
+            if job.session_id == session_id and job.text_hash != keep_hash:
+                self._cancel(job)
+
+    def stats(self) -> dict:
+        """
+        Prefetch counters for health/metrics endpoints
+        供健康/指标端点使用的预取计数
+        """
+        return {
+            "enabled": self.enabled,
+            "running": len(self._jobs),
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "busy": self.busy,
+            "stored": self.stored,
+            "discarded": self.discarded,
+            "hits": self.hits,
+            "joined": self.joined,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+_prefetcher: Optional[SubstepPrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_substep_prefetcher() -> SubstepPrefetcher:
+    """
+    Get the process-wide substep prefetcher
+    获取进程级子步骤预取器
+    """
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                settings = get_settings()
+                _prefetcher = SubstepPrefetcher(
+                    enabled=settings.substep_prefetch_enabled,
+                    concurrency=settings.substep_prefetch_concurrency,
+                    ttl_seconds=settings.substep_prefetch_ttl_seconds,
+                )
+    return _prefetcher
+
+
+def prefetchable(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Coalesce an analyze method and route it through the prefetch store
+    合并 analyze 方法并使其经过预取存储
+    """
+    flight_func = coalesced(func)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        prefetcher = get_substep_prefetcher()
+        if not prefetcher.enabled:
+            return await flight_func(*args, **kwargs)
+        key, _ = flight_func.key_for(*args, **kwargs)
+        arguments = signature.bind(*args, **kwargs).arguments
+        digest = working_text_hash(arguments.get("document_text") or "", arguments.get("locked_terms"))
+        return await prefetcher.run(
+            handler_step(args[0]), key, digest, lambda: flight_func(*args, **kwargs)
+        )
+
+    return wrapper
+
+
+async def _step_request(request: Request) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    (UI step, JSON body) of an analysis request, if it is one
+    分析请求的（界面步骤，JSON请求体），如果是的话
+    """
+    prefetcher = get_substep_prefetcher()
+    if not prefetcher.enabled or request.method != "POST":
+        return None
+    step = prefetcher.step_of(request.scope.get("endpoint"))
+    if step is None:
+        return None
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    if not isinstance(body, dict) or not isinstance(body.get("text"), str):
+        return None
+    return step, body
+
+
+async def schedule_substep_prefetch(request: Request, background_tasks: BackgroundTasks) -> AsyncIterator[None]:
+    """
+    Router dependency: after a UI step's analysis succeeds, prefetch the next step
+    路由依赖：界面步骤的分析成功后，预取下一步骤
+
+    Also marks the request with its step, so the step handler can claim a
+    result prefetched for it, and keeps the step marked as in flight for the
+    session until the endpoint returns, so it is not prefetched meanwhile.
+    Background tasks run only once the response has been sent, and not at
+    all when the endpoint raised, so failed analyses do not trigger prefetches.
+    同时为请求标记其步骤，使步骤处理器可以领取为其预取的结果，并在端点返回前将该步骤标记为
+    会话进行中，期间不会预取它。后台任务仅在响应发送后运行，端点抛出异常时不会运行，
+    因此失败的分析不会触发预取。
+    """
+    found = await _step_request(request)
+    if found is None:
+        yield
+        return
+    step, body = found
+    session_id = body.get("session_id")
+    _current_call.set(_StepCall(step=step, session_id=session_id))
+
+    # Results are stored per session; anonymous analyses are not prefetched
+    # 结果按会话存储；不带会话的分析不进行预取
+    if not session_id:
+        yield
+        return
+    prefetcher = get_substep_prefetcher()
+    index = get_step_index(step)
+    if index + 1 < len(STEP_ORDER):
+        next_step = STEP_ORDER[index + 1]
+        target = prefetcher.endpoint_for(next_step)
+        if target is not None:
+            payload = {k: body[k] for k in _PAYLOAD_FIELDS if k in body}
+            background_tasks.add_task(prefetcher.schedule, next_step, *target, payload)
+    prefetcher._enter_step(session_id, step)
+    try:
+        yield
+    finally:
+        prefetcher._leave_step(session_id, step)
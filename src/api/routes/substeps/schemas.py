@@ -3,7 +3,7 @@ Substep Shared Schemas
 Substep共享模式定义
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
@@ -509,3 +509,71 @@ class ValidationResponse(SubstepBaseResponse):
     locked_terms_check: bool = Field(True)
     semantic_similarity: float = Field(0)
     validation_passed: bool = Field(True)
+
+
+# =============================================================================
+# LLM Output Schemas
+# LLM输出模式
+# =============================================================================
+# What the substep prompts ask the LLM to return. They are sent as the
+# response_format JSON schema and validated by src.services.structured_output;
+# step-specific keys pass through unchanged (extra="allow").
+# 子步骤提示词要求LLM返回的结构。作为 response_format JSON Schema 发送，并由
+# src.services.structured_output 校验；步骤特有的键原样保留（extra="allow"）。
+
+class SubstepAnalysisOutput(BaseModel):
+    """LLM answer of a substep analysis prompt"""
+    model_config = ConfigDict(extra="allow")
+
+    risk_score: int = Field(..., ge=0, le=100, description="Risk score 0-100")
+    risk_level: RiskLevel = Field(..., description="low | medium | high")
+    issues: List[Dict[str, Any]] = Field(default_factory=list, description="Detected issues")
+    recommendations: List[str] = Field(default_factory=list, description="Recommendations (English)")
+    recommendations_zh: List[str] = Field(default_factory=list, description="Recommendations (Chinese)")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _derive_risk_level(cls, data: Any) -> Any:
+        # A missing level is derived from the score instead of re-asking the LLM
+        # 缺少等级时按分数推导，而不是重新询问LLM
+        if isinstance(data, dict) and not data.get("risk_level") and isinstance(data.get("risk_score"), (int, float)):
+            score = data["risk_score"]
+            data = {**data, "risk_level": "high" if score >= 60 else "medium" if score >= 30 else "low"}
+        return data
+
+    @field_validator("risk_score", mode="before")
+    @classmethod
+    def _round_score(cls, value: Any) -> Any:
+        return round(value) if isinstance(value, float) else value
+
+    @field_validator("risk_level", mode="before")
+    @classmethod
+    def _normalize_level(cls, value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+
+
+class RewriteOutput(BaseModel):
+    """LLM answer of a substep rewrite prompt"""
+    model_config = ConfigDict(extra="allow")
+
+    modified_text: str = Field(..., description="Full rewritten text")
+    changes_summary_zh: Optional[str] = Field(None, description="Summary of changes (Chinese)")
+    changes_count: Optional[int] = Field(None, description="Number of changes")
+    issues_addressed: Optional[List[str]] = Field(None, description="Issue types addressed")
+
+
+class SectionStructureEntry(BaseModel):
+    """One section in the LLM's section structure answer"""
+    model_config = ConfigDict(extra="allow")
+
+    role: str = Field(..., description="Section role, e.g. introduction")
+    title: str = Field("", description="Section title as written")
+    start_line: int = Field(..., ge=0, description="Line where the section starts")
+
+
+class SectionStructureOutput(BaseModel):
+    """LLM answer of the section structure prompt"""
+    model_config = ConfigDict(extra="allow")
+
+    document_title: str = Field("", description="Document title")
+    sections: List[SectionStructureEntry] = Field(default_factory=list, description="Top-level sections")
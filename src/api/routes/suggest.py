@@ -3,7 +3,9 @@ Suggestion generation API routes
 建议生成API路由
 """
 
+import asyncio
 import logging
+import time
 from fastapi import APIRouter, HTTPException, Depends
 
 logger = logging.getLogger(__name__)
@@ -50,29 +52,51 @@ class HintsRequest(BaseModel):
     获取写作提示的请求体
     """
     sentence: str
-from src.core.suggester.llm_track import LLMTrack
+from src.core.suggester.llm_track import BatchSuggestionItem, LLMTrack
+from src.core.suggester.hint_batcher import get_suggestion_batcher
 from src.core.suggester.rule_track import RuleTrack
+from src.core.suggester.cascade import SuggestionCascade, TierDecision
 from src.core.validator.semantic import SemanticValidator
 from src.core.validator.quality_gate import QualityGate
-from src.core.analyzer.scorer import RiskScorer
+from src.core.component_registry import get_quality_gate, get_risk_scorer
+from src.prompts.prefix_cache import gemini_usage, record_response_usage, record_usage
+from src.services.single_flight import flight_key, get_single_flight
 
 router = APIRouter()
 
-# Global scorer instance for reuse
-# 全局评分器实例以便重用
-_scorer = RiskScorer()
+# Shared scorer instance (process-wide, see component_registry)
+# 共享评分器实例（进程级，见 component_registry）
+_scorer = get_risk_scorer()
 
 
 @router.post("/", response_model=SuggestResponse)
 async def get_suggestions(
     request: SuggestRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    quality_gate: QualityGate = Depends(get_quality_gate)
 ):
     """
     Get humanization suggestions for a sentence
     获取句子的人源化建议
 
     CAASS v2.0 Phase 2: Uses whitelist and context_baseline for accurate scoring
+
+    Identical concurrent requests (double effects, double clicks) share one run.
+    相同的并发请求（双重 effect、双击）共享一次运行。
+    """
+    return await get_single_flight().do(
+        flight_key("suggest", request.session_id, None, request.model_dump(mode="json")),
+        lambda: _generate_suggestions(request, quality_gate),
+        name="suggest",
+        encode=lambda response: response.model_dump(mode="json"),
+        decode=SuggestResponse.model_validate,
+    )
+
+
+async def _generate_suggestions(request: SuggestRequest, quality_gate: QualityGate) -> SuggestResponse:
+    """
+    Rule tier, LLM escalation and translation for one sentence
+    单个句子的规则层、LLM升级和翻译
     """
     # Initialize suggestion tracks with session_id for Step 1.0 locked terms
     # 初始化建议轨道，使用session_id获取步骤1.0的锁定术语
@@ -95,102 +119,199 @@ async def get_suggestions(
     # Use user's colloquialism_level for consistent scoring across all steps
     # 使用用户的口语化级别以确保所有步骤的评分一致
     tone_level = request.colloquialism_level
-    original_analysis = _scorer.analyze(
+    original_analysis = await asyncio.to_thread(
+        _scorer.analyze,
         request.sentence,
         tone_level=tone_level,
         whitelist=whitelist_set,
-        context_baseline=context_baseline
+        context_baseline=context_baseline,
+        profile="score_only"
     )
     original_risk = original_analysis.risk_score
 
-    # Generate LLM suggestion (Track A)
-    # 生成LLM建议（轨道A）
-    llm_suggestion = None
-    quality_gate = QualityGate()
-    try:
-        llm_result = await llm_track.generate_suggestion(
-            sentence=request.sentence,
-            issues=request.issues,
-            locked_terms=request.locked_terms,
-            target_lang=request.target_lang,
-            is_paraphrase=request.is_paraphrase
-        )
-        if llm_result:
-            # DEAI Engine 2.0: Verify suggestion doesn't contain P0 words or first-person pronouns
-            # DEAI Engine 2.0: 验证建议不包含P0词或第一人称代词
-            validation = quality_gate.verify_suggestion(
-                original=request.sentence,
-                suggestion=llm_result.rewritten,
-                colloquialism_level=request.colloquialism_level
-            )
-
-            if not validation.passed:
-                # Log validation failure but still use the suggestion (with warning)
-                # 记录验证失败但仍使用建议（带警告）
-                logger.warning(
-                    f"[LLM Validation] {validation.action}: {validation.message}"
-                )
-                # Add validation warning to explanation
-                # 将验证警告添加到解释中
-                warning_note = f" [Warning: {validation.message}]"
-                llm_result.explanation = (llm_result.explanation or "") + warning_note
-                llm_result.explanation_zh = (llm_result.explanation_zh or "") + f" [警告: {validation.message_zh}]"
-
-            # Calculate actual risk score for rewritten text (CAASS v2.0 Phase 2)
-            # 为改写文本计算实际风险分数（CAASS v2.0 第二阶段）
-            llm_analysis = _scorer.analyze(
-                llm_result.rewritten,
-                tone_level=tone_level,
-                whitelist=whitelist_set,
-                context_baseline=context_baseline
-            )
-            actual_risk = llm_analysis.risk_score
-
-            llm_suggestion = Suggestion(
-                source=SuggestionSource.LLM,
-                rewritten=llm_result.rewritten,
-                changes=[
-                    ChangeDetail(
-                        original=c.original,
-                        replacement=c.replacement,
-                        reason=c.reason,
-                        reason_zh=c.reason_zh
-                    ) for c in llm_result.changes
-                ],
-                predicted_risk=actual_risk,  # Use actual calculated risk
-                semantic_similarity=llm_result.semantic_similarity,
-                explanation=llm_result.explanation,
-                explanation_zh=llm_result.explanation_zh
-            )
-    except Exception as e:
-        # Log error but continue with rule-based suggestion
-        # 记录错误但继续使用规则建议
-        print(f"LLM track error: {e}")
-
-    # Generate rule-based suggestion (Track B)
-    # 生成规则建议（轨道B）
-    rule_result = rule_track.generate_suggestion(
-        sentence=request.sentence,
+    # Rule tier first (Track B); the LLM is only called when the rule rewrite
+    # misses the cascade targets
+    # 先运行规则层（轨道B）；仅当规则改写未达到级联目标时才调用LLM
+    cascade = SuggestionCascade(route="suggest")
+    rule_outcome = await asyncio.to_thread(
+        cascade.run_rule_tier,
+        rule_track,
+        request.sentence,
+        original_risk,
+        locked_terms=request.locked_terms,
         issues=request.issues,
-        locked_terms=request.locked_terms
-    )
-    # Calculate actual risk score for rule-based rewrite (CAASS v2.0 Phase 2)
-    # 为规则改写计算实际风险分数（CAASS v2.0 第二阶段）
-    rule_analysis = _scorer.analyze(
-        rule_result.rewritten,
         tone_level=tone_level,
         whitelist=whitelist_set,
         context_baseline=context_baseline
     )
-    rule_actual_risk = rule_analysis.risk_score
+    rule_result = rule_outcome.rule_result
+    rule_suggestion = await asyncio.to_thread(
+        _build_rule_suggestion,
+        request.sentence,
+        rule_result,
+        colloquialism_level=tone_level,
+        whitelist_set=whitelist_set,
+        context_baseline=context_baseline,
+        predicted_risk=rule_outcome.risk
+    )
+    decisions = [rule_outcome.decision]
+
+    # Generate LLM suggestion (Track A) only on escalation; concurrent
+    # escalations of the same session share one batch prompt
+    # 仅在升级时生成LLM建议（轨道A）；同一会话的并发升级共享一次批量提示词
+    llm_suggestion = None
+    if rule_outcome.escalate:
+        try:
+            llm_result = await get_suggestion_batcher().suggest(
+                llm_track,
+                BatchSuggestionItem(
+                    sentence=request.sentence,
+                    issues=request.issues,
+                    locked_terms=request.locked_terms,
+                    is_paraphrase=request.is_paraphrase
+                ),
+                target_lang=request.target_lang
+            )
+            if llm_result:
+                llm_suggestion = await asyncio.to_thread(
+                    _build_llm_suggestion,
+                    request.sentence,
+                    llm_result,
+                    quality_gate,
+                    colloquialism_level=request.colloquialism_level,
+                    whitelist_set=whitelist_set,
+                    context_baseline=context_baseline
+                )
+            decisions.append(_record_llm_tier(cascade, llm_suggestion, original_risk))
+        except Exception as e:
+            # Log error but continue with rule-based suggestion
+            # 记录错误但继续使用规则建议
+            print(f"LLM track error: {e}")
+            decisions.append(cascade.record_llm(False, "error"))
 
     # DEBUG: Log Track B scoring to diagnose the 0-score issue
     # 调试：记录轨道B评分以诊断0分问题
     # Use logger for cross-platform compatibility (Windows GBK / Linux UTF-8)
     # 使用logger以实现跨平台兼容（Windows GBK / Linux UTF-8）
-    logger.info(f"[DEBUG Track B] Changes: {len(rule_result.changes)}, Text unchanged: {rule_result.rewritten == request.sentence}, Original risk: {original_risk}, Rule risk: {rule_actual_risk}")
+    logger.info(f"[DEBUG Track B] Changes: {len(rule_result.changes)}, Text unchanged: {rule_result.rewritten == request.sentence}, Original risk: {original_risk}, Rule risk: {rule_suggestion.predicted_risk}")
+
+    # Generate translation of original
+    # 生成原文翻译
+    translation = await _translate_sentence(request.sentence, request.target_lang)
+
+    return SuggestResponse(
+        original=request.sentence,
+        original_risk=original_risk,  # Use actual calculated risk
+        translation=translation,
+        llm_suggestion=llm_suggestion,
+        rule_suggestion=rule_suggestion,
+        locked_terms=request.locked_terms,
+        cascade_decisions=[d.to_dict() for d in decisions]
+    )
+
+
+def _record_llm_tier(
+    cascade: SuggestionCascade,
+    llm_suggestion: Optional[Suggestion],
+    original_risk: int
+) -> TierDecision:
+    """
+    Record the LLM tier outcome of an escalated sentence
+    记录已升级句子的LLM层结果
+    """
+    if llm_suggestion is None:
+        return cascade.record_llm(False, "no_result")
+    reason = cascade.llm_reason(llm_suggestion.predicted_risk, original_risk)
+    return cascade.record_llm(reason == "targets_met", reason, risk=llm_suggestion.predicted_risk)
+
+
+def _build_llm_suggestion(
+    sentence: str,
+    llm_result,
+    quality_gate: QualityGate,
+    colloquialism_level: int,
+    whitelist_set: Optional[set],
+    context_baseline: int
+) -> Suggestion:
+    """
+    Validate and score an LLM rewrite, and wrap it as a Suggestion
+    验证LLM改写并评分，封装为Suggestion
+    """
+    # DEAI Engine 2.0: Verify suggestion doesn't contain P0 words or first-person pronouns
+    # DEAI Engine 2.0: 验证建议不包含P0词或第一人称代词
+    validation = quality_gate.verify_suggestion(
+        original=sentence,
+        suggestion=llm_result.rewritten,
+        colloquialism_level=colloquialism_level
+    )
+
+    if not validation.passed:
+        # Log validation failure but still use the suggestion (with warning)
+        # 记录验证失败但仍使用建议（带警告）
+        logger.warning(
+            f"[LLM Validation] {validation.action}: {validation.message}"
+        )
+        # Add validation warning to explanation
+        # 将验证警告添加到解释中
+        warning_note = f" [Warning: {validation.message}]"
+        llm_result.explanation = (llm_result.explanation or "") + warning_note
+        llm_result.explanation_zh = (llm_result.explanation_zh or "") + f" [警告: {validation.message_zh}]"
+
+    # Calculate actual risk score for rewritten text (CAASS v2.0 Phase 2)
+    # 为改写文本计算实际风险分数（CAASS v2.0 第二阶段）
+    llm_analysis = _scorer.analyze(
+        llm_result.rewritten,
+        tone_level=colloquialism_level,
+        whitelist=whitelist_set,
+        context_baseline=context_baseline,
+        profile="score_only"
+    )
+
+    return Suggestion(
+        source=SuggestionSource.LLM,
+        rewritten=llm_result.rewritten,
+        changes=[
+            ChangeDetail(
+                original=c.original,
+                replacement=c.replacement,
+                reason=c.reason,
+                reason_zh=c.reason_zh
+            ) for c in llm_result.changes
+        ],
+        predicted_risk=llm_analysis.risk_score,  # Use actual calculated risk
+        semantic_similarity=llm_result.semantic_similarity,
+        explanation=llm_result.explanation,
+        explanation_zh=llm_result.explanation_zh
+    )
+
+
+def _build_rule_suggestion(
+    sentence: str,
+    rule_result,
+    colloquialism_level: int,
+    whitelist_set: Optional[set],
+    context_baseline: int,
+    predicted_risk: Optional[int] = None
+) -> Suggestion:
+    """
+    Score a rule-based rewrite and wrap it as a Suggestion
+    为规则改写评分并封装为Suggestion
 
-    rule_suggestion = Suggestion(
+    predicted_risk: score already computed by the cascade rule tier
+    predicted_risk: 级联规则层已计算的分数
+    """
+    # Calculate actual risk score for rule-based rewrite (CAASS v2.0 Phase 2)
+    # 为规则改写计算实际风险分数（CAASS v2.0 第二阶段）
+    if predicted_risk is None:
+        predicted_risk = _scorer.analyze(
+            rule_result.rewritten,
+            tone_level=colloquialism_level,
+            whitelist=whitelist_set,
+            context_baseline=context_baseline,
+            profile="score_only"
+        ).risk_score
+
+    return Suggestion(
         source=SuggestionSource.RULE,
         rewritten=rule_result.rewritten,
         changes=[
@@ -201,25 +322,12 @@ async def get_suggestions(
                 reason_zh=c.reason_zh
             ) for c in rule_result.changes
         ],
-        predicted_risk=rule_actual_risk,  # Use actual calculated risk
+        predicted_risk=predicted_risk,  # Use actual calculated risk
         semantic_similarity=rule_result.semantic_similarity,
         explanation=rule_result.explanation,
         explanation_zh=rule_result.explanation_zh
     )
 
-    # Generate translation of original
-    # 生成原文翻译
-    translation = await _translate_sentence(request.sentence, request.target_lang)
-
-    return SuggestResponse(
-        original=request.sentence,
-        original_risk=original_risk,  # Use actual calculated risk
-        translation=translation,
-        llm_suggestion=llm_suggestion,
-        rule_suggestion=rule_suggestion,
-        locked_terms=request.locked_terms
-    )
-
 
 @router.post("/apply")
 async def apply_suggestion(
@@ -275,7 +383,9 @@ async def apply_suggestion(
     # 使用会话的口语化级别以确保评分一致
     new_risk_score = 0
     if text_for_risk:
-        analysis = _scorer.analyze(text_for_risk, tone_level=tone_level)
+        analysis = await asyncio.to_thread(
+            _scorer.analyze, text_for_risk, tone_level=tone_level, profile="score_only"
+        )
         new_risk_score = analysis.risk_score
 
     # Check if modification already exists for this sentence
@@ -321,7 +431,8 @@ async def apply_suggestion(
 @router.post("/custom", response_model=ValidationResult)
 async def validate_custom(
     request: CustomInputRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    quality_gate: QualityGate = Depends(get_quality_gate)
 ):
     """
     Validate user's custom modification
@@ -348,10 +459,6 @@ async def validate_custom(
     if sentence.analysis_json and sentence.analysis_json.get("is_paraphrase"):
         is_paraphrase = True
 
-    # Initialize validators
-    # 初始化验证器
-    quality_gate = QualityGate()
-
     # Validate custom input against original
     # 验证自定义输入与原文对比
     result = await quality_gate.validate(
@@ -631,6 +738,7 @@ Return ONLY the JSON object, no other text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:analyze_sentence", analysis_prompt, "dashscope", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
         elif settings.llm_provider == "volcengine" and settings.volcengine_api_key:
             # Call Volcengine (火山引擎) DeepSeek API - faster
@@ -652,12 +760,14 @@ Return ONLY the JSON object, no other text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:analyze_sentence", analysis_prompt, "volcengine", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
             # Call Gemini API
             # 调用Gemini API
             from google import genai
             client = genai.Client(api_key=settings.gemini_api_key)
+            started = time.perf_counter()
             response = await client.aio.models.generate_content(
                 model=settings.llm_model,
                 contents=analysis_prompt,
@@ -666,6 +776,10 @@ Return ONLY the JSON object, no other text."""
                     "temperature": 0.3
                 }
             )
+            record_usage(
+                "suggest:analyze_sentence", analysis_prompt, gemini_usage(response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
             content = response.text.strip()
         elif settings.llm_provider == "deepseek" or settings.deepseek_api_key:
             # Call DeepSeek API (official - slower)
@@ -687,6 +801,7 @@ Return ONLY the JSON object, no other text."""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:analyze_sentence", analysis_prompt, "deepseek", response, data)
                 content = data["choices"][0]["message"]["content"].strip()
         else:
             # No LLM configured, use fallback
@@ -943,6 +1058,7 @@ Translation:"""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:_translate_sentence", prompt, "dashscope", response, data)
                 translation = data["choices"][0]["message"]["content"].strip()
                 return translation
         elif settings.llm_provider == "volcengine" and settings.volcengine_api_key:
@@ -965,6 +1081,7 @@ Translation:"""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:_translate_sentence", prompt, "volcengine", response, data)
                 translation = data["choices"][0]["message"]["content"].strip()
                 return translation
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
@@ -972,6 +1089,7 @@ Translation:"""
             # 使用Gemini API翻译
             from google import genai
             client = genai.Client(api_key=settings.gemini_api_key)
+            started = time.perf_counter()
             response = await client.aio.models.generate_content(
                 model=settings.llm_model,
                 contents=prompt,
@@ -980,6 +1098,10 @@ Translation:"""
                     "temperature": 0.3
                 }
             )
+            record_usage(
+                "suggest:_translate_sentence", prompt, gemini_usage(response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
             return response.text.strip()
         elif settings.llm_provider == "deepseek" or settings.deepseek_api_key:
             # Call DeepSeek API (official - slower)
@@ -1001,6 +1123,7 @@ Translation:"""
                 })
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("suggest:_translate_sentence", prompt, "deepseek", response, data)
                 translation = data["choices"][0]["message"]["content"].strip()
                 return translation
         else:
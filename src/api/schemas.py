@@ -192,6 +192,10 @@ class SentenceAnalysis(BaseModel):
     # 释义检测
     is_paraphrase: bool = False
 
+    # Lexicon snapshot version the scores were computed with
+    # 计算分数时使用的词库快照版本
+    lexicon_version: Optional[str] = None
+
 
 class ChangeDetail(BaseModel):
     """
@@ -229,6 +233,9 @@ class SuggestResponse(BaseModel):
     llm_suggestion: Optional[Suggestion] = None
     rule_suggestion: Optional[Suggestion] = None
     locked_terms: List[str] = []
+    # Cascade tier decisions (rule first, LLM only on escalation)
+    # 级联层级决策（先规则，仅在升级时调用LLM）
+    cascade_decisions: List[Dict[str, Any]] = []
 
 
 class ValidationResult(BaseModel):
@@ -291,6 +298,7 @@ class DocumentInfo(BaseModel):
     low_risk_count: int
     created_at: datetime
     original_text: Optional[str] = None  # Document text content for analysis
+    word_count: Optional[int] = None  # Billable word count (set on upload)
 
 
 class SessionInfo(BaseModel):
@@ -74,6 +74,10 @@ class Settings(BaseSettings):
     llm_model: str = "deepseek-v3-2-251201"  # volcengine model or deepseek-chat | gemini-2.5-flash | etc.
     llm_max_tokens: int = 2048  # Increased from 1024 to handle longer sentences
     llm_temperature: float = 0.7
+    llm_batch_size: int = 8  # Sentences per batched rewrite request
+    llm_batch_max_retries: int = 1  # Re-issue rounds for batch items that fail validation
+    llm_batch_tokens_per_item: int = 400  # Output token budget per sentence in a batch
+    suggest_batch_window_ms: int = 30  # Concurrent /suggest rewrites of a session within this window share one batch prompt; 0 = off
 
     # DeepSeek API base URL (official - commented out, using Volcengine instead)
     # DeepSeek API 基础URL（官方 - 已注释，改用火山引擎）
@@ -86,6 +90,108 @@ class Settings(BaseSettings):
     ppl_threshold_medium: float = 40.0  # Below this is medium risk
     fingerprint_density_threshold: float = 0.1  # 10% fingerprint words
 
+    # PPL Model Settings
+    # PPL模型配置
+    ppl_model_variant: str = "fp32"  # fp32 | int8 | fp16 (see scripts/download_onnx_model.py)
+    ppl_serialize_optimized_graph: bool = True  # Cache optimized graph under models/optimized/
+    ppl_session_pool_size: int = 0  # ONNX sessions; 0 = auto from CPU count
+    ppl_session_pool_max: int = 4  # Cap for the automatic pool size (each session holds the weights)
+    ppl_intra_op_threads: int = 0  # Threads per session; 0 = auto (1 below 4 CPUs, else 2)
+    ppl_queue_timeout_seconds: float = 10.0  # Wait for a free session before falling back to zlib
+
+    # Model Preload Settings
+    # 模型预加载配置
+    model_preload: str = "ppl,spacy,sbert"  # Comma-separated; empty disables preload
+    model_warmup: bool = True  # Run one warm-up inference per model after loading
+
+    # Lexicon Settings
+    # 词库配置
+    lexicon_source: str = "json"  # builtin | json | db (each layer overrides the previous)
+    lexicon_refresh_seconds: float = 60.0  # Poll JSON files / DB for changes; 0 disables hot reload
+
+    # LLM Usage Metering Settings
+    # LLM用量计量配置
+    llm_usage_metering: bool = True  # Record every provider call to the llm_usage table
+    llm_usage_flush_seconds: float = 5.0  # Write-behind interval
+    llm_usage_flush_batch: int = 200  # Flush early once this many calls are buffered
+    llm_usage_buffer_limit: int = 10000  # Oldest buffered calls are dropped beyond this
+
+    # Admin Dashboard Rollup Settings
+    # 管理员仪表板汇总配置
+    admin_rollup_refresh_seconds: float = 300.0  # Recompute recent daily rollups; 0 = build once on first read
+    admin_rollup_lookback_days: int = 7  # Days recomputed on each refresh (late payments / calls)
+
+    # Ingestion Worker Settings
+    # 导入工作进程配置
+    ingestion_sandbox: bool = True  # Parse uploads / count words in rlimited subprocesses; False runs inline
+    ingestion_workers: int = 0  # Worker processes; 0 = auto (half the CPUs, 1-4)
+    ingestion_timeout_seconds: float = 20.0  # Wall-clock (and CPU) limit per job; the worker is killed past it
+    ingestion_queue_timeout_seconds: float = 10.0  # Wait for a free worker before answering 503
+    ingestion_memory_limit_mb: int = 1024  # Address space a worker may grow by (POSIX only)
+
+    # Export Cache Settings
+    # 导出缓存配置
+    export_cache_backend: str = "memory"  # memory | s3 (S3-compatible object store) | off
+    export_cache_max_mb: int = 128  # In-process LRU of rendered DOCX/report bytes
+    export_cache_s3_url: Optional[str] = None  # s3://bucket/prefix
+    export_cache_s3_endpoint: Optional[str] = None  # Custom endpoint for MinIO / OSS / COS
+
+    # Entitlement Cache Settings
+    # 权限缓存配置
+    entitlement_cache_backend: str = "memory"  # memory | redis (uses redis_url; needed with several workers) | off
+    entitlement_cache_ttl_seconds: float = 30.0  # Paid (user, task) entitlements; invalidated on payment/status change
+    entitlement_cache_max_entries: int = 10000  # Per cache (tokens, tasks); least recently used evicted
+    auth_token_cache_seconds: float = 300.0  # Decoded JWTs, capped by the token's exp; 0 disables
+
+    # Tracing & Metrics Settings
+    # 追踪与指标配置
+    tracing_enabled: bool = True  # Time pipeline stages (spans) into histograms and per-request traces
+    tracing_exporter: str = "none"  # none | console | otlp (needs opentelemetry-sdk / exporter packages)
+    tracing_otlp_endpoint: Optional[str] = None  # e.g. http://otel-collector:4318/v1/traces
+    tracing_service_name: str = "academicguard"
+    metrics_enabled: bool = True  # Serve Prometheus metrics at /metrics (internal IPs only)
+    debug_timing_header: bool = True  # Debug mode: add a Server-Timing stage breakdown to every response
+
+    # Suggestion Cascade Settings
+    # 建议级联配置
+    suggest_cascade_enabled: bool = True  # Rules first; call the LLM only when the rule rewrite misses a target
+    cascade_risk_target: int = 25  # Rule rewrite must score below this (and below the original)
+    cascade_semantic_threshold: Optional[float] = None  # None = semantic_similarity_threshold
+
+    # Single-Flight Settings
+    # 单飞（请求合并）配置
+    single_flight_backend: str = "memory"  # memory | redis (SET NX lock on redis_url, coalesces across workers) | off
+    single_flight_lock_seconds: float = 120.0  # Redis lock TTL; remote followers stop waiting after this
+    single_flight_result_ttl_seconds: float = 30.0  # How long a leader's result stays readable in Redis
+
+    # Substep Prefetch Settings
+    # 子步骤预取配置
+    substep_prefetch_enabled: bool = True  # After step N's analysis, speculatively analyze step N+1 on the same text
+    substep_prefetch_concurrency: int = 2  # Prefetches running at once per worker; further ones are dropped
+    substep_prefetch_ttl_seconds: float = 900.0  # Unclaimed prefetched results are not served after this
+
+    # Fused Layer Analysis Settings
+    # 层级融合分析配置
+    fused_analysis_enabled: bool = True  # One LLM call analyzes every fusable substep of a layer
+    fused_analysis_max_tokens: int = 16384  # Output budget of the fused call; keep within the provider's output cap
+    fused_analysis_ttl_seconds: float = 900.0  # Unclaimed per-step results of a fused run are dropped after this
+
+    # Token Budget Settings
+    # Token预算配置
+    llm_context_window: int = 65536  # Prompt + completion tokens the configured model accepts
+    llm_max_output_tokens: int = 8192  # Provider cap on max_tokens
+    token_budget_tokenizer: str = "auto"  # auto | tiktoken | tokenizers | heuristic
+    token_budget_encoding: str = "cl100k_base"  # tiktoken encoding
+    token_budget_tokenizer_file: Optional[str] = None  # tokenizer.json for the tokenizers backend
+    token_budget_margin: float = 0.1  # Share of the window kept free for tokenizer differences
+    analysis_document_tokens: int = 3000  # Document share of a substep analysis prompt (was 10000 chars)
+    structure_document_tokens: int = 4500  # Document share of smart-structure prompts (was 15000 chars)
+
+    # Structured Output Settings
+    # 结构化输出配置
+    llm_structured_output: str = "auto"  # auto | json_schema | json_object | off (auto picks per provider)
+    llm_json_retry: bool = True  # Re-ask once for only the keys that failed validation
+
     # Validation Settings
     # 验证配置
     semantic_similarity_threshold: float = 0.80
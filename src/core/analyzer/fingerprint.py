@@ -10,6 +10,9 @@ from typing import List, Dict, Set, Optional, Tuple
 from pathlib import Path
 import logging
 
+from src.core.lexicon_registry import get_lexicon
+from src.services.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -200,29 +203,66 @@ class FingerprintDetector:
         "henceforth": {"weight": 0.7, "replacements": ["from now on", "from this point"]},
     }
 
+    # Word pattern for boundary matching
+    # 用于边界匹配的单词模式
+    word_boundary = re.compile(r'\b\w+\b')
+
     def __init__(self, custom_fingerprints_path: Optional[str] = None):
         """
         Initialize fingerprint detector
         初始化指纹检测器
 
+        Without a custom path the word/phrase/connector tables and their
+        compiled matchers come from the current lexicon snapshot (see
+        src/core/lexicon_registry.py), so lexicon reloads apply to existing
+        detectors and construction compiles nothing.
+        未指定自定义路径时，词/短语/连接词表及其编译好的匹配器来自当前词库快照，
+        词库重载对已有检测器生效，且构造时无需编译。
+
         Args:
             custom_fingerprints_path: Path to custom fingerprints JSON file
         """
-        self.high_freq_words = dict(self.HIGH_FREQ_WORDS)
-        self.phrase_patterns = dict(self.PHRASE_PATTERNS)
-        self.connector_patterns = dict(self.CONNECTOR_PATTERNS)
+        self._custom_tables: Optional[dict] = None
 
         if custom_fingerprints_path:
             self._load_custom_fingerprints(custom_fingerprints_path)
 
-        # Compile patterns
-        # 编译模式
-        self._compile_patterns()
-
         # Compile academic anchor patterns (DEAI Engine 2.0)
         # 编译学术锚点模式
         self._compile_anchor_patterns()
 
+    @property
+    def high_freq_words(self) -> Dict[str, dict]:
+        return self._tables()["words"]
+
+    @property
+    def phrase_patterns(self) -> Dict[str, dict]:
+        return self._tables()["phrases"]
+
+    @property
+    def connector_patterns(self) -> Dict[str, dict]:
+        return self._tables()["connectors"]
+
+    @property
+    def compiled_phrases(self) -> Dict[str, "re.Pattern"]:
+        return dict(self._tables()["phrase_matchers"])
+
+    def _tables(self) -> dict:
+        """
+        Current lookup tables: custom ones if loaded, else the lexicon snapshot
+        当前查找表：已加载自定义表时使用自定义表，否则使用词库快照
+        """
+        if self._custom_tables is not None:
+            return self._custom_tables
+        lexicon = get_lexicon()
+        return {
+            "words": lexicon.words,
+            "phrases": lexicon.phrases,
+            "connectors": lexicon.connectors,
+            "phrase_matchers": lexicon.phrase_matchers,
+            "connector_matchers": lexicon.connector_matchers,
+        }
+
     def _load_custom_fingerprints(self, path: str):
         """
         Load custom fingerprints from JSON file
@@ -232,33 +272,38 @@ class FingerprintDetector:
             with open(path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
 
+            lexicon = get_lexicon()
+            words = dict(lexicon.words)
+            phrases = dict(lexicon.phrases)
+            connectors = dict(lexicon.connectors)
+
             if "words" in data:
-                self.high_freq_words.update(data["words"])
+                words.update(data["words"])
             if "phrases" in data:
-                self.phrase_patterns.update(data["phrases"])
+                phrases.update(data["phrases"])
             if "connectors" in data:
-                self.connector_patterns.update(data["connectors"])
+                connectors.update(data["connectors"])
+
+            # Compile patterns once for this detector's private tables
+            # 为此检测器的私有词表编译一次模式
+            self._custom_tables = {
+                "words": words,
+                "phrases": phrases,
+                "connectors": connectors,
+                "phrase_matchers": tuple(
+                    (phrase, re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE))
+                    for phrase in phrases
+                ),
+                "connector_matchers": tuple(
+                    (connector, re.compile(r'\b' + re.escape(connector) + r'\b', re.IGNORECASE))
+                    for connector in connectors
+                ),
+            }
 
             logger.info(f"Loaded custom fingerprints from {path}")
         except Exception as e:
             logger.warning(f"Failed to load custom fingerprints: {e}")
 
-    def _compile_patterns(self):
-        """
-        Compile regex patterns for efficient matching
-        编译正则表达式以提高匹配效率
-        """
-        # Compile phrase patterns (case insensitive)
-        # 编译短语模式（不区分大小写）
-        self.compiled_phrases = {
-            phrase: re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE)
-            for phrase in self.phrase_patterns
-        }
-
-        # Word pattern for boundary matching
-        # 用于边界匹配的单词模式
-        self.word_boundary = re.compile(r'\b\w+\b')
-
     def _compile_anchor_patterns(self):
         """
         Compile academic anchor patterns for context immunity (DEAI Engine 2.0)
@@ -411,6 +456,7 @@ class FingerprintDetector:
 
         return matches
 
+    @traced("fingerprint.detect")
     def detect(self, text: str) -> List[FingerprintMatch]:
         """
         Detect all fingerprint words and phrases in text
@@ -425,11 +471,14 @@ class FingerprintDetector:
         if not text:
             return []
 
+        # Read the tables once so a concurrent lexicon reload cannot mix versions
+        # 只读取一次词表，避免并发词库重载混用版本
+        tables = self._tables()
         matches = []
 
         # Detect phrases first (longer patterns take precedence)
         # 首先检测短语（较长的模式优先）
-        matches.extend(self._detect_phrases(text))
+        matches.extend(self._detect_phrases(text, tables))
 
         # Get positions covered by phrases
         # 获取被短语覆盖的位置
@@ -439,11 +488,11 @@ class FingerprintDetector:
 
         # Detect individual words (skip if already covered by phrase)
         # 检测单个词（如果已被短语覆盖则跳过）
-        matches.extend(self._detect_words(text, covered_positions))
+        matches.extend(self._detect_words(text, covered_positions, tables))
 
         # Detect connectors
         # 检测连接词
-        matches.extend(self._detect_connectors(text, covered_positions))
+        matches.extend(self._detect_connectors(text, covered_positions, tables))
 
         # Sort by position
         # 按位置排序
@@ -451,15 +500,16 @@ class FingerprintDetector:
 
         return matches
 
-    def _detect_phrases(self, text: str) -> List[FingerprintMatch]:
+    def _detect_phrases(self, text: str, tables: Optional[dict] = None) -> List[FingerprintMatch]:
         """
         Detect fingerprint phrases
         检测指纹短语
         """
+        tables = tables or self._tables()
         matches = []
 
-        for phrase, pattern in self.compiled_phrases.items():
-            info = self.phrase_patterns[phrase]
+        for phrase, pattern in tables["phrase_matchers"]:
+            info = tables["phrases"][phrase]
             for match in pattern.finditer(text):
                 matches.append(FingerprintMatch(
                     word=match.group(0),
@@ -472,13 +522,19 @@ class FingerprintDetector:
 
         return matches
 
-    def _detect_words(self, text: str, covered_positions: Set[int]) -> List[FingerprintMatch]:
+    def _detect_words(
+        self,
+        text: str,
+        covered_positions: Set[int],
+        tables: Optional[dict] = None
+    ) -> List[FingerprintMatch]:
         """
         Detect fingerprint words
         检测指纹词
         """
+        tables = tables or self._tables()
+        high_freq_words = tables["words"]
         matches = []
-        text_lower = text.lower()
 
         for word_match in self.word_boundary.finditer(text):
             # Skip if position is covered by a phrase
@@ -488,8 +544,8 @@ class FingerprintDetector:
 
             word = word_match.group(0).lower()
 
-            if word in self.high_freq_words:
-                info = self.high_freq_words[word]
+            if word in high_freq_words:
+                info = high_freq_words[word]
                 matches.append(FingerprintMatch(
                     word=word_match.group(0),
                     position=word_match.start(),
@@ -501,15 +557,21 @@ class FingerprintDetector:
 
         return matches
 
-    def _detect_connectors(self, text: str, covered_positions: Set[int]) -> List[FingerprintMatch]:
+    def _detect_connectors(
+        self,
+        text: str,
+        covered_positions: Set[int],
+        tables: Optional[dict] = None
+    ) -> List[FingerprintMatch]:
         """
         Detect overused connectors
         检测过度使用的连接词
         """
+        tables = tables or self._tables()
         matches = []
 
-        for connector, info in self.connector_patterns.items():
-            pattern = re.compile(r'\b' + re.escape(connector) + r'\b', re.IGNORECASE)
+        for connector, pattern in tables["connector_matchers"]:
+            info = tables["connectors"][connector]
 
             for match in pattern.finditer(text):
                 # Skip if position is covered
@@ -19,7 +19,12 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from enum import Enum
+import functools
+import inspect
 import logging
+import time
+
+from src.services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +147,10 @@ class LayerResult:
     # Updated context to pass to next layer
     updated_context: Optional[LayerContext] = None
 
+    # Wall time of analyze(), filled in by BaseOrchestrator
+    # analyze() 耗时，由 BaseOrchestrator 填充
+    processing_time_ms: Optional[int] = None
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
         return {
@@ -152,9 +161,45 @@ class LayerResult:
             "recommendations": self.recommendations,
             "recommendations_zh": self.recommendations_zh,
             "details": self.details,
+            "processing_time_ms": self.processing_time_ms,
         }
 
 
+def _traced_step(func, stage: str):
+    """
+    Wrap one orchestrator method (sync or async) in a stage span
+    将编排器的单个方法（同步或异步）包装在阶段跨度中
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with span(stage):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(stage):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _timed_analyze(func, stage: str):
+    """
+    Wrap analyze() in a span and record its wall time on the LayerResult
+    将 analyze() 包装在跨度中，并将耗时写入 LayerResult
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        with span(stage):
+            result = await func(self, *args, **kwargs)
+        if isinstance(result, LayerResult):
+            result.processing_time_ms = int((time.perf_counter() - started) * 1000)
+        return result
+    return wrapper
+
+
 class BaseOrchestrator(ABC):
     """
     Base class for all layer orchestrators
@@ -164,10 +209,28 @@ class BaseOrchestrator(ABC):
     1. Receives context from upper layer
     2. Runs detection steps for its layer
     3. Returns result with updated context for lower layer
+
+    Subclasses are instrumented automatically: analyze() is timed as stage
+    "layer.<level>" (and its duration lands in LayerResult.processing_time_ms),
+    and each _analyze_* step as "layer.<level>.<step>".
+    子类会被自动埋点：analyze() 以 "layer.<level>" 阶段计时（耗时写入
+    LayerResult.processing_time_ms），每个 _analyze_* 步骤以
+    "layer.<level>.<step>" 计时。
     """
 
     layer: LayerLevel = LayerLevel.DOCUMENT
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        prefix = f"layer.{cls.layer.name.lower()}"
+        for attr, value in list(vars(cls).items()):
+            if not inspect.isfunction(value):
+                continue
+            if attr == "analyze":
+                setattr(cls, attr, _timed_analyze(value, prefix))
+            elif attr.startswith("_analyze_"):
+                setattr(cls, attr, _traced_step(value, f"{prefix}.{attr[len('_analyze_'):]}"))
+
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
 
@@ -20,6 +20,7 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 
+from src.core.lexicon_registry import get_lexicon
 from src.core.analyzer.layers.lexical.context_preparation import LexicalContext
 from src.core.analyzer.layers.lexical.fingerprint_detector import (
     FingerprintDetectionResult,
@@ -489,6 +490,12 @@ class ReplacementCandidateGenerator:
         else:
             replacements = self.TYPE_B_REPLACEMENTS.get(word_lower, {})
 
+        # Style-keyed lexicon overrides (FingerprintWord rows) take precedence
+        # 词库中按风格的覆盖（FingerprintWord 记录）优先
+        overrides = get_lexicon().styled_replacements.get(word_lower)
+        if overrides:
+            replacements = {**replacements, **{k: list(v) for k, v in overrides.items()}}
+
         if not replacements:
             return None
 
@@ -75,12 +75,23 @@ class LexicalContextPreparer:
     """
     Step 5.0: Prepares lexical analysis context
     步骤5.0：准备词汇分析上下文
+
+    Routes share one instance (component_registry.get_lexical_context_preparer),
+    so the feature database is read from disk once per process.
+    路由共享同一实例，特征数据库每个进程只从磁盘读取一次。
     """
 
     def __init__(self):
         """Initialize the context preparer"""
         self.feature_db = self._load_feature_database()
-        self.aigc_fingerprints = self._load_aigc_fingerprints()
+
+    @property
+    def aigc_fingerprints(self) -> Dict[str, Any]:
+        """
+        AIGC fingerprint tables from the current lexicon (follows hot reloads)
+        当前词库中的AIGC指纹表（随热重载更新）
+        """
+        return self._load_aigc_fingerprints()
 
     def _load_feature_database(self) -> Dict[str, Any]:
         """
@@ -101,19 +112,19 @@ class LexicalContextPreparer:
 
     def _load_aigc_fingerprints(self) -> Dict[str, Any]:
         """
-        Load AIGC fingerprint database from existing lexical_orchestrator
-        从现有的lexical_orchestrator加载AIGC指纹数据库
+        Load AIGC fingerprint database from the lexicon registry
+        从词库注册表加载AIGC指纹数据库
         """
         try:
-            from src.core.analyzer.layers.lexical_orchestrator import (
-                FINGERPRINT_TYPE_A,
-                FINGERPRINT_TYPE_B,
-                FINGERPRINT_PHRASES,
-            )
+            # Read from the lexicon snapshot so JSON/DB overrides apply here too
+            # 从词库快照读取，使JSON/数据库覆盖在此同样生效
+            from src.core.lexicon_registry import get_lexicon
+            lexicon = get_lexicon()
             return {
-                "type_a": FINGERPRINT_TYPE_A,
-                "type_b": FINGERPRINT_TYPE_B,
-                "phrases": FINGERPRINT_PHRASES,
+                "type_a": set(lexicon.type_a),
+                "type_b": dict(lexicon.type_b),
+                "phrases": dict(lexicon.phrase_risks),
+                "version": lexicon.version,
             }
         except ImportError:
             logger.warning("Could not import fingerprints from lexical_orchestrator")
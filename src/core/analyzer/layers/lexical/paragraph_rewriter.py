@@ -22,10 +22,12 @@ Core rewriting functionality:
 import json
 import re
 import logging
+import time
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 
 from src.config import get_settings
+from src.prompts.prefix_cache import gemini_usage, record_response_usage, record_usage
 from src.core.analyzer.layers.lexical.context_preparation import (
     LexicalContext,
     ParagraphLexicalInfo,
@@ -473,6 +475,7 @@ Style: Semi-formal
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("paragraph_rewriter", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
     async def _call_gemini(self, prompt: str) -> str:
@@ -480,6 +483,7 @@ Style: Semi-formal
         from google import genai
 
         client = genai.Client(api_key=settings.gemini_api_key)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=settings.llm_model,
             contents=prompt,
@@ -488,6 +492,10 @@ Style: Semi-formal
                 "temperature": settings.llm_temperature
             }
         )
+        record_usage(
+            "paragraph_rewriter", prompt, gemini_usage(response),
+            provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return response.text
 
     async def _call_deepseek(self, prompt: str) -> str:
@@ -511,6 +519,7 @@ Style: Semi-formal
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("paragraph_rewriter", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
     def _parse_llm_response(
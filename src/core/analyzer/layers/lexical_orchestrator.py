@@ -31,6 +31,7 @@ from src.core.analyzer.layers.base import (
 )
 from src.core.analyzer.fingerprint import FingerprintDetector
 from src.core.analyzer.connector_detector import ConnectorDetector
+from src.core.lexicon_registry import LexiconSnapshot, get_lexicon
 
 logger = logging.getLogger(__name__)
 
@@ -170,15 +171,20 @@ class LexicalOrchestrator(BaseOrchestrator):
         recommendations: List[str] = []
         recommendations_zh: List[str] = []
 
+        # One lexicon snapshot for the whole analysis (hot reloads swap it atomically)
+        # 整个分析使用同一个词库快照（热重载会原子替换）
+        lexicon = get_lexicon()
+        details["lexicon_version"] = lexicon.version
+
         # Step 5.1: Fingerprint Detection (consolidated)
-        fingerprint_result = self._analyze_fingerprints(context)
+        fingerprint_result = self._analyze_fingerprints(context, lexicon)
         issues.extend(fingerprint_result["issues"])
         details["fingerprints"] = fingerprint_result["details"]
         recommendations.extend(fingerprint_result["recommendations"])
         recommendations_zh.extend(fingerprint_result["recommendations_zh"])
 
         # Step 5.2: Connector Analysis (consolidated)
-        connector_result = self._analyze_connectors(context)
+        connector_result = self._analyze_connectors(context, lexicon)
         issues.extend(connector_result["issues"])
         details["connectors"] = connector_result["details"]
         recommendations.extend(connector_result["recommendations"])
@@ -211,7 +217,11 @@ class LexicalOrchestrator(BaseOrchestrator):
             updated_context=updated_context,
         )
 
-    def _analyze_fingerprints(self, context: LayerContext) -> Dict[str, Any]:
+    def _analyze_fingerprints(
+        self,
+        context: LayerContext,
+        lexicon: Optional[LexiconSnapshot] = None
+    ) -> Dict[str, Any]:
         """
         Step 5.1: Fingerprint Detection (consolidated)
         步骤 5.1：指纹词检测（整合）
@@ -222,6 +232,7 @@ class LexicalOrchestrator(BaseOrchestrator):
         - Type C: Connectors (+10-30 risk)
         - Phrases: Multi-word patterns
         """
+        lexicon = lexicon or get_lexicon()
         issues: List[DetectionIssue] = []
         details: Dict[str, Any] = {}
         recommendations: List[str] = []
@@ -233,21 +244,21 @@ class LexicalOrchestrator(BaseOrchestrator):
 
         # Detect Type A fingerprints (Dead Giveaways)
         type_a_matches = []
-        for word in FINGERPRINT_TYPE_A:
+        for word in lexicon.type_a:
             count = text.count(word.lower())
             if count > 0:
                 type_a_matches.append({"word": word, "count": count, "risk": 40})
 
         # Detect Type B fingerprints (Academic Clichés)
         type_b_matches = []
-        for word, risk in FINGERPRINT_TYPE_B.items():
+        for word, risk in lexicon.type_b.items():
             count = text.count(word.lower())
             if count > 0:
                 type_b_matches.append({"word": word, "count": count, "risk": risk})
 
         # Detect fingerprint phrases
         phrase_matches = []
-        for phrase, risk in FINGERPRINT_PHRASES.items():
+        for phrase, risk in lexicon.phrase_risks.items():
             count = text.count(phrase.lower())
             if count > 0:
                 phrase_matches.append({"phrase": phrase, "count": count, "risk": risk})
@@ -298,13 +309,18 @@ class LexicalOrchestrator(BaseOrchestrator):
             "recommendations_zh": recommendations_zh,
         }
 
-    def _analyze_connectors(self, context: LayerContext) -> Dict[str, Any]:
+    def _analyze_connectors(
+        self,
+        context: LayerContext,
+        lexicon: Optional[LexiconSnapshot] = None
+    ) -> Dict[str, Any]:
         """
         Step 5.2: Connector Analysis (consolidated)
         步骤 5.2：连接词分析（整合）
 
         Detects overuse of explicit connectors (AI pattern).
         """
+        lexicon = lexicon or get_lexicon()
         issues: List[DetectionIssue] = []
         details: Dict[str, Any] = {}
         recommendations: List[str] = []
@@ -316,11 +332,10 @@ class LexicalOrchestrator(BaseOrchestrator):
         connector_matches = []
         total_connector_risk = 0
 
-        for connector, risk in FINGERPRINT_TYPE_C_CONNECTORS.items():
-            # Match as whole word/phrase
-            pattern = r'\b' + re.escape(connector) + r'\b'
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            count = len(matches)
+        for connector, pattern in lexicon.type_c_matchers:
+            # Match as whole word/phrase (pattern precompiled in the snapshot)
+            risk = lexicon.type_c_connectors[connector]
+            count = len(pattern.findall(text))
 
             if count > 0:
                 connector_matches.append({
@@ -344,7 +359,7 @@ class LexicalOrchestrator(BaseOrchestrator):
 
         for sentence in sentences:
             sentence_lower = sentence.strip().lower()
-            for connector in FINGERPRINT_TYPE_C_CONNECTORS.keys():
+            for connector in lexicon.type_c_connectors.keys():
                 if sentence_lower.startswith(connector):
                     sentence_start_connectors += 1
                     break
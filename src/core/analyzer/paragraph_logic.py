@@ -807,11 +807,9 @@ async def analyze_paragraph_logic_framework(
         # 4. Call LLM using SmartStructureAnalyzer's method
         # 使用 SmartStructureAnalyzer 的方法调用LLM
         analyzer = SmartStructureAnalyzer()
-        response_text = await analyzer._call_llm(prompt)
-
-        # 5. Parse LLM response
-        # 解析LLM响应
-        llm_result = analyzer._parse_llm_response(response_text)
+        # 5. Parse LLM response (validated JSON fast path)
+        # 解析LLM响应（经校验的JSON快速路径）
+        llm_result = await analyzer._call_llm_json(prompt, name="paragraph_logic:sentence_roles")
 
         # 6. Convert to structured result
         # 转换为结构化结果
@@ -25,63 +25,453 @@ Author: AcademicGuard Team
 Date: 2026-01-02
 """
 
+import os
 import math
+import asyncio
+import queue
+import time
 import logging
-from typing import Optional, Tuple
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from src.config import get_settings
+from src.services.tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Model loading state (singleton pattern for lazy loading)
 # 模型加载状态（单例模式用于懒加载）
-_onnx_session = None
+_session_pool: Optional["PPLSessionPool"] = None
 _tokenizer = None
 _model_available: Optional[bool] = None
+_loaded_variant: Optional[str] = None
+_load_lock = threading.Lock()
+
+# Model file name per variant (all live in project_root/models/)
+# 各变体对应的模型文件名（均位于 project_root/models/）
+# fp32: original export, int8: dynamic INT8 quantization, fp16: half-precision weights + KV cache
+# fp32: 原始导出, int8: 动态INT8量化, fp16: 半精度权重 + KV缓存
+PPL_MODEL_VARIANTS: Dict[str, str] = {
+    "fp32": "distilgpt2.onnx",
+    "int8": "distilgpt2.int8.onnx",
+    "fp16": "distilgpt2.fp16.onnx",
+}
+
+# distilgpt2 architecture constants for the empty past_key_values feed
+# distilgpt2 架构常量，用于构造空的 past_key_values 输入
+_NUM_HEADS = 12
+_HEAD_DIM = 64
+
+
+def _get_model_dir() -> Path:
+    """
+    Get the model directory (project_root/models/)
+    获取模型目录（project_root/models/）
+    """
+    project_root = Path(__file__).parent.parent.parent.parent
+    return project_root / "models"
 
 
-def _get_model_paths() -> Tuple[Path, Path]:
+def _get_model_paths(variant: Optional[str] = None) -> Tuple[Path, Path]:
     """
     Get paths for ONNX model and tokenizer files
     获取ONNX模型和分词器文件的路径
 
+    Args:
+        variant: Model variant (fp32 | int8 | fp16). Defaults to settings.ppl_model_variant.
+
     Returns:
         Tuple of (model_path, tokenizer_path)
     """
+    if variant is None:
+        variant = get_settings().ppl_model_variant
+
     # Model directory is at project_root/models/
     # 模型目录在 project_root/models/
-    project_root = Path(__file__).parent.parent.parent.parent
-    model_dir = project_root / "models"
+    model_dir = _get_model_dir()
 
-    model_path = model_dir / "distilgpt2.onnx"
+    model_path = model_dir / PPL_MODEL_VARIANTS.get(variant, PPL_MODEL_VARIANTS["fp32"])
     tokenizer_path = model_dir / "tokenizer.json"
 
     return model_path, tokenizer_path
 
 
+def _get_optimized_model_path(model_path: Path, provider: str = "CPUExecutionProvider") -> Path:
+    """
+    Get the path of the serialized, graph-optimized copy of a model
+    获取序列化的图优化模型副本路径
+
+    The copy is keyed by execution provider, since an optimized graph may hold
+    nodes only that provider can run.
+    副本按执行提供者区分，因为优化后的计算图可能包含仅该提供者可执行的节点。
+
+    e.g. models/distilgpt2.int8.onnx -> models/optimized/distilgpt2.int8.cpu.opt.onnx
+    """
+    tag = provider.replace("ExecutionProvider", "").lower() or "cpu"
+    return model_path.parent / "optimized" / f"{model_path.stem}.{tag}.opt.onnx"
+
+
+def _resolve_variant(variant: str) -> str:
+    """
+    Resolve the requested variant to one whose model file exists
+    将请求的变体解析为模型文件实际存在的变体
+
+    Unknown or missing variants fall back to fp32 so a misconfigured node
+    still produces true PPL instead of dropping to the zlib proxy.
+    未知或缺失的变体回退到fp32，使配置错误的节点仍能计算真实PPL而非回退到zlib代理。
+    """
+    if variant not in PPL_MODEL_VARIANTS:
+        logger.warning(f"Unknown PPL model variant '{variant}', using fp32")
+        return "fp32"
+
+    model_path, _ = _get_model_paths(variant)
+    if variant != "fp32" and not model_path.exists():
+        logger.warning(
+            f"PPL model variant '{variant}' not found at {model_path}. "
+            f"Run 'python scripts/download_onnx_model.py --variants {variant}' to build it. "
+            f"Using fp32."
+        )
+        return "fp32"
+    return variant
+
+
+def _load_tokenizer(tokenizer_path: Path):
+    """
+    Load tokenizer from tokenizers library, fallback to transformers
+    从 tokenizers 库加载分词器，回退到 transformers
+
+    Returns:
+        Tokenizer instance or None if unavailable
+    """
+    # Try to load tokenizer from tokenizers library first, fallback to transformers
+    # 首先尝试从 tokenizers 库加载分词器，回退到 transformers
+    try:
+        from tokenizers import Tokenizer
+        if tokenizer_path.exists():
+            logger.debug("Using fast tokenizer from tokenizers library")
+            return Tokenizer.from_file(str(tokenizer_path))
+        raise FileNotFoundError("tokenizer.json not found")
+    except (ImportError, FileNotFoundError):
+        # Fallback to transformers tokenizer (already installed in project)
+        # 回退到 transformers 分词器（项目已安装）
+        try:
+            from transformers import GPT2TokenizerFast
+            logger.debug("Using tokenizer from transformers library")
+            return GPT2TokenizerFast.from_pretrained("distilgpt2")
+        except Exception as e:
+            logger.warning(
+                f"Cannot load tokenizer: {e}. "
+                f"Falling back to zlib compression ratio."
+            )
+            return None
+
+
+def create_ppl_session(
+    model_path: Path,
+    serialize_optimized: Optional[bool] = None,
+    intra_op_threads: int = 2
+):
+    """
+    Create an ONNX Runtime session for a PPL model
+    为PPL模型创建ONNX Runtime会话
+
+    When serialize_optimized is enabled, the first start writes the
+    extended-level optimized graph (one file per execution provider) via
+    SessionOptions.optimized_model_filepath; later starts load that file
+    directly with graph optimization disabled, skipping the optimization pass.
+    启用 serialize_optimized 时，首次启动通过 optimized_model_filepath 写出
+    EXTENDED 级别优化后的计算图（每个执行提供者一个文件）；之后的启动直接加载该文件并关闭图优化，完全跳过优化阶段。
+
+    Args:
+        model_path: Path of the source ONNX model
+        serialize_optimized: Override settings.ppl_serialize_optimized_graph
+        intra_op_threads: Threads used inside one inference call
+
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    import onnxruntime as ort
+
+    if serialize_optimized is None:
+        serialize_optimized = get_settings().ppl_serialize_optimized_graph
+
+    # Configure ONNX Runtime session with optimizations
+    # 配置带优化的ONNX Runtime会话
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = intra_op_threads
+    sess_options.inter_op_num_threads = 1
+    # Idle pooled sessions must not spin-wait and steal cores from busy ones
+    # 空闲的池化会话不应自旋等待而占用繁忙会话的CPU核心
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+    # Try to use GPU if available, fallback to CPU
+    # 如果可用则尝试使用GPU，否则回退到CPU
+    providers = ['CPUExecutionProvider']
+    try:
+        if 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
+    except Exception:
+        pass
+
+    load_path = model_path
+    optimized_path = _get_optimized_model_path(model_path, providers[0])
+    if serialize_optimized and optimized_path.exists() and (
+        optimized_path.stat().st_mtime >= model_path.stat().st_mtime
+    ):
+        # Pre-optimized graph is up to date: load it as-is
+        # 预优化计算图是最新的：直接加载
+        load_path = optimized_path
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    elif serialize_optimized:
+        # Serialize at EXTENDED: ENABLE_ALL adds layout transforms tied to the
+        # current hardware, which ORT advises against saving to disk
+        # 以 EXTENDED 级别序列化：ENABLE_ALL 会加入与当前硬件绑定的布局变换，
+        # ORT 不建议将其保存到磁盘
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        try:
+            optimized_path.parent.mkdir(parents=True, exist_ok=True)
+            sess_options.optimized_model_filepath = str(optimized_path)
+        except OSError as e:
+            logger.warning(f"Cannot serialize optimized PPL graph to {optimized_path}: {e}")
+    else:
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    session = ort.InferenceSession(
+        str(load_path),
+        sess_options,
+        providers=providers
+    )
+    logger.debug(f"ONNX session created from {load_path}")
+    return session
+
+
+def _available_cpus() -> int:
+    """
+    Number of CPUs this process may run on (respects container affinity)
+    本进程可用的CPU数量（考虑容器CPU亲和性）
+    """
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
+
+
+def get_pool_dimensions() -> Tuple[int, int]:
+    """
+    Size the session pool from CPU count and configuration
+    根据CPU数量和配置确定会话池大小
+
+    pool_size * intra_op_threads is kept at or below the CPU count so
+    concurrent PPL calls never oversubscribe cores; extra calls queue instead.
+    Each session holds its own copy of the weights, so the automatic size is
+    capped at settings.ppl_session_pool_max.
+    pool_size * intra_op_threads 不超过CPU数量，使并发PPL调用不会超额占用核心；
+    多余的调用排队等待。每个会话持有一份权重副本，因此自动大小受
+    settings.ppl_session_pool_max 限制。
+
+    Returns:
+        Tuple of (pool_size, intra_op_threads)
+    """
+    settings = get_settings()
+    cpus = _available_cpus()
+
+    threads = settings.ppl_intra_op_threads
+    if threads <= 0:
+        threads = 1 if cpus < 4 else 2
+    threads = min(threads, cpus)
+
+    size = settings.ppl_session_pool_size
+    if size <= 0:
+        size = max(1, min(cpus // threads, settings.ppl_session_pool_max))
+
+    return size, threads
+
+
+class PPLPoolMetrics:
+    """
+    Queue depth and inference latency histogram for the PPL session pool
+    PPL会话池的队列深度和推理延迟直方图
+    """
+
+    # Upper bounds in milliseconds; the last bucket is +Inf
+    # 上界（毫秒）；最后一个桶为 +Inf
+    LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.inference_count = 0
+        self.inference_ms_sum = 0.0
+        self.wait_ms_sum = 0.0
+        self.timeouts = 0
+        self.errors = 0
+        self.bucket_counts: List[int] = [0] * (len(self.LATENCY_BUCKETS_MS) + 1)
+
+    def enter_queue(self):
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def leave_queue(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            self.queue_depth -= 1
+            self.wait_ms_sum += wait_ms
+            if timed_out:
+                self.timeouts += 1
+
+    def observe(self, latency_ms: float, failed: bool = False):
+        with self._lock:
+            self.inference_count += 1
+            self.inference_ms_sum += latency_ms
+            if failed:
+                self.errors += 1
+            for i, bound in enumerate(self.LATENCY_BUCKETS_MS):
+                if latency_ms <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [str(b) for b in self.LATENCY_BUCKETS_MS] + ["+Inf"]
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "inference_count": self.inference_count,
+                "inference_ms_avg": (
+                    round(self.inference_ms_sum / self.inference_count, 2)
+                    if self.inference_count else 0.0
+                ),
+                "wait_ms_avg": (
+                    round(self.wait_ms_sum / self.inference_count, 2)
+                    if self.inference_count else 0.0
+                ),
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "latency_histogram_ms": dict(zip(labels, self.bucket_counts)),
+            }
+
+
+def _on_event_loop() -> bool:
+    """True when called on a thread that is running an asyncio event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class PPLSessionPool:
+    """
+    Fixed-size pool of ONNX sessions with blocking checkout
+    固定大小的ONNX会话池，签出时阻塞等待
+
+    Each session runs one inference at a time with its own intra-op thread
+    budget, so throughput scales with cores instead of all requests contending
+    inside a single shared session.
+    每个会话一次只运行一个推理并拥有独立的线程预算，吞吐量随核心数扩展，
+    而不是所有请求争用同一个共享会话。
+    """
+
+    def __init__(self, model_path: Path, size: int, intra_op_threads: int):
+        self.model_path = model_path
+        self.size = size
+        self.intra_op_threads = intra_op_threads
+        self.metrics = PPLPoolMetrics()
+        self._sessions: "queue.Queue" = queue.Queue()
+        self._all_sessions = []
+
+        for _ in range(size):
+            session = create_ppl_session(model_path, intra_op_threads=intra_op_threads)
+            self._all_sessions.append(session)
+            self._sessions.put(session)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Check out a session, waiting in queue if all are busy
+        签出一个会话，全部繁忙时排队等待
+
+        Callers should run inference in a worker thread (asyncio.to_thread).
+        On an event loop thread the checkout never waits: a busy pool raises
+        TimeoutError at once (callers then use the zlib fallback) instead of
+        freezing every request of the worker.
+        调用方应在工作线程中运行推理（asyncio.to_thread）。在事件循环线程上签出从不等待：
+        池繁忙时立即抛出 TimeoutError（调用方随后使用 zlib 后备），而不是冻结工作进程的所有请求。
+
+        Raises:
+            TimeoutError: No session became free within timeout
+        """
+        if _on_event_loop():
+            timeout = 0
+        self.metrics.enter_queue()
+        start = time.perf_counter()
+        try:
+            session = self._sessions.get(timeout=timeout) if timeout != 0 else self._sessions.get_nowait()
+        except queue.Empty:
+            self.metrics.leave_queue((time.perf_counter() - start) * 1000, timed_out=True)
+            raise TimeoutError(f"No PPL session free within {timeout}s")
+        self.metrics.leave_queue((time.perf_counter() - start) * 1000)
+
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def providers(self) -> List[str]:
+        return self._all_sessions[0].get_providers() if self._all_sessions else []
+
+    def info(self) -> dict:
+        return {
+            "size": self.size,
+            "intra_op_threads": self.intra_op_threads,
+            **self.metrics.snapshot(),
+        }
+
+
 def _lazy_load_model() -> bool:
     """
     Lazy load ONNX model and tokenizer (one-time initialization)
     懒加载ONNX模型和分词器（一次性初始化）
 
-    Uses singleton pattern to ensure model is loaded only once.
-    使用单例模式确保模型只加载一次。
+    Uses singleton pattern to ensure model is loaded only once, also when
+    the startup preload and a request race for it.
+    The variant is chosen by settings.ppl_model_variant.
+    使用单例模式确保模型只加载一次（启动预加载与请求并发时亦然）。
+    变体由 settings.ppl_model_variant 选择。
 
     Returns:
         True if model is available, False otherwise
     """
-    global _onnx_session, _tokenizer, _model_available
-
     # Return cached result if already attempted
     # 如果已经尝试过，返回缓存结果
     if _model_available is not None:
         return _model_available
 
+    with _load_lock:
+        if _model_available is None:
+            _load_model_locked()
+    return _model_available
+
+
+def _load_model_locked() -> bool:
+    """
+    Load ONNX model and tokenizer (caller holds _load_lock)
+    加载ONNX模型和分词器（调用方持有 _load_lock）
+    """
+    global _session_pool, _tokenizer, _model_available, _loaded_variant
+
     try:
         # Import optional dependencies
         # 导入可选依赖
-        import onnxruntime as ort
+        import onnxruntime  # noqa: F401
 
-        model_path, tokenizer_path = _get_model_paths()
+        variant = _resolve_variant(get_settings().ppl_model_variant)
+        model_path, tokenizer_path = _get_model_paths(variant)
 
         # Check if model files exist
         # 检查模型文件是否存在
@@ -94,56 +484,20 @@ def _lazy_load_model() -> bool:
             _model_available = False
             return False
 
-        # Try to load tokenizer from tokenizers library first, fallback to transformers
-        # 首先尝试从 tokenizers 库加载分词器，回退到 transformers
-        try:
-            from tokenizers import Tokenizer
-            if tokenizer_path.exists():
-                _tokenizer = Tokenizer.from_file(str(tokenizer_path))
-                logger.debug("Using fast tokenizer from tokenizers library")
-            else:
-                raise FileNotFoundError("tokenizer.json not found")
-        except (ImportError, FileNotFoundError):
-            # Fallback to transformers tokenizer (already installed in project)
-            # 回退到 transformers 分词器（项目已安装）
-            try:
-                from transformers import GPT2TokenizerFast
-                _tokenizer = GPT2TokenizerFast.from_pretrained("distilgpt2")
-                logger.debug("Using tokenizer from transformers library")
-            except Exception as e:
-                logger.warning(
-                    f"Cannot load tokenizer: {e}. "
-                    f"Falling back to zlib compression ratio."
-                )
-                _model_available = False
-                return False
-
-        # Configure ONNX Runtime session with optimizations
-        # 配置带优化的ONNX Runtime会话
-        sess_options = ort.SessionOptions()
-        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-        sess_options.intra_op_num_threads = 2  # Limit threads for responsiveness
-        sess_options.inter_op_num_threads = 1
+        _tokenizer = _load_tokenizer(tokenizer_path)
+        if _tokenizer is None:
+            _model_available = False
+            return False
 
-        # Try to use GPU if available, fallback to CPU
-        # 如果可用则尝试使用GPU，否则回退到CPU
-        providers = ['CPUExecutionProvider']
-        try:
-            if 'CUDAExecutionProvider' in ort.get_available_providers():
-                providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
-        except Exception:
-            pass
-
-        _onnx_session = ort.InferenceSession(
-            str(model_path),
-            sess_options,
-            providers=providers
-        )
+        pool_size, intra_op_threads = get_pool_dimensions()
+        _session_pool = PPLSessionPool(model_path, pool_size, intra_op_threads)
+        _loaded_variant = variant
         _model_available = True
 
         logger.info(
-            f"ONNX PPL model loaded successfully from {model_path}. "
-            f"Using providers: {_onnx_session.get_providers()}"
+            f"ONNX PPL model ({variant}) loaded successfully from {model_path}: "
+            f"{pool_size} session(s) x {intra_op_threads} thread(s). "
+            f"Using providers: {_session_pool.providers()}"
         )
         return True
 
@@ -162,6 +516,126 @@ def _lazy_load_model() -> bool:
         return False
 
 
+def _encode(tokenizer, text: str) -> list:
+    """
+    Tokenize text - handle both tokenizers library and transformers
+    对文本进行分词 - 处理 tokenizers 库和 transformers 两种情况
+    """
+    try:
+        # Try tokenizers library format first
+        # 首先尝试 tokenizers 库格式
+        encoding = tokenizer.encode(text)
+        if hasattr(encoding, 'ids'):
+            # tokenizers library
+            return encoding.ids
+        # transformers library returns list directly
+        return encoding
+    except Exception:
+        # transformers tokenizer
+        return tokenizer.encode(text)
+
+
+def _build_input_feed(session, input_ids) -> Dict[str, Any]:
+    """
+    Build the input feed expected by the session
+    构建会话所需的输入
+
+    Supports both the plain `input_ids -> logits` export produced by
+    scripts/download_onnx_model.py and Transformers.js-style models with
+    attention_mask/position_ids/past_key_values inputs. Empty past tensors use
+    the dtype declared by the model, so fp16 KV models are fed float16.
+    同时支持 download_onnx_model.py 导出的 `input_ids -> logits` 模型和带
+    attention_mask/position_ids/past_key_values 输入的 Transformers.js 风格模型。
+    空的past张量使用模型声明的数据类型，因此fp16 KV模型会接收float16输入。
+    """
+    import numpy as np
+
+    seq_len = input_ids.shape[1]
+    input_feed: Dict[str, Any] = {}
+
+    for model_input in session.get_inputs():
+        name = model_input.name
+        if name == "input_ids":
+            input_feed[name] = input_ids
+        elif name == "attention_mask":
+            # attention_mask: all 1s for the full sequence
+            # 注意力掩码：整个序列都是1
+            input_feed[name] = np.ones((1, seq_len), dtype=np.int64)
+        elif name == "position_ids":
+            # position_ids: 0, 1, 2, ... for each position
+            # 位置ID：每个位置0, 1, 2, ...
+            input_feed[name] = np.arange(seq_len, dtype=np.int64).reshape(1, -1)
+        elif name.startswith("past_key_values"):
+            # past_key_values: empty tensors (no past context for PPL calculation)
+            # 过去的键值：空张量（PPL计算没有过去上下文）
+            dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+            input_feed[name] = np.zeros((1, _NUM_HEADS, 0, _HEAD_DIM), dtype=dtype)
+
+    return input_feed
+
+
+def compute_ppl(session, tokenizer, text: str, max_length: int = 512) -> Optional[float]:
+    """
+    Compute perplexity of text with an explicit session and tokenizer
+    使用指定的会话和分词器计算文本困惑度
+
+    Used by calculate_onnx_ppl and by the variant evaluation harness
+    (scripts/evaluate_ppl_variants.py) to compare variants side by side.
+    供 calculate_onnx_ppl 和变体评估脚本（scripts/evaluate_ppl_variants.py）使用。
+
+    Returns:
+        Perplexity value, or None if the text has fewer than 2 tokens
+    """
+    import numpy as np
+
+    input_ids = _encode(tokenizer, text)
+
+    # Need at least 2 tokens for PPL calculation (predict next from current)
+    # 需要至少2个token进行PPL计算（从当前预测下一个）
+    if len(input_ids) < 2:
+        logger.debug("Not enough tokens for PPL calculation")
+        return None
+
+    # Truncate to max_length if necessary
+    # 如果需要，截断到最大长度
+    if len(input_ids) > max_length:
+        input_ids = input_ids[:max_length]
+
+    # Convert to numpy array with batch dimension
+    # 转换为带批次维度的numpy数组
+    input_array = np.array([input_ids], dtype=np.int64)
+
+    # Run inference with all required inputs
+    # 使用所有必需的输入运行推理
+    outputs = session.run(None, _build_input_feed(session, input_array))
+    # Shape: [batch, seq_len, vocab_size]; upcast fp16 logits for a stable softmax
+    # 形状: [batch, seq_len, vocab_size]；将fp16 logits提升精度以保证softmax稳定
+    logits = outputs[0].astype(np.float32, copy=False)
+
+    # Calculate cross-entropy loss for perplexity
+    # 计算交叉熵损失用于困惑度
+    # Shift: predict next token from current position
+    # 移位：从当前位置预测下一个token
+    shift_logits = logits[0, :-1, :]  # [seq_len-1, vocab_size]
+    shift_labels = input_array[0, 1:]  # [seq_len-1]
+
+    # log p(token) = logit(token) - logsumexp(logits), computed only for the
+    # target tokens instead of materializing the full log-softmax matrix
+    # log p(token) = logit(token) - logsumexp(logits)，仅对目标token计算，
+    # 不生成完整的log-softmax矩阵
+    max_logits = np.max(shift_logits, axis=-1)
+    log_sum_exp = max_logits + np.log(
+        np.sum(np.exp(shift_logits - max_logits[:, None]), axis=-1)
+    )
+    target_logits = shift_logits[np.arange(shift_labels.shape[0]), shift_labels]
+    token_log_probs = target_logits - log_sum_exp
+
+    # Perplexity = exp(-mean(log_probs))
+    # 困惑度 = exp(-mean(log_probs))
+    avg_neg_log_prob = -float(np.mean(token_log_probs))
+    return math.exp(avg_neg_log_prob)
+
+
 def calculate_onnx_ppl(text: str, max_length: int = 512) -> Tuple[Optional[float], bool]:
     """
     Calculate true perplexity using ONNX model
@@ -196,114 +670,24 @@ def calculate_onnx_ppl(text: str, max_length: int = 512) -> Tuple[Optional[float
         return None, False
 
     try:
-        import numpy as np
-
-        # Tokenize the text - handle both tokenizers library and transformers
-        # 对文本进行分词 - 处理 tokenizers 库和 transformers 两种情况
-        try:
-            # Try tokenizers library format first
-            # 首先尝试 tokenizers 库格式
-            encoding = _tokenizer.encode(text)
-            if hasattr(encoding, 'ids'):
-                # tokenizers library
-                input_ids = encoding.ids
-            else:
-                # transformers library returns list directly
-                input_ids = encoding
-        except Exception:
-            # transformers tokenizer
-            input_ids = _tokenizer.encode(text)
-
-        # Need at least 2 tokens for PPL calculation (predict next from current)
-        # 需要至少2个token进行PPL计算（从当前预测下一个）
-        if len(input_ids) < 2:
-            logger.debug("Not enough tokens for PPL calculation")
+        with _session_pool.acquire(timeout=get_settings().ppl_queue_timeout_seconds) as session:
+            start = time.perf_counter()
+            failed = True
+            try:
+                with span("ppl.onnx"):
+                    ppl = compute_ppl(session, _tokenizer, text, max_length)
+                failed = False
+            finally:
+                _session_pool.metrics.observe((time.perf_counter() - start) * 1000, failed)
+        if ppl is None:
             return None, False
 
-        # Truncate to max_length if necessary
-        # 如果需要，截断到最大长度
-        if len(input_ids) > max_length:
-            input_ids = input_ids[:max_length]
-
-        # Convert to numpy array with batch dimension
-        # 转换为带批次维度的numpy数组
-        seq_len = len(input_ids)
-        input_array = np.array([input_ids], dtype=np.int64)
-
-        # Prepare additional inputs for Transformers.js-style ONNX model
-        # 为 Transformers.js 风格的 ONNX 模型准备额外输入
-        # attention_mask: all 1s for the full sequence
-        # 注意力掩码：整个序列都是1
-        attention_mask = np.ones((1, seq_len), dtype=np.int64)
-
-        # position_ids: 0, 1, 2, ... for each position
-        # 位置ID：每个位置0, 1, 2, ...
-        position_ids = np.arange(seq_len, dtype=np.int64).reshape(1, -1)
-
-        # past_key_values: empty tensors (no past context)
-        # 过去的键值：空张量（没有过去的上下文）
-        # distilgpt2 has 6 layers, each with 12 heads, head_dim=64
-        # distilgpt2有6层，每层12个头，head_dim=64
-        num_layers = 6
-        num_heads = 12
-        head_dim = 64
-        past_seq_len = 0  # No past context for PPL calculation / PPL计算没有过去上下文
-
-        # Build input feed with all required tensors
-        # 构建包含所有必需张量的输入
-        input_feed = {
-            "input_ids": input_array,
-            "attention_mask": attention_mask,
-            "position_ids": position_ids,
-        }
-
-        # Add empty past_key_values for each layer
-        # 为每一层添加空的past_key_values
-        for i in range(num_layers):
-            input_feed[f"past_key_values.{i}.key"] = np.zeros(
-                (1, num_heads, past_seq_len, head_dim), dtype=np.float32
-            )
-            input_feed[f"past_key_values.{i}.value"] = np.zeros(
-                (1, num_heads, past_seq_len, head_dim), dtype=np.float32
-            )
-
-        # Run inference with all required inputs
-        # 使用所有必需的输入运行推理
-        outputs = _onnx_session.run(None, input_feed)
-        logits = outputs[0]  # Shape: [batch, seq_len, vocab_size]
-
-        # Calculate cross-entropy loss for perplexity
-        # 计算交叉熵损失用于困惑度
-        # Shift: predict next token from current position
-        # 移位：从当前位置预测下一个token
-        shift_logits = logits[:, :-1, :]  # [batch, seq_len-1, vocab_size]
-        shift_labels = input_array[:, 1:]  # [batch, seq_len-1]
-
-        # Compute log softmax for numerical stability
-        # 为数值稳定性计算log softmax
-        # log_softmax(x) = x - log(sum(exp(x)))
-        max_logits = np.max(shift_logits, axis=-1, keepdims=True)
-        exp_logits = np.exp(shift_logits - max_logits)
-        sum_exp_logits = np.sum(exp_logits, axis=-1, keepdims=True)
-        log_probs = shift_logits - max_logits - np.log(sum_exp_logits)
-
-        # Get log probability of actual tokens
-        # 获取实际token的对数概率
-        token_log_probs = []
-        for i, token_id in enumerate(shift_labels[0]):
-            token_log_probs.append(log_probs[0, i, token_id])
-
-        # Perplexity = exp(-mean(log_probs))
-        # 困惑度 = exp(-mean(log_probs))
-        avg_neg_log_prob = -np.mean(token_log_probs)
-        ppl = math.exp(avg_neg_log_prob)
-
         # Sanity check: PPL should be reasonable (typically 5-500 for real text)
         # 健全性检查：PPL应该在合理范围内（真实文本通常为5-500）
         if ppl < 1.0 or ppl > 10000:
             logger.warning(f"Unusual PPL value: {ppl}. May indicate model issue.")
 
-        logger.debug(f"ONNX PPL calculated: {ppl:.2f} for {len(input_ids)} tokens")
+        logger.debug(f"ONNX PPL calculated: {ppl:.2f} ({_loaded_variant})")
         return ppl, True
 
     except Exception as e:
@@ -336,12 +720,44 @@ def get_model_info() -> dict:
             "reason": "Model not loaded or dependencies missing"
         }
 
-    model_path, tokenizer_path = _get_model_paths()
+    model_path, tokenizer_path = _get_model_paths(_loaded_variant)
+    providers = _session_pool.providers() if _session_pool else []
+    optimized_path = _get_optimized_model_path(model_path, *providers[:1])
 
     return {
         "available": True,
+        "variant": _loaded_variant,
         "model_path": str(model_path),
+        "optimized_model_path": str(optimized_path) if optimized_path.exists() else None,
         "tokenizer_path": str(tokenizer_path),
-        "providers": _onnx_session.get_providers() if _onnx_session else [],
+        "providers": providers,
+        "pool": _session_pool.info() if _session_pool else None,
         "model_type": "distilgpt2"
     }
+
+
+def warmup_ppl_sessions(text: str) -> None:
+    """
+    Run one inference on every pooled session
+    在每个池化会话上运行一次推理
+
+    Holds one session at a time, so requests served while the background
+    preload runs are never starved. The pool queue is FIFO: a session goes
+    back to the tail, so successive checkouts cycle through all of them
+    (sessions taken by concurrent requests are warmed by those requests).
+    每次只持有一个会话，后台预加载期间处理的请求不会因此饥饿。池队列为先进先出：会话归还到队尾，
+    因此连续签出会轮遍所有会话（被并发请求取走的会话由这些请求预热）。
+    """
+    if not _lazy_load_model():
+        return
+    for _ in range(_session_pool.size):
+        with _session_pool.acquire(timeout=get_settings().ppl_queue_timeout_seconds) as session:
+            compute_ppl(session, _tokenizer, text)
+
+
+def get_pool_metrics() -> Optional[dict]:
+    """
+    Get session pool metrics (None if the ONNX model is not loaded)
+    获取会话池指标（ONNX模型未加载时为None）
+    """
+    return _session_pool.info() if _session_pool else None
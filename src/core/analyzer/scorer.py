@@ -17,10 +17,13 @@ import zlib
 import re
 
 from src.config import get_settings, get_risk_weights
-from src.core.analyzer.fingerprint import FingerprintMatch, FingerprintDetector
+from src.core.analyzer.fingerprint import FingerprintMatch
 from src.core.analyzer.burstiness import BurstinessAnalyzer, BurstinessResult
 from src.core.analyzer.connector_detector import ConnectorDetector, ConnectorAnalysisResult, ConnectorMatch
 from src.core.analyzer.ppl_calculator import calculate_onnx_ppl, is_onnx_available
+from src.core.component_registry import get_fingerprint_detector
+from src.core.lexicon_registry import get_lexicon
+from src.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -30,6 +33,10 @@ risk_weights = get_risk_weights()
 # Tiered fingerprint words for improved detection
 # 分级指纹词用于改进检测
 
+# Built-in tiers; at runtime read get_lexicon().level_1 / .level_2, which
+# extend these with JSON/DB entries (see src/core/lexicon_registry.py)
+# 内置分级；运行时读取 get_lexicon().level_1 / .level_2，其在此基础上叠加JSON/数据库条目
+
 # Level 1: Dead giveaways - extremely rare in human writing (+40 points each)
 # 一级：确凿证据 - 人类写作中极少见（每个+40分）
 LEVEL_1_FINGERPRINTS: Set[str] = {
@@ -147,10 +154,11 @@ def classify_fingerprint_type(word: str) -> str:
     Type C: Structural connectors (furthermore, moreover, etc.)
     """
     word_lower = word.lower()
+    level_1 = get_lexicon().level_1
 
     # Type A: Level 1 fingerprints are always dead giveaways
     # A类: 一级指纹词始终是确凿证据
-    if word_lower in LEVEL_1_FINGERPRINTS or any(fp in word_lower for fp in LEVEL_1_FINGERPRINTS):
+    if word_lower in level_1 or any(fp in word_lower for fp in level_1):
         return "type_a"
 
     # Type C: Connectors and structural words
@@ -323,6 +331,65 @@ class SentenceAnalysisResult:
     gptzero_issues: List[str] = field(default_factory=list)
     gptzero_issues_zh: List[str] = field(default_factory=list)
 
+    # Lexicon snapshot version used for this result (cache key component)
+    # 本结果使用的词库快照版本（缓存键组成部分）
+    lexicon_version: str = ""
+
+    # Scoring profile that produced this result; score_exact is False when a
+    # prefilter decided the threshold without computing PPL (risk_score is then
+    # a bound on the correct side of the threshold, see ScoringProfile)
+    # 产生此结果的评分配置；预筛选未计算PPL即判定阈值时 score_exact 为 False
+    # （此时 risk_score 是位于阈值正确一侧的界限值，见 ScoringProfile）
+    profile: str = "full"
+    score_exact: bool = True
+
+
+# Largest PPL contribution to the total score (see RiskScorer.analyze)
+# PPL 对总分的最大贡献（见 RiskScorer.analyze）
+PPL_CONTRIBUTION_MAX = 20
+
+# Default decision threshold of the prefilter profile (YOLO skips below it)
+# 预筛选配置的默认判定阈值（YOLO 跳过低于该值的句子）
+PREFILTER_THRESHOLD = 25
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """
+    Which parts of RiskScorer.analyze to compute
+    RiskScorer.analyze 需要计算的部分
+
+    The total score only depends on fingerprints, structure, human deduction
+    and PPL. Burstiness, connectors and the Turnitin/GPTZero views are
+    reported alongside it, so callers that only need the number can skip them.
+    With early_exit, PPL (the expensive component, bounded to
+    0..PPL_CONTRIBUTION_MAX points) is only computed when the cheap components
+    cannot decide "score < threshold" on their own.
+    总分只取决于指纹词、结构、人类特征减分和PPL。突发性、连接词以及 Turnitin/GPTZero
+    视角只是附带报告，只需要分数的调用方可以跳过它们。启用 early_exit 时，仅当廉价组件
+    无法单独判定 "分数 < 阈值" 时才计算PPL（开销最大的组件，贡献为 0..PPL_CONTRIBUTION_MAX 分）。
+    """
+    name: str
+    burstiness: bool = True
+    connectors: bool = True
+    detector_views: bool = True
+    early_exit: bool = False
+
+
+SCORING_PROFILES: Dict[str, ScoringProfile] = {
+    # Everything: upload analysis, sentence cards, detector views
+    # 全部计算：上传分析、句子卡片、检测器视角
+    "full": ScoringProfile("full"),
+    # Exact risk_score/risk_level only: candidate validation, quality gate
+    # 仅精确的 risk_score/risk_level：候选验证、质量门控
+    "score_only": ScoringProfile("score_only", burstiness=False, connectors=False, detector_views=False),
+    # "Is risk < threshold?" with early exit: YOLO pre-filter
+    # 带提前退出的 "风险 < 阈值?"：YOLO 预筛选
+    "prefilter": ScoringProfile(
+        "prefilter", burstiness=False, connectors=False, detector_views=False, early_exit=True
+    ),
+}
+
 
 class RiskScorer:
     """
@@ -339,7 +406,7 @@ class RiskScorer:
 
     def __init__(self):
         """Initialize risk scorer"""
-        self.fingerprint_detector = FingerprintDetector()
+        self.fingerprint_detector = get_fingerprint_detector()
         self.burstiness_analyzer = BurstinessAnalyzer()
         self.connector_detector = ConnectorDetector()
         self.weights = {
@@ -349,6 +416,7 @@ class RiskScorer:
             "structure": risk_weights.structure
         }
 
+    @traced("scorer.analyze")
     def analyze(
         self,
         text: str,
@@ -359,7 +427,9 @@ class RiskScorer:
         tone_level: int = 4,
         whitelist: Optional[Set[str]] = None,
         context_baseline: int = 0,
-        paragraph_context: Optional[ParagraphContext] = None
+        paragraph_context: Optional[ParagraphContext] = None,
+        profile: str = "full",
+        threshold: int = PREFILTER_THRESHOLD
     ) -> SentenceAnalysisResult:
         """
         Perform complete risk analysis on text (CAASS v2.0 Phase 2)
@@ -375,10 +445,14 @@ class RiskScorer:
             whitelist: Domain-specific terms to exempt from scoring
             context_baseline: Pre-calculated paragraph context baseline (0-25)
             paragraph_context: Full paragraph context for baseline calculation
+            profile: Scoring profile name (see SCORING_PROFILES)
+            threshold: Decision threshold for early-exit profiles
 
         Returns:
             SentenceAnalysisResult with all scores and issues
         """
+        scoring = SCORING_PROFILES[profile]
+
         # Phase 2: Calculate context baseline from paragraph if provided
         # 第二阶段：如果提供了段落上下文，计算上下文基准分
         if paragraph_context is not None:
@@ -386,19 +460,6 @@ class RiskScorer:
         issues = []
         whitelist = whitelist or set()
 
-        # Calculate PPL score (used for context baseline in future)
-        # 计算PPL分数（未来用于上下文基准）
-        ppl = self._calculate_ppl(text)
-        ppl_score, ppl_risk = self._score_ppl(ppl)
-
-        if ppl_risk in ["medium", "high"]:
-            issues.append(Issue(
-                type="ppl",
-                description=f"Low perplexity ({ppl:.1f}) indicates predictable AI-like text",
-                description_zh=f"低困惑度 ({ppl:.1f}) 表明文本可预测性高，类似AI生成",
-                severity=ppl_risk
-            ))
-
         # Detect fingerprints
         # 检测指纹词
         if fingerprints is None:
@@ -434,15 +495,21 @@ class RiskScorer:
 
         # Calculate burstiness score (Phase 2: Enhanced with BurstinessAnalyzer)
         # 计算突发性分数（第二阶段：使用BurstinessAnalyzer增强）
-        burstiness_score = self._score_burstiness(text, context_sentences)
-        burstiness_result = self._analyze_burstiness_enhanced(context_sentences)
-        burstiness_value = burstiness_result.burstiness_score if burstiness_result else 0.0
-        burstiness_risk = burstiness_result.risk_level if burstiness_result else "unknown"
+        burstiness_score = 0
+        burstiness_value = 0.0
+        burstiness_risk = "unknown"
+        if scoring.burstiness:
+            burstiness_score = self._score_burstiness(text, context_sentences)
+            burstiness_result = self._analyze_burstiness_enhanced(context_sentences)
+            burstiness_value = burstiness_result.burstiness_score if burstiness_result else 0.0
+            burstiness_risk = burstiness_result.risk_level if burstiness_result else "unknown"
 
         # Phase 2: Detect explicit connectors
         # 第二阶段：检测显性连接词
-        connector_match = self.connector_detector.analyze_single_sentence(text)
+        connector_match = None
         connector_score = 0
+        if scoring.connectors:
+            connector_match = self.connector_detector.analyze_single_sentence(text)
         if connector_match:
             # Add connector issue
             # 添加连接词问题
@@ -467,6 +534,30 @@ class RiskScorer:
         # CAASS v2.0 第二阶段: 带上下文基准和ONNX PPL的评分公式
         # Score = Context_baseline + FP_absolute + Structure_patterns + PPL_contribution - Human_bonus
         # 评分 = 上下文基准分 + 指纹词绝对分 + 结构模式分 + PPL贡献分 - 人类特征减分
+        partial_score = context_baseline + fingerprint_score + structure_score - human_deduction
+
+        # Early exit: PPL adds 0..PPL_CONTRIBUTION_MAX, so the cheap components
+        # alone may already decide which side of the threshold the score is on
+        # 提前退出：PPL 贡献 0..PPL_CONTRIBUTION_MAX 分，廉价组件可能已能判定分数位于阈值哪一侧
+        score_exact = True
+        if scoring.early_exit and (
+            partial_score >= threshold or partial_score + PPL_CONTRIBUTION_MAX < threshold
+        ):
+            score_exact = False
+            ppl, ppl_score, ppl_risk = 0.0, 0, "unknown"
+        else:
+            # Calculate PPL score (used for context baseline in future)
+            # 计算PPL分数（未来用于上下文基准）
+            ppl = self._calculate_ppl(text)
+            ppl_score, ppl_risk = self._score_ppl(ppl)
+
+            if ppl_risk in ["medium", "high"]:
+                issues.insert(0, Issue(
+                    type="ppl",
+                    description=f"Low perplexity ({ppl:.1f}) indicates predictable AI-like text",
+                    description_zh=f"低困惑度 ({ppl:.1f}) 表明文本可预测性高，类似AI生成",
+                    severity=ppl_risk
+                ))
 
         # Calculate PPL contribution to score (0-20 points)
         # 计算PPL对分数的贡献（0-20分）
@@ -476,7 +567,7 @@ class RiskScorer:
         if ppl_risk == "high":
             # PPL < 20: AI-like, add 15-20 points
             # PPL < 20: AI特征，加15-20分
-            ppl_contribution = min(20, int(ppl_score * 0.22))
+            ppl_contribution = min(PPL_CONTRIBUTION_MAX, int(ppl_score * 0.22))
         elif ppl_risk == "medium":
             # PPL 20-40: Somewhat AI-like, add 5-15 points
             # PPL 20-40: 有些AI特征，加5-15分
@@ -484,18 +575,16 @@ class RiskScorer:
         # ppl_risk == "low": PPL > 40, human-like, no addition
         # ppl_risk == "low": PPL > 40，人类特征，不加分
 
-        raw_score = context_baseline + fingerprint_score + structure_score + ppl_contribution
-
         # Apply human deduction (but don't go below 0)
         # 应用人类减分（但不低于0）
-        total_score = max(0, min(100, raw_score - human_deduction))
+        total_score = max(0, min(100, partial_score + ppl_contribution))
 
         # Log scoring details for debugging
         # 记录评分详情用于调试
         logger.debug(
             f"CAASS v2.0 Phase 2: Ctx={context_baseline}, FP={fingerprint_score}, "
             f"Struct={structure_score}, PPL={ppl_contribution}(raw={ppl:.1f}), Human=-{human_deduction}, "
-            f"Total={total_score}, Tone={tone_level}"
+            f"Total={total_score}, Tone={tone_level}, Profile={scoring.name}"
         )
         # DEBUG: Print scoring details to diagnose Track B 0-score issue
         # 调试：打印评分详情以诊断轨道B 0分问题
@@ -520,12 +609,12 @@ class RiskScorer:
         turnitin_score, turnitin_issues, turnitin_issues_zh = (0, [], [])
         gptzero_score, gptzero_issues, gptzero_issues_zh = (0, [], [])
 
-        if include_turnitin:
+        if include_turnitin and scoring.detector_views:
             turnitin_score, turnitin_issues, turnitin_issues_zh = self._turnitin_view(
                 text, fingerprints, structure_score
             )
 
-        if include_gptzero:
+        if include_gptzero and scoring.detector_views:
             gptzero_score, gptzero_issues, gptzero_issues_zh = self._gptzero_view(
                 text, ppl, fingerprints, burstiness_score
             )
@@ -552,9 +641,13 @@ class RiskScorer:
             turnitin_issues_zh=turnitin_issues_zh,
             gptzero_score=gptzero_score,
             gptzero_issues=gptzero_issues,
-            gptzero_issues_zh=gptzero_issues_zh
+            gptzero_issues_zh=gptzero_issues_zh,
+            lexicon_version=get_lexicon().version,
+            profile=scoring.name,
+            score_exact=score_exact
         )
 
+    @traced("scorer.ppl")
     def _calculate_ppl(self, text: str) -> float:
         """
         Calculate perplexity using ONNX model with zlib fallback
@@ -701,6 +794,7 @@ class RiskScorer:
 
         return min(100, density_score + high_risk_bonus)
 
+    @traced("scorer.fingerprint_score")
     def _score_fingerprint_caass(
         self,
         fingerprints: List[FingerprintMatch],
@@ -731,6 +825,7 @@ class RiskScorer:
         # 上限80，为结构模式留出空间
         return min(80, total_score)
 
+    @traced("scorer.burstiness")
     def _score_burstiness(
         self,
         text: str,
@@ -786,6 +881,7 @@ class RiskScorer:
             else:
                 return 20  # Good variation = low risk
 
+    @traced("scorer.burstiness_enhanced")
     def _analyze_burstiness_enhanced(
         self,
         context_sentences: Optional[List[str]] = None
@@ -831,6 +927,7 @@ class RiskScorer:
         text_lower = text.lower().strip()
         words = text.split()
         word_count = len(words)
+        lexicon = get_lexicon()
 
         # === TIERED FINGERPRINT DETECTION ===
         # === 分级指纹检测 ===
@@ -838,7 +935,7 @@ class RiskScorer:
         # Level 1: Dead giveaways (+40 each, max 120)
         # 一级：确凿证据（每个+40，最高120）
         level_1_hits = 0
-        for fp in LEVEL_1_FINGERPRINTS:
+        for fp in lexicon.level_1:
             if fp in text_lower:
                 level_1_hits += 1
         score += min(120, level_1_hits * 40)
@@ -846,7 +943,7 @@ class RiskScorer:
         # Level 2: AI habitual phrases (+15 each, max 60)
         # 二级：AI惯用语（每个+15，最高60）
         level_2_hits = 0
-        for fp in LEVEL_2_FINGERPRINTS:
+        for fp in lexicon.level_2:
             if fp in text_lower:
                 level_2_hits += 1
         score += min(60, level_2_hits * 15)
@@ -949,6 +1046,7 @@ class RiskScorer:
 
         return min(100, score)
 
+    @traced("scorer.structure")
     def _score_structure_caass(self, text: str, tone_level: int = 4) -> int:
         """
         CAASS v2.0: Calculate structure pattern score with tone adaptation
@@ -1018,6 +1116,7 @@ class RiskScorer:
         # 结构分数上限，为指纹分数留出空间
         return min(40, score)
 
+    @traced("scorer.human_deduction")
     def _calculate_human_deduction(self, text: str) -> int:
         """
         Calculate human feature deduction (negative score)
@@ -1094,6 +1193,7 @@ class RiskScorer:
 
         return min(50, deduction)  # Cap deduction at 50
 
+    @traced("scorer.turnitin_view")
     def _turnitin_view(
         self,
         text: str,
@@ -1135,6 +1235,7 @@ class RiskScorer:
 
         return (min(100, score), issues, issues_zh)
 
+    @traced("scorer.gptzero_view")
     def _gptzero_view(
         self,
         text: str,
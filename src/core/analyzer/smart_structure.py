@@ -17,6 +17,7 @@ Uses LangChain for intelligent document parsing:
 
 import json
 import re
+import time
 import httpx
 import logging
 from dataclasses import dataclass, field
@@ -26,6 +27,17 @@ from pydantic import BaseModel, Field
 logger = logging.getLogger(__name__)
 
 from src.config import get_settings
+from src.services.structured_output import get_structured_output
+from src.services.token_budget import get_token_budgeter
+from src.prompts.prefix_cache import (
+    CachedPrompt,
+    PromptInput,
+    as_cached_prompt,
+    build_prompt,
+    gemini_usage,
+    record_response_usage,
+    record_usage,
+)
 
 # Get settings instance
 settings = get_settings()
@@ -692,22 +704,19 @@ class SmartStructureAnalyzer:
             SmartStructureAnalysis as dict
         """
         try:
-            # Truncate if too long (keep first 15000 chars for context window)
-            # 如果太长则截断
-            if len(document_text) > 15000:
-                document_text = document_text[:15000] + "\n\n[... document truncated for analysis ...]"
+            # Truncate to the structure token budget
+            # 截断到结构分析token预算
+            document_text = self._fit_document(document_text)
 
             # Build prompt
             # 构建提示词
-            prompt = SMART_STRUCTURE_PROMPT.format(document_text=document_text)
+            prompt = build_prompt(SMART_STRUCTURE_PROMPT, document_text=document_text)
 
             # Call LLM directly using httpx (bypassing proxy)
             # 直接使用httpx调用LLM（绕过代理）
-            response_text = await self._call_llm(prompt)
-
-            # Parse JSON response
-            # 解析JSON响应
-            result = self._parse_llm_response(response_text)
+            result = await self._call_llm_json(
+                prompt, max_tokens=self._max_tokens(prompt, SMART_STRUCTURE_PROMPT), name="smart_structure"
+            )
 
             # Validate and clean up result
             # 验证并清理结果
@@ -744,10 +753,9 @@ class SmartStructureAnalyzer:
         try:
             logger.info(f"[SmartStructureAnalyzer] Starting Step 1-1: Structure Analysis (target_colloquialism={target_colloquialism})")
 
-            # Truncate if too long
-            # 如果太长则截断
-            if len(document_text) > 15000:
-                document_text = document_text[:15000] + "\n\n[... document truncated for analysis ...]"
+            # Truncate to the structure token budget
+            # 截断到结构分析token预算
+            document_text = self._fit_document(document_text)
 
             # Build style context based on target colloquialism level
             # 根据目标口语化级别构建风格上下文
@@ -755,18 +763,17 @@ class SmartStructureAnalyzer:
 
             # Build prompt for structure analysis
             # 构建结构分析提示词
-            prompt = STRUCTURE_ANALYSIS_PROMPT.format(
+            prompt = build_prompt(
+                STRUCTURE_ANALYSIS_PROMPT,
                 document_text=document_text,
                 style_context=style_context
             )
 
             # Call LLM
             # 调用 LLM
-            response_text = await self._call_llm(prompt)
-
-            # Parse response
-            # 解析响应
-            result = self._parse_llm_response(response_text)
+            result = await self._call_llm_json(
+                prompt, max_tokens=self._max_tokens(prompt, STRUCTURE_ANALYSIS_PROMPT), name="smart_structure:structure"
+            )
 
             # Validate structure-specific fields
             # 验证结构特定字段
@@ -806,10 +813,9 @@ class SmartStructureAnalyzer:
         try:
             logger.info("[SmartStructureAnalyzer] Starting Step 1-2: Relationship Analysis")
 
-            # Truncate if too long
-            # 如果太长则截断
-            if len(document_text) > 15000:
-                document_text = document_text[:15000] + "\n\n[... document truncated for analysis ...]"
+            # Truncate to the structure token budget
+            # 截断到结构分析token预算
+            document_text = self._fit_document(document_text)
 
             # Extract paragraph positions from structure result
             # 从结构结果中提取段落位置
@@ -824,18 +830,17 @@ class SmartStructureAnalyzer:
 
             # Build prompt for relationship analysis
             # 构建关系分析提示词
-            prompt = RELATIONSHIP_ANALYSIS_PROMPT.format(
+            prompt = build_prompt(
+                RELATIONSHIP_ANALYSIS_PROMPT,
                 document_text=document_text,
                 paragraph_positions=positions_text
             )
 
             # Call LLM
             # 调用 LLM
-            response_text = await self._call_llm(prompt)
-
-            # Parse response
-            # 解析响应
-            result = self._parse_llm_response(response_text)
+            result = await self._call_llm_json(
+                prompt, max_tokens=self._max_tokens(prompt, RELATIONSHIP_ANALYSIS_PROMPT), name="smart_structure:relationships"
+            )
 
             # Validate relationship-specific fields
             # 验证关系特定字段
@@ -1081,31 +1086,114 @@ For example:
 
         return result
 
-    async def _call_llm(self, prompt: str) -> str:
+    def _fit_document(self, document_text: str) -> str:
+        """
+        Document cut to the structure token budget (STRUCTURE_DOCUMENT_TOKENS)
+        截断到结构分析token预算（STRUCTURE_DOCUMENT_TOKENS）的文档
+        """
+        return get_token_budgeter().fit_text(
+            document_text,
+            settings.structure_document_tokens,
+            marker="\n\n[... document truncated for analysis ...]"
+        )
+
+    def _max_tokens(self, prompt: PromptInput, template: str) -> int:
+        """
+        max_tokens sized from the template's JSON schema (answers list every paragraph)
+        按模板JSON结构确定的 max_tokens（回答会列出每个段落）
+        """
+        budgeter = get_token_budgeter()
+        input_tokens = budgeter.count(as_cached_prompt(prompt).user)
+        plan = budgeter.plan(prompt, budgeter.expected_output(template, input_tokens, 0.5), floor=4096)
+        if not plan.fits:
+            logger.warning(f"[SmartStructureAnalyzer] Prompt over budget: {plan.to_dict()}")
+        return plan.max_tokens
+
+    async def _call_llm(
+        self,
+        prompt: PromptInput,
+        max_tokens: int = 8192,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call LLM API directly using httpx with trust_env=False to bypass proxy
         直接使用httpx调用LLM API，设置trust_env=False以绕过代理
+
+        A CachedPrompt's static prefix is sent as the system message so
+        providers can reuse their prefix cache across documents. A
+        response_format the provider rejects is dropped (see structured_output).
+        CachedPrompt 的静态前缀作为系统消息发送，便于提供商跨文档复用前缀缓存。
+        提供商拒绝的 response_format 会被弃用（见 structured_output）。
+        """
+        prompt = as_cached_prompt(prompt)
+        provider = self._provider()
+        calls = {
+            "dashscope": self._call_dashscope,
+            "volcengine": self._call_volcengine,
+            "deepseek": self._call_deepseek,
+            "gemini": self._call_gemini,
+            "openai": self._call_openai,
+        }
+        if provider is None:
+            raise ValueError("No LLM API configured. Please set DASHSCOPE_API_KEY or other LLM API key in .env")
+        try:
+            return await calls[provider](prompt, max_tokens, response_format)
+        except httpx.HTTPStatusError as e:
+            if not response_format or e.response.status_code != 400:
+                raise
+            get_structured_output().mark_unsupported(provider, e)
+            return await calls[provider](prompt, max_tokens, None)
+
+    def _provider(self) -> Optional[str]:
+        """
+        Provider _call_llm sends to
+        _call_llm 使用的提供商
         """
         # DashScope (阿里云灵积) - Qwen models
         # 阿里云灵积 - 通义千问模型
         if settings.llm_provider == "dashscope" and settings.dashscope_api_key:
-            return await self._call_dashscope(prompt)
+            return "dashscope"
         # Volcengine (火山引擎) - preferred for faster DeepSeek access
         # 火山引擎 - 更快的 DeepSeek 访问
         elif settings.llm_provider == "volcengine" and settings.volcengine_api_key:
-            return await self._call_volcengine(prompt)
+            return "volcengine"
         # DeepSeek official (commented out - slower)
         # DeepSeek 官方（已注释 - 较慢）
         elif settings.llm_provider == "deepseek" and settings.deepseek_api_key:
-            return await self._call_deepseek(prompt)
+            return "deepseek"
         elif settings.llm_provider == "gemini" and settings.gemini_api_key:
-            return await self._call_gemini(prompt)
+            return "gemini"
         elif settings.openai_api_key:
-            return await self._call_openai(prompt)
-        else:
-            raise ValueError("No LLM API configured. Please set DASHSCOPE_API_KEY or other LLM API key in .env")
+            return "openai"
+        return None
+
+    async def _call_llm_json(self, prompt: PromptInput, max_tokens: int = 8192, name: str = "smart_structure") -> Dict[str, Any]:
+        """
+        Call LLM for a JSON object, validated by the structured-output fast path
+        调用LLM获取JSON对象，经结构化输出快速路径校验
 
-    async def _call_dashscope(self, prompt: str) -> str:
+        A truncated answer is re-asked once from the key where it broke off;
+        _parse_llm_response stays the last resort.
+        被截断的回答从中断处的键重新询问一次；_parse_llm_response 作为最后手段。
+        """
+        async def call(call_prompt: PromptInput, response_format: Optional[Dict[str, Any]]) -> str:
+            return await self._call_llm(call_prompt, max_tokens, response_format)
+
+        return await get_structured_output().complete(
+            call,
+            prompt,
+            Dict[str, Any],
+            provider=self._provider() or "none",
+            name=name,
+            fallback=self._parse_llm_response,
+        )
+
+    async def _call_dashscope(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int = 8192,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call DashScope (阿里云灵积) API - OpenAI compatible format
         调用阿里云灵积 API - OpenAI 兼容格式
@@ -1119,17 +1207,26 @@ For example:
             timeout=300.0,  # 5 minutes timeout for long documents
             trust_env=False  # Ignore system proxy settings
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": settings.dashscope_model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 8192,  # Increased for longer documents
+                "messages": prompt.messages(),
+                "max_tokens": max_tokens,
                 "temperature": self.temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage("smart_structure", prompt, "dashscope", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_volcengine(self, prompt: str) -> str:
+    async def _call_volcengine(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int = 8192,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call Volcengine (火山引擎) DeepSeek API - OpenAI compatible format
         调用火山引擎 DeepSeek API - OpenAI 兼容格式
@@ -1143,17 +1240,26 @@ For example:
             timeout=300.0,  # 5 minutes timeout for long documents
             trust_env=False  # Ignore system proxy settings
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": settings.volcengine_model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 8192,  # Increased for longer documents
+                "messages": prompt.messages(),
+                "max_tokens": max_tokens,
                 "temperature": self.temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage("smart_structure", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_deepseek(self, prompt: str) -> str:
+    async def _call_deepseek(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int = 8192,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call DeepSeek API directly (official - slower than Volcengine)
         直接调用DeepSeek API（官方 - 比火山引擎慢）
@@ -1167,45 +1273,76 @@ For example:
             timeout=300.0,  # 5 minutes timeout for long documents
             trust_env=False  # Ignore system proxy settings
         ) as client:
-            response = await client.post("/chat/completions", json={
+            payload = {
                 "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 8192,  # Increased for longer documents
+                "messages": prompt.messages(),
+                "max_tokens": max_tokens,
                 "temperature": self.temperature
-            })
+            }
+            if response_format:
+                payload["response_format"] = response_format
+            response = await client.post("/chat/completions", json=payload)
             response.raise_for_status()
             data = response.json()
+            record_response_usage("smart_structure", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
-    async def _call_gemini(self, prompt: str) -> str:
+    async def _call_gemini(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int = 4096,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call Gemini API
         调用Gemini API
         """
         from google import genai
         client = genai.Client(api_key=settings.gemini_api_key)
+        config = {
+            "max_output_tokens": max_tokens,
+            "temperature": self.temperature
+        }
+        if prompt.system:
+            config["system_instruction"] = prompt.system
+        if response_format:
+            config["response_mime_type"] = "application/json"
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=self.model,
-            contents=prompt,
-            config={
-                "max_output_tokens": 4096,
-                "temperature": self.temperature
-            }
+            contents=prompt.user,
+            config=config
+        )
+        record_usage(
+            "smart_structure", prompt, gemini_usage(response),
+            provider="gemini", model=self.model, latency_ms=(time.perf_counter() - started) * 1000
         )
         return response.text
 
-    async def _call_openai(self, prompt: str) -> str:
+    async def _call_openai(
+        self,
+        prompt: CachedPrompt,
+        max_tokens: int = 4096,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> str:
         """
         Call OpenAI API
         调用OpenAI API
         """
         import openai
         client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+        started = time.perf_counter()
+        extra = {"response_format": response_format} if response_format else {}
         response = await client.chat.completions.create(
             model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=4096,
-            temperature=self.temperature
+            messages=prompt.messages(),
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            **extra
+        )
+        record_usage(
+            "smart_structure", prompt, response.usage.model_dump() if response.usage else None,
+            provider="openai", model=response.model, latency_ms=(time.perf_counter() - started) * 1000
         )
         return response.choices[0].message.content
 
@@ -1568,7 +1705,8 @@ async def generate_semantic_strategies(
 
     # Build prompt
     # 构建提示词
-    prompt = PARAGRAPH_LENGTH_STRATEGY_PROMPT.format(
+    prompt = build_prompt(
+        PARAGRAPH_LENGTH_STRATEGY_PROMPT,
         mean_length=mean_length,
         std_dev=std_dev,
         cv=cv,
@@ -1579,11 +1717,7 @@ async def generate_semantic_strategies(
         # Call LLM using SmartStructureAnalyzer's method
         # 使用SmartStructureAnalyzer的方法调用LLM
         analyzer = SmartStructureAnalyzer()
-        response_text = await analyzer._call_llm(prompt)
-
-        # Parse response
-        # 解析响应
-        result = analyzer._parse_llm_response(response_text)
+        result = await analyzer._call_llm_json(prompt, name="smart_structure:paragraph_length")
 
         # Convert to ParagraphLengthStrategy objects
         # 转换为ParagraphLengthStrategy对象
@@ -14,15 +14,20 @@ but carry little semantic content.
 
 import re
 import logging
+import threading
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Tuple, Any
 from enum import Enum
 
+from src.services.tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Track spaCy availability
 # 跟踪spaCy可用性
 _spacy_available = False
+_spacy_attempted = False
+_spacy_lock = threading.Lock()
 _nlp = None
 
 
@@ -30,12 +35,30 @@ def _init_spacy():
     """
     Initialize spaCy with en_core_web_md model
     使用en_core_web_md模型初始化spaCy
+
+    Thread-safe and attempted only once, so the startup preload and the
+    first request cannot both load the model.
+    线程安全且只尝试一次，启动预加载和首个请求不会重复加载模型。
     """
-    global _spacy_available, _nlp
+    global _spacy_attempted
 
-    if _nlp is not None:
+    if _spacy_attempted:
         return _spacy_available
 
+    with _spacy_lock:
+        if not _spacy_attempted:
+            _load_spacy()
+            _spacy_attempted = True
+    return _spacy_available
+
+
+def _load_spacy():
+    """
+    Load the spaCy model (caller holds _spacy_lock)
+    加载spaCy模型（调用方持有 _spacy_lock）
+    """
+    global _spacy_available, _nlp
+
     try:
         import spacy
         try:
@@ -59,8 +82,6 @@ def _init_spacy():
         logger.warning("spaCy not installed. Install with: pip install spacy")
         _spacy_available = False
 
-    return _spacy_available
-
 
 class VoidPatternType(Enum):
     """Types of syntactic void patterns"""
@@ -360,7 +381,8 @@ class SyntacticVoidDetector:
         matches = []
 
         try:
-            doc = _nlp(text)
+            with span("spacy.parse"):
+                doc = _nlp(text)
 
             for sent in doc.sents:
                 # Look for abstract verb + abstract noun patterns
@@ -9,11 +9,13 @@ Part of Layer 5 Step 1.0: Term Locking
 import json
 import logging
 import re
+import time
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from enum import Enum
 
 from src.config import get_settings
+from src.prompts.prefix_cache import gemini_usage, record_response_usage, record_usage
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -212,6 +214,7 @@ class TermExtractor:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("term_extractor", prompt, "volcengine", response, data)
             return data["choices"][0]["message"]["content"]
 
     async def _call_dashscope(self, prompt: str) -> str:
@@ -235,6 +238,7 @@ class TermExtractor:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("term_extractor", prompt, "dashscope", response, data)
             return data["choices"][0]["message"]["content"]
 
     async def _call_gemini(self, prompt: str) -> str:
@@ -242,6 +246,7 @@ class TermExtractor:
         from google import genai
 
         client = genai.Client(api_key=settings.gemini_api_key)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=settings.llm_model,
             contents=prompt,
@@ -250,6 +255,10 @@ class TermExtractor:
                 "temperature": 0.3
             }
         )
+        record_usage(
+            "term_extractor", prompt, gemini_usage(response),
+            provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return response.text
 
     async def _call_deepseek(self, prompt: str) -> str:
@@ -273,6 +282,7 @@ class TermExtractor:
             })
             response.raise_for_status()
             data = response.json()
+            record_response_usage("term_extractor", prompt, "deepseek", response, data)
             return data["choices"][0]["message"]["content"]
 
     async def _call_anthropic(self, prompt: str) -> str:
@@ -280,11 +290,16 @@ class TermExtractor:
         import anthropic
 
         client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+        started = time.perf_counter()
         message = await client.messages.create(
             model=settings.llm_model,
             max_tokens=4096,
             messages=[{"role": "user", "content": prompt}]
         )
+        record_usage(
+            "term_extractor", prompt, message.usage.model_dump() if message.usage else None,
+            provider="anthropic", model=message.model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return message.content[0].text
 
     async def _call_openai(self, prompt: str) -> str:
@@ -292,12 +307,17 @@ class TermExtractor:
         import openai
 
         client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+        started = time.perf_counter()
         response = await client.chat.completions.create(
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=4096,
             temperature=0.3
         )
+        record_usage(
+            "term_extractor", prompt, response.usage.model_dump() if response.usage else None,
+            provider="openai", model=response.model, latency_ms=(time.perf_counter() - started) * 1000
+        )
         return response.choices[0].message.content
 
     def _parse_response(self, response: str) -> TermExtractionResult:
@@ -0,0 +1,170 @@
+"""
+Component Registry - process-wide analyzer singletons
+组件注册表 - 进程级分析组件单例
+
+Routes used to construct QualityGate, RiskScorer, TermLocker,
+FingerprintDetector, LexicalContextPreparer and friends on every request,
+recompiling regex tables and re-reading JSON data each time. The registry
+builds each component once per process, on first use, and hands the same
+instance to every caller. The getters double as FastAPI dependencies:
+
+    async def route(quality_gate: QualityGate = Depends(get_quality_gate)):
+
+Registered components hold only immutable, precompiled state after
+construction; everything request-specific (tone level, whitelist, target
+risk, locked terms) is passed to their methods. They are therefore safe to
+share across requests and worker threads. Lexicon data is read from
+get_lexicon() per call, so hot reloads still apply to the shared instances.
+
+路由过去在每个请求中构造 QualityGate、RiskScorer、TermLocker、FingerprintDetector、
+LexicalContextPreparer 等组件，每次都重新编译正则表并重新读取 JSON 数据。注册表在
+首次使用时为每个进程构建一次组件，并将同一实例交给所有调用方。获取函数同时可作为
+FastAPI 依赖使用。注册的组件构造后只持有不可变的预编译状态；请求相关的参数
+（口语化级别、白名单、目标风险、锁定术语）通过方法参数传入，因此可以在请求和工作线程
+之间安全共享。词库数据每次调用从 get_lexicon() 读取，热重载对共享实例同样生效。
+
+LLMTrack and RuleTrack are not registered: they are cheap to build and carry
+the request's colloquialism level and session-locked terms.
+LLMTrack 和 RuleTrack 不注册：它们构造开销很小，且携带请求的口语化级别和会话锁定术语。
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+if TYPE_CHECKING:
+    from src.core.analyzer.fingerprint import FingerprintDetector
+    from src.core.analyzer.layers.lexical.context_preparation import LexicalContextPreparer
+    from src.core.analyzer.layers.lexical.fingerprint_detector import EnhancedFingerprintDetector
+    from src.core.analyzer.scorer import RiskScorer
+    from src.core.preprocessor.segmenter import SentenceSegmenter
+    from src.core.preprocessor.term_locker import TermLocker
+    from src.core.validator.quality_gate import QualityGate
+
+logger = logging.getLogger(__name__)
+
+# name -> instance; factories may call other getters, hence the re-entrant lock
+# 名称 -> 实例；工厂可能调用其他获取函数，因此使用可重入锁
+_components: Dict[str, Any] = {}
+_build_ms: Dict[str, float] = {}
+_lock = threading.RLock()
+
+
+def _component(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the named singleton, building it once (thread-safe)
+    返回指定单例，仅构建一次（线程安全）
+    """
+    component = _components.get(name)
+    if component is not None:
+        return component
+
+    with _lock:
+        component = _components.get(name)
+        if component is None:
+            start = time.perf_counter()
+            component = factory()
+            _build_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+            _components[name] = component
+            logger.debug(f"Built shared component {name} in {_build_ms[name]} ms")
+    return component
+
+
+def _build_risk_scorer():
+    from src.core.analyzer.scorer import RiskScorer
+    return RiskScorer()
+
+
+def _build_fingerprint_detector():
+    from src.core.analyzer.fingerprint import FingerprintDetector
+    return FingerprintDetector()
+
+
+def _build_term_locker():
+    from src.core.preprocessor.term_locker import TermLocker
+    return TermLocker()
+
+
+def _build_sentence_segmenter():
+    from src.core.preprocessor.segmenter import SentenceSegmenter
+    return SentenceSegmenter()
+
+
+def _build_quality_gate():
+    from src.core.validator.quality_gate import QualityGate
+    return QualityGate()
+
+
+def _build_lexical_context_preparer():
+    from src.core.analyzer.layers.lexical.context_preparation import LexicalContextPreparer
+    return LexicalContextPreparer()
+
+
+def _build_enhanced_fingerprint_detector():
+    from src.core.analyzer.layers.lexical.fingerprint_detector import EnhancedFingerprintDetector
+    return EnhancedFingerprintDetector()
+
+
+def get_risk_scorer() -> "RiskScorer":
+    """
+    Shared RiskScorer (CAASS scoring)
+    共享的 RiskScorer（CAASS 评分）
+    """
+    return _component("risk_scorer", _build_risk_scorer)
+
+
+def get_fingerprint_detector() -> "FingerprintDetector":
+    """
+    Shared FingerprintDetector with the default (lexicon) tables
+    使用默认（词库）词表的共享 FingerprintDetector
+    """
+    return _component("fingerprint_detector", _build_fingerprint_detector)
+
+
+def get_term_locker() -> "TermLocker":
+    """
+    Shared TermLocker with the default whitelist (treat as read-only)
+    使用默认白名单的共享 TermLocker（视为只读）
+    """
+    return _component("term_locker", _build_term_locker)
+
+
+def get_sentence_segmenter() -> "SentenceSegmenter":
+    """
+    Shared SentenceSegmenter for the default language
+    默认语言的共享 SentenceSegmenter
+    """
+    return _component("sentence_segmenter", _build_sentence_segmenter)
+
+
+def get_quality_gate() -> "QualityGate":
+    """
+    Shared QualityGate with the configured semantic threshold
+    使用配置语义阈值的共享 QualityGate
+    """
+    return _component("quality_gate", _build_quality_gate)
+
+
+def get_lexical_context_preparer() -> "LexicalContextPreparer":
+    """
+    Shared Step 5.0 context preparer
+    共享的步骤5.0上下文准备器
+    """
+    return _component("lexical_context_preparer", _build_lexical_context_preparer)
+
+
+def get_enhanced_fingerprint_detector() -> "EnhancedFingerprintDetector":
+    """
+    Shared Step 5.1 fingerprint detector
+    共享的步骤5.1指纹检测器
+    """
+    return _component("enhanced_fingerprint_detector", _build_enhanced_fingerprint_detector)
+
+
+def component_status() -> Dict[str, Any]:
+    """
+    Built components and their construction time, for /health/ready
+    已构建的组件及其构造耗时，供 /health/ready 使用
+    """
+    return {"built": dict(_build_ms)}
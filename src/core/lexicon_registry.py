@@ -0,0 +1,530 @@
+"""
+Lexicon Registry - versioned, hot-reloadable fingerprint and whitelist lexicons
+词库注册表 - 带版本、可热重载的指纹词与白名单词库
+
+Fingerprint and whitelist vocabularies used to be fixed Python constants, so
+every lexicon tweak meant a redeploy (and cold caches). The registry builds one
+immutable LexiconSnapshot from three layers, later layers overriding earlier ones:
+
+1. builtin - the constants shipped in the analyzer modules (always loaded)
+2. json    - data/fingerprints/*.json and data/terms/whitelist.json
+3. db      - FingerprintWord and TermWhitelist tables
+
+All regex matchers are compiled once when a snapshot is built. Consumers call
+get_lexicon() per operation and read from the returned snapshot; a reload
+builds a new snapshot and swaps the reference atomically, so in-flight
+requests keep a consistent view and nobody needs to restart.
+
+词库分三层构建为一个不可变的 LexiconSnapshot，后层覆盖前层：
+1. builtin - 分析模块中的内置常量（始终加载）
+2. json    - data/fingerprints/*.json 和 data/terms/whitelist.json
+3. db      - FingerprintWord 和 TermWhitelist 表
+
+所有正则匹配器在构建快照时一次性编译。使用方每次操作调用 get_lexicon()
+并从返回的快照读取；重载时构建新快照并原子替换引用，进行中的请求保持一致视图，无需重启。
+
+FingerprintWord.category mapping / 类别映射:
+    high_freq, academic, None -> fingerprint word
+    phrase                    -> fingerprint phrase
+    connector                 -> overused connector
+    level_1                   -> dead giveaway (LEVEL_1 / Type A / P0 blocklist)
+    level_2                   -> AI habitual phrase (LEVEL_2)
+    p0                        -> P0 blocklist only
+replacements_json may be a list, or a dict keyed by style
+(academic / moderate / casual) used by the rule-based rewriters.
+replacements_json 可以是列表，或按风格（academic / moderate / casual）分组的字典。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Pattern, Set, Tuple
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+FINGERPRINT_DIR = DATA_DIR / "fingerprints"
+WHITELIST_PATH = DATA_DIR / "terms" / "whitelist.json"
+
+
+@dataclass(frozen=True)
+class LexiconSnapshot:
+    """
+    Immutable, precompiled view of all lexicons at one version
+    某一版本下所有词库的不可变预编译视图
+    """
+    version: str
+    sources: Tuple[str, ...]
+    loaded_at: float
+
+    # FingerprintDetector tables: entry -> {"weight": float, "replacements": [...]}
+    # FingerprintDetector 词表：条目 -> {"weight": float, "replacements": [...]}
+    words: Mapping[str, Mapping[str, Any]]
+    phrases: Mapping[str, Mapping[str, Any]]
+    connectors: Mapping[str, Mapping[str, Any]]
+
+    # RiskScorer tiers
+    # RiskScorer 分级
+    level_1: FrozenSet[str]
+    level_2: FrozenSet[str]
+
+    # LexicalOrchestrator tables (risk points)
+    # LexicalOrchestrator 词表（风险分）
+    type_a: FrozenSet[str]
+    type_b: Mapping[str, int]
+    type_c_connectors: Mapping[str, int]
+    phrase_risks: Mapping[str, int]
+
+    # QualityGate post-generation blocklist
+    # QualityGate 生成后黑名单
+    p0_blocklist: FrozenSet[str]
+
+    # Style-keyed replacement overrides for RuleTrack / candidate generator
+    # RuleTrack / 候选生成器使用的按风格替换覆盖
+    styled_replacements: Mapping[str, Mapping[str, Tuple[str, ...]]]
+
+    # Protected domain terms (lowercase)
+    # 受保护的学科术语（小写）
+    whitelist_terms: FrozenSet[str]
+
+    # Precompiled matchers
+    # 预编译匹配器
+    phrase_matchers: Tuple[Tuple[str, Pattern], ...] = field(repr=False, default=())
+    connector_matchers: Tuple[Tuple[str, Pattern], ...] = field(repr=False, default=())
+    type_c_matchers: Tuple[Tuple[str, Pattern], ...] = field(repr=False, default=())
+    p0_word_matchers: Tuple[Tuple[str, Pattern], ...] = field(repr=False, default=())
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "sources": list(self.sources),
+            "loaded_at": self.loaded_at,
+            "counts": {
+                "words": len(self.words),
+                "phrases": len(self.phrases),
+                "connectors": len(self.connectors),
+                "level_1": len(self.level_1),
+                "level_2": len(self.level_2),
+                "p0_blocklist": len(self.p0_blocklist),
+                "whitelist_terms": len(self.whitelist_terms),
+            },
+        }
+
+
+def _boundary_pattern(entry: str) -> Pattern:
+    return re.compile(r'\b' + re.escape(entry) + r'\b', re.IGNORECASE)
+
+
+class _LexiconData:
+    """
+    Mutable accumulator used while merging sources
+    合并数据源时使用的可变累加器
+    """
+
+    def __init__(self):
+        self.words: Dict[str, Dict[str, Any]] = {}
+        self.phrases: Dict[str, Dict[str, Any]] = {}
+        self.connectors: Dict[str, Dict[str, Any]] = {}
+        self.level_1: Set[str] = set()
+        self.level_2: Set[str] = set()
+        self.type_a: Set[str] = set()
+        self.type_b: Dict[str, int] = {}
+        self.type_c_connectors: Dict[str, int] = {}
+        self.phrase_risks: Dict[str, int] = {}
+        self.p0_blocklist: Set[str] = set()
+        self.styled_replacements: Dict[str, Dict[str, List[str]]] = {}
+        self.whitelist_terms: Set[str] = set()
+        self.sources: List[str] = []
+
+    @staticmethod
+    def _merge_entry(table: Dict[str, Dict[str, Any]], key: str, entry: Dict[str, Any]):
+        merged = dict(table.get(key, {}))
+        merged.update({k: v for k, v in entry.items() if v is not None})
+        merged.setdefault("weight", 0.5)
+        merged.setdefault("replacements", [])
+        table[key] = merged
+
+    def content(self) -> dict:
+        """Canonical content used for the version hash / 用于版本哈希的规范内容"""
+        return {
+            "words": self.words,
+            "phrases": self.phrases,
+            "connectors": self.connectors,
+            "level_1": sorted(self.level_1),
+            "level_2": sorted(self.level_2),
+            "type_a": sorted(self.type_a),
+            "type_b": self.type_b,
+            "type_c_connectors": self.type_c_connectors,
+            "phrase_risks": self.phrase_risks,
+            "p0_blocklist": sorted(self.p0_blocklist),
+            "styled_replacements": self.styled_replacements,
+            "whitelist_terms": sorted(self.whitelist_terms),
+        }
+
+    def freeze(self) -> LexiconSnapshot:
+        """
+        Compile matchers and build the immutable snapshot
+        编译匹配器并构建不可变快照
+        """
+        digest = hashlib.sha256(
+            json.dumps(self.content(), sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()[:12]
+
+        def frozen_table(table: Dict[str, Dict[str, Any]]) -> Mapping[str, Mapping[str, Any]]:
+            return MappingProxyType({
+                key: MappingProxyType({**entry, "replacements": list(entry.get("replacements", []))})
+                for key, entry in table.items()
+            })
+
+        p0_words = sorted(w for w in self.p0_blocklist if ' ' not in w)
+
+        return LexiconSnapshot(
+            version=digest,
+            sources=tuple(self.sources),
+            loaded_at=time.time(),
+            words=frozen_table(self.words),
+            phrases=frozen_table(self.phrases),
+            connectors=frozen_table(self.connectors),
+            level_1=frozenset(self.level_1),
+            level_2=frozenset(self.level_2),
+            type_a=frozenset(self.type_a),
+            type_b=MappingProxyType(dict(self.type_b)),
+            type_c_connectors=MappingProxyType(dict(self.type_c_connectors)),
+            phrase_risks=MappingProxyType(dict(self.phrase_risks)),
+            p0_blocklist=frozenset(self.p0_blocklist),
+            styled_replacements=MappingProxyType({
+                word: MappingProxyType({style: tuple(options) for style, options in styles.items()})
+                for word, styles in self.styled_replacements.items()
+            }),
+            whitelist_terms=frozenset(self.whitelist_terms),
+            phrase_matchers=tuple((p, _boundary_pattern(p)) for p in self.phrases),
+            connector_matchers=tuple((c, _boundary_pattern(c)) for c in self.connectors),
+            type_c_matchers=tuple((c, _boundary_pattern(c)) for c in self.type_c_connectors),
+            p0_word_matchers=tuple((w, _boundary_pattern(w)) for w in p0_words),
+        )
+
+
+def _load_builtin(data: _LexiconData) -> None:
+    """
+    Seed from the constants shipped in the analyzer modules
+    从分析模块内置常量初始化
+    """
+    # Imported lazily: these modules import this registry at module level
+    # 延迟导入：这些模块在模块级别导入本注册表
+    from src.core.analyzer.fingerprint import FingerprintDetector
+    from src.core.analyzer.scorer import LEVEL_1_FINGERPRINTS, LEVEL_2_FINGERPRINTS
+    from src.core.analyzer.layers.lexical_orchestrator import (
+        FINGERPRINT_TYPE_A,
+        FINGERPRINT_TYPE_B,
+        FINGERPRINT_TYPE_C_CONNECTORS,
+        FINGERPRINT_PHRASES,
+    )
+    from src.core.validator.quality_gate import P0_HIGH_RISK_LEVEL_2
+
+    for word, entry in FingerprintDetector.HIGH_FREQ_WORDS.items():
+        data._merge_entry(data.words, word, entry)
+    for phrase, entry in FingerprintDetector.PHRASE_PATTERNS.items():
+        data._merge_entry(data.phrases, phrase, entry)
+    for connector, entry in FingerprintDetector.CONNECTOR_PATTERNS.items():
+        data._merge_entry(data.connectors, connector, entry)
+
+    data.level_1.update(LEVEL_1_FINGERPRINTS)
+    data.level_2.update(LEVEL_2_FINGERPRINTS)
+    data.type_a.update(FINGERPRINT_TYPE_A)
+    data.type_b.update(FINGERPRINT_TYPE_B)
+    data.type_c_connectors.update(FINGERPRINT_TYPE_C_CONNECTORS)
+    data.phrase_risks.update(FINGERPRINT_PHRASES)
+
+    data.p0_blocklist.update(LEVEL_1_FINGERPRINTS)
+    data.p0_blocklist.update(P0_HIGH_RISK_LEVEL_2)
+    data.sources.append("builtin")
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to read lexicon file {path}: {e}")
+        return None
+
+
+def _normalize_json_entry(entry: dict) -> dict:
+    """
+    phrases.json uses a single "replacement" string; normalize to "replacements"
+    phrases.json 使用单个 "replacement" 字符串；规范化为 "replacements"
+    """
+    normalized = {"weight": entry.get("weight")}
+    if isinstance(entry.get("replacements"), list):
+        normalized["replacements"] = entry["replacements"]
+    elif isinstance(entry.get("replacement"), str):
+        normalized["replacements"] = [entry["replacement"]]
+    return normalized
+
+
+def _load_json(data: _LexiconData) -> None:
+    """
+    Overlay data/fingerprints/*.json and data/terms/whitelist.json
+    叠加 data/fingerprints/*.json 和 data/terms/whitelist.json
+    """
+    words = _read_json(FINGERPRINT_DIR / "words.json") or {}
+    for word, entry in words.get("high_frequency", {}).items():
+        data._merge_entry(data.words, word.lower(), _normalize_json_entry(entry))
+    for connector, entry in words.get("connectors", {}).items():
+        data._merge_entry(data.connectors, connector.lower(), _normalize_json_entry(entry))
+
+    phrases = _read_json(FINGERPRINT_DIR / "phrases.json") or {}
+    for phrase, entry in phrases.get("phrases", {}).items():
+        key = phrase.lower()
+        normalized = _normalize_json_entry(entry)
+        # Keep the richer builtin replacement list when JSON only has one
+        # JSON仅有单个替换时保留更丰富的内置替换列表
+        if key in data.phrases and "replacement" in entry and "replacements" not in entry:
+            normalized.pop("replacements", None)
+        data._merge_entry(data.phrases, key, normalized)
+
+    safe = _read_json(FINGERPRINT_DIR / "safe_replacements.json") or {}
+    data.p0_blocklist.update(w.lower() for w in safe.get("p0_blocklist", []))
+
+    whitelist = _read_json(WHITELIST_PATH) or {}
+    for terms in whitelist.values():
+        if isinstance(terms, list):
+            data.whitelist_terms.update(t.lower() for t in terms if isinstance(t, str))
+
+    data.sources.append("json")
+
+
+def _apply_db_rows(data: _LexiconData, fingerprint_rows: list, whitelist_rows: list) -> None:
+    """
+    Overlay FingerprintWord and TermWhitelist rows
+    叠加 FingerprintWord 和 TermWhitelist 表记录
+
+    Args:
+        fingerprint_rows: (word, category, risk_weight, replacements_json) tuples
+        whitelist_rows: term strings
+    """
+    for word, category, risk_weight, replacements in fingerprint_rows:
+        if not word:
+            continue
+        key = word.strip().lower()
+        category = (category or "high_freq").lower()
+
+        entry: Dict[str, Any] = {"weight": risk_weight}
+        if isinstance(replacements, list):
+            entry["replacements"] = replacements
+        elif isinstance(replacements, dict):
+            data.styled_replacements[key] = {
+                style: list(options) for style, options in replacements.items()
+                if isinstance(options, list)
+            }
+            entry["replacements"] = list(
+                replacements.get("moderate") or next(iter(replacements.values()), [])
+            )
+
+        if category == "phrase":
+            data._merge_entry(data.phrases, key, entry)
+        elif category == "connector":
+            data._merge_entry(data.connectors, key, entry)
+        elif category == "level_1":
+            data.level_1.add(key)
+            data.type_a.add(key)
+            data.p0_blocklist.add(key)
+            data._merge_entry(data.phrases if ' ' in key else data.words, key, entry)
+        elif category == "level_2":
+            data.level_2.add(key)
+        elif category == "p0":
+            data.p0_blocklist.add(key)
+        else:
+            data._merge_entry(data.words, key, entry)
+
+    data.whitelist_terms.update(t.strip().lower() for t in whitelist_rows if t)
+    data.sources.append("db")
+
+
+class LexiconRegistry:
+    """
+    Holds the current LexiconSnapshot and rebuilds it when sources change
+    持有当前的 LexiconSnapshot 并在数据源变化时重建
+
+    Reads never lock: `current` is a plain attribute swapped in one assignment.
+    读取无需加锁：`current` 是一次赋值即可替换的普通属性。
+    """
+
+    def __init__(self, source: str = "json", refresh_seconds: float = 60.0):
+        self.source = source  # builtin | json | db
+        self.refresh_seconds = refresh_seconds
+        self._current: Optional[LexiconSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._json_signature: Optional[tuple] = None
+        self._db_signature: Optional[tuple] = None
+        self._db_rows: Tuple[list, list] = ([], [])
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> LexiconSnapshot:
+        snapshot = self._current
+        if snapshot is None:
+            snapshot = self.rebuild()
+        return snapshot
+
+    def _json_files_signature(self) -> tuple:
+        paths = sorted(FINGERPRINT_DIR.glob("*.json")) + [WHITELIST_PATH]
+        return tuple(
+            (str(p), p.stat().st_mtime_ns) for p in paths if p.exists()
+        )
+
+    def rebuild(self) -> LexiconSnapshot:
+        """
+        Build a new snapshot from the configured sources and swap it in
+        从配置的数据源构建新快照并替换
+
+        DB rows are taken from the last successful refresh_from_db().
+        数据库记录取自最近一次成功的 refresh_from_db()。
+        """
+        with self._build_lock:
+            data = _LexiconData()
+            _load_builtin(data)
+            if self.source in ("json", "db"):
+                _load_json(data)
+                self._json_signature = self._json_files_signature()
+            if self.source == "db" and self._db_signature is not None:
+                _apply_db_rows(data, *self._db_rows)
+
+            snapshot = data.freeze()
+            previous = self._current
+            self._current = snapshot
+
+        if previous is None or previous.version != snapshot.version:
+            logger.info(
+                f"Lexicon snapshot {snapshot.version} active "
+                f"(sources: {', '.join(snapshot.sources)})"
+            )
+        return snapshot
+
+    async def refresh_from_db(self) -> bool:
+        """
+        Re-read the FingerprintWord/TermWhitelist tables if they changed
+        如果 FingerprintWord/TermWhitelist 表有变化则重新读取
+
+        Returns:
+            True if the tables changed since the last read
+        """
+        from sqlalchemy import select, func
+        from src.db.database import AsyncSessionLocal
+        from src.db.models import FingerprintWord, TermWhitelist
+
+        async with AsyncSessionLocal() as db:
+            signature_row = (await db.execute(
+                select(func.count(FingerprintWord.id), func.max(FingerprintWord.updated_at))
+            )).one()
+            whitelist_row = (await db.execute(
+                select(func.count(TermWhitelist.id), func.max(TermWhitelist.created_at))
+            )).one()
+            signature = (tuple(signature_row), tuple(whitelist_row))
+            if signature == self._db_signature:
+                return False
+
+            fingerprint_rows = (await db.execute(
+                select(
+                    FingerprintWord.word,
+                    FingerprintWord.category,
+                    FingerprintWord.risk_weight,
+                    FingerprintWord.replacements_json,
+                )
+            )).all()
+            whitelist_rows = (await db.execute(select(TermWhitelist.term))).scalars().all()
+
+        self._db_rows = ([tuple(r) for r in fingerprint_rows], list(whitelist_rows))
+        self._db_signature = signature
+        return True
+
+    async def check_for_changes(self) -> bool:
+        """
+        Rebuild the snapshot if any source changed
+        任一数据源变化时重建快照
+
+        Returns:
+            True if a new snapshot was built
+        """
+        changed = False
+        if self.source in ("json", "db"):
+            changed = self._json_files_signature() != self._json_signature
+        if self.source == "db":
+            try:
+                changed = await self.refresh_from_db() or changed
+            except Exception as e:
+                logger.warning(f"Lexicon DB refresh failed, keeping current snapshot: {e}")
+
+        if changed or self._current is None:
+            await asyncio.to_thread(self.rebuild)
+            return True
+        return False
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.check_for_changes()
+            except Exception as e:
+                logger.warning(f"Lexicon refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        """
+        Start the background refresh loop (no-op if refresh is disabled)
+        启动后台刷新循环（禁用刷新时为空操作）
+        """
+        if self._task is None and self.refresh_seconds > 0:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_registry: Optional[LexiconRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_lexicon_registry() -> LexiconRegistry:
+    """
+    Get the process-wide lexicon registry
+    获取进程级词库注册表
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = get_settings()
+                _registry = LexiconRegistry(
+                    source=settings.lexicon_source,
+                    refresh_seconds=settings.lexicon_refresh_seconds,
+                )
+    return _registry
+
+
+def get_lexicon() -> LexiconSnapshot:
+    """
+    Get the current lexicon snapshot
+    获取当前词库快照
+
+    Call once per operation and keep the reference, so a concurrent reload
+    cannot mix two versions within one analysis.
+    每次操作调用一次并保留引用，避免并发重载导致一次分析中混用两个版本。
+    """
+    return get_lexicon_registry().current
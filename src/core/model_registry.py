@@ -0,0 +1,242 @@
+"""
+Model Registry - preloads and warms up heavy models at startup
+模型注册表 - 在启动时预加载并预热重量级模型
+
+The ONNX PPL model, the spaCy pipeline and the Sentence-BERT model are all
+lazily loaded on first use. Without preloading, the first requests after a
+deploy or autoscale pay several seconds of load time, sometimes past the proxy
+timeout. The registry loads the configured models in parallel worker threads
+from main.lifespan, runs one warm-up inference per model, and reports readiness
+so /health/ready only admits traffic once every worker is warm.
+
+ONNX PPL模型、spaCy管道和Sentence-BERT模型都在首次使用时懒加载。
+不预加载时，部署或扩容后的首批请求需要承担数秒的加载时间，有时超过代理超时。
+注册表在 main.lifespan 中以并行工作线程加载配置的模型，为每个模型运行一次预热推理，
+并报告就绪状态，使 /health/ready 仅在工作进程预热完成后才接收流量。
+
+Models that cannot be loaded (missing files or optional dependencies) are
+marked "unavailable": the analyzers fall back to their non-model paths, so
+the worker is still considered ready.
+无法加载的模型（缺少文件或可选依赖）标记为 "unavailable"：分析器会回退到非模型路径，
+因此工作进程仍视为就绪。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Sample text for warm-up inference (long enough for PPL and a full spaCy parse)
+# 预热推理用的样本文本（足够长以计算PPL并完成spaCy完整解析）
+WARMUP_TEXT = (
+    "The results indicate that the proposed method improves accuracy on both datasets. "
+    "However, the gains are smaller when the training data is limited."
+)
+
+
+@dataclass
+class ModelStatus:
+    """
+    Load status of a single model
+    单个模型的加载状态
+    """
+    name: str
+    state: str = "pending"  # pending | loading | ready | unavailable | failed
+    load_ms: Optional[float] = None
+    warmup_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+        }
+
+
+def _load_ppl() -> bool:
+    from src.core.analyzer.ppl_calculator import _lazy_load_model
+    return _lazy_load_model()
+
+
+def _warmup_ppl() -> None:
+    from src.core.analyzer.ppl_calculator import warmup_ppl_sessions
+    warmup_ppl_sessions(WARMUP_TEXT)
+
+
+def _load_spacy() -> bool:
+    from src.core.analyzer.syntactic_void import _init_spacy
+    return _init_spacy()
+
+
+def _warmup_spacy() -> None:
+    from src.core.analyzer import syntactic_void
+    if syntactic_void._nlp is not None:
+        syntactic_void._nlp(WARMUP_TEXT)
+
+
+def _load_sbert() -> bool:
+    from src.core.validator.semantic import load_sbert_model
+    return load_sbert_model() is not None
+
+
+def _warmup_sbert() -> None:
+    from src.core.validator.semantic import load_sbert_model
+    model = load_sbert_model()
+    if model is not None:
+        model.encode([WARMUP_TEXT, WARMUP_TEXT])
+
+
+# name -> (loader, warm-up); loader returns False when the model is unavailable
+# 名称 -> (加载器, 预热)；模型不可用时加载器返回False
+MODEL_LOADERS: Dict[str, tuple] = {
+    "ppl": (_load_ppl, _warmup_ppl),
+    "spacy": (_load_spacy, _warmup_spacy),
+    "sbert": (_load_sbert, _warmup_sbert),
+}
+
+
+class ModelRegistry:
+    """
+    Tracks preload/warm-up of heavy models and exposes readiness
+    跟踪重量级模型的预加载/预热并提供就绪状态
+    """
+
+    def __init__(self, model_names: List[str], warmup: bool = True):
+        unknown = [name for name in model_names if name not in MODEL_LOADERS]
+        if unknown:
+            logger.warning(f"Unknown models in MODEL_PRELOAD ignored: {unknown}")
+        self.model_names = [name for name in model_names if name in MODEL_LOADERS]
+        self.warmup = warmup
+        self.statuses: Dict[str, ModelStatus] = {
+            name: ModelStatus(name=name) for name in self.model_names
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        All configured models finished loading
+        所有配置的模型已完成加载
+
+        "failed" also counts as finished: the analyzers degrade to their
+        fallbacks, and keeping the worker out of rotation forever would not help.
+        "failed" 也视为完成：分析器会降级到后备路径，永久移出流量并无帮助。
+        """
+        return all(
+            status.state not in ("pending", "loading")
+            for status in self.statuses.values()
+        )
+
+    def _load_one(self, name: str) -> None:
+        """
+        Load and warm up one model (runs in a worker thread)
+        加载并预热一个模型（在工作线程中运行）
+        """
+        loader, warmup = MODEL_LOADERS[name]
+        status = self.statuses[name]
+        status.state = "loading"
+
+        start = time.perf_counter()
+        try:
+            available = loader()
+        except Exception as e:
+            status.state = "failed"
+            status.error = str(e)
+            logger.error(f"Model preload failed for {name}: {e}")
+            return
+        status.load_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        if not available:
+            status.state = "unavailable"
+            logger.info(f"Model {name} unavailable, analyzers will use fallback ({status.load_ms} ms)")
+            return
+
+        if self.warmup:
+            start = time.perf_counter()
+            try:
+                warmup()
+            except Exception as e:
+                # Warm-up failure is not fatal: the model itself loaded
+                # 预热失败不致命：模型本身已加载
+                logger.warning(f"Model warm-up failed for {name}: {e}")
+            status.warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        status.state = "ready"
+        logger.info(f"Model {name} ready (load {status.load_ms} ms, warm-up {status.warmup_ms} ms)")
+
+    async def preload(self) -> None:
+        """
+        Load all configured models in parallel worker threads
+        在并行工作线程中加载所有配置的模型
+        """
+        self._started_at = time.time()
+        await asyncio.gather(*(
+            asyncio.to_thread(self._load_one, name) for name in self.model_names
+        ))
+        self._finished_at = time.time()
+        states = {name: s.state for name, s in self.statuses.items()}
+        logger.info(
+            f"Model preload finished in {self._finished_at - self._started_at:.1f}s: {states}"
+        )
+
+    def start(self) -> None:
+        """
+        Start preloading in the background so liveness answers immediately
+        在后台开始预加载，使存活探针可以立即响应
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self.preload())
+
+    async def stop(self) -> None:
+        """
+        Cancel a preload still in progress (worker threads finish on their own)
+        取消仍在进行的预加载（工作线程自行结束）
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        """
+        Readiness report for /health/ready
+        供 /health/ready 使用的就绪报告
+        """
+        from src.core.analyzer.ppl_calculator import get_pool_metrics
+
+        return {
+            "ready": self.is_ready,
+            "models": {name: s.to_dict() for name, s in self.statuses.items()},
+            "preload_seconds": (
+                round(self._finished_at - self._started_at, 2)
+                if self._started_at and self._finished_at else None
+            ),
+            "ppl_pool": get_pool_metrics(),
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Get the process-wide model registry
+    获取进程级模型注册表
+    """
+    global _registry
+    if _registry is None:
+        settings = get_settings()
+        names = [n.strip() for n in settings.model_preload.split(",") if n.strip()]
+        _registry = ModelRegistry(names, warmup=settings.model_warmup)
+    return _registry
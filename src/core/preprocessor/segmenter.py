@@ -8,6 +8,8 @@ from dataclasses import dataclass
 from typing import List, Optional
 import logging
 
+from src.services.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -186,6 +188,7 @@ class SentenceSegmenter:
             re.compile(r'^Keywords?\s*:', re.IGNORECASE),
         ]
 
+    @traced("segmenter.segment")
     def segment(self, text: str) -> List[Sentence]:
         """
         Segment text into sentences
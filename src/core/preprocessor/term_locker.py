@@ -6,7 +6,7 @@ Term locking module - identifies and protects academic terms
 import re
 import json
 from dataclasses import dataclass
-from typing import List, Set, Optional
+from typing import List, Set, Optional, Pattern, Tuple
 from pathlib import Path
 import logging
 
@@ -179,6 +179,36 @@ class TermLocker:
             r'\([A-Z][a-z]+(?:\s+(?:et\s+al\.|&|and)\s+[A-Z][a-z]+)*,?\s*\d{4}[a-z]?\)'
         )
 
+        # Quotation patterns (invalid ones are skipped)
+        # 引用内容模式（跳过无效模式）
+        self.quotation_patterns = []
+        for pattern_str in self.QUOTATION_PATTERNS:
+            try:
+                self.quotation_patterns.append(re.compile(pattern_str))
+            except re.error:
+                continue
+
+        self._compile_whitelist()
+
+    def _compile_whitelist(self):
+        """
+        Compile one word-boundary matcher per whitelist term, with its domain
+        为每个白名单术语编译一个词边界匹配器，并记录其领域
+
+        Rebuilt whenever the whitelist changes, so identify_terms() never
+        compiles regexes on the request path.
+        白名单变化时重建，使 identify_terms() 不在请求路径上编译正则。
+        """
+        matchers: List[Tuple[str, Pattern, Optional[str]]] = []
+        for term in self.whitelist:
+            domain = None
+            for d, d_terms in self.domain_terms.items():
+                if term in d_terms:
+                    domain = d
+                    break
+            matchers.append((term, re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE), domain))
+        self.whitelist_matchers = matchers
+
     def identify_terms(self, text: str) -> List[LockedTerm]:
         """
         Identify all terms that should be locked in the text
@@ -222,23 +252,14 @@ class TermLocker:
         terms = []
         text_lower = text.lower()
 
-        for term in self.whitelist:
-            # Use word boundary matching
-            # 使用词边界匹配
-            pattern = r'\b' + re.escape(term) + r'\b'
-            for match in re.finditer(pattern, text_lower, re.IGNORECASE):
+        for term, pattern, domain in self.whitelist_matchers:
+            # Word boundary matching with the precompiled matcher
+            # 使用预编译匹配器进行词边界匹配
+            for match in pattern.finditer(text_lower):
                 # Get original case from text
                 # 从文本获取原始大小写
                 original_term = text[match.start():match.end()]
 
-                # Find domain if available
-                # 如果可用则查找领域
-                domain = None
-                for d, d_terms in self.domain_terms.items():
-                    if term in d_terms:
-                        domain = d
-                        break
-
                 terms.append(LockedTerm(
                     term=original_term,
                     start_pos=match.start(),
@@ -290,19 +311,15 @@ class TermLocker:
         查找引用内容
         """
         terms = []
-        
-        for pattern_str in self.QUOTATION_PATTERNS:
-            try:
-                pattern = re.compile(pattern_str)
-                for match in pattern.finditer(text):
-                    terms.append(LockedTerm(
-                        term=match.group(0),
-                        start_pos=match.start(),
-                        end_pos=match.end(),
-                        source="quotation"
-                    ))
-            except re.error:
-                continue
+
+        for pattern in self.quotation_patterns:
+            for match in pattern.finditer(text):
+                terms.append(LockedTerm(
+                    term=match.group(0),
+                    start_pos=match.start(),
+                    end_pos=match.end(),
+                    source="quotation"
+                ))
 
         return terms
 
@@ -378,6 +395,11 @@ class TermLocker:
         Add a term to the whitelist
         将术语添加到白名单
 
+        Mutates this locker: use a private TermLocker, never the shared
+        component_registry.get_term_locker() instance.
+        会修改此锁定器：请使用私有 TermLocker，不要修改共享的
+        component_registry.get_term_locker() 实例。
+
         Args:
             term: Term to add
             domain: Optional domain category
@@ -387,6 +409,7 @@ class TermLocker:
             if domain not in self.domain_terms:
                 self.domain_terms[domain] = set()
             self.domain_terms[domain].add(term.lower())
+        self._compile_whitelist()
 
     def remove_term(self, term: str):
         """
@@ -396,6 +419,7 @@ class TermLocker:
         self.whitelist.discard(term.lower())
         for domain_terms in self.domain_terms.values():
             domain_terms.discard(term.lower())
+        self._compile_whitelist()
 
 
 # Convenience function
@@ -405,5 +429,5 @@ def identify_locked_terms(text: str) -> List[LockedTerm]:
     Convenience function to identify locked terms
     识别锁定术语的便捷函数
     """
-    locker = TermLocker()
-    return locker.identify_terms(text)
+    from src.core.component_registry import get_term_locker
+    return get_term_locker().identify_terms(text)
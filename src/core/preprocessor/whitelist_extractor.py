@@ -10,6 +10,8 @@ import logging
 from typing import Set, List, Optional
 from dataclasses import dataclass
 
+from src.core.lexicon_registry import get_lexicon
+
 logger = logging.getLogger(__name__)
 
 
@@ -89,8 +91,15 @@ class WhitelistExtractor:
         'autocorrelation', 'stationarity',
     }
 
-    def __init__(self):
-        """Initialize whitelist extractor"""
+    def __init__(self, lexicon_terms: Optional[Set[str]] = None):
+        """
+        Initialize whitelist extractor
+
+        Args:
+            lexicon_terms: Whitelist terms to use instead of the lexicon registry
+                (ingestion workers receive the parent's snapshot this way)
+        """
+        self._lexicon_terms = frozenset(lexicon_terms) if lexicon_terms is not None else None
         self._compile_patterns()
 
     def _compile_patterns(self):
@@ -100,6 +109,16 @@ class WhitelistExtractor:
             for pattern in self.DOMAIN_PATTERNS
         ]
 
+    @property
+    def known_domain_terms(self) -> Set[str]:
+        """
+        Builtin domain terms plus whitelist terms from the lexicon registry
+        内置学科术语加上词库注册表中的白名单术语
+        """
+        if self._lexicon_terms is not None:
+            return self.KNOWN_DOMAIN_TERMS | self._lexicon_terms
+        return self.KNOWN_DOMAIN_TERMS | get_lexicon().whitelist_terms
+
     def extract_from_abstract(self, abstract_text: str) -> WhitelistResult:
         """
         Extract domain-specific terms from the Abstract section
@@ -136,7 +155,7 @@ class WhitelistExtractor:
 
         # 3. Add known domain terms if they appear in abstract
         # 3. 如果已知学科术语出现在摘要中，添加它们
-        for term in self.KNOWN_DOMAIN_TERMS:
+        for term in self.known_domain_terms:
             if term in abstract_lower:
                 terms.add(term)
 
@@ -204,8 +223,9 @@ class WhitelistExtractor:
             intro_result = self.extract_from_abstract(intro_text)
             # Only add high-confidence terms from intro
             # 只添加引言中高置信度的术语
+            known_terms = self.known_domain_terms
             for term in intro_result.terms:
-                if term in self.KNOWN_DOMAIN_TERMS or len(term) > 10:
+                if term in known_terms or len(term) > 10:
                     terms.add(term)
 
         confidence = min(1.0, len(terms) / 30)
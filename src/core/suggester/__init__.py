@@ -1,5 +1,6 @@
 # Suggester module
 from src.core.suggester.llm_track import LLMTrack
 from src.core.suggester.rule_track import RuleTrack
+from src.core.suggester.cascade import SuggestionCascade
 
-__all__ = ["LLMTrack", "RuleTrack"]
+__all__ = ["LLMTrack", "RuleTrack", "SuggestionCascade"]
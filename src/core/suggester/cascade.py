@@ -0,0 +1,222 @@
+"""
+Suggestion cascade - rule track first, LLM only when the rules fall short
+建议级联 - 先走规则轨道，仅在规则不达标时调用LLM
+
+/suggest and the YOLO routes used to call the LLM for every sentence, even
+when RuleTrack's deterministic rewrite already brought the sentence under
+the risk target. The cascade runs the rule tier first, scores its output
+(RiskScorer score_only profile), checks semantic similarity and the
+QualityGate suggestion verifier, and escalates to the LLM only when one of
+those misses. Every tier decision is counted in
+academicguard_cascade_decisions_total{route, tier, decision, reason} and
+logged at debug level, so the thresholds can be tuned from real traffic.
+
+/suggest 和 YOLO 路由过去对每个句子都调用LLM，即使 RuleTrack 的确定性改写已将句子
+降到风险目标以下。级联先运行规则层，对其输出评分（RiskScorer score_only 配置），
+检查语义相似度和 QualityGate 建议校验，仅当任一项未达标时才升级到LLM。
+每个层级的决策都计入 academicguard_cascade_decisions_total 并以 debug 级别记录日志，
+便于根据真实流量调整阈值。
+
+Rule-tier reasons / 规则层原因:
+    targets_met              accepted, no LLM call
+    cascade_disabled         SUGGEST_CASCADE_ENABLED=false, always escalate
+    no_change                the rules found nothing to rewrite
+    validation_failed        P0 words, new fingerprints or first-person pronouns
+    no_improvement           rewrite does not lower the risk
+    risk_above_target        rewrite still scores at or above CASCADE_RISK_TARGET
+                             (the score YOLO treats as needing a rewrite)
+    semantic_below_threshold rewrite drifts from the original meaning
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from src.config import get_settings
+from src.core.component_registry import get_quality_gate, get_risk_scorer
+from src.core.suggester.rule_track import RuleSuggestionResult, RuleTrack
+from src.services.tracing import CASCADE_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TierDecision:
+    """
+    One tier's decision for one sentence
+    单个句子在某一层级的决策
+    """
+    tier: str  # rule | llm
+    decision: str  # accept | escalate | reject
+    reason: str
+    risk: Optional[int] = None
+    semantic: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "decision": self.decision,
+            "reason": self.reason,
+            "risk": self.risk,
+            "semantic": round(self.semantic, 3) if self.semantic is not None else None,
+        }
+
+
+@dataclass
+class RuleTierOutcome:
+    """
+    Rule rewrite plus the cascade's verdict on it
+    规则改写及级联对其的判定
+
+    risk is set whenever the rewrite is usable (changed and verified), so
+    callers can still compare it with an LLM rewrite after escalating.
+    只要改写可用（有改动且通过校验）就会设置 risk，升级后调用方仍可与LLM改写比较。
+    """
+    rule_result: Optional[RuleSuggestionResult]
+    decision: TierDecision
+    risk: Optional[int] = None
+    semantic: Optional[float] = None
+
+    @property
+    def escalate(self) -> bool:
+        return self.decision.decision == "escalate"
+
+    @property
+    def usable(self) -> bool:
+        return self.risk is not None
+
+
+class SuggestionCascade:
+    """
+    Rule-first suggestion cascade
+    规则优先的建议级联
+
+    Stateless apart from its thresholds; build one per request (cheap) or
+    share one across requests.
+    除阈值外无状态；可每个请求构建一个（开销很小）或跨请求共享。
+    """
+
+    def __init__(
+        self,
+        route: str,
+        risk_target: Optional[int] = None,
+        semantic_threshold: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ):
+        settings = get_settings()
+        self.route = route
+        self.risk_target = settings.cascade_risk_target if risk_target is None else risk_target
+        self.semantic_threshold = (
+            semantic_threshold
+            or settings.cascade_semantic_threshold
+            or settings.semantic_similarity_threshold
+        )
+        self.enabled = settings.suggest_cascade_enabled if enabled is None else enabled
+        self.scorer = get_risk_scorer()
+        self.quality_gate = get_quality_gate()
+
+    def _record(self, decision: TierDecision) -> TierDecision:
+        CASCADE_DECISIONS.inc(1, self.route, decision.tier, decision.decision, decision.reason)
+        logger.debug(f"[cascade:{self.route}] {decision.to_dict()}")
+        return decision
+
+    def run_rule_tier(
+        self,
+        rule_track: RuleTrack,
+        sentence: str,
+        original_risk: int,
+        locked_terms: List[str],
+        issues: Optional[List[Dict[str, Any]]] = None,
+        tone_level: int = 4,
+        whitelist: Optional[Set[str]] = None,
+        context_baseline: int = 0,
+    ) -> RuleTierOutcome:
+        """
+        Generate, verify and score the rule rewrite, then accept or escalate
+        生成、校验并评分规则改写，然后接受或升级
+        """
+        rule_result = rule_track.generate_suggestion(
+            sentence=sentence,
+            issues=issues or [],
+            locked_terms=locked_terms,
+        )
+
+        if not rule_result or not rule_result.rewritten or rule_result.rewritten == sentence:
+            return RuleTierOutcome(
+                rule_result=rule_result,
+                decision=self._record(TierDecision("rule", "escalate", "no_change")),
+            )
+
+        validation = self.quality_gate.verify_suggestion(
+            original=sentence,
+            suggestion=rule_result.rewritten,
+            colloquialism_level=tone_level,
+        )
+        if not validation.passed:
+            return RuleTierOutcome(
+                rule_result=rule_result,
+                decision=self._record(TierDecision("rule", "escalate", "validation_failed")),
+            )
+
+        risk = self.scorer.analyze(
+            rule_result.rewritten,
+            tone_level=tone_level,
+            whitelist=whitelist,
+            context_baseline=context_baseline,
+            profile="score_only",
+        ).risk_score
+
+        semantic = None
+        if not self.enabled:
+            reason = "cascade_disabled"
+        elif risk >= original_risk:
+            reason = "no_improvement"
+        elif risk >= self.risk_target:
+            reason = "risk_above_target"
+        else:
+            # Semantic similarity last: it is the most expensive check
+            # 语义相似度放在最后：它是开销最大的检查
+            semantic = self.quality_gate.semantic_validator.get_similarity_score(
+                sentence, rule_result.rewritten
+            )
+            reason = "targets_met" if semantic >= self.semantic_threshold else "semantic_below_threshold"
+
+        decision = TierDecision(
+            "rule",
+            "accept" if reason == "targets_met" else "escalate",
+            reason,
+            risk=risk,
+            semantic=semantic,
+        )
+        return RuleTierOutcome(
+            rule_result=rule_result,
+            decision=self._record(decision),
+            risk=risk,
+            semantic=semantic,
+        )
+
+    def record_llm(
+        self,
+        accepted: bool,
+        reason: str,
+        risk: Optional[int] = None,
+    ) -> TierDecision:
+        """
+        Record the outcome of an escalated sentence's LLM tier
+        记录已升级句子在LLM层的结果
+
+        reason: targets_met | risk_above_target | no_improvement |
+                validation_failed | no_result | error
+        """
+        return self._record(TierDecision("llm", "accept" if accepted else "reject", reason, risk=risk))
+
+    def llm_reason(self, risk: int, original_risk: int) -> str:
+        """
+        Reason label for a verified LLM rewrite with the given risk
+        给定风险的已校验LLM改写对应的原因标签
+        """
+        if risk >= original_risk:
+            return "no_improvement"
+        if risk >= self.risk_target:
+            return "risk_above_target"
+        return "targets_met"
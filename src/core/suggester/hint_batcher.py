@@ -0,0 +1,159 @@
+"""
+Suggestion batcher - coalesce concurrent /suggest LLM calls into one batch prompt
+建议批处理器 - 将并发的 /suggest LLM调用合并为一次批量提示词
+
+The review page requests hints for several sentences at once (prefetching
+the next sentences, switching quickly between them). Each escalated
+sentence used to send its own rewrite prompt. Calls for the same session
+and colloquialism level that arrive within a short window are now packed
+into one LLMTrack.generate_suggestions_batch request; a call that finds no
+company within the window still uses the single-sentence prompt.
+
+审阅页面会同时为多个句子请求提示（预取后续句子、快速切换）。过去每个升级的句子都会
+单独发送一次改写提示词。现在在短时间窗口内到达的、同一会话和口语化级别的调用会被打包为
+一次 LLMTrack.generate_suggestions_batch 请求；窗口内没有其他调用的仍使用单句提示词。
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.config import get_settings
+from src.core.suggester.llm_track import BatchSuggestionItem, LLMSuggestionResult, LLMTrack
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingBatch:
+    """Calls collected for one (session, level, language) key"""
+    track: LLMTrack
+    target_lang: str
+    items: List[BatchSuggestionItem] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class SuggestionBatcher:
+    """
+    Per-session micro-batching of single-sentence LLM rewrites
+    按会话对单句LLM改写进行微批处理
+    """
+
+    def __init__(self, window_ms: int = 30, max_items: int = 8):
+        self.window_ms = window_ms
+        self.max_items = max(1, max_items)
+        self._pending: Dict[Tuple[Any, ...], _PendingBatch] = {}
+        self._running: Set[asyncio.Task] = set()
+        self.calls = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.singles = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    async def suggest(
+        self,
+        track: LLMTrack,
+        item: BatchSuggestionItem,
+        target_lang: str = "zh"
+    ) -> Optional[LLMSuggestionResult]:
+        """
+        Rewrite one sentence, sharing an LLM call with concurrent callers
+        改写一个句子，与并发调用方共享一次LLM调用
+        """
+        self.calls += 1
+        if not self.enabled or not track.session_id:
+            self.singles += 1
+            return await self._single(track, item, target_lang)
+
+        loop = asyncio.get_running_loop()
+        key = (id(loop), track.session_id, track.level, target_lang)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(track=track, target_lang=target_lang)
+            batch.timer = loop.call_later(self.window_ms / 1000, self._flush, key, batch)
+            self._pending[key] = batch
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_items:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Tuple[Any, ...], batch: _PendingBatch) -> None:
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _PendingBatch) -> None:
+        try:
+            if len(batch.items) == 1:
+                self.singles += 1
+                results = [await self._single(batch.track, batch.items[0], batch.target_lang)]
+            else:
+                self.batches += 1
+                self.batched_items += len(batch.items)
+                logger.info(f"[suggest-batch] {len(batch.items)} sentences of session {batch.track.session_id} in one request")
+                results = await batch.track.generate_suggestions_batch(batch.items, target_lang=batch.target_lang)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    async def _single(
+        track: LLMTrack,
+        item: BatchSuggestionItem,
+        target_lang: str
+    ) -> Optional[LLMSuggestionResult]:
+        return await track.generate_suggestion(
+            sentence=item.sentence,
+            issues=item.issues,
+            locked_terms=item.locked_terms,
+            target_lang=target_lang,
+            is_paraphrase=item.is_paraphrase
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_ms,
+            "max_items": self.max_items,
+            "calls": self.calls,
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "singles": self.singles,
+        }
+
+
+_batcher: Optional[SuggestionBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_suggestion_batcher() -> SuggestionBatcher:
+    """
+    Get the process-wide suggestion batcher
+    获取进程级建议批处理器
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                settings = get_settings()
+                _batcher = SuggestionBatcher(
+                    window_ms=settings.suggest_batch_window_ms,
+                    max_items=settings.llm_batch_size,
+                )
+    return _batcher
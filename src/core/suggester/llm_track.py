@@ -8,10 +8,13 @@ Integrates with Step 1.0 Term Locking to protect locked terms during rewriting.
 
 import json
 import logging
+import re
+import time
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 
 from src.config import get_settings, ColloquialismConfig
+from src.prompts.prefix_cache import gemini_usage, record_response_usage, record_usage
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -52,6 +55,15 @@ class Change:
     reason_zh: str
 
 
+@dataclass
+class BatchSuggestionItem:
+    """One sentence in a batched rewrite request"""
+    sentence: str
+    issues: List[Dict[str, Any]] = field(default_factory=list)
+    locked_terms: List[str] = field(default_factory=list)
+    is_paraphrase: bool = False
+
+
 @dataclass
 class LLMSuggestionResult:
     """Result from LLM suggestion generation"""
@@ -158,94 +170,18 @@ Style: Casual Informal (Discussion Level)
         }
     }
 
-    def __init__(self, colloquialism_level: int = 4, session_id: Optional[str] = None):
-        """
-        Initialize LLM track
-
-        Args:
-            colloquialism_level: Target formality level (0-10)
-            session_id: Optional session ID for accessing locked terms from Step 1.0
-        """
-        self.level = colloquialism_level
-        self.session_id = session_id
-        self.style_guide = self._get_style_guide()
-        self.word_preferences = self._get_word_preferences()
-
-        # Load locked terms from session (Step 1.0)
-        # 从会话加载锁定术语（步骤1.0）
-        self.session_locked_terms = get_locked_terms_from_session(session_id)
-        if self.session_locked_terms:
-            logger.info(f"Loaded {len(self.session_locked_terms)} locked terms from session {session_id}")
-
-    def _get_style_guide(self) -> str:
-        """Get style guide for current level"""
-        level_range = ColloquialismConfig.get_level_range(self.level)
-        return self.STYLE_GUIDES.get(level_range, self.STYLE_GUIDES["academic_moderate"])
-
-    def _get_word_preferences(self) -> Dict[str, str]:
-        """Get word preferences for current level"""
-        for level_range, prefs in self.WORD_PREFERENCES.items():
-            if level_range[0] <= self.level <= level_range[1]:
-                return prefs
-        return self.WORD_PREFERENCES[(3, 4)]
-
-    def _build_prompt(
-        self,
-        sentence: str,
-        issues: List[Dict[str, Any]],
-        locked_terms: List[str],
-        target_lang: str,
-        is_paraphrase: bool = False
-    ) -> str:
-        """
-        Build the prompt for LLM
-        构建LLM的提示词
-        """
-        # Format issues
-        # 格式化问题
-        issues_text = "\n".join([
-            f"- {issue.get('type', 'unknown')}: {issue.get('description', '')}"
-            for issue in issues
-        ]) if issues else "No specific issues detected"
-
-        # Format word preferences
-        # 格式化词汇偏好
-        prefs_text = "\n".join([
-            f"  • '{formal}' → '{preferred}'"
-            for formal, preferred in self.word_preferences.items()
-        ])
-
-        # Add paraphrase instruction if needed
-        paraphrase_instruction = ""
-        if is_paraphrase:
-            paraphrase_instruction = """
-## PARAPHRASE PROTECTION (CRITICAL):
-This sentence is a PARAPHRASE of cited work.
-1. You MUST preserve the exact meaning (Semantic Similarity >= 0.95).
+    # Rules for sentences that paraphrase cited work
+    # 转述引用文献的句子所遵循的规则
+    PARAPHRASE_RULES = """1. You MUST preserve the exact meaning (Semantic Similarity >= 0.95).
 2. You MUST preserve the citation in its EXACT original format - NO format changes allowed.
    - "(Smith, 2020)" must stay as "(Smith, 2020)" - NOT "Smith (2020)"
    - "[1]" must stay as "[1]" - same position, same punctuation
 3. Only make minor stylistic changes to reduce AI detection, do not rewrite structure completely.
-4. If you cannot improve the sentence without changing the citation format, return the original sentence unchanged.
-"""
-
-        prompt = f"""## TASK: REWRITE to pass AI detection (lower perplexity uniformity)
-
-You are an expert at making AI-generated text appear human-written. REWRITE this sentence to PASS AI detectors like GPTZero and Turnitin.
-
-## Original Sentence
-{sentence}
-
-## Detected Issues
-{issues_text}
-
-## Protected Terms (KEEP UNCHANGED)
-{', '.join(locked_terms) if locked_terms else 'None'}
+4. If you cannot improve the sentence without changing the citation format, return the original sentence unchanged."""
 
-## Colloquialism Level: {self.level}/10
-{self.style_guide}
-{paraphrase_instruction}
-## FIRST-PERSON PRONOUN RULES (CRITICAL FOR LEVEL 0-5):
+    # Static rewrite rules shared by single and batched prompts
+    # 单句与批量提示词共用的静态改写规则
+    REWRITE_RULES = """## FIRST-PERSON PRONOUN RULES (CRITICAL FOR LEVEL 0-5):
 If Colloquialism Level is 0-5 (academic writing):
 - STRICTLY FORBIDDEN: I, we, my, our, us, me (all forms)
 - USE INSTEAD: "this study", "this research", "the analysis", "the present investigation", "the findings"
@@ -334,7 +270,96 @@ FORBIDDEN:
 - Do NOT change citation punctuation or spacing
 - Do NOT merge or split citations
 
-ONLY rewrite the NON-CITATION parts of the sentence.
+ONLY rewrite the NON-CITATION parts of the sentence."""
+
+    # Citations that must survive a paraphrase rewrite verbatim
+    # 转述改写中必须原样保留的引用
+    CITATION_PATTERN = re.compile(r'\([^()]*\d{4}[a-z]?\)|\[\d+(?:\s*[,\-–]\s*\d+)*\]')
+
+    def __init__(self, colloquialism_level: int = 4, session_id: Optional[str] = None):
+        """
+        Initialize LLM track
+
+        Args:
+            colloquialism_level: Target formality level (0-10)
+            session_id: Optional session ID for accessing locked terms from Step 1.0
+        """
+        self.level = colloquialism_level
+        self.session_id = session_id
+        self.style_guide = self._get_style_guide()
+        self.word_preferences = self._get_word_preferences()
+        self.last_batch_stats: Dict[str, int] = {}
+
+        # Load locked terms from session (Step 1.0)
+        # 从会话加载锁定术语（步骤1.0）
+        self.session_locked_terms = get_locked_terms_from_session(session_id)
+        if self.session_locked_terms:
+            logger.info(f"Loaded {len(self.session_locked_terms)} locked terms from session {session_id}")
+
+    def _get_style_guide(self) -> str:
+        """Get style guide for current level"""
+        level_range = ColloquialismConfig.get_level_range(self.level)
+        return self.STYLE_GUIDES.get(level_range, self.STYLE_GUIDES["academic_moderate"])
+
+    def _get_word_preferences(self) -> Dict[str, str]:
+        """Get word preferences for current level"""
+        for level_range, prefs in self.WORD_PREFERENCES.items():
+            if level_range[0] <= self.level <= level_range[1]:
+                return prefs
+        return self.WORD_PREFERENCES[(3, 4)]
+
+    def _build_prompt(
+        self,
+        sentence: str,
+        issues: List[Dict[str, Any]],
+        locked_terms: List[str],
+        target_lang: str,
+        is_paraphrase: bool = False
+    ) -> str:
+        """
+        Build the prompt for LLM
+        构建LLM的提示词
+        """
+        # Format issues
+        # 格式化问题
+        issues_text = "\n".join([
+            f"- {issue.get('type', 'unknown')}: {issue.get('description', '')}"
+            for issue in issues
+        ]) if issues else "No specific issues detected"
+
+        # Format word preferences
+        # 格式化词汇偏好
+        prefs_text = "\n".join([
+            f"  • '{formal}' → '{preferred}'"
+            for formal, preferred in self.word_preferences.items()
+        ])
+
+        # Add paraphrase instruction if needed
+        paraphrase_instruction = ""
+        if is_paraphrase:
+            paraphrase_instruction = (
+                "\n## PARAPHRASE PROTECTION (CRITICAL):\n"
+                "This sentence is a PARAPHRASE of cited work.\n"
+                f"{self.PARAPHRASE_RULES}\n"
+            )
+
+        prompt = f"""## TASK: REWRITE to pass AI detection (lower perplexity uniformity)
+
+You are an expert at making AI-generated text appear human-written. REWRITE this sentence to PASS AI detectors like GPTZero and Turnitin.
+
+## Original Sentence
+{sentence}
+
+## Detected Issues
+{issues_text}
+
+## Protected Terms (KEEP UNCHANGED)
+{', '.join(locked_terms) if locked_terms else 'None'}
+
+## Colloquialism Level: {self.level}/10
+{self.style_guide}
+{paraphrase_instruction}
+{self.REWRITE_RULES}
 
 ## Response (JSON ONLY, no markdown):
 {{
@@ -380,40 +405,8 @@ ONLY rewrite the NON-CITATION parts of the sentence.
         prompt = self._build_prompt(sentence, issues, all_locked_terms, target_lang, is_paraphrase)
 
         try:
-            # Try to use configured LLM provider
-            # 尝试使用配置的LLM提供商
-            if settings.llm_provider == "volcengine" and settings.volcengine_api_key:
-                # Volcengine (火山引擎) - faster DeepSeek access
-                # 火山引擎 - 更快的 DeepSeek 访问
-                response = await self._call_volcengine(prompt)
-            elif settings.llm_provider == "dashscope" and settings.dashscope_api_key:
-                # DashScope (阿里云灵积) - Qwen models
-                # 阿里云灵积 - 通义千问模型
-                response = await self._call_dashscope(prompt)
-            elif settings.llm_provider == "gemini" and settings.gemini_api_key:
-                response = await self._call_gemini(prompt)
-            elif settings.llm_provider == "deepseek" and settings.deepseek_api_key:
-                response = await self._call_deepseek(prompt)
-            elif settings.llm_provider == "anthropic" and settings.anthropic_api_key:
-                response = await self._call_anthropic(prompt)
-            elif settings.llm_provider == "openai" and settings.openai_api_key:
-                response = await self._call_openai(prompt)
-            elif settings.dashscope_api_key:
-                # Fallback to DashScope
-                response = await self._call_dashscope(prompt)
-            elif settings.volcengine_api_key:
-                # Fallback to Volcengine if available (preferred)
-                # 如果可用则回退到火山引擎（首选）
-                response = await self._call_volcengine(prompt)
-            elif settings.gemini_api_key:
-                # Fallback to Gemini if available
-                # 如果可用则回退到Gemini
-                response = await self._call_gemini(prompt)
-            elif settings.deepseek_api_key:
-                # Fallback to DeepSeek if available
-                # 如果可用则回退到DeepSeek
-                response = await self._call_deepseek(prompt)
-            else:
+            response = await self._call_llm(prompt)
+            if response is None:
                 # Fallback to rule-based simulation for MVP
                 # MVP阶段回退到基于规则的模拟
                 logger.warning("No LLM API configured, using fallback")
@@ -427,20 +420,294 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"LLM suggestion generation failed: {e}")
             return self._fallback_suggestion(sentence, issues, all_locked_terms)
 
-    async def _call_anthropic(self, prompt: str) -> str:
+    def _build_batch_prompt(
+        self,
+        items: List[BatchSuggestionItem],
+        locked_terms: List[List[str]],
+        retry_notes: Optional[Dict[int, str]] = None
+    ) -> str:
+        """
+        Build one prompt that rewrites several sentences
+        构建一次改写多个句子的提示词
+
+        The style guide and rewrite rules are sent once per batch instead of
+        once per sentence; each sentence keeps its own protected terms,
+        issues and paraphrase flag.
+        风格指南和改写规则每批只发送一次；每个句子保留各自的受保护术语、问题和转述标记。
+        """
+        retry_notes = retry_notes or {}
+        paraphrase_instruction = ""
+        if any(item.is_paraphrase for item in items):
+            paraphrase_instruction = (
+                "\n## PARAPHRASE PROTECTION (CRITICAL):\n"
+                "Sentences marked PARAPHRASE are paraphrases of cited work. For those sentences:\n"
+                f"{self.PARAPHRASE_RULES}\n"
+            )
+
+        blocks = []
+        for i, item in enumerate(items):
+            issues_text = "; ".join(
+                f"{issue.get('type', 'unknown')}: {issue.get('description', '')}"
+                for issue in item.issues
+            ) if item.issues else "No specific issues detected"
+            lines = [
+                f"### [{i}]",
+                f"Sentence: {item.sentence}",
+                f"Protected Terms (KEEP UNCHANGED): {', '.join(locked_terms[i]) if locked_terms[i] else 'None'}",
+                f"Detected Issues: {issues_text}",
+            ]
+            if item.is_paraphrase:
+                lines.append("PARAPHRASE: yes (apply PARAPHRASE PROTECTION)")
+            if i in retry_notes:
+                lines.append(f"Previous attempt rejected: {retry_notes[i]}")
+            blocks.append("\n".join(lines))
+        sentences_text = "\n\n".join(blocks)
+
+        return f"""## TASK: REWRITE each sentence to pass AI detection (lower perplexity uniformity)
+
+You are an expert at making AI-generated text appear human-written. REWRITE each sentence below independently to PASS AI detectors like GPTZero and Turnitin.
+
+## Colloquialism Level: {self.level}/10
+{self.style_guide}
+{paraphrase_instruction}
+{self.REWRITE_RULES}
+
+## Sentences ({len(items)})
+{sentences_text}
+
+## Response (JSON ONLY, no markdown):
+A JSON array with exactly one object per sentence, using the sentence's [id]:
+[
+  {{
+    "id": 0,
+    "rewritten": "the rewritten sentence applying above techniques",
+    "changes": [
+      {{"original": "word/phrase", "replacement": "new", "reason": "technique used", "reason_zh": "使用的技巧"}}
+    ],
+    "explanation": "Techniques applied",
+    "explanation_zh": "应用的技巧",
+    "risk_reduction": "high/medium/low"
+  }}
+]"""
+
+    def _parse_batch_response(
+        self,
+        response: str,
+        items: List[BatchSuggestionItem]
+    ) -> List[Optional[LLMSuggestionResult]]:
+        """
+        Parse a JSON-array batch response, one result per item (None if missing)
+        解析JSON数组形式的批量响应，每项一个结果（缺失则为None）
+        """
+        results: List[Optional[LLMSuggestionResult]] = [None] * len(items)
+        try:
+            data = json.loads(self._strip_code_fence(response))
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse LLM batch response: {e}")
+            return results
+
+        if isinstance(data, dict):
+            data = data.get("results") or data.get("items") or []
+        if not isinstance(data, list):
+            return results
+
+        for position, entry in enumerate(data):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("id", position))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(items) and results[index] is None:
+                try:
+                    results[index] = self._result_from_data(entry, items[index].sentence)
+                except Exception as e:
+                    logger.warning(f"Invalid batch item {index}: {e}")
+        return results
+
+    def _validate_batch_result(
+        self,
+        item: BatchSuggestionItem,
+        locked_terms: List[str],
+        result: Optional[LLMSuggestionResult]
+    ) -> Optional[str]:
+        """
+        Check one batched rewrite on its own
+        单独检查一条批量改写结果
+
+        Returns:
+            Rejection reason, or None if the rewrite is usable
+        """
+        if result is None or not (result.rewritten or "").strip():
+            return "missing or empty rewrite"
+
+        rewritten_lower = result.rewritten.lower()
+        original_lower = item.sentence.lower()
+        for term in locked_terms:
+            if term.lower() in original_lower and term.lower() not in rewritten_lower:
+                return f"protected term '{term}' was changed"
+
+        if item.is_paraphrase:
+            for citation in self.CITATION_PATTERN.findall(item.sentence):
+                if citation not in result.rewritten:
+                    return f"citation '{citation}' was not preserved"
+        return None
+
+    async def generate_suggestions_batch(
+        self,
+        items: List[BatchSuggestionItem],
+        target_lang: str = "zh",
+        batch_size: Optional[int] = None
+    ) -> List[Optional[LLMSuggestionResult]]:
+        """
+        Generate humanization suggestions for several sentences per LLM call
+        每次LLM调用为多个句子生成人源化建议
+
+        Sentences are packed into requests of `batch_size` with a JSON-array
+        response. Each item is validated on its own; only the items that fail
+        are re-issued (up to llm_batch_max_retries rounds).
+        句子按 batch_size 打包为一次请求并返回JSON数组。每项单独验证，
+        仅重新发送失败的项（最多 llm_batch_max_retries 轮）。
+
+        Args:
+            items: Sentences with their issues, locked terms and paraphrase flags
+            target_lang: Target language for explanations
+            batch_size: Sentences per request (defaults to llm_batch_size)
+
+        Returns:
+            One result per item, in input order (None if the item kept failing)
+        """
+        batch_size = max(1, batch_size or settings.llm_batch_size)
+        results: List[Optional[LLMSuggestionResult]] = [None] * len(items)
+        self.last_batch_stats = {"items": len(items), "llm_calls": 0, "reissued": 0, "failed": 0}
+        if not items:
+            return results
+
+        # Merge session locked terms per item (Step 1.0 integration)
+        # 为每项合并会话锁定术语（步骤1.0集成）
+        locked_terms = [
+            list(set(self.session_locked_terms + (item.locked_terms or [])))
+            for item in items
+        ]
+
+        pending = list(range(len(items)))
+        retry_notes: Dict[int, str] = {}
+        for attempt in range(settings.llm_batch_max_retries + 1):
+            if not pending:
+                break
+            failed: List[int] = []
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                chunk_items = [items[i] for i in chunk]
+                prompt = self._build_batch_prompt(
+                    chunk_items,
+                    [locked_terms[i] for i in chunk],
+                    {pos: retry_notes[i] for pos, i in enumerate(chunk) if i in retry_notes}
+                )
+                max_tokens = max(settings.llm_max_tokens, settings.llm_batch_tokens_per_item * len(chunk))
+
+                try:
+                    response = await self._call_llm(prompt, max_tokens)
+                except Exception as e:
+                    logger.error(f"LLM batch of {len(chunk)} failed: {e}")
+                    self.last_batch_stats["llm_calls"] += 1
+                    failed.extend(chunk)
+                    continue
+
+                if response is None:
+                    # No LLM configured: same rule-based fallback as single mode
+                    # 未配置LLM：与单句模式相同的规则回退
+                    logger.warning("No LLM API configured, using fallback")
+                    for i in chunk:
+                        results[i] = self._fallback_suggestion(
+                            items[i].sentence, items[i].issues, locked_terms[i]
+                        )
+                    continue
+
+                self.last_batch_stats["llm_calls"] += 1
+                parsed = self._parse_batch_response(response, chunk_items)
+                for pos, i in enumerate(chunk):
+                    reason = self._validate_batch_result(items[i], locked_terms[i], parsed[pos])
+                    if reason is None:
+                        results[i] = parsed[pos]
+                    else:
+                        retry_notes[i] = reason
+                        failed.append(i)
+
+            if failed and attempt < settings.llm_batch_max_retries:
+                self.last_batch_stats["reissued"] += len(failed)
+                logger.info(f"Re-issuing {len(failed)}/{len(items)} batch items that failed validation")
+            pending = failed
+
+        self.last_batch_stats["failed"] = len(pending)
+        logger.info(
+            f"LLM batch: {len(items)} sentences in {self.last_batch_stats['llm_calls']} calls "
+            f"({self.last_batch_stats['reissued']} re-issued, {len(pending)} failed)"
+        )
+        return results
+
+    async def _call_llm(self, prompt: str, max_tokens: Optional[int] = None) -> Optional[str]:
+        """
+        Send a prompt to the configured LLM provider
+        将提示词发送到配置的LLM提供商
+
+        Returns:
+            Raw response text, or None if no provider is configured
+        """
+        # Try to use configured LLM provider
+        # 尝试使用配置的LLM提供商
+        if settings.llm_provider == "volcengine" and settings.volcengine_api_key:
+            # Volcengine (火山引擎) - faster DeepSeek access
+            # 火山引擎 - 更快的 DeepSeek 访问
+            return await self._call_volcengine(prompt, max_tokens)
+        elif settings.llm_provider == "dashscope" and settings.dashscope_api_key:
+            # DashScope (阿里云灵积) - Qwen models
+            # 阿里云灵积 - 通义千问模型
+            return await self._call_dashscope(prompt, max_tokens)
+        elif settings.llm_provider == "gemini" and settings.gemini_api_key:
+            return await self._call_gemini(prompt, max_tokens)
+        elif settings.llm_provider == "deepseek" and settings.deepseek_api_key:
+            return await self._call_deepseek(prompt, max_tokens)
+        elif settings.llm_provider == "anthropic" and settings.anthropic_api_key:
+            return await self._call_anthropic(prompt, max_tokens)
+        elif settings.llm_provider == "openai" and settings.openai_api_key:
+            return await self._call_openai(prompt, max_tokens)
+        elif settings.dashscope_api_key:
+            # Fallback to DashScope
+            return await self._call_dashscope(prompt, max_tokens)
+        elif settings.volcengine_api_key:
+            # Fallback to Volcengine if available (preferred)
+            # 如果可用则回退到火山引擎（首选）
+            return await self._call_volcengine(prompt, max_tokens)
+        elif settings.gemini_api_key:
+            # Fallback to Gemini if available
+            # 如果可用则回退到Gemini
+            return await self._call_gemini(prompt, max_tokens)
+        elif settings.deepseek_api_key:
+            # Fallback to DeepSeek if available
+            # 如果可用则回退到DeepSeek
+            return await self._call_deepseek(prompt, max_tokens)
+        return None
+
+    async def _call_anthropic(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """Call Anthropic API"""
         try:
             import anthropic
 
             client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
 
+            started = time.perf_counter()
             message = await client.messages.create(
                 model=settings.llm_model,
-                max_tokens=settings.llm_max_tokens,
+                max_tokens=max_tokens or settings.llm_max_tokens,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
+            record_usage(
+                "llm_track", prompt, message.usage.model_dump() if message.usage else None,
+                provider="anthropic", model=message.model, latency_ms=(time.perf_counter() - started) * 1000
+            )
 
             return message.content[0].text
         except ImportError:
@@ -450,21 +717,26 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"Anthropic API error: {e}")
             raise
 
-    async def _call_openai(self, prompt: str) -> str:
+    async def _call_openai(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """Call OpenAI API"""
         try:
             import openai
 
             client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
 
+            started = time.perf_counter()
             response = await client.chat.completions.create(
                 model="gpt-4",
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=settings.llm_max_tokens,
+                max_tokens=max_tokens or settings.llm_max_tokens,
                 temperature=settings.llm_temperature
             )
+            record_usage(
+                "llm_track", prompt, response.usage.model_dump() if response.usage else None,
+                provider="openai", model=response.model, latency_ms=(time.perf_counter() - started) * 1000
+            )
 
             return response.choices[0].message.content
         except ImportError:
@@ -474,7 +746,7 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"OpenAI API error: {e}")
             raise
 
-    async def _call_volcengine(self, prompt: str) -> str:
+    async def _call_volcengine(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """
         Call Volcengine (火山引擎) DeepSeek API - OpenAI compatible format
         调用火山引擎 DeepSeek API - OpenAI 兼容格式
@@ -494,12 +766,13 @@ ONLY rewrite the NON-CITATION parts of the sentence.
                 response = await client.post("/chat/completions", json={
                     "model": settings.volcengine_model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": settings.llm_max_tokens,
+                    "max_tokens": max_tokens or settings.llm_max_tokens,
                     "temperature": settings.llm_temperature
                 })
 
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("llm_track", prompt, "volcengine", response, data)
                 return data["choices"][0]["message"]["content"]
 
         except ImportError:
@@ -509,7 +782,7 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"Volcengine API error: {e}")
             raise
 
-    async def _call_dashscope(self, prompt: str) -> str:
+    async def _call_dashscope(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """
         Call DashScope (阿里云灵积) API - OpenAI compatible format
         调用阿里云灵积 API - OpenAI 兼容格式
@@ -529,12 +802,13 @@ ONLY rewrite the NON-CITATION parts of the sentence.
                 response = await client.post("/chat/completions", json={
                     "model": settings.dashscope_model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": settings.llm_max_tokens,
+                    "max_tokens": max_tokens or settings.llm_max_tokens,
                     "temperature": settings.llm_temperature
                 })
 
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("llm_track", prompt, "dashscope", response, data)
                 return data["choices"][0]["message"]["content"]
 
         except ImportError:
@@ -544,7 +818,7 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"DashScope API error: {e}")
             raise
 
-    async def _call_deepseek(self, prompt: str) -> str:
+    async def _call_deepseek(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """
         Call DeepSeek API (OpenAI-compatible) - official, slower than Volcengine
         调用DeepSeek API（OpenAI兼容）- 官方，比火山引擎慢
@@ -566,12 +840,13 @@ ONLY rewrite the NON-CITATION parts of the sentence.
                 response = await client.post("/chat/completions", json={
                     "model": settings.llm_model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": settings.llm_max_tokens,
+                    "max_tokens": max_tokens or settings.llm_max_tokens,
                     "temperature": settings.llm_temperature
                 })
 
                 response.raise_for_status()
                 data = response.json()
+                record_response_usage("llm_track", prompt, "deepseek", response, data)
                 return data["choices"][0]["message"]["content"]
 
         except ImportError:
@@ -581,7 +856,7 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"DeepSeek API error: {e}")
             raise
 
-    async def _call_gemini(self, prompt: str) -> str:
+    async def _call_gemini(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """
         Call Google Gemini API using google-genai library
         使用google-genai库调用Google Gemini API
@@ -595,14 +870,19 @@ ONLY rewrite the NON-CITATION parts of the sentence.
 
             # Use async API for non-blocking call
             # 使用异步API进行非阻塞调用
+            started = time.perf_counter()
             response = await client.aio.models.generate_content(
                 model=settings.llm_model,
                 contents=prompt,
                 config={
-                    "max_output_tokens": settings.llm_max_tokens,
+                    "max_output_tokens": max_tokens or settings.llm_max_tokens,
                     "temperature": settings.llm_temperature
                 }
             )
+            record_usage(
+                "llm_track", prompt, gemini_usage(response),
+                provider="gemini", model=settings.llm_model, latency_ms=(time.perf_counter() - started) * 1000
+            )
 
             return response.text
 
@@ -619,49 +899,8 @@ ONLY rewrite the NON-CITATION parts of the sentence.
         解析LLM响应JSON
         """
         try:
-            # Clean response (remove markdown code blocks if present)
-            # 清理响应（如果存在则移除markdown代码块）
-            response = response.strip()
-            if response.startswith("```"):
-                response = response.split("```")[1]
-                if response.startswith("json"):
-                    response = response[4:]
-            response = response.strip()
-
-            data = json.loads(response)
-
-            changes = [
-                Change(
-                    original=c.get("original", ""),
-                    replacement=c.get("replacement", ""),
-                    reason=c.get("reason", ""),
-                    reason_zh=c.get("reason_zh", "")
-                )
-                for c in data.get("changes", [])
-            ]
-
-            # Estimate risk reduction
-            # 估计风险降低
-            risk_reduction = data.get("risk_reduction", "medium")
-            predicted_risk = {
-                "high": 25,
-                "medium": 40,
-                "low": 55
-            }.get(risk_reduction, 40)
-
-            # Calculate semantic similarity (simplified)
-            # 计算语义相似度（简化版）
-            rewritten = data.get("rewritten", original)
-            similarity = self._estimate_similarity(original, rewritten)
-
-            return LLMSuggestionResult(
-                rewritten=rewritten,
-                changes=changes,
-                predicted_risk=predicted_risk,
-                semantic_similarity=similarity,
-                explanation=data.get("explanation", ""),
-                explanation_zh=data.get("explanation_zh", "")
-            )
+            data = json.loads(self._strip_code_fence(response))
+            return self._result_from_data(data, original)
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse LLM response: {e}")
@@ -670,6 +909,56 @@ ONLY rewrite the NON-CITATION parts of the sentence.
             logger.error(f"Error processing LLM response: {e}")
             return None
 
+    def _strip_code_fence(self, response: str) -> str:
+        """
+        Clean response (remove markdown code blocks if present)
+        清理响应（如果存在则移除markdown代码块）
+        """
+        response = response.strip()
+        if response.startswith("```"):
+            response = response.split("```")[1]
+            if response.startswith("json"):
+                response = response[4:]
+        return response.strip()
+
+    def _result_from_data(self, data: Dict[str, Any], original: str) -> LLMSuggestionResult:
+        """
+        Build a suggestion result from one parsed response object
+        从一个已解析的响应对象构建建议结果
+        """
+        changes = [
+            Change(
+                original=c.get("original", ""),
+                replacement=c.get("replacement", ""),
+                reason=c.get("reason", ""),
+                reason_zh=c.get("reason_zh", "")
+            )
+            for c in data.get("changes", [])
+        ]
+
+        # Estimate risk reduction
+        # 估计风险降低
+        risk_reduction = data.get("risk_reduction", "medium")
+        predicted_risk = {
+            "high": 25,
+            "medium": 40,
+            "low": 55
+        }.get(risk_reduction, 40)
+
+        # Calculate semantic similarity (simplified)
+        # 计算语义相似度（简化版）
+        rewritten = data.get("rewritten", original)
+        similarity = self._estimate_similarity(original, rewritten)
+
+        return LLMSuggestionResult(
+            rewritten=rewritten,
+            changes=changes,
+            predicted_risk=predicted_risk,
+            semantic_similarity=similarity,
+            explanation=data.get("explanation", ""),
+            explanation_zh=data.get("explanation_zh", "")
+        )
+
     def _estimate_similarity(self, original: str, rewritten: str) -> float:
         """
         Estimate semantic similarity (simplified)
@@ -12,6 +12,7 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple
 
 from src.config import ColloquialismConfig
+from src.core.lexicon_registry import get_lexicon
 
 logger = logging.getLogger(__name__)
 
@@ -713,7 +714,7 @@ class RuleTrack:
         # 第一遍：在原文中找到所有指纹词及其位置
         replacements_to_make = []
 
-        for word, replacements in self.FINGERPRINT_REPLACEMENTS.items():
+        for word, replacements in self._fingerprint_replacements().items():
             pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
 
             for match in pattern.finditer(text):
@@ -745,7 +746,7 @@ class RuleTrack:
 
                 # Get level-appropriate replacement
                 # 获取等级适当的替换
-                alternatives = replacements.get(self.style_category, replacements["moderate"])
+                alternatives = replacements.get(self.style_category, replacements.get("moderate", []))
                 replacement = alternatives[0] if alternatives else word
 
                 # Preserve case
@@ -916,11 +917,33 @@ class RuleTrack:
         Returns list of alternatives based on current style level
         """
         word_lower = word.lower()
+        replacements = self._fingerprint_replacements()
 
-        if word_lower in self.FINGERPRINT_REPLACEMENTS:
-            return self.FINGERPRINT_REPLACEMENTS[word_lower].get(
+        if word_lower in replacements:
+            return replacements[word_lower].get(
                 self.style_category,
-                self.FINGERPRINT_REPLACEMENTS[word_lower]["moderate"]
+                replacements[word_lower].get("moderate", [])
             )
 
         return []
+
+    def _fingerprint_replacements(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Builtin replacements merged with style-keyed lexicon overrides
+        内置替换与词库中按风格的覆盖合并
+
+        Overrides come from FingerprintWord.replacements_json dicts
+        (LEXICON_SOURCE=db) and apply without a restart.
+        覆盖来自 FingerprintWord.replacements_json 字典，无需重启即可生效。
+        """
+        overrides = get_lexicon().styled_replacements
+        if not overrides:
+            return self.FINGERPRINT_REPLACEMENTS
+
+        merged = dict(self.FINGERPRINT_REPLACEMENTS)
+        for word, styles in overrides.items():
+            entry = dict(merged.get(word, {}))
+            entry.update({style: list(options) for style, options in styles.items()})
+            entry.setdefault("moderate", next(iter(entry.values()), []))
+            merged[word] = entry
+        return merged
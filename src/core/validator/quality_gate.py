@@ -3,19 +3,17 @@ Quality gate module - multi-layer validation
 质量门控模块 - 多层验证
 """
 
+import asyncio
 import logging
 import re
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
-
-import json
-from pathlib import Path
+from typing import List, Optional, Dict, Any, FrozenSet
 
 from src.config import get_settings
 from src.core.validator.semantic import SemanticValidator
-from src.core.analyzer.scorer import RiskScorer, LEVEL_1_FINGERPRINTS, LEVEL_2_FINGERPRINTS
-from src.core.preprocessor.term_locker import TermLocker
-from src.core.analyzer.fingerprint import FingerprintDetector, FingerprintMatch
+from src.core.analyzer.fingerprint import FingerprintMatch
+from src.core.component_registry import get_fingerprint_detector, get_risk_scorer, get_term_locker
+from src.core.lexicon_registry import get_lexicon
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -32,6 +30,16 @@ FIRST_PERSON_PRONOUNS = {
     "i", "we", "my", "our", "us", "me", "myself", "ourselves"
 }
 
+# High-risk LEVEL_2 fingerprints added to the P0 blocklist (builtin lexicon seed)
+# 加入P0黑名单的高风险LEVEL_2指纹词（内置词库种子）
+P0_HIGH_RISK_LEVEL_2 = {
+    "pivotal", "paramount", "crucial", "holistic", "comprehensive",
+    "underscores", "underscore", "foster", "fosters", "noteworthy",
+    "groundbreaking", "plays a pivotal role", "plays a crucial role",
+    "of paramount importance", "holistic approach", "comprehensive framework",
+    "underscores the importance", "foster a culture"
+}
+
 
 @dataclass
 class QualityCheckResult:
@@ -85,6 +93,10 @@ class QualityGate:
     2. Term integrity (protected terms intact)
     3. Risk reduction (AIGC score improved)
     4. Readability (not degraded)
+
+    Holds no per-request state: routes share one instance through
+    component_registry.get_quality_gate().
+    不持有请求级状态：路由通过 component_registry.get_quality_gate() 共享同一实例。
     """
 
     def __init__(
@@ -102,10 +114,12 @@ class QualityGate:
         self.semantic_threshold = semantic_threshold or settings.semantic_similarity_threshold
         self.risk_target = risk_target
 
+        # Scorer, locker and detector are the process-wide shared instances
+        # 评分器、锁定器和检测器使用进程级共享实例
         self.semantic_validator = SemanticValidator(self.semantic_threshold)
-        self.risk_scorer = RiskScorer()
-        self.term_locker = TermLocker()
-        self.fingerprint_detector = FingerprintDetector()
+        self.risk_scorer = get_risk_scorer()
+        self.term_locker = get_term_locker()
+        self.fingerprint_detector = get_fingerprint_detector()
 
         # P0 word blocklist for post-generation validation (DEAI Engine 2.0)
         # 生成后验证的P0词黑名单
@@ -154,7 +168,7 @@ class QualityGate:
 
         # Layer 3: Risk reduction check
         # 层3: 风险降低检查
-        risk_result = self._check_risk(modified, target)
+        risk_result = await asyncio.to_thread(self._check_risk, modified, target)
         checks.append(risk_result)
 
         # Aggregate results
@@ -308,7 +322,7 @@ class QualityGate:
         Check that risk score is reduced (CAASS v2.0)
         检查风险分数是否降低（CAASS v2.0）
         """
-        analysis = self.risk_scorer.analyze(modified, tone_level=tone_level)
+        analysis = self.risk_scorer.analyze(modified, tone_level=tone_level, profile="score_only")
         new_score = analysis.risk_score
 
         if new_score <= target:
@@ -423,40 +437,22 @@ class QualityGate:
         Initialize P0 word blocklist for post-generation validation (DEAI Engine 2.0)
         初始化生成后验证的P0词黑名单
 
-        The blocklist includes:
+        The blocklist lives in the lexicon snapshot and includes:
         - All LEVEL_1 fingerprints (dead giveaways)
-        - High-risk LEVEL_2 fingerprints (pivotal, paramount, crucial, etc.)
+        - High-risk LEVEL_2 fingerprints (P0_HIGH_RISK_LEVEL_2)
+        - "p0_blocklist" from data/fingerprints/safe_replacements.json
+        - FingerprintWord rows with category "p0" / "level_1" (LEXICON_SOURCE=db)
         """
-        # Start with all LEVEL_1 fingerprints
-        # 从所有LEVEL_1指纹词开始
-        self.p0_blocklist = set(LEVEL_1_FINGERPRINTS)
-
-        # Add high-risk LEVEL_2 fingerprints
-        # 添加高风险LEVEL_2指纹词
-        high_risk_level2 = {
-            "pivotal", "paramount", "crucial", "holistic", "comprehensive",
-            "underscores", "underscore", "foster", "fosters", "noteworthy",
-            "groundbreaking", "plays a pivotal role", "plays a crucial role",
-            "of paramount importance", "holistic approach", "comprehensive framework",
-            "underscores the importance", "foster a culture"
-        }
-        self.p0_blocklist.update(high_risk_level2)
-
-        # Try to load additional blocklist from JSON if exists
-        # 尝试从JSON加载额外的黑名单
-        try:
-            blocklist_path = Path("data/fingerprints/safe_replacements.json")
-            if blocklist_path.exists():
-                with open(blocklist_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if "p0_blocklist" in data:
-                        self.p0_blocklist.update(data["p0_blocklist"])
-                        logger.info(f"Loaded P0 blocklist from {blocklist_path}")
-        except Exception as e:
-            logger.warning(f"Failed to load P0 blocklist from JSON: {e}")
-
         logger.debug(f"P0 blocklist initialized with {len(self.p0_blocklist)} entries")
 
+    @property
+    def p0_blocklist(self) -> FrozenSet[str]:
+        """
+        Current P0 blocklist (follows lexicon hot reloads)
+        当前P0黑名单（随词库热重载更新）
+        """
+        return get_lexicon().p0_blocklist
+
     def _check_p0_words(self, text: str) -> List[str]:
         """
         Check if text contains any P0 blocked words (DEAI Engine 2.0)
@@ -468,21 +464,21 @@ class QualityGate:
         Returns:
             List of blocked words found
         """
+        lexicon = get_lexicon()
         text_lower = text.lower()
         found = []
 
-        for word in self.p0_blocklist:
-            # Use word boundary matching for single words
-            # 对单个词使用词边界匹配
-            if ' ' not in word:
-                pattern = r'\b' + re.escape(word) + r'\b'
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    found.append(word)
-            else:
-                # For phrases, simple substring match
-                # 对短语使用简单子字符串匹配
-                if word.lower() in text_lower:
-                    found.append(word)
+        # Single words use the snapshot's precompiled word-boundary matchers
+        # 单个词使用快照中预编译的词边界匹配器
+        for word, pattern in lexicon.p0_word_matchers:
+            if pattern.search(text_lower):
+                found.append(word)
+
+        # For phrases, simple substring match
+        # 对短语使用简单子字符串匹配
+        for word in lexicon.p0_blocklist:
+            if ' ' in word and word.lower() in text_lower:
+                found.append(word)
 
         return found
 
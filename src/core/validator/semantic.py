@@ -4,6 +4,7 @@ Semantic similarity validation module
 """
 
 import logging
+import threading
 from dataclasses import dataclass
 from typing import Optional, List
 
@@ -12,6 +13,44 @@ from src.config import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Shared Sentence-BERT model (loaded once per process, see ModelRegistry preload)
+# 共享的Sentence-BERT模型（每个进程加载一次，见 ModelRegistry 预加载）
+SBERT_MODEL_NAME = "all-MiniLM-L6-v2"
+_sbert_model = None
+_sbert_attempted = False
+_sbert_lock = threading.Lock()
+
+
+def load_sbert_model():
+    """
+    Load the shared Sentence-BERT model (thread-safe, one-time)
+    加载共享的Sentence-BERT模型（线程安全，仅一次）
+
+    Returns:
+        SentenceTransformer instance, or None if unavailable
+    """
+    global _sbert_model, _sbert_attempted
+
+    if _sbert_attempted:
+        return _sbert_model
+
+    with _sbert_lock:
+        if _sbert_attempted:
+            return _sbert_model
+        try:
+            from sentence_transformers import SentenceTransformer
+            _sbert_model = SentenceTransformer(SBERT_MODEL_NAME)
+            logger.info("Loaded Sentence-BERT model")
+        except ImportError:
+            logger.warning("sentence-transformers not installed, using fallback similarity")
+        except Exception as e:
+            logger.error(f"Failed to load Sentence-BERT model: {e}")
+        # Mark as attempted to avoid repeated attempts
+        # 标记为已尝试，避免重复尝试
+        _sbert_attempted = True
+
+    return _sbert_model
+
 
 @dataclass
 class SemanticValidationResult:
@@ -53,17 +92,8 @@ class SemanticValidator:
         if self._model_loaded:
             return
 
-        try:
-            from sentence_transformers import SentenceTransformer
-            self._model = SentenceTransformer('all-MiniLM-L6-v2')
-            self._model_loaded = True
-            logger.info("Loaded Sentence-BERT model")
-        except ImportError:
-            logger.warning("sentence-transformers not installed, using fallback similarity")
-            self._model_loaded = True  # Mark as loaded to avoid repeated attempts
-        except Exception as e:
-            logger.error(f"Failed to load Sentence-BERT model: {e}")
-            self._model_loaded = True
+        self._model = load_sbert_model()
+        self._model_loaded = True
 
     def validate(
         self,
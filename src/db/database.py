@@ -3,10 +3,15 @@ Database connection and session management
 数据库连接和会话管理
 """
 
+import logging
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from src.config import get_settings
+from src.services.tracing import instrument_engine, span
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 # Create async engine
@@ -20,6 +25,10 @@ engine = create_async_engine(
     connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
 )
 
+# Time every statement into the DB latency histogram and the request trace
+# 将每条语句的耗时记录到数据库延迟直方图和请求追踪中
+instrument_engine(engine)
+
 # Create async session factory
 # 创建异步会话工厂
 AsyncSessionLocal = async_sessionmaker(
@@ -33,13 +42,60 @@ AsyncSessionLocal = async_sessionmaker(
 Base = declarative_base()
 
 
+def _upgrade_schema(sync_conn) -> None:
+    """
+    Add columns and indexes that exist on the models but not yet in the database
+    添加模型中存在但数据库中尚不存在的列和索引
+
+    create_all() only creates missing tables. New columns are declared with a
+    server default (or nullable), so a plain ADD COLUMN is enough for them.
+    create_all() 只创建缺失的表。新增列都带有服务端默认值（或可为空），
+    因此简单的 ADD COLUMN 即可。
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.schema import CreateColumn
+
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} without server default")
+                continue
+            ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+        # Indexes declared after the table was created
+        # 表创建之后声明的索引
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(sync_conn)
+                logger.info(f"Created index {index.name}")
+
+
 async def init_db():
     """
     Initialize database tables
     初始化数据库表
     """
+    # Register every model on Base before create_all
+    # 在 create_all 之前将所有模型注册到 Base
+    from src.db.models import Document, refresh_risk_summary
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_schema)
+
+        # Backfill risk summaries of documents stored before they were materialized
+        # 回填物化之前已存储文档的风险汇总
+        await conn.execute(refresh_risk_summary(Document.summarized_at.is_(None)))
 
 
 async def get_db():
@@ -50,7 +106,8 @@ async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            with span("db.commit"):
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -3,7 +3,7 @@ SQLAlchemy ORM Models
 数据库ORM模型
 """
 
-from sqlalchemy import Column, String, Text, Integer, Float, Boolean, ForeignKey, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Integer, Float, Boolean, ForeignKey, DateTime, Date, JSON, Index, LargeBinary, Enum as SQLEnum, select, update
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from src.db.database import Base
@@ -115,6 +115,13 @@ class Task(Base):
     # API调用追踪（用于异常检测）
     api_call_count = Column(Integer, default=0, nullable=False)  # Number of LLM API calls
 
+    # LLM usage rollups (flushed in batches by src.services.llm_usage)
+    # LLM用量汇总（由 src.services.llm_usage 批量写入）
+    prompt_tokens_total = Column(Integer, default=0, server_default="0", nullable=False)
+    completion_tokens_total = Column(Integer, default=0, server_default="0", nullable=False)
+    cached_tokens_total = Column(Integer, default=0, server_default="0", nullable=False)
+    llm_latency_ms_total = Column(Float, default=0.0, server_default="0", nullable=False)
+
     # Timestamps
     # 时间戳
     created_at = Column(DateTime, server_default=func.now())
@@ -128,6 +135,14 @@ class Task(Base):
     document = relationship("Document", back_populates="task")
     session = relationship("Session", foreign_keys=[session_id])
 
+    # Indexes for admin aggregates (revenue by paid date, anomaly scans by price)
+    # 管理员聚合查询索引（按支付日期统计营收、按价格扫描异常）
+    __table_args__ = (
+        Index("ix_tasks_payment_status_paid_at", "payment_status", "paid_at"),
+        Index("ix_tasks_price_final_api_call_count", "price_final", "api_call_count"),
+        Index("ix_tasks_created_at", "created_at"),
+    )
+
 
 class Document(Base):
     """
@@ -149,10 +164,52 @@ class Document(Base):
     structure_analysis_cache = Column(JSON, nullable=True)  # Step 1: Structure analysis cache
     transition_analysis_cache = Column(JSON, nullable=True)  # Step 2: Transition analysis cache
 
+    # Risk summary of the sentence rows, materialized by refresh_risk_summary()
+    # whenever sentences are written; NULL summarized_at means not yet computed
+    # 句子行的风险汇总，每次写入句子时由 refresh_risk_summary() 物化；
+    # summarized_at 为 NULL 表示尚未计算
+    total_sentences = Column(Integer, nullable=False, default=0, server_default="0")
+    high_risk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    medium_risk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    low_risk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    summarized_at = Column(DateTime, nullable=True)
+
     # Relationships
     sentences = relationship("Sentence", back_populates="document", cascade="all, delete-orphan")
     sessions = relationship("Session", back_populates="document", cascade="all, delete-orphan")
     task = relationship("Task", back_populates="document", uselist=False)  # One-to-one with Task
+    source = relationship("DocumentSource", back_populates="document", uselist=False, cascade="all, delete-orphan")
+
+    # Keyset pagination of the document list (newest first, id as tie-breaker)
+    # 文档列表的键集分页（最新在前，id 作为次序键）
+    __table_args__ = (
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_status_created_at_id", "status", "created_at", "id"),
+    )
+
+
+class DocumentSource(Base):
+    """
+    Original DOCX package of an uploaded document plus its paragraph index
+    上传文档的原始DOCX包及其段落索引
+
+    Kept in its own table so listing documents never loads the package bytes.
+    Export patches only changed paragraphs into this package (see
+    src.services.docx_roundtrip), preserving styles, figures and layout.
+    单独建表，使文档列表查询不会加载包字节。导出时只将变化的段落写回此包
+    （见 src.services.docx_roundtrip），保留样式、图片和版式。
+    """
+    __tablename__ = "document_sources"
+
+    document_id = Column(String(36), ForeignKey("documents.id"), primary_key=True)
+    package = Column(LargeBinary, nullable=False)  # Original .docx bytes
+    package_sha256 = Column(String(64), nullable=False)
+    # [{"p": body paragraph ordinal, "hash": sha1 of stripped text, "len": text length}]
+    # for every non-empty paragraph, in the order they appear in original_text
+    paragraph_index = Column(JSON, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    document = relationship("Document", back_populates="source")
 
 
 class Session(Base):
@@ -203,6 +260,44 @@ class Sentence(Base):
     document = relationship("Document", back_populates="sentences")
     modifications = relationship("Modification", back_populates="sentence", cascade="all, delete-orphan")
 
+    # Covers the per-document risk aggregate of refresh_risk_summary()
+    # 覆盖 refresh_risk_summary() 的按文档风险聚合
+    __table_args__ = (
+        Index("ix_sentences_document_id_risk_level", "document_id", "risk_level"),
+    )
+
+
+def refresh_risk_summary(*where):
+    """
+    UPDATE statement recomputing the materialized risk summary of documents
+    重新计算文档物化风险汇总的 UPDATE 语句
+
+    One statement with correlated counts over the sentences index; pass a
+    filter such as `Document.id == doc_id`. Execute it after the sentence
+    rows are flushed, in the same transaction.
+    使用句子索引上的相关子查询计数的单条语句；传入过滤条件，如 `Document.id == doc_id`。
+    需在句子行 flush 之后、同一事务中执行。
+    """
+    def count(*conditions):
+        return (
+            select(func.count(Sentence.id))
+            .where(Sentence.document_id == Document.id, *conditions)
+            .scalar_subquery()
+        )
+
+    return (
+        update(Document)
+        .where(*where)
+        .values(
+            total_sentences=count(),
+            high_risk_count=count(Sentence.risk_level == "high"),
+            medium_risk_count=count(Sentence.risk_level == "medium"),
+            low_risk_count=count(Sentence.risk_level == "low"),
+            summarized_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
 
 class Modification(Base):
     """
@@ -281,6 +376,67 @@ class Feedback(Base):
     reviewed_at = Column(DateTime, nullable=True)
 
 
+# ==========================================
+# LLM Usage Model (per-call metering)
+# LLM用量模型（按调用计量）
+# ==========================================
+
+class LLMUsage(Base):
+    """
+    LLM usage model - one row per provider call
+    LLM用量模型 - 每次提供商调用一行
+
+    Written in batches by the usage recorder, never on the request path.
+    由用量记录器批量写入，不在请求路径上写入。
+    """
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String(36), ForeignKey("tasks.task_id"), nullable=True, index=True)
+    session_id = Column(String(36), nullable=True, index=True)
+    step = Column(String(100), nullable=False)  # e.g., "substep:Step2_1Handler", "llm_track"
+    provider = Column(String(20), nullable=False)  # dashscope, volcengine, deepseek, gemini, openai
+    model = Column(String(100), nullable=True)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)
+    cache_hit = Column(Boolean, default=False)
+    latency_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, nullable=False)  # Call time (not flush time)
+
+
+# ==========================================
+# Admin Daily Rollup Model (dashboard aggregates)
+# 管理员每日汇总模型（仪表板聚合）
+# ==========================================
+
+class AdminDailyRollup(Base):
+    """
+    Daily rollup of paid tasks per price bucket
+    按价格区间统计的已支付任务每日汇总
+
+    Refreshed periodically by src.services.admin_rollup; the admin dashboard
+    reads it instead of aggregating the tasks table on every refresh.
+    由 src.services.admin_rollup 定期刷新；管理员仪表板读取此表，
+    而不是每次刷新都聚合 tasks 表。
+    """
+    __tablename__ = "admin_daily_rollups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)  # Paid date (UTC)
+    price_bucket = Column(String(20), nullable=False)  # e.g., "¥50-100"
+    revenue = Column(Float, default=0.0, nullable=False)
+    task_count = Column(Integer, default=0, nullable=False)
+    words = Column(Integer, default=0, nullable=False)  # Billable words
+    api_calls = Column(Integer, default=0, nullable=False)
+    minimum_charge_count = Column(Integer, default=0, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_admin_daily_rollups_day_bucket", "day", "price_bucket", unique=True),
+    )
+
+
 # ==========================================
 # Substep State Model (substep cache)
 # 子步骤状态模型（子步骤缓存）
@@ -314,7 +470,11 @@ class SubstepState(Base):
 
     # Step completion status
     # 步骤完成状态
-    status = Column(String(20), default="pending")  # pending, completed, skipped
+    status = Column(String(20), default="pending")  # pending, completed, skipped, prefetched
+
+    # Hash of the working text a prefetched analysis_result was computed on
+    # 预取的 analysis_result 所基于的工作文本哈希
+    text_hash = Column(String(16), nullable=True)
 
     # Timestamps
     # 时间戳
@@ -8,6 +8,7 @@ import sys
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from src.config import get_settings
@@ -24,6 +25,22 @@ from src.utils.process_manager import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 from src.db.database import init_db
+from src.core.model_registry import get_model_registry
+from src.core.lexicon_registry import get_lexicon_registry
+from src.core.component_registry import component_status
+from src.prompts.prefix_cache import get_prefix_cache_stats
+from src.services.llm_usage import get_usage_recorder
+from src.services.admin_rollup import get_rollup_refresher
+from src.services.entitlement_cache import get_entitlement_cache
+from src.services.single_flight import get_single_flight
+from src.core.suggester.hint_batcher import get_suggestion_batcher
+from src.api.routes.substeps.prefetch import get_substep_prefetcher
+from src.api.routes.substeps.fusion import get_layer_fusion
+from src.services.token_budget import get_token_budgeter
+from src.services.structured_output import get_structured_output
+from src.services.ingestion import get_ingestion_pool
+from src.services.export_store import get_export_cache
+from src.services.tracing import render_metrics, setup_tracing, shutdown_tracing, tracing_status
 from src.api.routes import documents, analyze, suggest, session, export, transition, structure, flow, paragraph, structure_guidance
 from src.api.routes import auth, payment, task, feedback, admin
 from src.api.routes.analysis import router as analysis_router
@@ -32,6 +49,8 @@ from src.api.routes.substep_state import router as substep_state_router
 from src.middleware.mode_checker import ModeCheckerMiddleware
 from src.middleware.internal_service_middleware import InternalServiceMiddleware, SecurityHeadersMiddleware
 from src.middleware.rate_limiter import RateLimitMiddleware
+from src.middleware.usage_scope import UsageScopeMiddleware
+from src.middleware.tracing import TracingMiddleware
 
 
 settings = get_settings()
@@ -142,14 +161,52 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.app_name} v{settings.app_version}...")
     logger.info(f"System Mode: {settings.system_mode.value.upper()}")
     logger.info(f"Server PID: {os.getpid()}")
+
+    # Export spans to OpenTelemetry if TRACING_EXPORTER is set (no-op by default)
+    # 如设置了 TRACING_EXPORTER 则将 span 导出到 OpenTelemetry（默认不导出）
+    setup_tracing()
+
     await init_db()
     logger.info("Database initialized")
 
+    # Preload and warm up models in the background; /health/ready reports progress
+    # 在后台预加载并预热模型；/health/ready 报告进度
+    model_registry = get_model_registry()
+    model_registry.start()
+
+    # Build the lexicon snapshot and poll JSON/DB sources for hot reloads
+    # 构建词库快照并轮询 JSON/数据库数据源以实现热重载
+    lexicon_registry = get_lexicon_registry()
+    await lexicon_registry.check_for_changes()
+    lexicon_registry.start()
+    logger.info(f"Lexicon {lexicon_registry.current.version} loaded")
+
+    # Flush buffered LLM usage records to the database in the background
+    # 在后台将缓冲的LLM用量记录写入数据库
+    usage_recorder = get_usage_recorder()
+    usage_recorder.start()
+
+    # Keep the admin dashboard's daily rollups current
+    # 保持管理员仪表板的每日汇总最新
+    rollup_refresher = get_rollup_refresher()
+    rollup_refresher.start()
+
+    # Pre-spawn the sandboxed ingestion workers (upload parsing, billing counts)
+    # 预先启动沙箱化导入工作进程（上传解析、计费字数统计）
+    ingestion_pool = get_ingestion_pool()
+    ingestion_pool.start()
+
     yield
 
     # Shutdown: Cleanup resources
     # 关闭: 清理资源
     logger.info("Shutting down...")
+    await model_registry.stop()
+    await lexicon_registry.stop()
+    await usage_recorder.stop()
+    await rollup_refresher.stop()
+    ingestion_pool.stop()
+    shutdown_tracing()
     remove_pid_file()
     logger.info("PID file removed")
 
@@ -199,6 +256,14 @@ app.add_middleware(
 # 速率限制中间件 - 防止API滥用并保护LLM配额
 app.add_middleware(RateLimitMiddleware)
 
+# Usage Scope Middleware - attributes LLM calls to the request's session/task
+# 用量归属中间件 - 将LLM调用归属到请求的会话/任务
+app.add_middleware(UsageScopeMiddleware)
+
+# Tracing Middleware (outermost) - per-request trace, latency histogram, debug Server-Timing
+# 追踪中间件（最外层）- 按请求追踪、延迟直方图、调试用 Server-Timing
+app.add_middleware(TracingMiddleware)
+
 # Include API routers
 # 包含API路由
 app.include_router(documents.router, prefix="/api/v1/documents", tags=["Documents"])
@@ -256,12 +321,57 @@ async def root():
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint
-    健康检查端点
+    Health check endpoint (liveness)
+    健康检查端点（存活探针）
     """
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness endpoint - 503 until configured models are loaded and warmed up
+    就绪检查端点 - 在配置的模型加载并预热完成前返回503
+
+    Point the load balancer's readiness probe here and the liveness probe
+    at /health, so cold workers stay out of rotation without being restarted.
+    负载均衡的就绪探针指向此处，存活探针指向 /health，
+    使冷启动的工作进程不接收流量但也不会被重启。
+    """
+    status = get_model_registry().status()
+    status["lexicon"] = get_lexicon_registry().current.info()
+    status["prompt_prefix_cache"] = get_prefix_cache_stats()
+    status["llm_usage"] = get_usage_recorder().stats()
+    status["entitlement_cache"] = get_entitlement_cache().stats()
+    status["ingestion"] = get_ingestion_pool().stats()
+    export_cache = get_export_cache()
+    status["export_cache"] = export_cache.stats() if export_cache else {"backend": "off"}
+    status["tracing"] = tracing_status()
+    status["components"] = component_status()
+    status["single_flight"] = get_single_flight().stats()
+    status["suggest_batch"] = get_suggestion_batcher().stats()
+    status["substep_prefetch"] = get_substep_prefetcher().stats()
+    status["fused_analysis"] = get_layer_fusion().stats()
+    status["token_budget"] = get_token_budgeter().stats()
+    status["structured_output"] = get_structured_output().stats()
+    status["status"] = "ready" if status["ready"] else "starting"
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """
+        Prometheus metrics (request, stage, LLM and DB latency histograms)
+        Prometheus 指标（请求、阶段、LLM 和数据库延迟直方图）
+
+        Listed in InternalServiceMiddleware.INTERNAL_PATHS, so only internal
+        networks (and X-Service-Key holders in operational mode) can scrape it.
+        已列入 InternalServiceMiddleware.INTERNAL_PATHS，仅内网（运营模式下还需 X-Service-Key）可抓取。
+        """
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
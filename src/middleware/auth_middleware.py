@@ -20,6 +20,7 @@ from datetime import datetime, timedelta
 from src.config import get_settings
 from src.db.database import get_db
 from src.db.models import Task, PaymentStatus
+from src.services.entitlement_cache import get_entitlement_cache
 
 
 # Try to import python-jose, fallback to simple implementation
@@ -139,6 +140,34 @@ def jwt_decode(token: str, secret: str, algorithms: list = None) -> dict:
         return _simple_jwt_decode(token, secret, algorithms)
 
 
+def _user_from_token(token: str, settings) -> dict:
+    """
+    Decode a bearer token into the user dict, reusing cached verifications
+    将令牌解码为用户字典，复用缓存的校验结果
+
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    cache = get_entitlement_cache()
+    user = cache.get_token(token)
+    if user is not None:
+        return user
+
+    payload = jwt_decode(
+        token,
+        settings.jwt_secret_key,
+        algorithms=[settings.jwt_algorithm]
+    )
+    user = {
+        "user_id": payload.get("sub"),
+        "platform_user_id": payload.get("platform_user_id"),
+        "is_debug": False
+    }
+    exp = payload.get("exp")
+    cache.set_token(token, user, exp if isinstance(exp, (int, float)) else None)
+    return user
+
+
 async def get_current_user(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
@@ -188,16 +217,7 @@ async def get_current_user(
         )
 
     try:
-        payload = jwt_decode(
-            credentials.credentials,
-            settings.jwt_secret_key,
-            algorithms=[settings.jwt_algorithm]
-        )
-        return {
-            "user_id": payload.get("sub"),
-            "platform_user_id": payload.get("platform_user_id"),
-            "is_debug": False
-        }
+        return _user_from_token(credentials.credentials, settings)
     except JWTError as e:
         raise HTTPException(
             status_code=401,
@@ -245,16 +265,7 @@ async def get_current_user_optional(
         return None
 
     try:
-        payload = jwt_decode(
-            credentials.credentials,
-            settings.jwt_secret_key,
-            algorithms=[settings.jwt_algorithm]
-        )
-        return {
-            "user_id": payload.get("sub"),
-            "platform_user_id": payload.get("platform_user_id"),
-            "is_debug": False
-        }
+        return _user_from_token(credentials.credentials, settings)
     except JWTError:
         return None
 
@@ -285,8 +296,11 @@ async def require_payment(
     In debug mode, always returns True (payment not required).
     调试模式下始终返回True（不需要支付）。
 
-    In operational mode, checks if task is paid.
-    运营模式下检查任务是否已支付。
+    In operational mode, checks if task is paid. Granted (user, task) pairs
+    are cached for ENTITLEMENT_CACHE_TTL_SECONDS, so repeated substep calls
+    skip the database; denials are never cached.
+    运营模式下检查任务是否已支付。已授予的（用户，任务）组合会缓存
+    ENTITLEMENT_CACHE_TTL_SECONDS 秒，重复的子步骤调用无需查询数据库；拒绝结果不缓存。
 
     Args:
         task_id: Task ID to check
@@ -306,14 +320,20 @@ async def require_payment(
     if settings.is_debug_mode():
         return True
 
+    # Cached entitlement: no database round-trip
+    # 缓存的权限：无需数据库往返
+    cache = get_entitlement_cache()
+    if await cache.is_entitled(user.get("user_id"), task_id):
+        return True
+
     # Check task payment status
     # 检查任务支付状态
     result = await db.execute(
-        select(Task).where(Task.task_id == task_id)
+        select(Task.task_id, Task.payment_status).where(Task.task_id == task_id)
     )
-    task = result.scalar_one_or_none()
+    row = result.first()
 
-    if not task:
+    if row is None:
         raise HTTPException(
             status_code=404,
             detail={
@@ -323,7 +343,7 @@ async def require_payment(
             }
         )
 
-    if task.payment_status != PaymentStatus.PAID.value:
+    if row.payment_status != PaymentStatus.PAID.value:
         raise HTTPException(
             status_code=402,
             detail={
@@ -334,6 +354,7 @@ async def require_payment(
             }
         )
 
+    await cache.grant(user.get("user_id"), task_id)
     return True
 
 
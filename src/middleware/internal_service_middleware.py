@@ -32,6 +32,7 @@ class InternalServiceMiddleware(BaseHTTPMiddleware):
     INTERNAL_PATHS = [
         "/api/v1/payment/callback",
         "/api/v1/internal/",
+        "/metrics",
     ]
 
     # Default allowed IPs/networks
@@ -0,0 +1,83 @@
+"""
+Tracing Middleware
+追踪中间件
+
+Binds a RequestTrace to every HTTP request, times the request into the
+academicguard_http_request_duration_seconds histogram (labelled by route
+template, not raw path, to keep cardinality bounded) and adds an X-Trace-Id
+header. In debug mode the response also carries a Server-Timing header
+with the per-stage breakdown of the spans finished before the response
+started (visible in the browser's network panel).
+为每个HTTP请求绑定 RequestTrace，将请求耗时记录到 academicguard_http_request_duration_seconds
+直方图（按路由模板而非原始路径打标签，以控制基数），并添加 X-Trace-Id 头。调试模式下，
+响应还带有 Server-Timing 头，列出响应开始前已结束的各阶段耗时（可在浏览器网络面板查看）。
+
+Pure ASGI (not BaseHTTPMiddleware) so the context variable is set in the task
+that runs the endpoint.
+采用纯ASGI（非 BaseHTTPMiddleware），使上下文变量设置在运行端点的任务中。
+"""
+
+import time
+
+from src.config import get_settings
+from src.services.tracing import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    RequestTrace,
+    bind_request_trace,
+    reset_request_trace,
+    span,
+)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+class TracingMiddleware:
+    """
+    Per-request trace, latency histogram and debug Server-Timing header
+    按请求的追踪、延迟直方图和调试用 Server-Timing 头
+    """
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.server_timing = settings.is_debug_mode() and settings.debug_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = bind_request_trace(trace)
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-trace-id", trace.trace_id.encode()))
+                if self.server_timing:
+                    headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with span("http.request", method=scope.get("method"), path=scope.get("path")):
+                await self.app(scope, receive, send_with_trace)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope.get("method", ""),
+                _route_template(scope),
+                str(status),
+            )
+            reset_request_trace(token)
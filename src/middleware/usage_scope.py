@@ -0,0 +1,89 @@
+"""
+Usage Scope Middleware
+用量归属中间件
+
+Attributes the LLM calls made while handling a request to its session/task,
+so src.services.llm_usage can roll them up per document. The ids come from
+the "/session/{id}/" path segment or the top-level "session_id"/"task_id"
+fields of a JSON body.
+将处理请求期间的LLM调用归属到对应会话/任务，使 src.services.llm_usage 可以按文档汇总。
+ID来自 "/session/{id}/" 路径段或JSON请求体顶层的 "session_id"/"task_id" 字段。
+
+Pure ASGI (not BaseHTTPMiddleware) so the context variable is set in the task
+that runs the endpoint, and the buffered body is replayed unchanged.
+采用纯ASGI（非 BaseHTTPMiddleware），使上下文变量设置在运行端点的任务中，
+并原样重放缓冲的请求体。
+"""
+
+import re
+from typing import Optional
+
+from src.services.llm_usage import usage_scope
+
+_SESSION_PATH_RE = re.compile(r"/session/([0-9a-fA-F-]{36})(?:/|$)")
+_SESSION_BODY_RE = re.compile(rb'"session_id"\s*:\s*"([0-9a-fA-F-]{36})"')
+_TASK_BODY_RE = re.compile(rb'"task_id"\s*:\s*"([0-9a-fA-F-]{36})"')
+
+# Only scan bodies up to this size for ids (documents are posted as files)
+# 只在不超过此大小的请求体中查找ID（文档以文件形式上传）
+MAX_SCAN_BYTES = 2 * 1024 * 1024
+
+
+def _match(pattern: re.Pattern, body: bytes) -> Optional[str]:
+    match = pattern.search(body)
+    return match.group(1).decode() if match else None
+
+
+class UsageScopeMiddleware:
+    """
+    Sets the LLM usage scope (session/task id) for each HTTP request
+    为每个HTTP请求设置LLM用量作用域（会话/任务ID）
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path_match = _SESSION_PATH_RE.search(scope.get("path", ""))
+        session_id = path_match.group(1) if path_match else None
+        task_id = None
+
+        headers = dict(scope.get("headers") or [])
+        content_type = headers.get(b"content-type", b"")
+        content_length = int(headers.get(b"content-length", b"0") or 0)
+        if (
+            scope.get("method") in ("POST", "PUT", "PATCH")
+            and content_type.startswith(b"application/json")
+            and 0 < content_length <= MAX_SCAN_BYTES
+        ):
+            # Buffer the body once, then replay it to the app
+            # 缓冲请求体一次，然后重放给应用
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            body = b"".join(chunks)
+            session_id = session_id or _match(_SESSION_BODY_RE, body)
+            task_id = _match(_TASK_BODY_RE, body)
+
+            replayed = False
+
+            async def replay_receive():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            receive = replay_receive
+
+        with usage_scope(session_id=session_id, task_id=task_id):
+            await self.app(scope, receive, send)
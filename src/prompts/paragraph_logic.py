@@ -19,6 +19,8 @@ Analysis Features:
 
 from typing import Optional, List, Dict, Any
 
+from src.prompts.prefix_cache import CachedPrompt, build_prompt, split_prompt
+
 
 # =============================================================================
 # Sentence Role Analysis Prompt (Step 2 Enhancement)
@@ -163,7 +165,7 @@ If AI-like patterns detected, suggest specific improvements:
 def get_sentence_role_analysis_prompt(
     paragraph: str,
     sentences: List[str]
-) -> str:
+) -> CachedPrompt:
     """
     Generate prompt for sentence role analysis and logic framework detection
     生成句子角色分析和逻辑框架检测的Prompt
@@ -173,7 +175,7 @@ def get_sentence_role_analysis_prompt(
         sentences: List of individual sentences
 
     Returns:
-        Formatted prompt for LLM
+        Prompt in prefix-cache layout (static rules as system prefix)
     """
     # Build numbered sentence list
     # 构建编号句子列表
@@ -182,7 +184,8 @@ def get_sentence_role_analysis_prompt(
         for i, s in enumerate(sentences)
     ])
 
-    return SENTENCE_ROLE_ANALYSIS_PROMPT.format(
+    return build_prompt(
+        SENTENCE_ROLE_ANALYSIS_PROMPT,
         paragraph=paragraph,
         sentence_list=sentence_list
     )
@@ -1413,18 +1416,53 @@ def get_paragraph_logic_prompt(
     strategy: str,
     paragraph: str,
     **kwargs
-) -> str:
+) -> CachedPrompt:
     """
     Get the appropriate prompt for the specified strategy
     获取指定策略的Prompt
 
+    The rendered prompt is split into a static system prefix (strategy rules,
+    output format) and a user suffix holding the paragraph and per-request data.
+    渲染后的提示词拆分为静态系统前缀（策略规则、输出格式）和包含段落及请求数据的用户后缀。
+
     Args:
         strategy: One of "ani", "subject_diversity", "implicit_connector", "rhythm", "all"
         paragraph: The paragraph text to restructure
         **kwargs: Additional arguments for specific strategies
 
     Returns:
-        Formatted prompt string
+        Prompt in prefix-cache layout
+    """
+    text = _render_strategy_prompt(strategy, paragraph, **kwargs)
+    return split_prompt(text, [paragraph, *_variable_strings(kwargs)])
+
+
+def _variable_strings(value: Any) -> List[str]:
+    """
+    Collect per-request strings (issue descriptions, connectors, citations,
+    sentence length lists) embedded in a rendered prompt
+    收集渲染后提示词中嵌入的每次请求字符串（问题描述、连接词、引用、句长列表）
+    """
+    if isinstance(value, str):
+        return [value] if len(value) >= 12 else []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        strings = [s for item in value for s in _variable_strings(item)]
+        if value and all(isinstance(item, (int, float)) for item in value):
+            strings.append(str(value))
+        return strings
+    return []
+
+
+def _render_strategy_prompt(
+    strategy: str,
+    paragraph: str,
+    **kwargs
+) -> str:
+    """
+    Render the full prompt text for a strategy
+    渲染指定策略的完整提示词文本
     """
     if strategy not in STRATEGY_PROMPTS:
         raise ValueError(
@@ -0,0 +1,337 @@
+"""
+Prompt prefix caching layout - static system prefix + variable suffix
+提示词前缀缓存布局 - 静态系统前缀 + 可变后缀
+
+DashScope, DeepSeek, Volcengine and other OpenAI-compatible endpoints cache
+the longest previously seen prompt prefix automatically. Our templates used to
+put the document text near the top and the long static rules after it, so no
+two requests shared a prefix. This module splits every prompt into:
+
+- system: the blocks that contain no variable data (rules, strategies, output
+  format). Byte-identical across requests, sent as the system message.
+- user:   the blocks that carry document text, issues, locked terms, etc.
+
+Each prefix has a stable hash so cache hit rates can be tracked per template.
+
+DashScope、DeepSeek、火山引擎等OpenAI兼容端点会自动缓存已见过的最长提示词前缀。
+原模板把文档文本放在前面、长静态规则放在后面，导致请求之间无法共享前缀。
+本模块将提示词拆分为：
+- system：不含可变数据的块（规则、策略、输出格式），跨请求字节一致，作为系统消息发送
+- user：  携带文档文本、问题、锁定词等的块
+每个前缀有稳定哈希，用于按模板跟踪缓存命中率。
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# A str.format placeholder ("{name}", "{name:.2f}"), not an escaped "{{"
+# str.format 占位符（"{name}"、"{name:.2f}"），非转义的 "{{"
+_PLACEHOLDER_RE = re.compile(r'(?<!\{)\{[A-Za-z_][^{}]*\}(?!\})')
+
+# Blocks are separated by blank lines
+# 块之间以空行分隔
+_BLOCK_SEPARATOR_RE = re.compile(r'\n[ \t]*\n')
+
+
+@dataclass(frozen=True)
+class CachedPrompt:
+    """
+    A prompt split into a cacheable static prefix and a variable suffix
+    拆分为可缓存静态前缀和可变后缀的提示词
+    """
+    system: str
+    user: str
+
+    @property
+    def prefix_hash(self) -> str:
+        return hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Chat messages with the static prefix in the system role
+        将静态前缀放在 system 角色中的聊天消息
+        """
+        if not self.system:
+            return [{"role": "user", "content": self.user}]
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user},
+        ]
+
+    def text(self) -> str:
+        """
+        Single-string form (copyable prompts, providers without a system role)
+        单字符串形式（可复制的提示词、无 system 角色的提供商）
+        """
+        return f"{self.system}\n\n{self.user}" if self.system else self.user
+
+
+PromptInput = Union[str, CachedPrompt]
+
+
+def as_cached_prompt(prompt: PromptInput) -> CachedPrompt:
+    """Wrap a plain string prompt (no cacheable prefix) / 包装纯字符串提示词"""
+    if isinstance(prompt, CachedPrompt):
+        return prompt
+    return CachedPrompt(system="", user=prompt)
+
+
+def chat_messages(prompt: PromptInput) -> List[Dict[str, str]]:
+    """
+    Chat messages for a plain or cached prompt
+    为纯字符串或缓存布局提示词生成聊天消息
+    """
+    return as_cached_prompt(prompt).messages()
+
+
+def _is_label(block: str) -> bool:
+    """
+    A heading or "Label:" line that introduces the next block
+    引出下一个块的标题或 "标签:" 行
+    """
+    stripped = block.strip()
+    return "\n" not in stripped and (stripped.startswith("#") or stripped.endswith(":"))
+
+
+def _partition(blocks: List[Tuple[str, bool]]) -> Tuple[List[str], List[str]]:
+    """
+    Split (block, is_variable) pairs into static and variable lists
+    将 (块, 是否可变) 对拆分为静态列表和可变列表
+
+    A label block directly followed by a variable block travels with it, so
+    "## Original Paragraph:" stays next to the paragraph.
+    紧接可变块的标签块随之移动，使 "## Original Paragraph:" 与段落保持相邻。
+    """
+    static: List[str] = []
+    variable: List[str] = []
+    for i, (block, is_variable) in enumerate(blocks):
+        if not is_variable and _is_label(block) and i + 1 < len(blocks) and blocks[i + 1][1]:
+            is_variable = True
+        (variable if is_variable else static).append(block)
+    return static, variable
+
+
+@lru_cache(maxsize=256)
+def _template_layout(template: str) -> Tuple[str, str]:
+    """
+    Split a str.format template once into (static system text, user template)
+    将 str.format 模板一次性拆分为（静态系统文本，用户模板）
+    """
+    blocks = [
+        (block, bool(_PLACEHOLDER_RE.search(block)))
+        for block in _BLOCK_SEPARATOR_RE.split(template.strip())
+        if block.strip()
+    ]
+    static, variable = _partition(blocks)
+    # Static blocks contain no placeholders; format() only unescapes "{{ }}"
+    # 静态块不含占位符；format() 仅还原 "{{ }}" 转义
+    system = "\n\n".join(static).format()
+    return system, "\n\n".join(variable)
+
+
+def build_prompt(template: str, **params: Any) -> CachedPrompt:
+    """
+    Fill a str.format template in prefix-cache layout
+    以前缀缓存布局填充 str.format 模板
+
+    Blocks with placeholders go to the user message; everything else forms
+    the static system prefix (computed once per template).
+    含占位符的块进入用户消息，其余部分构成静态系统前缀（每个模板只计算一次）。
+    """
+    system, user_template = _template_layout(template)
+    return CachedPrompt(system=system, user=user_template.format(**params))
+
+
+def join_prompts(*prompts: CachedPrompt) -> CachedPrompt:
+    """
+    Concatenate prompts section-wise (system after system, user after user)
+    按部分拼接提示词（系统接系统、用户接用户）
+
+    The first prompt's static prefix stays a common prefix, so the base
+    template is still shared when the appended parts differ.
+    第一个提示词的静态前缀仍是公共前缀，追加部分不同时基础模板仍可共享缓存。
+    """
+    return CachedPrompt(
+        system="\n\n".join(p.system for p in prompts if p.system),
+        user="\n\n".join(p.user for p in prompts if p.user),
+    )
+
+
+def split_prompt(text: str, variable_parts: Iterable[Optional[str]]) -> CachedPrompt:
+    """
+    Split an already rendered prompt, given the variable strings it embeds
+    根据嵌入的可变字符串拆分已渲染的提示词
+
+    Used for the f-string prompt builders. Blank lines inside a variable part
+    (e.g. a multi-paragraph document) never split it.
+    用于 f-string 构建的提示词。可变部分内部的空行（如多段文档）不会被拆开。
+
+    Args:
+        text: Rendered prompt
+        variable_parts: Document/paragraph text and other per-request data
+    """
+    text = text.strip()
+    spans = []
+    for part in variable_parts:
+        part = (part or "").strip()
+        if not part:
+            continue
+        start = text.find(part)
+        while start != -1:
+            spans.append((start, start + len(part)))
+            start = text.find(part, start + len(part))
+
+    def in_span(position: int) -> bool:
+        return any(start <= position < end for start, end in spans)
+
+    blocks: List[Tuple[str, bool]] = []
+    block_start = 0
+    for separator in _BLOCK_SEPARATOR_RE.finditer(text):
+        if in_span(separator.start()):
+            continue
+        blocks.append((block_start, separator.start()))
+        block_start = separator.end()
+    blocks.append((block_start, len(text)))
+
+    classified = [
+        (text[start:end], any(s < end and start < e for s, e in spans))
+        for start, end in blocks
+        if text[start:end].strip()
+    ]
+    static, variable = _partition(classified)
+    return CachedPrompt(system="\n\n".join(static), user="\n\n".join(variable))
+
+
+# =============================================================================
+# Cached-token accounting
+# 缓存token统计
+# =============================================================================
+
+_stats_lock = threading.Lock()
+_prefix_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _cached_tokens(usage: Dict[str, Any]) -> int:
+    """
+    Read cached prompt tokens from the provider-specific usage fields
+    从各提供商的 usage 字段读取缓存命中的提示词token数
+    """
+    details = usage.get("prompt_tokens_details") or {}
+    for value in (
+        details.get("cached_tokens"),          # OpenAI / DashScope / Volcengine
+        usage.get("prompt_cache_hit_tokens"),  # DeepSeek
+        usage.get("cache_read_input_tokens"),  # Anthropic
+        usage.get("cached_content_token_count"),  # Gemini
+    ):
+        if value:
+            return int(value)
+    return 0
+
+
+def record_usage(
+    label: str,
+    prompt: PromptInput,
+    usage: Optional[Dict[str, Any]],
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    latency_ms: Optional[float] = None,
+) -> None:
+    """
+    Log prompt/cached token counts for one call, accumulate per-prefix stats
+    and meter the call
+    记录一次调用的提示词/缓存token数，按前缀累计统计并计量该调用
+
+    Args:
+        label: Call site name (e.g. "substep:Step2_1Handler")
+        prompt: The prompt that was sent
+        usage: Provider "usage" object (dict), if any
+        provider: Provider name; defaults to settings.llm_provider
+        model: Model reported by the provider
+        latency_ms: Request latency in milliseconds
+    """
+    from src.services.llm_usage import record_llm_call
+
+    usage = usage or {}
+    cached = _cached_tokens(usage)
+    record_llm_call(label, provider, model, usage, latency_ms, cached_tokens=cached)
+    if not usage:
+        return
+
+    prompt = as_cached_prompt(prompt)
+    prompt_tokens = int(usage.get("prompt_tokens") or usage.get("input_tokens") or 0)
+    prefix_hash = prompt.prefix_hash if prompt.system else "-"
+
+    with _stats_lock:
+        stats = _prefix_stats.setdefault(prefix_hash, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "label": label,
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached
+
+    logger.info(
+        f"LLM usage [{label}] prefix={prefix_hash} prompt_tokens={prompt_tokens} "
+        f"cached_tokens={cached} completion_tokens={usage.get('completion_tokens', usage.get('output_tokens', 0))}"
+        + (f" latency_ms={latency_ms:.0f}" if latency_ms is not None else "")
+    )
+
+
+def record_response_usage(
+    label: str,
+    prompt: PromptInput,
+    provider: str,
+    response: Any,
+    data: Dict[str, Any],
+) -> None:
+    """
+    record_usage() for an OpenAI-compatible httpx response
+    为 OpenAI 兼容的 httpx 响应调用 record_usage()
+
+    Args:
+        response: httpx.Response (latency taken from response.elapsed)
+        data: Parsed JSON body
+    """
+    record_usage(
+        label, prompt, data.get("usage"),
+        provider=provider,
+        model=data.get("model"),
+        latency_ms=response.elapsed.total_seconds() * 1000,
+    )
+
+
+def gemini_usage(response: Any) -> Dict[str, Any]:
+    """
+    Normalize Gemini usage_metadata to the OpenAI usage field names
+    将 Gemini 的 usage_metadata 规范为 OpenAI usage 字段名
+    """
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(metadata, "prompt_token_count", 0) or 0,
+        "completion_tokens": getattr(metadata, "candidates_token_count", 0) or 0,
+        "cached_content_token_count": getattr(metadata, "cached_content_token_count", 0) or 0,
+    }
+
+
+def get_prefix_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per-prefix call counts and cache hit ratios since startup
+    启动以来按前缀统计的调用次数和缓存命中率
+    """
+    with _stats_lock:
+        return {
+            prefix_hash: {
+                **stats,
+                "hit_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3)
+                if stats["prompt_tokens"] else 0.0,
+            }
+            for prefix_hash, stats in _prefix_stats.items()
+        }
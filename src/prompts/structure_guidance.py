@@ -6,6 +6,8 @@ This module contains prompts for generating detailed guidance
 for structure issues in academic papers.
 """
 
+from src.prompts.prefix_cache import CachedPrompt, build_prompt
+
 # =============================================================================
 # Issue Type Definitions
 # 问题类型定义
@@ -428,7 +430,7 @@ Suggest a paragraph reordering that:
 # 获取问题类型专用提示词的辅助函数
 # =============================================================================
 
-def get_issue_specific_prompt(issue_type: str, context: dict) -> str:
+def get_issue_specific_prompt(issue_type: str, context: dict) -> CachedPrompt:
     """
     Get the issue-specific prompt template with context filled in.
     获取填充了上下文的问题类型专用提示词模板。
@@ -438,19 +440,19 @@ def get_issue_specific_prompt(issue_type: str, context: dict) -> str:
         context: Dictionary containing context variables
 
     Returns:
-        Formatted prompt string
+        Prompt in prefix-cache layout (empty for unknown issue types)
     """
     if issue_type not in ISSUE_SPECIFIC_PROMPTS:
-        return ""
+        return CachedPrompt(system="", user="")
 
     template = ISSUE_SPECIFIC_PROMPTS[issue_type]
 
     # Fill in context variables, using empty string for missing keys
     # 填充上下文变量，缺失的键使用空字符串
     try:
-        return template.format(**{k: context.get(k, "") for k in _extract_format_keys(template)})
+        return build_prompt(template, **{k: context.get(k, "") for k in _extract_format_keys(template)})
     except KeyError:
-        return template
+        return CachedPrompt(system="", user=template)
 
 
 def _extract_format_keys(template: str) -> list:
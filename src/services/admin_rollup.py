@@ -0,0 +1,245 @@
+"""
+Admin Rollup Service - daily aggregates for the admin dashboard
+管理员汇总服务 - 管理员仪表板的每日聚合
+
+The dashboard used to aggregate the whole tasks table on every refresh. This
+service keeps admin_daily_rollups (revenue, tasks, billable words, LLM calls
+per paid day and price bucket) up to date from a background loop: the first
+run backfills every day, later runs recompute only the last
+ADMIN_ROLLUP_LOOKBACK_DAYS days, which is where late payments and LLM calls
+still change the numbers.
+
+仪表板过去在每次刷新时聚合整个 tasks 表。本服务通过后台循环维护 admin_daily_rollups
+（按支付日期和价格区间统计的营收、任务数、计费字数、LLM调用数）：首次运行回填所有日期，
+之后只重算最近 ADMIN_ROLLUP_LOOKBACK_DAYS 天，即延迟支付和LLM调用仍会改变数值的区间。
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.db.models import AdminDailyRollup, PaymentStatus, Task
+
+logger = logging.getLogger(__name__)
+
+# (min inclusive, max exclusive, label); None means unbounded
+# （下限含，上限不含，标签）；None 表示无上限
+PRICE_BUCKETS: List[Tuple[float, Optional[float], str]] = [
+    (50, 100, "¥50-100"),
+    (100, 200, "¥100-200"),
+    (200, 500, "¥200-500"),
+    (500, 1000, "¥500-1000"),
+    (1000, None, "¥1000+"),
+]
+
+# Bucket for paid tasks outside PRICE_BUCKETS (kept so revenue totals add up)
+# PRICE_BUCKETS 之外的已支付任务所在区间（保留以使营收总额一致）
+OTHER_BUCKET = "other"
+
+
+def price_bucket_condition(low: float, high: Optional[float], column=Task.price_final):
+    """
+    SQL condition for one price bucket
+    单个价格区间的 SQL 条件
+    """
+    return column >= low if high is None else and_(column >= low, column < high)
+
+
+def price_bucket_expr(column=Task.price_final, else_=OTHER_BUCKET):
+    """
+    SQL CASE expression mapping a price to its bucket label
+    将价格映射为区间标签的 SQL CASE 表达式
+    """
+    return case(
+        *[(price_bucket_condition(low, high, column), label) for low, high, label in PRICE_BUCKETS],
+        else_=else_,
+    )
+
+
+def _as_date(value) -> Optional[date]:
+    """func.date() returns a string on SQLite and a date elsewhere"""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _upsert_statement(db: AsyncSession):
+    """
+    INSERT that updates the existing (day, price_bucket) row on conflict
+    冲突时更新已有 (day, price_bucket) 行的 INSERT
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(AdminDailyRollup)
+    statement = dialect_insert(AdminDailyRollup)
+    return statement.on_conflict_do_update(
+        index_elements=[AdminDailyRollup.day, AdminDailyRollup.price_bucket],
+        set_={
+            name: statement.excluded[name]
+            for name in ("revenue", "task_count", "words", "api_calls", "minimum_charge_count", "refreshed_at")
+        },
+    )
+
+
+async def refresh_daily_rollups(db: AsyncSession, since: Optional[date] = None) -> int:
+    """
+    Recompute rollup rows for paid days >= since (all days when None)
+    重算支付日期 >= since 的汇总行（为 None 时重算所有日期）
+
+    Returns:
+        Number of rollup rows written
+    """
+    day = func.date(Task.paid_at)
+    bucket = price_bucket_expr()
+    conditions = [
+        Task.payment_status == PaymentStatus.PAID.value,
+        Task.paid_at.isnot(None),
+    ]
+    if since is not None:
+        conditions.append(Task.paid_at >= datetime.combine(since, datetime.min.time()))
+
+    rows = (await db.execute(
+        select(
+            day.label("day"),
+            bucket.label("bucket"),
+            func.coalesce(func.sum(Task.price_final), 0).label("revenue"),
+            func.count(Task.task_id).label("task_count"),
+            func.coalesce(func.sum(Task.word_count_billable), 0).label("words"),
+            func.coalesce(func.sum(Task.api_call_count), 0).label("api_calls"),
+            func.sum(case((Task.is_minimum_charge == True, 1), else_=0)).label("minimum_charge_count"),
+        ).where(and_(*conditions)).group_by(day, bucket)
+    )).all()
+
+    # Upsert, then drop rows of the window this run did not write (days or
+    # buckets without paid tasks any more). Concurrent refreshes (startup loop
+    # vs first admin read, or several workers) thus never collide on the
+    # unique (day, price_bucket) index.
+    # 先 upsert，再删除本次未写入的窗口内行（已无支付任务的日期或区间）。
+    # 并发刷新（启动循环与首次管理员读取，或多个工作进程）因此不会在唯一索引
+    # (day, price_bucket) 上冲突。
+    refreshed_at = datetime.utcnow()
+    if rows:
+        await db.execute(_upsert_statement(db), [
+            {
+                "day": _as_date(row.day),
+                "price_bucket": row.bucket,
+                "revenue": float(row.revenue or 0),
+                "task_count": int(row.task_count or 0),
+                "words": int(row.words or 0),
+                "api_calls": int(row.api_calls or 0),
+                "minimum_charge_count": int(row.minimum_charge_count or 0),
+                "refreshed_at": refreshed_at,
+            }
+            for row in rows
+        ])
+    stale = delete(AdminDailyRollup).where(AdminDailyRollup.refreshed_at < refreshed_at)
+    if since is not None:
+        stale = stale.where(AdminDailyRollup.day >= since)
+    await db.execute(stale)
+    await db.commit()
+    return len(rows)
+
+
+class AdminRollupRefresher:
+    """
+    Background loop keeping admin_daily_rollups current
+    保持 admin_daily_rollups 最新的后台循环
+    """
+
+    def __init__(self, refresh_seconds: float = 300.0, lookback_days: int = 7):
+        self.refresh_seconds = refresh_seconds
+        self.lookback_days = lookback_days
+        self.last_refreshed_at: Optional[datetime] = None
+        self._backfilled = False
+        self._task: Optional[asyncio.Task] = None
+        # One refresh at a time per process; readers wait for the in-flight one
+        # 每个进程同一时间只运行一次刷新；读取方等待进行中的刷新
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> int:
+        """
+        Backfill on the first run, then recompute the lookback window
+        首次运行时回填，之后重算回溯窗口
+        """
+        async with self._lock:
+            return await self._refresh()
+
+    async def _refresh(self) -> int:
+        from src.db.database import AsyncSessionLocal
+
+        since = None
+        if self._backfilled:
+            since = datetime.utcnow().date() - timedelta(days=self.lookback_days)
+        async with AsyncSessionLocal() as db:
+            written = await refresh_daily_rollups(db, since)
+        self._backfilled = True
+        self.last_refreshed_at = datetime.utcnow()
+        logger.debug(f"Admin rollups refreshed since {since or 'beginning'}: {written} rows")
+        return written
+
+    async def ensure_built(self) -> None:
+        """
+        Build the rollups on first read if the loop has not run yet (or is disabled)
+        如果循环尚未运行（或已禁用），在首次读取时构建汇总
+        """
+        if self.last_refreshed_at is not None:
+            return
+        async with self._lock:
+            if self.last_refreshed_at is None:
+                await self._refresh()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Admin rollup refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        """
+        Start the background refresh loop (no-op if disabled)
+        启动后台刷新循环（禁用时为空操作）
+        """
+        if self._task is None and self.refresh_seconds > 0:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_refresher: Optional[AdminRollupRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_rollup_refresher() -> AdminRollupRefresher:
+    """
+    Get the process-wide rollup refresher
+    获取进程级汇总刷新器
+    """
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                settings = get_settings()
+                _refresher = AdminRollupRefresher(
+                    refresh_seconds=settings.admin_rollup_refresh_seconds,
+                    lookback_days=settings.admin_rollup_lookback_days,
+                )
+    return _refresher
@@ -209,6 +209,11 @@ async def save_modified_text(
 
         await db.commit()
         logger.info(f"Saved modified text for {step_name} in session {session_id}")
+
+        # Prefetched analyses of the old text are now stale
+        # 旧文本的预取分析已过期
+        from src.api.routes.substeps.prefetch import get_substep_prefetcher
+        get_substep_prefetcher().invalidate_session(session_id)
         return True
 
     except Exception as e:
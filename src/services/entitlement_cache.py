@@ -0,0 +1,329 @@
+"""
+Entitlement Cache - short-TTL cache for auth and payment dependencies
+权限缓存 - 认证和支付依赖的短TTL缓存
+
+require_payment used to run a select(Task) on every protected request, and
+get_current_user re-verified the JWT on every call, although a substep
+session hits the same task dozens of times a minute. This module keeps:
+
+- decoded tokens, keyed by a hash of the bearer token, until the earlier of
+  the token's own exp and AUTH_TOKEN_CACHE_SECONDS (always in-process);
+- paid entitlements keyed on (user, task) for ENTITLEMENT_CACHE_TTL_SECONDS,
+  in-process or in Redis (ENTITLEMENT_CACHE_BACKEND=redis).
+
+require_payment 过去每次受保护请求都执行 select(Task)，get_current_user 每次调用都重新校验JWT，
+而一个子步骤会话每分钟会多次访问同一任务。本模块缓存：
+- 已解码的令牌（按令牌哈希，有效期取令牌 exp 与 AUTH_TOKEN_CACHE_SECONDS 中较早者，仅进程内）；
+- 按（用户，任务）缓存的已支付权限（ENTITLEMENT_CACHE_TTL_SECONDS，进程内或Redis）。
+
+Only granted entitlements are cached; denials always go to the database, so
+a payment confirmed on another worker is visible immediately. Payment
+callbacks and task status changes invalidate the task after their commit.
+Only Redis mode reaches the other workers: with the memory backend another
+worker keeps a revoked entitlement for up to the TTL, so multi-worker
+deployments should use ENTITLEMENT_CACHE_BACKEND=redis.
+只缓存已授予的权限；拒绝始终查询数据库，因此其他工作进程确认的支付立即可见。
+支付回调和任务状态变更在提交后使任务失效。只有 Redis 模式会作用于其他工作进程：内存后端下，
+其他工作进程最多在TTL内保留已撤销的权限，因此多工作进程部署应使用 ENTITLEMENT_CACHE_BACKEND=redis。
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS_PREFIX = "academicguard:entitlement:"
+
+
+class EntitlementCache:
+    """
+    Token and (user, task) entitlement cache
+    令牌和（用户，任务）权限缓存
+    """
+
+    def __init__(
+        self,
+        backend: str = "memory",
+        ttl_seconds: float = 30.0,
+        token_ttl_seconds: float = 300.0,
+        max_entries: int = 10000,
+        redis_url: Optional[str] = None,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.token_ttl_seconds = token_ttl_seconds
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self._lock = threading.Lock()
+        # token hash -> (user dict, expires_at)
+        self._tokens: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # task_id -> {user_id: expires_at}
+        self._entitlements: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._redis = None
+        self.token_hits = 0
+        self.token_misses = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.redis_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend != "off" and self.ttl_seconds > 0
+
+    # ------------------------------------------------------------------
+    # Decoded tokens (in-process only; decoding is CPU, not shared state)
+    # 已解码令牌（仅进程内；解码是CPU开销，而非共享状态）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token(self, token: str) -> Optional[dict]:
+        """
+        Return the cached user for a bearer token, if still valid
+        返回令牌对应的缓存用户（如仍有效）
+        """
+        if self.token_ttl_seconds <= 0:
+            return None
+        key = self._token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._tokens[key]
+                self.token_misses += 1
+                return None
+            self._tokens.move_to_end(key)
+            self.token_hits += 1
+            return dict(entry[0])
+
+    def set_token(self, token: str, user: dict, exp: Optional[float] = None) -> None:
+        """
+        Cache a verified token's user until min(exp, now + token TTL)
+        缓存已验证令牌的用户，直到 min(exp, 当前时间 + 令牌TTL)
+        """
+        if self.token_ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.token_ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._tokens[self._token_key(token)] = (dict(user), expires_at)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # (user, task) entitlements
+    # （用户，任务）权限
+    # ------------------------------------------------------------------
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    def _use_redis(self) -> bool:
+        return self.backend == "redis" and bool(self.redis_url)
+
+    async def is_entitled(self, user_id: Optional[str], task_id: str) -> bool:
+        """
+        True if (user, task) has a cached paid entitlement
+        如果（用户，任务）有缓存的已支付权限则返回True
+        """
+        if not self.enabled:
+            return False
+        user_key = user_id or ""
+        if self._use_redis():
+            try:
+                found = await self._get_redis().hget(_REDIS_PREFIX + task_id, user_key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Entitlement cache Redis read failed, using database: {e}")
+                found = None
+            with self._lock:
+                if found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return bool(found)
+
+        now = time.time()
+        with self._lock:
+            users = self._entitlements.get(task_id)
+            expires_at = users.get(user_key) if users else None
+            if expires_at is None or expires_at <= now:
+                if expires_at is not None:
+                    del users[user_key]
+                self.misses += 1
+                return False
+            self._entitlements.move_to_end(task_id)
+            self.hits += 1
+            return True
+
+    async def grant(self, user_id: Optional[str], task_id: str) -> None:
+        """
+        Record a paid entitlement for (user, task)
+        记录（用户，任务）的已支付权限
+        """
+        if not self.enabled:
+            return
+        user_key = user_id or ""
+        if self._use_redis():
+            try:
+                redis = self._get_redis()
+                key = _REDIS_PREFIX + task_id
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.hset(key, user_key, "1")
+                    pipe.expire(key, max(1, int(self.ttl_seconds)))
+                    await pipe.execute()
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Entitlement cache Redis write failed: {e}")
+            return
+
+        with self._lock:
+            users = self._entitlements.setdefault(task_id, {})
+            users[user_key] = time.time() + self.ttl_seconds
+            self._entitlements.move_to_end(task_id)
+            while len(self._entitlements) > self.max_entries:
+                self._entitlements.popitem(last=False)
+
+    async def invalidate_task(self, task_id: Optional[str]) -> None:
+        """
+        Drop every cached entitlement of a task (payment or status change)
+        删除任务的所有缓存权限（支付或状态变更时）
+        """
+        if not task_id:
+            return
+        self._drop_local(task_id)
+        if self._use_redis():
+            await self._drop_redis(task_id)
+
+    def _drop_local(self, task_id: str) -> None:
+        with self._lock:
+            self._entitlements.pop(task_id, None)
+            self.invalidations += 1
+
+    async def _drop_redis(self, task_id: str) -> None:
+        try:
+            await self._get_redis().delete(_REDIS_PREFIX + task_id)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Entitlement cache Redis invalidation failed for {task_id}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Cache counters for health/metrics endpoints
+        供健康/指标端点使用的缓存计数
+        """
+        with self._lock:
+            return {
+                "backend": self.backend if self.enabled else "off",
+                "ttl_seconds": self.ttl_seconds,
+                "tokens_cached": len(self._tokens),
+                "token_hits": self.token_hits,
+                "token_misses": self.token_misses,
+                "tasks_cached": len(self._entitlements),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "redis_errors": self.redis_errors,
+            }
+
+
+_cache: Optional[EntitlementCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_entitlement_cache() -> EntitlementCache:
+    """
+    Get the process-wide entitlement cache
+    获取进程级权限缓存
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = EntitlementCache(
+                    backend=settings.entitlement_cache_backend,
+                    ttl_seconds=settings.entitlement_cache_ttl_seconds,
+                    token_ttl_seconds=settings.auth_token_cache_seconds,
+                    max_entries=settings.entitlement_cache_max_entries,
+                    redis_url=settings.redis_url,
+                )
+    return _cache
+
+
+async def invalidate_task_entitlements(task_id: Optional[str]) -> None:
+    """
+    Invalidate a task's cached entitlements (call after payment/status writes)
+    使任务的缓存权限失效（在支付/状态写入后调用）
+    """
+    await get_entitlement_cache().invalidate_task(task_id)
+
+
+_PENDING_KEY = "entitlement_invalidations"
+_LISTENING_KEY = "entitlement_invalidation_hooks"
+_redis_invalidations: Set["asyncio.Task"] = set()
+
+
+def invalidate_task_entitlements_on_commit(db: AsyncSession, task_id: Optional[str]) -> None:
+    """
+    Invalidate a task's cached entitlements once db's transaction commits
+    在 db 的事务提交后使任务的缓存权限失效
+
+    For services that flush and leave the commit to their caller. Invalidating
+    before the commit would let a concurrent require_payment read the still
+    committed old row and grant it again for the whole TTL. A rollback drops
+    the pending invalidations.
+    用于只 flush、由调用方提交的服务。若在提交前失效，并发的 require_payment 可能读到仍已提交的
+    旧行并重新授予整个TTL的权限。回滚时丢弃待处理的失效。
+    """
+    if not task_id:
+        return
+    session = db.sync_session
+    if not session.info.get(_LISTENING_KEY):
+        session.info[_LISTENING_KEY] = True
+        event.listen(session, "after_commit", _invalidate_committed)
+        event.listen(session, "after_soft_rollback", _discard_pending)
+    session.info.setdefault(_PENDING_KEY, set()).add(task_id)
+
+
+def _invalidate_committed(session) -> None:
+    task_ids = session.info.pop(_PENDING_KEY, None)
+    if not task_ids:
+        return
+    cache = get_entitlement_cache()
+    for task_id in task_ids:
+        cache._drop_local(task_id)
+    if not cache._use_redis():
+        return
+    # Commit hooks are synchronous; the Redis deletes run on the event loop
+    # 提交钩子是同步的；Redis 删除在事件循环上执行
+    loop = asyncio.get_running_loop()
+    for task_id in task_ids:
+        task = loop.create_task(cache._drop_redis(task_id))
+        _redis_invalidations.add(task)
+        task.add_done_callback(_redis_invalidations.discard)
+
+
+def _discard_pending(session, previous_transaction) -> None:
+    # Savepoint rollbacks keep the outer transaction's invalidations
+    # 保存点回滚保留外层事务的失效
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,250 @@
+"""
+Export Store - content-addressed rendering and caching of export artifacts
+导出存储 - 导出产物的内容寻址渲染与缓存
+
+Exports used to be written synchronously to a local exports/ directory and
+served by filename, which blocked the event loop, leaked disk and broke as
+soon as the download hit another pod. Artifacts are now addressed by a hash
+of their content (format + renderer version + text/report), rendered on
+demand and streamed; rendered bytes are cached so a repeat download of an
+unchanged session costs nothing:
+
+- memory: bounded in-process LRU (EXPORT_CACHE_MAX_MB);
+- s3: any S3-compatible object store (EXPORT_CACHE_S3_URL, optional
+  EXPORT_CACHE_S3_ENDPOINT for MinIO/OSS/COS), shared by all pods;
+- off: render every time.
+
+导出过去同步写入本地 exports/ 目录并按文件名提供下载，这会阻塞事件循环、泄漏磁盘空间，
+且下载请求落到其他 pod 时失效。现在产物按内容哈希（格式 + 渲染器版本 + 文本/报告）寻址，
+按需渲染并流式输出；渲染结果会被缓存，未变化会话的重复下载没有额外开销。
+"""
+
+import hashlib
+import io
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import IO, Iterable, Iterator, List, Optional
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered output changes for the same input
+# 相同输入的渲染结果发生变化时递增
+EXPORT_RENDER_VERSION = "1"
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Keep DOCX renders in memory up to this size before spooling to disk
+# DOCX 渲染结果在此大小以内保存在内存中，超过后才写入磁盘
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+# Try to import boto3 for S3-compatible caching
+# 尝试导入 boto3 用于 S3 兼容缓存
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+
+def content_key(kind: str, fmt: str, parts: Iterable[str]) -> str:
+    """
+    Hash identifying one rendered artifact
+    标识一个渲染产物的哈希
+
+    Args:
+        kind: "document" or "report"
+        fmt: Output format (txt, docx, json)
+        parts: Strings the output is rendered from
+    """
+    digest = hashlib.sha256(f"{kind}:{fmt}:{EXPORT_RENDER_VERSION}".encode())
+    for part in parts:
+        digest.update(b"\x00")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def iter_text_chunks(text: str, chunk_chars: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encode text to UTF-8 chunk by chunk
+    逐块将文本编码为UTF-8
+    """
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars].encode("utf-8")
+
+
+def iter_buffered(pieces: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Coalesce many small string pieces (e.g. json iterencode) into byte chunks
+    将大量小字符串片段（如 json iterencode）合并为字节块
+    """
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_file(fileobj: IO[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream a file object from the start and close it
+    从头流式读取文件对象并在结束后关闭
+    """
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def spooled_buffer() -> IO[bytes]:
+    """
+    In-memory buffer that only spills to disk for very large renders
+    仅在渲染结果非常大时才写入磁盘的内存缓冲区
+    """
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+class ExportCache:
+    """
+    Bounded in-process LRU of rendered artifacts
+    进程内有界的渲染产物LRU缓存
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, max_item_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_item_bytes or self.max_bytes <= 0:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "items": len(self._items),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class S3ExportCache(ExportCache):
+    """
+    S3-compatible object store cache shared across pods (memory LRU in front)
+    跨 pod 共享的 S3 兼容对象存储缓存（前置内存LRU）
+    """
+
+    backend = "s3"
+
+    def __init__(self, url: str, endpoint_url: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        without_scheme = url[len("s3://"):] if url.startswith("s3://") else url
+        self.bucket, _, prefix = without_scheme.partition("/")
+        self.prefix = prefix.strip("/")
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self.remote_errors = 0
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = super().get(key)
+        if data is not None:
+            return data
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            data = response["Body"].read()
+        except self._client.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            self.remote_errors += 1
+            logger.warning(f"Export cache S3 read failed for {key}: {e}")
+            return None
+        super().put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        super().put(key, data)
+        try:
+            self._client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=io.BytesIO(data))
+        except Exception as e:
+            self.remote_errors += 1
+            logger.warning(f"Export cache S3 write failed for {key}: {e}")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["bucket"] = self.bucket
+        stats["remote_errors"] = self.remote_errors
+        return stats
+
+
+_cache: Optional[ExportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_export_cache() -> Optional[ExportCache]:
+    """
+    Get the process-wide export cache (None when EXPORT_CACHE_BACKEND=off)
+    获取进程级导出缓存（EXPORT_CACHE_BACKEND=off 时为 None）
+    """
+    global _cache
+    settings = get_settings()
+    if settings.export_cache_backend == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                max_bytes = settings.export_cache_max_mb * 1024 * 1024
+                if settings.export_cache_backend == "s3" and settings.export_cache_s3_url:
+                    if BOTO3_AVAILABLE:
+                        _cache = S3ExportCache(
+                            settings.export_cache_s3_url,
+                            endpoint_url=settings.export_cache_s3_endpoint,
+                            max_bytes=max_bytes,
+                        )
+                    else:
+                        logger.warning("boto3 not installed, export cache falls back to memory")
+                if _cache is None:
+                    _cache = ExportCache(max_bytes=max_bytes)
+    return _cache
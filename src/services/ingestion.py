@@ -0,0 +1,591 @@
+"""
+Ingestion Service - sandboxed, killable workers for upload parsing and billing counts
+导入服务 - 用于上传解析和计费字数统计的沙箱化、可终止工作进程
+
+Uploads used to be parsed with python-docx inline on the event loop, and
+WordCounter.count_with_timeout could only stop *waiting* for a runaway count
+(the thread kept burning CPU). This module runs that work in a small pool of
+subprocesses, each under an address-space and CPU rlimit:
+
+- ingest_file(): DOCX/TXT extraction streamed from disk, reference stripping,
+  whitelist extraction, billing word count and hashing in one job;
+- count_text(): billing word count for text already in the database.
+
+A job that exceeds INGESTION_TIMEOUT_SECONDS gets its worker killed and
+replaced; a job that trips an rlimit kills only its own worker. Either way
+the other workers keep serving, so a hostile upload costs one worker slot
+for at most the timeout.
+
+上传过去在事件循环中直接用 python-docx 解析，WordCounter.count_with_timeout 只能停止
+*等待*失控的统计（线程仍在消耗CPU）。本模块在小型子进程池中执行这些工作，
+每个进程都受地址空间和CPU资源限制：
+- ingest_file()：从磁盘流式提取DOCX/TXT、剥离参考文献、提取白名单、统计计费字数并计算哈希；
+- count_text()：对数据库中已有文本统计计费字数。
+超过 INGESTION_TIMEOUT_SECONDS 的任务会终止并替换其工作进程；触发资源限制只会终止
+该工作进程。其他工作进程继续服务，恶意上传最多占用一个工作进程槽位直到超时。
+"""
+
+import asyncio
+import codecs
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.config import get_settings
+from src.services.docx_roundtrip import build_paragraph_index
+from src.services.tracing import span
+from src.services.word_counter import TextCleaningTimeoutError, WordCountResult
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK = 64 * 1024
+
+
+class IngestionError(Exception):
+    """
+    Ingestion failed; carries an API error code and bilingual messages
+    导入失败；包含API错误码和双语消息
+    """
+
+    def __init__(self, code: str, message: str, message_zh: str = "", status_code: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.message_zh = message_zh or message
+        self.status_code = status_code
+
+    def detail(self) -> dict:
+        return {"error": self.code, "message": self.message, "message_zh": self.message_zh}
+
+
+class IngestionTimeoutError(IngestionError, TextCleaningTimeoutError):
+    """
+    Job exceeded the wall-clock timeout; its worker was killed
+    任务超过时间限制；其工作进程已被终止
+    """
+
+
+class IngestionBusyError(IngestionError):
+    """
+    No worker became free within the queue timeout
+    在排队超时内没有空闲的工作进程
+    """
+
+
+@dataclass
+class IngestionResult:
+    """
+    Everything the upload route needs from one pass over the file
+    上传路由一次遍历文件所需的全部结果
+    """
+    text: str
+    body_text: str
+    reference_section: Optional[str]
+    whitelist_terms: Set[str]
+    word_count: WordCountResult
+    file_sha256: str
+    file_size: int
+    # DOCX only: body paragraph index for formatting-preserving export
+    # 仅DOCX：用于保留格式导出的正文段落索引
+    paragraph_index: Optional[List[Dict[str, Any]]] = None
+
+
+# ----------------------------------------------------------------------
+# Job functions (run inside the worker process)
+# 任务函数（在工作进程中运行）
+# ----------------------------------------------------------------------
+
+def _read_txt(path: str) -> Tuple[str, str, int]:
+    """
+    Decode a text file chunk by chunk (UTF-8, falling back to Latin-1)
+    分块解码文本文件（UTF-8，失败时回退到Latin-1）
+    """
+    for encoding in ("utf-8", "latin-1"):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        digest = hashlib.sha256()
+        parts: List[str] = []
+        size = 0
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(_READ_CHUNK)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    parts.append(decoder.decode(chunk))
+                parts.append(decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            continue
+        return "".join(parts), digest.hexdigest(), size
+    raise IngestionError("invalid_file_content", "Could not decode text file", "无法解码文本文件")
+
+
+def _file_digest(path: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _read_docx(path: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Extract non-empty paragraph text and the paragraph index from a DOCX file
+    从DOCX文件提取非空段落文本和段落索引
+    """
+    try:
+        from docx import Document as DocxDocument
+    except ImportError:
+        raise IngestionError(
+            "docx_library_missing",
+            "python-docx library is required to process .docx files",
+            "处理.docx文件需要python-docx库",
+            status_code=500,
+        )
+
+    try:
+        doc = DocxDocument(path)
+    except Exception as e:
+        raise IngestionError(
+            "invalid_docx",
+            f"Invalid or corrupted DOCX file: {str(e)}",
+            f"无效或损坏的DOCX文件: {str(e)}",
+        )
+
+    try:
+        # Only paragraph text (excludes headers, footers, comments, etc.)
+        # 只提取段落文本（排除页眉、页脚、批注等）
+        paragraphs, paragraph_index = build_paragraph_index(doc)
+        return "\n\n".join(paragraphs), paragraph_index
+    except Exception as e:
+        raise IngestionError(
+            "docx_parsing_failed",
+            f"Failed to extract text from DOCX: {str(e)}",
+            f"从DOCX提取文本失败: {str(e)}",
+        )
+
+
+def ingest_file(path: str, file_ext: str, lexicon_terms: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Extract, strip references, extract whitelist, count and hash one upload
+    对一个上传文件进行提取、参考文献剥离、白名单提取、计数和哈希
+
+    Returns a plain dict so the result pickles cheaply across the pipe.
+    返回普通字典，便于通过管道低成本序列化。
+    """
+    from src.core.preprocessor.reference_handler import ReferenceHandler
+    from src.core.preprocessor.whitelist_extractor import WhitelistExtractor
+    from src.services.word_counter import WordCounter
+
+    paragraph_index = None
+    if file_ext == ".docx":
+        text, paragraph_index = _read_docx(path)
+        file_sha256, file_size = _file_digest(path)
+        if not text:
+            raise IngestionError(
+                "empty_document",
+                "No text content found in DOCX file",
+                "DOCX文件中未找到文本内容",
+            )
+    else:
+        text, file_sha256, file_size = _read_txt(path)
+
+    body_text, reference_section = ReferenceHandler().extract(text)
+    whitelist = WhitelistExtractor(lexicon_terms=lexicon_terms).extract_from_document(text)
+    word_count = WordCounter()._do_count(text, calculate_hash=True)
+
+    return {
+        "text": text,
+        "body_text": body_text,
+        "reference_section": reference_section,
+        "whitelist_terms": set(whitelist.terms),
+        "word_count": word_count.model_dump(),
+        "file_sha256": file_sha256,
+        "file_size": file_size,
+        "paragraph_index": paragraph_index,
+    }
+
+
+def count_text(text: str, calculate_hash: bool = True) -> Dict[str, Any]:
+    """
+    Billing word count for text (WordCounter rules)
+    文本的计费字数统计（WordCounter 规则）
+    """
+    from src.services.word_counter import WordCounter
+
+    return WordCounter()._do_count(text, calculate_hash).model_dump()
+
+
+_JOBS = {
+    "ingest": ingest_file,
+    "count": count_text,
+}
+
+
+def _address_space_bytes() -> int:
+    """
+    Current virtual memory size of this process (Linux), else 0
+    当前进程的虚拟内存大小（Linux），否则为0
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _apply_limits(memory_mb: int) -> None:
+    """
+    Cap the address space at the worker's start-up size plus memory_mb
+    将地址空间上限设为工作进程启动时大小加 memory_mb
+
+    The limit is relative because spawn re-imports the parent's main module,
+    whose baseline differs between uvicorn and `python -m src.main`.
+    限制是相对值，因为 spawn 会重新导入父进程主模块，其基线大小因启动方式而异。
+    """
+    try:
+        import resource
+    except ImportError:
+        return  # Windows: no rlimits, the wall-clock kill still applies
+    if memory_mb > 0:
+        limit = _address_space_bytes() + memory_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ingestion worker could not set memory limit: {e}")
+
+
+def _arm_cpu_limit(cpu_seconds: float) -> None:
+    """
+    Allow this job cpu_seconds more CPU time (the soft limit is cumulative)
+    允许当前任务再使用 cpu_seconds 秒CPU时间（软限制是累计值）
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    if cpu_seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, memory_mb: int, cpu_seconds: float) -> None:
+    """
+    Worker process loop: receive (kind, kwargs), reply ("ok", result) or ("error", ...)
+    工作进程循环：接收 (kind, kwargs)，回复 ("ok", result) 或 ("error", ...)
+    """
+    _apply_limits(memory_mb)
+    while True:
+        try:
+            kind, kwargs = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            return
+        _arm_cpu_limit(cpu_seconds)
+        try:
+            reply = ("ok", _JOBS[kind](**kwargs))
+        except IngestionError as e:
+            reply = ("error", e.code, e.message, e.message_zh, e.status_code)
+        except MemoryError:
+            reply = ("error", "file_too_complex", "Document exceeds the memory limit for parsing",
+                     "文档解析超出内存限制", 413)
+        except Exception as e:
+            reply = ("error", "ingestion_failed", f"Failed to process document: {str(e)}",
+                     f"文档处理失败: {str(e)}", 400)
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            return
+
+
+# ----------------------------------------------------------------------
+# Worker pool (parent side)
+# 工作进程池（父进程侧）
+# ----------------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int, cpu_seconds: float):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, memory_mb, cpu_seconds),
+            daemon=True,
+            name="ingestion-worker",
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(timeout=2)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class IngestionPool:
+    """
+    Fixed-size pool of rlimited worker processes with hard-kill on timeout
+    固定大小、受资源限制、超时强制终止的工作进程池
+
+    workers=0 runs jobs inline on a thread instead (no isolation; for
+    platforms where subprocesses are not available).
+    workers=0 时在线程中直接运行任务（无隔离；用于无法使用子进程的平台）。
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout_seconds: float = 20.0,
+        queue_timeout_seconds: float = 10.0,
+        memory_limit_mb: int = 1024,
+    ):
+        self.workers = max(0, workers)
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._closed = False
+        self.jobs = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.busy_rejections = 0
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.memory_limit_mb, self.timeout_seconds)
+
+    def _acquire(self) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._spawned < self.workers:
+                self._spawned += 1
+                spawn = True
+            else:
+                spawn = False
+        if spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._spawned -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.queue_timeout_seconds)
+        except queue.Empty:
+            self.busy_rejections += 1
+            raise IngestionBusyError(
+                "ingestion_busy",
+                "Document processing is busy, please retry shortly",
+                "文档处理繁忙，请稍后重试",
+                status_code=503,
+            )
+
+    def _release(self, worker: Optional[_Worker]) -> None:
+        if worker is not None and not self._closed and worker.process.is_alive():
+            self._idle.put(worker)
+            return
+        if worker is not None:
+            worker.kill()
+        with self._lock:
+            self._spawned -= 1
+
+    def run_sync(self, kind: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run one job on a worker, blocking the calling thread
+        在工作进程上运行一个任务，阻塞调用线程
+
+        Raises:
+            IngestionTimeoutError: Timed out; the worker was killed
+            IngestionBusyError: No worker became free in time
+            IngestionError: The job failed or its worker died (rlimit)
+        """
+        with span(f"ingestion.{kind}"):
+            return self._run_job(kind, timeout, **kwargs)
+
+    def _run_job(self, kind: str, timeout: Optional[float], **kwargs) -> Any:
+        timeout = timeout or self.timeout_seconds
+        self.jobs += 1
+        if self.workers == 0:
+            return _JOBS[kind](**kwargs)
+
+        worker = self._acquire()
+        try:
+            worker.conn.send((kind, kwargs))
+            if not worker.conn.poll(timeout):
+                self.timeouts += 1
+                logger.warning(f"Ingestion job '{kind}' exceeded {timeout}s, killing worker pid={worker.process.pid}")
+                worker.kill()
+                worker = None
+                raise IngestionTimeoutError(
+                    "processing_timeout",
+                    f"Document processing exceeded {timeout:g}s timeout. File may be malformed or too complex.",
+                    f"文档处理超过 {timeout:g} 秒限制，文件可能格式异常或过于复杂。",
+                    status_code=413,
+                )
+            try:
+                reply = worker.conn.recv()
+            except (EOFError, OSError):
+                self.crashes += 1
+                logger.warning(f"Ingestion worker pid={worker.process.pid} died during '{kind}' (resource limit)")
+                worker.kill()
+                worker = None
+                raise IngestionError(
+                    "file_too_complex",
+                    "Document exceeds the resource limits for parsing",
+                    "文档解析超出资源限制",
+                    status_code=413,
+                )
+        finally:
+            self._release(worker)
+
+        if reply[0] == "ok":
+            return reply[1]
+        _, code, message, message_zh, status_code = reply
+        raise IngestionError(code, message, message_zh, status_code=status_code)
+
+    async def run(self, kind: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run one job without blocking the event loop
+        运行一个任务而不阻塞事件循环
+        """
+        return await asyncio.to_thread(self.run_sync, kind, timeout, **kwargs)
+
+    async def ingest(self, path: str, file_ext: str) -> IngestionResult:
+        """
+        Parse an uploaded file stored at path
+        解析存储在 path 的上传文件
+        """
+        from src.core.lexicon_registry import get_lexicon
+
+        result = await self.run(
+            "ingest",
+            path=path,
+            file_ext=file_ext,
+            lexicon_terms=set(get_lexicon().whitelist_terms),
+        )
+        return IngestionResult(
+            text=result["text"],
+            body_text=result["body_text"],
+            reference_section=result["reference_section"],
+            whitelist_terms=result["whitelist_terms"],
+            word_count=WordCountResult(**result["word_count"]),
+            file_sha256=result["file_sha256"],
+            file_size=result["file_size"],
+            paragraph_index=result["paragraph_index"],
+        )
+
+    async def count_words(self, text: str, calculate_hash: bool = True) -> WordCountResult:
+        """
+        Billing word count in a worker
+        在工作进程中统计计费字数
+        """
+        result = await self.run("count", text=text, calculate_hash=calculate_hash)
+        return WordCountResult(**result)
+
+    def start(self) -> None:
+        """
+        Pre-spawn the workers so the first upload does not pay process start-up
+        预先启动工作进程，使首次上传不承担进程启动开销
+        """
+        self._closed = False
+        while True:
+            with self._lock:
+                if self._spawned >= self.workers:
+                    return
+                self._spawned += 1
+            try:
+                self._idle.put(self._spawn())
+            except Exception as e:
+                with self._lock:
+                    self._spawned -= 1
+                logger.warning(f"Could not start ingestion worker: {e}")
+                return
+
+    def stop(self) -> None:
+        """
+        Kill idle workers; busy ones are killed when released
+        终止空闲的工作进程；忙碌的在释放时终止
+        """
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+            with self._lock:
+                self._spawned -= 1
+
+    def stats(self) -> dict:
+        """
+        Pool counters for health/metrics endpoints
+        供健康/指标端点使用的进程池计数
+        """
+        return {
+            "workers": self.workers,
+            "spawned": self._spawned,
+            "idle": self._idle.qsize(),
+            "jobs": self.jobs,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "busy_rejections": self.busy_rejections,
+        }
+
+
+_pool: Optional[IngestionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ingestion_pool() -> IngestionPool:
+    """
+    Get the process-wide ingestion pool
+    获取进程级导入工作进程池
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = get_settings()
+                workers = settings.ingestion_workers
+                if workers <= 0:
+                    workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+                if not settings.ingestion_sandbox:
+                    workers = 0
+                _pool = IngestionPool(
+                    workers=workers,
+                    timeout_seconds=settings.ingestion_timeout_seconds,
+                    queue_timeout_seconds=settings.ingestion_queue_timeout_seconds,
+                    memory_limit_mb=settings.ingestion_memory_limit_mb,
+                )
+    return _pool
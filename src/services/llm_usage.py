@@ -0,0 +1,346 @@
+"""
+LLM Usage Metering - per-call usage recorder with asynchronous write-behind
+LLM用量计量 - 按调用记录用量并异步批量写入
+
+Every provider call reports its step, provider, model, token counts, latency
+and cache hit through record_llm_call(). The call only appends to an
+in-memory buffer; a background loop started from main.lifespan flushes the
+buffer in batches to the llm_usage table and rolls the counters up onto Task
+(api_call_count, token and latency totals), so no LLM call waits on a DB write.
+
+每次提供商调用通过 record_llm_call() 上报步骤、提供商、模型、token数、延迟和缓存命中。
+调用只追加到内存缓冲区；由 main.lifespan 启动的后台循环将缓冲区批量写入 llm_usage 表，
+并把计数汇总到 Task（api_call_count、token和延迟总量），LLM调用不会等待数据库写入。
+
+The session/task a call belongs to comes from usage_scope(), set by the route
+or handler that knows it. Calls with only a session id are attributed to the
+task of that session's document at flush time.
+调用所属的会话/任务来自路由或处理器设置的 usage_scope()。
+只有会话ID的调用在写入时归属到该会话文档对应的任务。
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import get_settings
+from src.services.tracing import observe_llm_call
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMCallRecord:
+    """
+    One metered provider call
+    一次计量的提供商调用
+    """
+    step: str
+    provider: str
+    model: Optional[str]
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency_ms: Optional[float]
+    created_at: datetime
+    session_id: Optional[str] = None
+    task_id: Optional[str] = None
+
+    @property
+    def cache_hit(self) -> bool:
+        return self.cached_tokens > 0
+
+
+# Attribution of the calls made in the current request/task
+# 当前请求/任务中调用的归属信息
+_usage_context: contextvars.ContextVar[Dict[str, Optional[str]]] = contextvars.ContextVar(
+    "llm_usage_context", default={}
+)
+
+
+@contextmanager
+def usage_scope(
+    session_id: Optional[str] = None,
+    task_id: Optional[str] = None,
+    step: Optional[str] = None,
+) -> Iterator[None]:
+    """
+    Attribute LLM calls made inside this block to a session/task/step
+    将此代码块内的LLM调用归属到会话/任务/步骤
+
+    Nested scopes inherit the fields they do not override. Context variables
+    are copied into asyncio tasks, so gathered calls keep the attribution.
+    嵌套作用域继承未覆盖的字段。上下文变量会复制到 asyncio 任务中，并发调用保留归属。
+    """
+    current = _usage_context.get()
+    merged = dict(current)
+    for key, value in (("session_id", session_id), ("task_id", task_id), ("step", step)):
+        if value:
+            merged[key] = value
+    token = _usage_context.set(merged)
+    try:
+        yield
+    finally:
+        _usage_context.reset(token)
+
+
+class UsageRecorder:
+    """
+    Buffers call records and flushes them to the database in batches
+    缓冲调用记录并批量写入数据库
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        flush_seconds: float = 5.0,
+        flush_batch: int = 200,
+        buffer_limit: int = 10000,
+    ):
+        self.enabled = enabled
+        self.flush_seconds = flush_seconds
+        self.flush_batch = flush_batch
+        self._buffer: deque = deque(maxlen=buffer_limit)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+
+    def record(self, call: LLMCallRecord) -> None:
+        """
+        Append one call to the buffer (never blocks on I/O)
+        将一次调用追加到缓冲区（从不阻塞于I/O）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(call)
+            self.recorded += 1
+            should_wake = len(self._buffer) >= self.flush_batch
+        if should_wake and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _drain(self) -> List[LLMCallRecord]:
+        with self._lock:
+            calls = list(self._buffer)
+            self._buffer.clear()
+        return calls
+
+    def _requeue(self, calls: List[LLMCallRecord]) -> None:
+        """
+        Put calls back in front of the buffer after a failed flush
+        写入失败后将调用放回缓冲区前端
+        """
+        with self._lock:
+            room = self._buffer.maxlen - len(self._buffer)
+            kept = calls[-room:] if room > 0 else []
+            self.dropped += len(calls) - len(kept)
+            self._buffer.extendleft(reversed(kept))
+
+    async def flush(self) -> int:
+        """
+        Write buffered calls to llm_usage and roll them up onto Task
+        将缓冲的调用写入 llm_usage 并汇总到 Task
+
+        Returns:
+            Number of calls written
+        """
+        calls = self._drain()
+        if not calls:
+            return 0
+        try:
+            await _write_calls(calls)
+        except Exception as e:
+            self.flush_errors += 1
+            self._requeue(calls)
+            logger.warning(f"LLM usage flush failed, {len(calls)} calls kept for retry: {e}")
+            return 0
+        self.flushed += len(calls)
+        logger.debug(f"Flushed {len(calls)} LLM usage records")
+        return len(calls)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """
+        Start the background flush loop
+        启动后台写入循环
+        """
+        if self._task is None and self.enabled:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush loop and write whatever is still buffered
+        停止写入循环并写出仍在缓冲区中的记录
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._loop = None
+        self._wake = None
+
+    def stats(self) -> dict:
+        """
+        Recorder counters for health/metrics endpoints
+        供健康/指标端点使用的记录器计数
+        """
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "enabled": self.enabled,
+            "buffered": buffered,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+
+async def _write_calls(calls: List[LLMCallRecord]) -> None:
+    """
+    Insert usage rows and apply Task rollups in one transaction
+    在一个事务中插入用量行并更新 Task 汇总
+    """
+    from sqlalchemy import insert, select, update
+    from src.db.database import AsyncSessionLocal
+    from src.db.models import LLMUsage, Session, Task
+
+    async with AsyncSessionLocal() as db:
+        # Resolve the task of calls that only carry a session id
+        # 为只有会话ID的调用解析所属任务
+        session_ids = {c.session_id for c in calls if c.session_id and not c.task_id}
+        if session_ids:
+            rows = (await db.execute(
+                select(Session.id, Task.task_id)
+                .join(Task, Task.document_id == Session.document_id)
+                .where(Session.id.in_(session_ids))
+            )).all()
+            task_by_session = {session_id: task_id for session_id, task_id in rows}
+            for call in calls:
+                if call.session_id and not call.task_id:
+                    call.task_id = task_by_session.get(call.session_id)
+
+        await db.execute(insert(LLMUsage), [
+            {**asdict(call), "cache_hit": call.cache_hit} for call in calls
+        ])
+
+        rollups: Dict[str, Dict[str, float]] = {}
+        for call in calls:
+            if not call.task_id:
+                continue
+            totals = rollups.setdefault(call.task_id, {
+                "calls": 0, "prompt": 0, "completion": 0, "cached": 0, "latency": 0.0,
+            })
+            totals["calls"] += 1
+            totals["prompt"] += call.prompt_tokens
+            totals["completion"] += call.completion_tokens
+            totals["cached"] += call.cached_tokens
+            totals["latency"] += call.latency_ms or 0.0
+
+        for task_id, totals in rollups.items():
+            await db.execute(
+                update(Task)
+                .where(Task.task_id == task_id)
+                .values(
+                    api_call_count=Task.api_call_count + totals["calls"],
+                    prompt_tokens_total=Task.prompt_tokens_total + totals["prompt"],
+                    completion_tokens_total=Task.completion_tokens_total + totals["completion"],
+                    cached_tokens_total=Task.cached_tokens_total + totals["cached"],
+                    llm_latency_ms_total=Task.llm_latency_ms_total + totals["latency"],
+                )
+            )
+        await db.commit()
+
+
+_recorder: Optional[UsageRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_usage_recorder() -> UsageRecorder:
+    """
+    Get the process-wide usage recorder
+    获取进程级用量记录器
+    """
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                settings = get_settings()
+                _recorder = UsageRecorder(
+                    enabled=settings.llm_usage_metering,
+                    flush_seconds=settings.llm_usage_flush_seconds,
+                    flush_batch=settings.llm_usage_flush_batch,
+                    buffer_limit=settings.llm_usage_buffer_limit,
+                )
+    return _recorder
+
+
+def record_llm_call(
+    step: str,
+    provider: Optional[str],
+    model: Optional[str],
+    usage: Optional[Dict[str, Any]],
+    latency_ms: Optional[float],
+    cached_tokens: int = 0,
+) -> None:
+    """
+    Record one provider call for the current usage scope
+    为当前用量作用域记录一次提供商调用
+
+    Args:
+        step: Call site name; overridden by the scope's step if one is set
+        provider: Provider name (dashscope, volcengine, deepseek, gemini, openai)
+        model: Model reported by the provider (or the configured one)
+        usage: Provider "usage" object normalized to a dict, if any
+        latency_ms: Request latency in milliseconds
+        cached_tokens: Prompt tokens served from the provider prefix cache
+    """
+    usage = usage or {}
+    context = _usage_context.get()
+    record = LLMCallRecord(
+        step=context.get("step") or step,
+        provider=provider or get_settings().llm_provider,
+        model=model,
+        prompt_tokens=int(usage.get("prompt_tokens") or usage.get("input_tokens") or 0),
+        completion_tokens=int(usage.get("completion_tokens") or usage.get("output_tokens") or 0),
+        cached_tokens=cached_tokens,
+        latency_ms=round(latency_ms, 1) if latency_ms is not None else None,
+        created_at=datetime.utcnow(),
+        session_id=context.get("session_id"),
+        task_id=context.get("task_id"),
+    )
+    get_usage_recorder().record(record)
+
+    # Latency histogram, token counters and an llm.<provider> span in the request trace
+    # 延迟直方图、token计数器，以及请求追踪中的 llm.<provider> span
+    observe_llm_call(
+        record.provider, record.step, latency_ms,
+        record.prompt_tokens, record.completion_tokens, cached_tokens,
+    )
@@ -0,0 +1,310 @@
+"""
+Single-Flight - coalesce identical in-flight expensive calls
+单飞 - 合并正在进行中的相同高开销调用
+
+The frontend regularly fires the same expensive request twice (React double
+effects, step re-entry, double-clicking "analyze"). The substep cache is only
+written once the LLM call completes, so every duplicate used to start its own
+multi-second LLM or pipeline run. Calls are keyed on (endpoint, session,
+step, input hash): while one is in flight, identical calls await the same
+task instead of starting another.
+
+前端经常重复发出同一个高开销请求（React 双重 effect、重新进入步骤、双击"分析"）。
+子步骤缓存只在LLM调用完成后写入，因此每个重复请求过去都会启动自己的多秒级LLM或流水线运行。
+调用按（端点，会话，步骤，输入哈希）作为键：一个调用进行中时，相同调用等待同一任务而不是再启动一个。
+
+- memory: one asyncio task per key in this process. The task is shielded,
+  so a disconnecting leader does not cancel the followers' result.
+- redis (SINGLE_FLIGHT_BACKEND=redis): additionally takes a
+  SET NX PX lock under REDIS_URL, so workers coalesce with each other. The
+  leader publishes a JSON-serialisable result for a few seconds; followers in
+  other workers poll for it and run the call themselves if the leader's lock
+  disappears without a result (the substep cache then usually answers).
+
+- memory：本进程内每个键一个 asyncio 任务。任务受 shield 保护，领导者断开不会取消跟随者的结果。
+- redis：额外在 REDIS_URL 上获取 SET NX PX 锁，使工作进程之间也能合并。领导者将可JSON序列化
+  的结果发布几秒钟；其他工作进程中的跟随者轮询该结果，若领导者的锁消失而没有结果则自行执行
+  （此时通常由子步骤缓存应答）。
+
+Every caller, leader included, receives its own deep copy of the shared
+result, so callers may mutate what they get back.
+每个调用方（包括领导者）都获得共享结果的独立深拷贝，因此调用方可以修改返回值。
+"""
+
+import asyncio
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.config import get_settings
+from src.services.tracing import SINGLE_FLIGHT_CALLS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_REDIS_PREFIX = "academicguard:singleflight:"
+
+# Delete the lock only if we still own it
+# 仅当锁仍归自己所有时才删除
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def flight_key(endpoint: str, session_id: Optional[str] = None, step: Optional[str] = None, *inputs: Any) -> str:
+    """
+    Build a coalescing key from (endpoint, session, step, input hash)
+    由（端点，会话，步骤，输入哈希）构建合并键
+    """
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    return f"{endpoint}:{session_id or '-'}:{step or '-'}:{digest}"
+
+
+class SingleFlight:
+    """
+    Per-key in-flight call coalescing, in-process and optionally across workers
+    按键合并进行中的调用，进程内以及可选的跨工作进程
+    """
+
+    def __init__(
+        self,
+        backend: str = "memory",
+        redis_url: Optional[str] = None,
+        lock_seconds: float = 120.0,
+        result_ttl_seconds: float = 30.0,
+        poll_seconds: float = 0.25,
+    ):
+        self.backend = backend
+        self.redis_url = redis_url
+        self.lock_seconds = lock_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._redis = None
+        self.leaders = 0
+        self.followers = 0
+        self.remote_followers = 0
+        self.remote_fallbacks = 0
+        self.redis_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend != "off"
+
+    def _use_redis(self) -> bool:
+        return self.backend == "redis" and bool(self.redis_url)
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        name: str = "call",
+        encode: Optional[Callable[[T], Any]] = None,
+        decode: Optional[Callable[[Any], T]] = None,
+    ) -> T:
+        """
+        Run fn once per key while in flight; identical calls share the result
+        每个键在进行中时只运行一次 fn；相同调用共享结果
+
+        encode/decode convert the result to and from JSON-compatible data for
+        the redis backend (default: the result itself is JSON-compatible).
+        encode/decode 用于 redis 后端在结果与JSON兼容数据之间转换（默认结果本身可JSON序列化）。
+        """
+        if not self.enabled:
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.followers += 1
+            SINGLE_FLIGHT_CALLS.inc(1, name, "follower")
+            logger.debug(f"[single-flight] joining in-flight {key}")
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self.leaders += 1
+        SINGLE_FLIGHT_CALLS.inc(1, name, "leader")
+        if self._use_redis():
+            task = asyncio.ensure_future(self._run_distributed(key, fn, name, encode, decode))
+        else:
+            task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def cancel(self, key: str) -> bool:
+        """
+        Cancel the in-flight call for key (its waiters get CancelledError)
+        取消键对应的进行中调用（其等待者收到 CancelledError）
+        """
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved when every waiter has gone away
+        # 所有等待者都已离开时将异常标记为已获取
+        if not task.cancelled():
+            task.exception()
+
+    async def _run_distributed(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        name: str,
+        encode: Optional[Callable[[T], Any]],
+        decode: Optional[Callable[[Any], T]],
+    ) -> T:
+        """
+        Leader election across workers via a Redis lock
+        通过 Redis 锁在工作进程之间选举领导者
+        """
+        lock_key = _REDIS_PREFIX + "lock:" + key
+        result_key = _REDIS_PREFIX + "result:" + key
+        token = uuid.uuid4().hex
+        try:
+            redis = self._get_redis()
+            acquired = await redis.set(lock_key, token, nx=True, px=int(self.lock_seconds * 1000))
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Single-flight Redis lock failed, running locally: {e}")
+            return await fn()
+
+        if acquired:
+            try:
+                result = await fn()
+                try:
+                    payload = json.dumps(encode(result) if encode else result, ensure_ascii=False)
+                    await redis.set(result_key, payload, px=int(self.result_ttl_seconds * 1000))
+                except (TypeError, ValueError):
+                    # Not JSON-serialisable: remote followers re-run after the lock is released
+                    # 不可JSON序列化：远程跟随者在锁释放后重新执行
+                    pass
+                except Exception as e:
+                    self.redis_errors += 1
+                    logger.warning(f"Single-flight Redis publish failed for {key}: {e}")
+                return result
+            finally:
+                try:
+                    await redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    self.redis_errors += 1
+                    logger.warning(f"Single-flight Redis unlock failed for {key}: {e}")
+
+        # Another worker is computing this key: wait for its result
+        # 另一个工作进程正在计算此键：等待其结果
+        deadline = time.monotonic() + self.lock_seconds
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_seconds)
+                payload = await redis.get(result_key)
+                if payload is not None:
+                    self.remote_followers += 1
+                    SINGLE_FLIGHT_CALLS.inc(1, name, "remote_follower")
+                    data = json.loads(payload)
+                    return decode(data) if decode else data
+                if not await redis.exists(lock_key):
+                    break
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Single-flight Redis wait failed for {key}: {e}")
+
+        self.remote_fallbacks += 1
+        SINGLE_FLIGHT_CALLS.inc(1, name, "remote_fallback")
+        return await fn()
+
+    def stats(self) -> dict:
+        """
+        Coalescing counters for health/metrics endpoints
+        供健康/指标端点使用的合并计数
+        """
+        return {
+            "backend": self.backend,
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "remote_followers": self.remote_followers,
+            "remote_fallbacks": self.remote_fallbacks,
+            "redis_errors": self.redis_errors,
+        }
+
+
+_flight: Optional[SingleFlight] = None
+_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get the process-wide single-flight group
+    获取进程级单飞组
+    """
+    global _flight
+    if _flight is None:
+        with _flight_lock:
+            if _flight is None:
+                settings = get_settings()
+                _flight = SingleFlight(
+                    backend=settings.single_flight_backend,
+                    redis_url=settings.redis_url,
+                    lock_seconds=settings.single_flight_lock_seconds,
+                    result_ttl_seconds=settings.single_flight_result_ttl_seconds,
+                )
+    return _flight
+
+
+def coalesced(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Coalesce concurrent identical calls of an async method
+    合并异步方法的并发相同调用
+
+    The key is the owner class and method plus every bound argument, with
+    session_id and step_name (when present) spelled out in the key. The
+    wrapper's key_for(*args, **kwargs) returns the key a call would use.
+    键由所属类和方法加上所有绑定参数组成，session_id 和 step_name（如有）会显式写入键中。
+    包装函数的 key_for(*args, **kwargs) 返回调用将使用的键。
+    """
+    signature = inspect.signature(func)
+
+    def key_for(*args, **kwargs) -> Tuple[str, str]:
+        """
+        (flight key, metric name) of a call
+        调用的（合并键，指标名称）
+        """
+        bound = signature.bind(*args, **kwargs)
+        arguments = dict(bound.arguments)
+        owner = arguments.pop("self", None)
+        endpoint = f"{type(owner).__name__}.{func.__qualname__}" if owner is not None else func.__qualname__
+        step_name = arguments.get("step_name")
+        return flight_key(endpoint, arguments.get("session_id"), step_name, arguments), step_name or endpoint
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        flight = get_single_flight()
+        if not flight.enabled:
+            return await func(*args, **kwargs)
+
+        key, name = key_for(*args, **kwargs)
+        return await flight.do(key, lambda: func(*args, **kwargs), name=name)
+
+    wrapper.key_for = key_for
+    return wrapper
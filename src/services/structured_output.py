@@ -0,0 +1,390 @@
+"""
+Structured Output - schema-constrained LLM JSON with a validated fast path
+结构化输出 - 受模式约束的LLM JSON与经过校验的快速解析路径
+
+LLM answers used to be recovered by layers of repair heuristics (brace
+extraction, newline fixing, bracket closing) and, when those failed, by a
+full re-generation. Structured output replaces that with:
+
+- response_format: each call sends its output schema where the provider
+  accepts it (json_schema), or at least JSON mode (json_object / Gemini's
+  application/json). A provider that rejects the parameter is remembered and
+  called without it for the rest of the process;
+- a compiled validator: the answer is validated by a cached pydantic
+  TypeAdapter straight from the JSON text (validate_json), with no
+  intermediate json.loads or regex passes;
+- one targeted retry: when validation fails, the top-level keys that did
+  parse and validate are kept, and the LLM is asked once for only the keys
+  that are broken or missing (a truncated answer resumes at the key where it
+  was cut). The retry reuses the original prompt, so the provider's prefix
+  cache still applies.
+
+Callers pass their legacy parser as the last resort, so behaviour never gets
+worse than before when neither pass yields a valid answer.
+
+LLM回答过去依靠多层修复启发式（括号提取、换行修复、补全括号）恢复，失败时再完整重新生成。
+结构化输出将其替换为：
+- response_format：提供商支持时随调用发送输出模式（json_schema），否则至少使用JSON模式
+  （json_object / Gemini 的 application/json）。拒绝该参数的提供商会被记住，进程内后续调用不再发送；
+- 编译后的校验器：用缓存的 pydantic TypeAdapter 直接从JSON文本校验（validate_json），
+  无需额外的 json.loads 或正则处理；
+- 一次定向重试：校验失败时保留已成功解析并通过校验的顶层键，只针对出错或缺失的键重新询问一次
+  （被截断的回答从截断处的键继续）。重试复用原提示词，提供商的前缀缓存仍然有效。
+调用方传入旧的解析器作为最后手段，因此两次都无法得到有效回答时，行为不会比以前更差。
+"""
+
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.config import get_settings
+from src.prompts.prefix_cache import CachedPrompt, PromptInput, as_cached_prompt
+from src.services.tracing import STRUCTURED_OUTPUT
+
+logger = logging.getLogger(__name__)
+
+# Strongest response_format each provider accepts ("auto" mode)
+# 各提供商支持的最强 response_format（"auto" 模式）
+PROVIDER_MODES = {
+    "volcengine": "json_schema",
+    "openai": "json_schema",
+    "dashscope": "json_object",
+    "deepseek": "json_object",
+    "gemini": "json_object",
+}
+MODES = ("json_schema", "json_object")
+
+REPAIR_PROMPT = """
+
+Your previous answer could not be used ({error}).
+Return ONLY a JSON object with these keys, filled in exactly as the instructions above require: {keys}
+Do not repeat any other key. No markdown, no explanations.
+你之前的回答无法使用。只返回包含上述键的JSON对象，不要重复其他键，不要使用markdown或解释。"""
+
+_decoder = json.JSONDecoder()
+_SEPARATOR = re.compile(r"[\s,]*")
+_COLON = re.compile(r"\s*:\s*")
+_SCHEMA_NAME = re.compile(r"[^a-zA-Z0-9_-]")
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+@lru_cache(maxsize=None)
+def json_schema(model: Any) -> Dict[str, Any]:
+    """JSON schema of an output model (cached) 输出模型的JSON Schema（缓存）"""
+    return _adapter(model).json_schema(by_alias=True)
+
+
+def _keys(model: Any) -> List[str]:
+    """Declared top-level keys of an output model 输出模型声明的顶层键"""
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        return [info.alias or name for name, info in model.model_fields.items()]
+    return []
+
+
+def _dump(value: Any) -> Dict[str, Any]:
+    if isinstance(value, BaseModel):
+        # Only keys the LLM returned; defaults are left to the callers' .get()
+        # 只保留LLM返回的键；默认值留给调用方的 .get()
+        return value.model_dump(mode="json", by_alias=True, exclude_unset=True)
+    return value
+
+
+def _body(text: str) -> Tuple[str, str]:
+    """
+    JSON text of an answer without code fences or surrounding prose, and
+    everything from its first brace on (for answers cut short)
+    回答中去掉代码围栏和前后说明的JSON文本，以及从第一个左括号开始的全部内容（用于被截断的回答）
+    """
+    text = (text or "").strip()
+    start = text.find("{")
+    if start < 0:
+        return text, text
+    end = text.rfind("}")
+    return (text[start:end + 1] if end > start else text[start:]), text[start:]
+
+
+def _salvage(body: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Complete top-level members of a malformed object, and the key where it broke
+    从格式错误的对象中取出完整的顶层成员，以及出错处的键
+    """
+    members: Dict[str, Any] = {}
+    pos = body.find("{")
+    if pos < 0:
+        return members, None
+    pos += 1
+    key = None
+    try:
+        while True:
+            pos = _SEPARATOR.match(body, pos).end()
+            if pos >= len(body) or body[pos] == "}":
+                return members, None
+            key = None
+            key, pos = _decoder.raw_decode(body, pos)
+            if not isinstance(key, str):
+                return members, None
+            colon = _COLON.match(body, pos)
+            if colon is None:
+                return members, key
+            value, pos = _decoder.raw_decode(body, colon.end())
+            members[key] = value
+    except ValueError:
+        return members, key
+
+
+@dataclass
+class StructuredResult:
+    """
+    Outcome of validating one answer
+    校验一个回答的结果
+
+    data is the validated answer; otherwise partial holds the top-level keys
+    that are usable as they are and broken the keys to ask for again.
+    data 为校验通过的回答；否则 partial 保存可直接使用的顶层键，broken 为需要重新询问的键。
+    """
+    data: Optional[Dict[str, Any]] = None
+    partial: Dict[str, Any] = field(default_factory=dict)
+    broken: List[str] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+class StructuredOutput:
+    """
+    Schema-constrained calls: response_format, validation and one targeted retry
+    受模式约束的调用：response_format、校验与一次定向重试
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._lock = threading.Lock()
+        self._unsupported: set = set()
+
+    # =========================================================================
+    # Request side
+    # 请求侧
+    # =========================================================================
+
+    def mode(self, provider: str) -> Optional[str]:
+        """response_format mode used for a provider, None for plain text 提供商使用的模式"""
+        mode = self.settings.llm_structured_output
+        if mode == "off" or provider in self._unsupported:
+            return None
+        if mode == "auto":
+            return PROVIDER_MODES.get(provider)
+        return mode if mode in MODES else None
+
+    def response_format(self, provider: str, model: Any, name: str) -> Optional[Dict[str, Any]]:
+        """
+        OpenAI-style response_format for a call, or None
+        一次调用的 OpenAI 风格 response_format，或 None
+
+        Gemini takes the same dict; its provider method maps it to
+        response_mime_type.
+        Gemini 使用同样的字典，由其提供商方法映射为 response_mime_type。
+        """
+        mode = self.mode(provider)
+        if mode == "json_schema" and _keys(model):
+            return {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": _SCHEMA_NAME.sub("_", name)[:64],
+                    "schema": json_schema(model),
+                    "strict": False,
+                },
+            }
+        if mode:
+            return {"type": "json_object"}
+        return None
+
+    def mark_unsupported(self, provider: str, error: Any) -> None:
+        """Stop sending response_format to a provider that rejected it 停止向拒绝该参数的提供商发送"""
+        with self._lock:
+            if provider in self._unsupported:
+                return
+            self._unsupported.add(provider)
+        logger.warning(f"[StructuredOutput] {provider} rejected response_format, sending plain prompts: {error}")
+
+    # =========================================================================
+    # Validation
+    # 校验
+    # =========================================================================
+
+    def parse(self, text: str, model: Any) -> StructuredResult:
+        """
+        Validate an answer; on failure, split it into usable and broken keys
+        校验回答；失败时拆分为可用的键和出错的键
+        """
+        body, tail = _body(text)
+        adapter = _adapter(model)
+        try:
+            return StructuredResult(data=_dump(adapter.validate_json(body)))
+        except ValidationError as e:
+            error = _summary(e)
+
+        cut, cut_key = False, None
+        try:
+            raw = json.loads(body)
+        except ValueError:
+            raw, cut_key = _salvage(tail)
+            cut = True
+        if not isinstance(raw, dict):
+            return StructuredResult(error=error)
+
+        broken = self._invalid_keys(adapter, model, raw)
+        if cut:
+            # Everything from the point where the answer broke off
+            # 回答中断处之后的所有内容
+            broken = list(dict.fromkeys([*broken, *(key for key in [cut_key, *_keys(model)] if key and key not in raw)]))
+        partial = {key: value for key, value in raw.items() if key not in broken}
+        if not broken:
+            try:
+                return StructuredResult(data=_dump(adapter.validate_python(partial)))
+            except ValidationError as e:
+                error = _summary(e)
+        return StructuredResult(partial=partial, broken=broken, error=error)
+
+    @staticmethod
+    def _invalid_keys(adapter: TypeAdapter, model: Any, raw: Dict[str, Any]) -> List[str]:
+        try:
+            adapter.validate_python(raw)
+            return []
+        except ValidationError as e:
+            keys: List[str] = []
+            for err in e.errors(include_url=False):
+                if not err["loc"]:
+                    return list(dict.fromkeys([*raw, *_keys(model)]))
+                key = str(err["loc"][0])
+                if key not in keys:
+                    keys.append(key)
+            return keys
+
+    def repair_prompt(self, prompt: PromptInput, result: StructuredResult) -> CachedPrompt:
+        """
+        The original prompt plus a request for only the broken keys
+        原提示词加上只针对出错键的请求
+        """
+        prompt = as_cached_prompt(prompt)
+        suffix = REPAIR_PROMPT.format(error=result.error or "invalid JSON", keys=", ".join(result.broken))
+        return CachedPrompt(system=prompt.system, user=prompt.user + suffix)
+
+    def merge(self, result: StructuredResult, text: str, model: Any) -> StructuredResult:
+        """
+        Combine the kept keys with the retry's answer and validate again
+        将保留的键与重试回答合并并再次校验
+        """
+        body, tail = _body(text)
+        try:
+            fixed = json.loads(body)
+        except ValueError:
+            fixed, _ = _salvage(tail)
+        if not isinstance(fixed, dict):
+            return StructuredResult(error="retry answer is not a JSON object")
+        merged = {**result.partial, **{key: value for key, value in fixed.items() if key in result.broken}}
+        try:
+            return StructuredResult(data=_dump(_adapter(model).validate_python(merged)))
+        except ValidationError as e:
+            return StructuredResult(partial=merged, error=_summary(e))
+
+    # =========================================================================
+    # Calls
+    # 调用
+    # =========================================================================
+
+    async def complete(
+        self,
+        call: Callable[[PromptInput, Optional[Dict[str, Any]]], Awaitable[str]],
+        prompt: PromptInput,
+        model: Any,
+        *,
+        provider: str,
+        name: str,
+        fallback: Callable[[str], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Call the LLM for a JSON answer matching model
+        调用LLM获取符合模型的JSON回答
+
+        Args:
+            call: call(prompt, response_format) -> answer text
+            prompt: Prompt text or CachedPrompt
+            model: pydantic model (or type) the answer must validate against
+            provider: Provider the call goes to, for response_format support
+            name: Caller name for metrics and the schema name
+            fallback: Legacy parser used when no valid answer is obtained
+
+        Returns:
+            Validated answer as a dict
+        """
+        response_format = self.response_format(provider, model, name)
+        text = await call(prompt, response_format)
+        result = self.parse(text, model)
+        if result.ok:
+            STRUCTURED_OUTPUT.inc(1, name, "valid")
+            return result.data
+
+        # Re-ask only when something is worth keeping; otherwise it would be a full re-generation
+        # 只有存在可保留内容时才重新询问；否则等同于完整重新生成
+        if self.settings.llm_json_retry and result.partial and result.broken:
+            logger.info(f"[StructuredOutput] {name}: re-asking for {result.broken} ({result.error})")
+            retry_text = await call(
+                self.repair_prompt(prompt, result),
+                {"type": "json_object"} if response_format else None,
+            )
+            merged = self.merge(result, retry_text, model)
+            if merged.ok:
+                STRUCTURED_OUTPUT.inc(1, name, "repaired")
+                return merged.data
+            result = merged
+
+        logger.warning(f"[StructuredOutput] {name}: no valid answer, using the tolerant parser ({result.error})")
+        STRUCTURED_OUTPUT.inc(1, name, "fallback")
+        return fallback(text)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current mode per provider 各提供商当前模式"""
+        return {
+            "mode": self.settings.llm_structured_output,
+            "retry": self.settings.llm_json_retry,
+            "providers": {provider: self.mode(provider) or "off" for provider in PROVIDER_MODES},
+            "unsupported": sorted(self._unsupported),
+        }
+
+
+def _summary(error: ValidationError) -> str:
+    """First validation errors in one line 单行显示前几个校验错误"""
+    parts = []
+    for err in error.errors(include_url=False)[:3]:
+        loc = ".".join(str(part) for part in err["loc"]) or "<root>"
+        parts.append(f"{loc}: {err['msg']}")
+    return "; ".join(parts)
+
+
+_structured_output: Optional[StructuredOutput] = None
+_structured_output_lock = threading.Lock()
+
+
+def get_structured_output() -> StructuredOutput:
+    """
+    Get the process-wide StructuredOutput instance
+    获取进程级 StructuredOutput 实例
+    """
+    global _structured_output
+    if _structured_output is None:
+        with _structured_output_lock:
+            if _structured_output is None:
+                _structured_output = StructuredOutput()
+    return _structured_output
@@ -25,6 +25,8 @@ from sqlalchemy.orm import selectinload
 from src.db.models import Task, Document, User, TaskStatus, PaymentStatus
 from src.services.word_counter import WordCounter, WordCountResult, PriceResult, get_word_counter, TextCleaningTimeoutError
 from src.services.payment_service import get_payment_provider, OrderCreateResult
+from src.services.entitlement_cache import invalidate_task_entitlements_on_commit
+from src.services.ingestion import get_ingestion_pool, IngestionError
 
 
 class TaskService:
@@ -73,12 +75,15 @@ class TaskService:
         if not document:
             raise ValueError(f"Document not found: {document_id}")
 
-        # Count words and calculate price with timeout protection (格式炸弹防御)
-        # 带超时保护的字数统计和价格计算
+        # Count words in a killable ingestion worker (格式炸弹防御), then price
+        # 在可终止的导入工作进程中统计字数（格式炸弹防御），然后计算价格
         try:
-            count_result, price_result = self.word_counter.count_and_price_with_timeout(document.original_text)
+            count_result = await get_ingestion_pool().count_words(document.original_text)
         except TextCleaningTimeoutError as e:
             raise ValueError(f"Document processing timeout - file may be malformed: {str(e)}")
+        except IngestionError as e:
+            raise ValueError(f"Document processing failed: {e.message}")
+        price_result = self.word_counter.calculate_price(count_result)
 
         # Create task
         # 创建任务
@@ -171,6 +176,7 @@ class TaskService:
             task.processed_at = datetime.utcnow()
 
         await self.db.flush()
+        invalidate_task_entitlements_on_commit(self.db, task_id)
         return task
 
     async def mark_as_quoted(self, task_id: str) -> Task:
@@ -208,6 +214,7 @@ class TaskService:
         task.paid_at = datetime.utcnow()
 
         await self.db.flush()
+        invalidate_task_entitlements_on_commit(self.db, task_id)
         return task
 
     async def mark_as_processing(self, task_id: str) -> Task:
@@ -389,6 +396,7 @@ class TaskService:
         count = 0
         for task in tasks:
             task.status = TaskStatus.EXPIRED.value
+            invalidate_task_entitlements_on_commit(self.db, task.task_id)
             count += 1
 
         if count > 0:
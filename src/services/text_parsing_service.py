@@ -19,6 +19,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
+from src.services.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
@@ -227,6 +229,7 @@ class TextParsingService:
         self.min_paragraph_words = min_paragraph_words
         self.language = language
 
+    @traced("text_parsing.parse_document")
     def parse_document(self, text: str) -> Tuple[List[ParsedParagraph], List[ParsedSection], DocumentStatistics]:
         """
         Parse document into paragraphs, sections, and statistics
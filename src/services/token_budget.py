@@ -0,0 +1,392 @@
+"""
+Token Budget - local token counting and up-front prompt/output sizing
+Token预算 - 本地token计数与提前规划提示词/输出大小
+
+LLM calls used fixed max_tokens (8192 / 4096 / 2048) and character-based
+truncation (document_text[:10000], [:15000]), with no idea of the actual
+token counts. Long prompts were rejected for context overflow, and long
+answers were cut off and went through JSON repair. The budgeter counts
+tokens locally and plans each call before it is sent:
+
+- prompt tokens: counted per text and cached by content hash, so the static
+  system prefix of a template is tokenized once;
+- expected output: derived from the JSON schema example in the template
+  (plus a share of the document for answers that list or echo it);
+- max_tokens: sized from the expected output, within the provider's output
+  cap and what is left of the context window;
+- fits / chunks: whether the call can succeed at all, and if not, into how
+  many chunks the input must be split. Callers decide before paying for a
+  generation that would fail or be truncated.
+
+LLM调用过去使用固定的 max_tokens（8192/4096/2048）和按字符截断（document_text[:10000]、[:15000]），
+对实际token数一无所知。长提示词会因超出上下文被拒绝，长回答会被截断并走JSON修复。
+预算器在本地计数token，并在发送前规划每次调用：
+- 提示词token：按文本计数并以内容哈希缓存，模板的静态系统前缀只分词一次；
+- 预期输出：由模板中的JSON结构示例推算（对列出或复述文档的回答再加上文档的一部分）；
+- max_tokens：按预期输出确定，不超过提供商输出上限和上下文窗口剩余空间；
+- fits / chunks：调用能否成功，若不能则输入需拆分为多少块。调用方在为会失败或被截断的生成付费之前作出决定。
+
+Tokenizers (TOKEN_BUDGET_TOKENIZER): tiktoken (TOKEN_BUDGET_ENCODING, e.g.
+cl100k_base), a HuggingFace tokenizers tokenizer.json
+(TOKEN_BUDGET_TOKENIZER_FILE), or a conservative character heuristic. "auto"
+uses the first one available. Provider tokenizers differ from all of these,
+so plans keep TOKEN_BUDGET_MARGIN of the window free.
+分词器：tiktoken、HuggingFace tokenizers 的 tokenizer.json，或保守的字符估算；"auto" 使用第一个可用者。
+提供商的分词器与这些都不同，因此规划时保留 TOKEN_BUDGET_MARGIN 比例的窗口余量。
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from src.config import get_settings
+from src.prompts.prefix_cache import PromptInput, as_cached_prompt
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+# Chat formatting overhead per message (role markers, separators)
+# 每条消息的聊天格式开销（角色标记、分隔符）
+_MESSAGE_OVERHEAD = 8
+
+# Schema examples show one item per list; real answers list several
+# 结构示例中每个列表只有一项；真实回答会列出多项
+_SCHEMA_FILL = 2.0
+
+# Heuristic: one token per CJK character, ~3.5 characters per token otherwise
+# 估算：每个中日韩字符一个token，其余约3.5个字符一个token
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_CHARS_PER_TOKEN = 3.5
+
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass
+class BudgetPlan:
+    """
+    Token plan of one LLM call
+    单次LLM调用的token规划
+    """
+    prompt_tokens: int
+    expected_output_tokens: int
+    max_tokens: int
+    fits: bool
+    chunks: int = 1
+
+    def to_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "expected_output_tokens": self.expected_output_tokens,
+            "max_tokens": self.max_tokens,
+            "fits": self.fits,
+            "chunks": self.chunks,
+        }
+
+
+def _heuristic_count(text: str) -> int:
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / _CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=256)
+def schema_example(template: str) -> str:
+    """
+    The JSON output example of a str.format template (its largest "{{ ... }}" block)
+    str.format 模板中的JSON输出示例（最大的 "{{ ... }}" 块）
+    """
+    text = template.replace("{{", "\x01").replace("}}", "\x02")
+    best = ""
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char == "\x01":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == "\x02" and depth:
+            depth -= 1
+            if depth == 0 and i + 1 - start > len(best):
+                best = text[start:i + 1]
+    return best.replace("\x01", "{").replace("\x02", "}")
+
+
+class TokenBudgeter:
+    """
+    Counts tokens locally and plans max_tokens and chunking for LLM calls
+    本地计数token并为LLM调用规划 max_tokens 和分块
+    """
+
+    def __init__(
+        self,
+        tokenizer: str = "auto",
+        encoding: str = "cl100k_base",
+        tokenizer_file: Optional[str] = None,
+        context_window: int = 65536,
+        max_output_tokens: int = 8192,
+        margin: float = 0.1,
+        cache_size: int = 4096,
+    ):
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.margin = margin
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.backend, self._encode = self._load_tokenizer(tokenizer, encoding, tokenizer_file)
+        self.counted = 0
+        self.cache_hits = 0
+        self.plans = 0
+        self.over_budget = 0
+
+    @staticmethod
+    def _load_tokenizer(tokenizer: str, encoding: str, tokenizer_file: Optional[str]):
+        """
+        (backend name, text -> token count) for the configured tokenizer
+        配置的分词器对应的（后端名称，文本 -> token数）
+        """
+        if tokenizer in ("auto", "tiktoken") and TIKTOKEN_AVAILABLE:
+            try:
+                enc = tiktoken.get_encoding(encoding)
+                return "tiktoken", lambda text: len(enc.encode(text, disallowed_special=()))
+            except Exception as e:
+                # The encoding file is downloaded on first use; offline hosts fall through
+                # 编码文件在首次使用时下载；离线主机继续尝试下一个
+                logger.warning(f"tiktoken encoding '{encoding}' unavailable: {e}")
+        if tokenizer in ("auto", "tokenizers") and TOKENIZERS_AVAILABLE and tokenizer_file:
+            try:
+                tok = Tokenizer.from_file(tokenizer_file)
+                return "tokenizers", lambda text: len(tok.encode(text, add_special_tokens=False).ids)
+            except Exception as e:
+                logger.warning(f"Cannot load tokenizer file {tokenizer_file}: {e}")
+        if tokenizer not in ("auto", "heuristic"):
+            logger.warning(f"Tokenizer '{tokenizer}' not available, using character heuristic")
+        return "heuristic", _heuristic_count
+
+    # ------------------------------------------------------------------
+    # Counting
+    # 计数
+    # ------------------------------------------------------------------
+
+    def count(self, text: str) -> int:
+        """
+        Token count of text (cached by content hash)
+        文本的token数（按内容哈希缓存）
+        """
+        if not text:
+            return 0
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+        tokens = self._encode(text)
+        with self._cache_lock:
+            self.counted += 1
+            self._cache[key] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def count_prompt(self, prompt: PromptInput) -> int:
+        """
+        Token count of a prompt as sent (system + user messages)
+        按发送形式计算提示词token数（系统 + 用户消息）
+        """
+        prompt = as_cached_prompt(prompt)
+        tokens = self.count(prompt.user) + _MESSAGE_OVERHEAD
+        if prompt.system:
+            tokens += self.count(prompt.system) + _MESSAGE_OVERHEAD
+        return tokens
+
+    def schema_tokens(self, template: str) -> int:
+        """
+        Tokens of the JSON output example in a template
+        模板中JSON输出示例的token数
+        """
+        return self.count(schema_example(template))
+
+    def expected_output(self, template: str, document_tokens: int = 0, output_ratio: float = 0.0) -> int:
+        """
+        Expected answer size: the filled-in schema plus a share of the document
+        预期回答大小：填充后的结构加上文档的一部分
+
+        output_ratio is the share of the document the answer lists or echoes
+        (about 1.2 for a full rewrite, less for analyses that quote parts of it).
+        output_ratio 为回答列出或复述的文档比例（完整改写约1.2，引用部分内容的分析更少）。
+        """
+        return int(self.schema_tokens(template) * _SCHEMA_FILL + document_tokens * output_ratio)
+
+    # ------------------------------------------------------------------
+    # Planning
+    # 规划
+    # ------------------------------------------------------------------
+
+    @property
+    def usable_window(self) -> int:
+        return int(self.context_window * (1 - self.margin))
+
+    def plan(
+        self,
+        prompt: PromptInput,
+        expected_output: int,
+        floor: int = 1024,
+        output_cap: Optional[int] = None,
+    ) -> BudgetPlan:
+        """
+        Size max_tokens for a call and decide whether it fits
+        为调用确定 max_tokens 并判断其能否容纳
+
+        max_tokens is twice the expected output (at least floor), limited by
+        the output cap and the rest of the context window. The call fits when
+        that limit still leaves room for the expected output; otherwise chunks
+        is how many parts the input has to be split into.
+        max_tokens 为预期输出的两倍（至少为 floor），受输出上限和上下文窗口剩余空间限制。
+        若该上限仍能容纳预期输出则可以容纳；否则 chunks 为输入需拆分的块数。
+        """
+        self.plans += 1
+        cap = output_cap or self.max_output_tokens
+        prompt_tokens = self.count_prompt(prompt)
+        expected_output = max(0, int(expected_output))
+        limit = min(cap, self.usable_window - prompt_tokens)
+        max_tokens = max(0, min(max(expected_output * 2, floor), limit))
+        fits = limit > 0 and expected_output <= limit
+        chunks = 1
+        if not fits:
+            self.over_budget += 1
+            # Split until each part's prompt and output fit (prompt size scales with the part)
+            # 拆分直到每部分的提示词和输出都能容纳（提示词大小随部分缩放）
+            needed = prompt_tokens + expected_output
+            chunks = max(2, math.ceil(max(needed / max(self.usable_window, 1), expected_output / max(cap, 1))))
+        return BudgetPlan(
+            prompt_tokens=prompt_tokens,
+            expected_output_tokens=expected_output,
+            max_tokens=max_tokens,
+            fits=fits,
+            chunks=chunks,
+        )
+
+    # ------------------------------------------------------------------
+    # Fitting text
+    # 文本适配
+    # ------------------------------------------------------------------
+
+    def fit_text(self, text: str, max_tokens: int, marker: str = "") -> str:
+        """
+        Text cut to max_tokens at a line boundary (marker appended when cut)
+        按行边界截断到 max_tokens 的文本（截断时追加 marker）
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        lines = text.split("\n")
+        # Binary search on the number of whole lines that fit
+        # 对可容纳的完整行数做二分查找
+        low, high = 0, len(lines)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self._encode("\n".join(lines[:mid])) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        if low == 0:
+            # A single huge line: cut by characters proportionally
+            # 单个超长行：按字符比例截断
+            ratio = max_tokens / max(self._encode(lines[0]), 1)
+            kept = lines[0][:int(len(lines[0]) * ratio)]
+        else:
+            kept = "\n".join(lines[:low])
+        return kept + marker
+
+    def split_text(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Split text into paragraph-aligned chunks of at most max_tokens each
+        将文本按段落拆分为每块不超过 max_tokens 的块
+
+        Oversized paragraphs are cut with fit_text; blank-line separators are
+        kept so joining the chunks with "\\n\\n" restores the layout.
+        超长段落使用 fit_text 切分；保留空行分隔，使用 "\\n\\n" 拼接可恢复版式。
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for paragraph in _PARAGRAPH_RE.split(text.strip()):
+            tokens = self.count(paragraph)
+            while tokens > max_tokens:
+                head = self.fit_text(paragraph, max_tokens)
+                if not head:
+                    break
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                chunks.append(head)
+                paragraph = paragraph[len(head):].lstrip("\n")
+                tokens = self.count(paragraph)
+            if not paragraph:
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(paragraph)
+            current_tokens += tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def stats(self) -> dict:
+        """
+        Budgeter counters for health/metrics endpoints
+        供健康/指标端点使用的预算器计数
+        """
+        return {
+            "backend": self.backend,
+            "context_window": self.context_window,
+            "max_output_tokens": self.max_output_tokens,
+            "counted": self.counted,
+            "cache_hits": self.cache_hits,
+            "cached": len(self._cache),
+            "plans": self.plans,
+            "over_budget": self.over_budget,
+        }
+
+
+_budgeter: Optional[TokenBudgeter] = None
+_budgeter_lock = threading.Lock()
+
+
+def get_token_budgeter() -> TokenBudgeter:
+    """
+    Get the process-wide token budgeter
+    获取进程级token预算器
+    """
+    global _budgeter
+    if _budgeter is None:
+        with _budgeter_lock:
+            if _budgeter is None:
+                settings = get_settings()
+                _budgeter = TokenBudgeter(
+                    tokenizer=settings.token_budget_tokenizer,
+                    encoding=settings.token_budget_encoding,
+                    tokenizer_file=settings.token_budget_tokenizer_file,
+                    context_window=settings.llm_context_window,
+                    max_output_tokens=settings.llm_max_output_tokens,
+                    margin=settings.token_budget_margin,
+                )
+    return _budgeter
@@ -0,0 +1,535 @@
+"""
+Tracing & Metrics - lightweight spans, per-request timing and Prometheus metrics
+追踪与指标 - 轻量级 span、按请求计时和 Prometheus 指标
+
+span("stage") / @traced("stage") time a block or function. Every finished
+span:
+- is observed in the academicguard_stage_duration_seconds histogram;
+- is added to the current request's RequestTrace (a context variable bound
+  by TracingMiddleware), which debug responses expose as a Server-Timing
+  header;
+- is mirrored to OpenTelemetry when TRACING_EXPORTER is "console" or "otlp"
+  and the opentelemetry SDK is installed. Parent/child links then follow
+  OpenTelemetry's own context propagation. The default exporter is "none"
+  (no-op), so nothing leaves the process.
+
+span("阶段") / @traced("阶段") 对代码块或函数计时。每个结束的 span：
+- 记录到 academicguard_stage_duration_seconds 直方图；
+- 加入当前请求的 RequestTrace（由 TracingMiddleware 绑定的上下文变量），
+  调试响应通过 Server-Timing 头输出；
+- 当 TRACING_EXPORTER 为 "console" 或 "otlp" 且安装了 opentelemetry SDK 时同步到
+  OpenTelemetry，父子关系由 OpenTelemetry 自身的上下文传播维护。默认导出器为
+  "none"（空操作），数据不会离开进程。
+
+Context variables are copied into asyncio tasks and asyncio.to_thread, so
+spans in gathered calls and worker threads land in the right request.
+Metrics are rendered in the Prometheus text format by render_metrics() for
+the /metrics endpoint; no client library is required.
+上下文变量会复制到 asyncio 任务和 asyncio.to_thread 中，因此并发调用和工作线程中的
+span 会归入正确的请求。render_metrics() 以 Prometheus 文本格式输出指标供 /metrics
+端点使用，无需客户端库。
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (1 ms .. 60 s)
+# 延迟分桶（秒，1毫秒到60秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ----------------------------------------------------------------------
+# Metrics (Prometheus text exposition)
+# 指标（Prometheus 文本格式）
+# ----------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Labelled latency histogram
+    带标签的延迟直方图
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _label_text(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Labelled monotonically increasing counter
+    带标签的单调递增计数器
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """
+    Labelled gauge
+    带标签的仪表
+    """
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, *labelvalues: str) -> None:
+        self.inc(-amount, *labelvalues)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "academicguard_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "academicguard_http_requests_in_progress",
+    "HTTP requests currently being handled",
+)
+STAGE_SECONDS = Histogram(
+    "academicguard_stage_duration_seconds",
+    "Duration of traced pipeline stages (spans)",
+    ("stage",),
+)
+LLM_CALL_SECONDS = Histogram(
+    "academicguard_llm_call_duration_seconds",
+    "LLM provider call latency",
+    ("provider", "step"),
+)
+LLM_TOKENS = Counter(
+    "academicguard_llm_tokens_total",
+    "LLM tokens by provider and kind (prompt, completion, cached)",
+    ("provider", "kind"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "academicguard_db_query_duration_seconds",
+    "Database statement latency by operation",
+    ("operation",),
+)
+CASCADE_DECISIONS = Counter(
+    "academicguard_cascade_decisions_total",
+    "Suggestion cascade decisions by route, tier, decision and reason",
+    ("route", "tier", "decision", "reason"),
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "academicguard_single_flight_total",
+    "Coalesced calls by name and role (leader, follower, remote_follower, remote_fallback)",
+    ("name", "role"),
+)
+SUBSTEP_PREFETCH = Counter(
+    "academicguard_substep_prefetch_total",
+    "Speculative substep analyses by step and outcome (scheduled, skipped, busy, completed, stored, discarded, hit, joined, cancelled, failed)",
+    ("step", "outcome"),
+)
+FUSED_ANALYSIS = Counter(
+    "academicguard_fused_analysis_total",
+    "Fused per-layer analyses by layer and outcome (run, served, missing, failed, over_budget)",
+    ("layer", "outcome"),
+)
+STRUCTURED_OUTPUT = Counter(
+    "academicguard_structured_output_total",
+    "Schema-validated LLM answers by caller and outcome (valid, repaired, fallback)",
+    ("name", "outcome"),
+)
+
+_METRICS = [
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    STAGE_SECONDS,
+    LLM_CALL_SECONDS,
+    LLM_TOKENS,
+    DB_QUERY_SECONDS,
+    CASCADE_DECISIONS,
+    SINGLE_FLIGHT_CALLS,
+    SUBSTEP_PREFETCH,
+    FUSED_ANALYSIS,
+    STRUCTURED_OUTPUT,
+]
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4)
+    以 Prometheus 文本格式（0.0.4 版）输出全部指标
+    """
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Per-request trace
+# 按请求的追踪
+# ----------------------------------------------------------------------
+
+class RequestTrace:
+    """
+    Spans finished while handling one request
+    处理一个请求期间结束的 span
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        # (stage, seconds); list.append is atomic, so worker threads may add too
+        # （阶段，秒）；list.append 是原子操作，工作线程也可以添加
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.spans.append((stage, seconds))
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """
+        {stage: {"count": n, "total_ms": ms}} ordered by total time
+        按总耗时排序的 {阶段: {"count": 次数, "total_ms": 毫秒}}
+        """
+        totals: Dict[str, List[float]] = {}
+        for stage, seconds in list(self.spans):
+            entry = totals.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        ordered = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return {stage: {"count": count, "total_ms": round(total * 1000, 2)} for stage, (count, total) in ordered}
+
+    def server_timing(self, limit: int = 25) -> str:
+        """
+        Server-Timing header value (top stages plus the elapsed total)
+        Server-Timing 头的值（耗时最多的阶段加上总耗时）
+        """
+        entries = [f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        for stage, info in list(self.breakdown().items())[:limit]:
+            entries.append(f'{stage};dur={info["total_ms"]:.1f};desc="x{info["count"]}"')
+        return ", ".join(entries)
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+def bind_request_trace(trace: RequestTrace) -> contextvars.Token:
+    """
+    Make trace the current request trace (returns a token for reset)
+    将 trace 设为当前请求追踪（返回用于重置的令牌）
+    """
+    return _current_trace.set(trace)
+
+
+def reset_request_trace(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """
+    The trace of the request being handled, if any
+    当前正在处理的请求的追踪（如有）
+    """
+    return _current_trace.get()
+
+
+# ----------------------------------------------------------------------
+# Spans
+# Span
+# ----------------------------------------------------------------------
+
+_settings = get_settings()
+_enabled = _settings.tracing_enabled
+_tracer = None  # OpenTelemetry tracer when an exporter is configured
+_provider = None
+
+
+def _finish(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+class Span:
+    """
+    Times a block; use via span() as a (sync or async-safe) context manager
+    对代码块计时；通过 span() 作为上下文管理器使用（同步和异步代码均可）
+    """
+
+    __slots__ = ("name", "attributes", "_start", "_otel")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes = attributes
+        self._start = None
+        self._otel = None
+
+    def __enter__(self) -> "Span":
+        if not _enabled:
+            return self
+        if _tracer is not None:
+            self._otel = _tracer.start_as_current_span(self.name, attributes=self.attributes or None)
+            self._otel.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._start is None:
+            return False
+        _finish(self.name, time.perf_counter() - self._start)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.attributes is None:
+            self.attributes = {}
+        self.attributes[key] = value
+        if self._otel is not None:
+            from opentelemetry import trace as otel_trace
+            otel_trace.get_current_span().set_attribute(key, value)
+
+
+def span(name: str, **attributes: Any) -> Span:
+    """
+    Time a block as a pipeline stage
+    将代码块作为流水线阶段计时
+
+    Example:
+        with span("scorer.ppl"):
+            ppl = self._calculate_ppl(text)
+    """
+    return Span(name, attributes or None)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator: time every call of a sync or async function as a stage
+    装饰器：将同步或异步函数的每次调用作为一个阶段计时
+    """
+    def decorator(func: Callable) -> Callable:
+        stage = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def record_span(name: str, duration_ms: float, **attributes: Any) -> None:
+    """
+    Record a stage that was timed elsewhere (e.g. an LLM call that just ended)
+    记录在别处计时的阶段（例如刚结束的LLM调用）
+    """
+    if not _enabled:
+        return
+    seconds = max(0.0, duration_ms / 1000)
+    _finish(name, seconds)
+    if _tracer is not None:
+        end_ns = time.time_ns()
+        otel_span = _tracer.start_span(name, start_time=end_ns - int(seconds * 1e9), attributes=attributes or None)
+        otel_span.end(end_time=end_ns)
+
+
+def observe_llm_call(
+    provider: str,
+    step: str,
+    latency_ms: Optional[float],
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached_tokens: int = 0,
+) -> None:
+    """
+    Metrics and span for one finished LLM provider call
+    为一次已完成的LLM提供商调用记录指标和 span
+    """
+    if latency_ms is not None:
+        LLM_CALL_SECONDS.observe(latency_ms / 1000, provider, step)
+        record_span(f"llm.{provider}", latency_ms, step=step)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider, "prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider, "completion")
+    if cached_tokens:
+        LLM_TOKENS.inc(cached_tokens, provider, "cached")
+
+
+# ----------------------------------------------------------------------
+# Database statements
+# 数据库语句
+# ----------------------------------------------------------------------
+
+_DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every statement executed through a (sync or async) SQLAlchemy engine
+    对通过（同步或异步）SQLAlchemy 引擎执行的每条语句计时
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_trace_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_trace_query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        if operation not in _DB_OPERATIONS:
+            operation = "OTHER"
+        DB_QUERY_SECONDS.observe(seconds, operation)
+        if _enabled:
+            _finish("db.query", seconds)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("_trace_query_start"):
+            conn.info["_trace_query_start"].pop()
+
+
+# ----------------------------------------------------------------------
+# OpenTelemetry exporter
+# OpenTelemetry 导出器
+# ----------------------------------------------------------------------
+
+def setup_tracing() -> None:
+    """
+    Configure the OpenTelemetry exporter from settings (called from lifespan)
+    根据配置设置 OpenTelemetry 导出器（在 lifespan 中调用）
+    """
+    global _tracer, _provider
+    exporter_name = (_settings.tracing_exporter or "none").lower()
+    if not _enabled or exporter_name == "none" or _tracer is not None:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if exporter_name == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter(endpoint=_settings.tracing_otlp_endpoint) \
+                if _settings.tracing_otlp_endpoint else OTLPSpanExporter()
+        elif exporter_name == "console":
+            exporter = ConsoleSpanExporter()
+        else:
+            logger.warning(f"Unknown TRACING_EXPORTER '{exporter_name}', spans are not exported")
+            return
+    except ImportError as e:
+        logger.warning(f"OpenTelemetry SDK not installed, spans are not exported: {e}")
+        return
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": _settings.tracing_service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    _tracer = _provider.get_tracer("academicguard")
+    logger.info(f"Tracing spans exported via {exporter_name}")
+
+
+def shutdown_tracing() -> None:
+    """
+    Flush and stop the exporter
+    刷新并停止导出器
+    """
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+
+def tracing_status() -> Dict[str, Any]:
+    """
+    Tracing configuration for the readiness endpoint
+    供就绪端点使用的追踪配置
+    """
+    return {
+        "enabled": _enabled,
+        "exporter": (_settings.tracing_exporter or "none") if _tracer is not None else "none",
+        "metrics_endpoint": _settings.metrics_enabled,
+    }
@@ -15,11 +15,8 @@ Billing Rules (计费规则):
 import re
 import math
 import hashlib
-import asyncio
-import signal
 from typing import Tuple, Optional
 from pydantic import BaseModel
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 
 class WordCountResult(BaseModel):
@@ -93,7 +90,6 @@ class WordCounter:
         self.price_per_100_words = price_per_100_words
         self.minimum_charge = minimum_charge
         self.cleaning_timeout = cleaning_timeout
-        self._executor = ThreadPoolExecutor(max_workers=2)
 
     def _strip_references(self, text: str) -> Tuple[str, bool]:
         """
@@ -214,8 +210,14 @@ class WordCounter:
         带超时保护的字数统计
 
         This method protects against malicious files that could cause
-        infinite loops or excessive memory usage (format bombs).
+        infinite loops or excessive memory usage (format bombs). The count
+        runs in an ingestion worker process, which is killed on timeout.
         此方法防止可能导致死循环或内存溢出的恶意文件（格式炸弹）。
+        统计在导入工作进程中执行，超时即终止该进程。
+
+        Blocks the calling thread; async callers should await
+        get_ingestion_pool().count_words() instead.
+        会阻塞调用线程；异步调用方应改为 await get_ingestion_pool().count_words()。
 
         Args:
             text: Full document text
@@ -227,14 +229,15 @@ class WordCounter:
         Raises:
             TextCleaningTimeoutError: If processing exceeds timeout
         """
-        try:
-            future = self._executor.submit(self._do_count, text, calculate_hash)
-            return future.result(timeout=self.cleaning_timeout)
-        except FuturesTimeoutError:
-            raise TextCleaningTimeoutError(
-                f"Text cleaning exceeded {self.cleaning_timeout}s timeout. "
-                f"File may be malformed or too complex."
-            )
+        from src.services.ingestion import get_ingestion_pool
+
+        result = get_ingestion_pool().run_sync(
+            "count",
+            timeout=self.cleaning_timeout,
+            text=text,
+            calculate_hash=calculate_hash,
+        )
+        return WordCountResult(**result)
 
     def calculate_price(self, word_count_result: WordCountResult) -> PriceResult:
         """
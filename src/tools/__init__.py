@@ -0,0 +1,8 @@
+"""
+Developer tools for AcademicGuard
+AcademicGuard 开发工具
+
+- fake_llm: Deterministic OpenAI-compatible LLM stand-in server
+  (python -m src.tools.fake_llm)
+  确定性的 OpenAI 兼容 LLM 替身服务器
+"""
@@ -0,0 +1,591 @@
+"""
+Fake LLM - deterministic OpenAI-compatible stand-in server
+模拟LLM - 确定性的 OpenAI 兼容替身服务器
+
+Load and integration tests of the substep, YOLO and rewrite flows should not
+spend provider quota. This server answers /chat/completions like the
+OpenAI-compatible providers (Volcengine, DashScope, DeepSeek): it recognizes
+which prompt template a request was built from and returns schema-valid JSON
+for it, with configurable latency, errors and rate limits.
+
+对子步骤、YOLO 和改写流程进行负载与集成测试时不应消耗提供商配额。本服务器像 OpenAI 兼容
+提供商（火山引擎、灵积、DeepSeek）一样响应 /chat/completions：识别请求所用的提示词模板，
+返回符合其结构的JSON，并可配置延迟、错误和限流。
+
+Prompt kinds (first match wins):
+- repair: structured_output's re-ask, answers only the keys it names;
+- fused_analysis: one object keyed by the "=== TASK stepX-Y ===" ids;
+- section_structure: title and sections found from heading-like lines;
+- rewrite: modified_text with deterministic edits of the document;
+- rewrite_text: the same edits as plain text ("Return the ... document text only");
+- suggestion_batch / suggestion: sentence rewrites of the suggestion track;
+- translation: the sentence tagged as translated (plain text);
+- analysis: risk_score, risk_level, issues and recommendations;
+- json: any other prompt that asks for JSON gets {};
+- text: everything else gets a short plain answer.
+
+提示词类型（按顺序首个匹配生效）：repair（结构化输出的重新询问，只回答其列出的键）、
+fused_analysis（以 "=== TASK stepX-Y ===" 的步骤ID为键）、section_structure（根据类似标题的行
+得到标题和章节）、rewrite（对文档做确定性修改的 modified_text）、rewrite_text（同样的修改，
+以纯文本返回）、suggestion_batch / suggestion（建议轨道的句子改写）、translation（标记为译文
+的句子，纯文本）、analysis（风险分数、等级、问题和建议）、json（其他要求JSON的提示词返回 {}）、
+text（其余返回简短纯文本）。
+
+Answers are seeded by the prompt text, so the same prompt always gets the
+same answer. Latency and faults are drawn from one generator seeded by
+--seed, so a replayed load test sees the same sequence. Usage reports
+prompt/completion tokens counted by the token budgeter, and cached_tokens
+for system prefixes the server has already seen, so prefix-cache accounting
+can be exercised offline. Streaming ("stream": true) is sent as
+server-sent events in the OpenAI chunk format.
+回答以提示词文本为种子，相同提示词总得到相同回答。延迟和故障由 --seed 作为种子的同一
+生成器产生，重放负载测试时序列一致。usage 报告由token预算器计数的提示词/生成token数，
+以及服务器已见过的系统前缀的 cached_tokens，便于离线验证前缀缓存统计。流式请求
+（"stream": true）以 OpenAI 分块格式的 server-sent events 发送。
+
+Usage:
+    python -m src.tools.fake_llm --port 8900
+    python -m src.tools.fake_llm --latency lognormal --latency-ms 800 --latency-spread 0.6 \\
+        --tokens-per-second 60 --error-rate 0.02 --rate-limit-rate 0.05 --max-concurrency 32
+
+Point the app at it (any API key is accepted):
+    LLM_PROVIDER=dashscope
+    DASHSCOPE_API_KEY=fake
+    DASHSCOPE_BASE_URL=http://127.0.0.1:8900/v1
+VOLCENGINE_BASE_URL and DEEPSEEK_BASE_URL work the same way. Gemini and the
+Anthropic SDK use their own protocols and are not served.
+VOLCENGINE_BASE_URL 和 DEEPSEEK_BASE_URL 同理。Gemini 和 Anthropic SDK 使用各自的协议，不在服务范围内。
+
+Runtime control: GET /fake/stats, PUT /fake/config (any subset of the
+options, e.g. {"error_rate": 0.5} to test failover mid-run), POST /fake/reset.
+运行时控制：GET /fake/stats、PUT /fake/config（任意选项子集，例如 {"error_rate": 0.5} 用于中途测试故障切换）、
+POST /fake/reset。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.services.token_budget import get_token_budgeter
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+_TASK_ID = re.compile(r"=== TASK (step\d+-\d+) ===")
+_REPAIR_KEYS = re.compile(r"instructions above require: (.+)")
+_BATCH_SENTENCE = re.compile(r"^### \[(\d+)\]\nSentence: (.*)$", re.MULTILINE)
+_ORIGINAL_SENTENCE = re.compile(r"## Original Sentence\n(.+)")
+_TRANSLATE_SENTENCE = re.compile(r"Sentence: (.+)")
+_DOCUMENT_TAG = re.compile(r"<document>\n?(.*?)\n?</document>", re.DOTALL)
+_HEADING = re.compile(
+    r"^(\d+(\.\d+)*\.?\s+\S.*|(abstract|introduction|background|related work|methods?|methodology|"
+    r"results?|discussion|conclusions?|references|acknowledg(e)?ments?)\b.*)$",
+    re.IGNORECASE,
+)
+_SECTION_HEADER = re.compile(r"^## (.+)$", re.MULTILINE)
+_SCAFFOLD_LINE = re.compile(r"^(#.*|[A-Z][\w /()-]{0,40}:\s*)$")
+
+# Deterministic edits that make a "rewrite" differ from its input
+# 让"改写"结果与输入不同的确定性修改
+_EDITS = (
+    ("Furthermore, ", "Also, "),
+    ("Moreover, ", "Besides, "),
+    ("In addition, ", "Plus, "),
+    ("Additionally, ", "On top of that, "),
+    ("utilize", "use"),
+    ("demonstrate", "show"),
+    ("facilitate", "help"),
+    ("comprehensive", "thorough"),
+)
+
+
+@dataclass
+class FakeLLMConfig:
+    """
+    Latency and fault settings (all adjustable at runtime via PUT /fake/config)
+    延迟与故障设置（均可通过 PUT /fake/config 在运行时调整）
+    """
+    latency: str = "lognormal"  # fixed | uniform | normal | lognormal (time to first token)
+    latency_ms: float = 300.0  # Median / mean time to first token
+    latency_spread: float = 0.5  # uniform/normal: +- ms as a share of latency_ms; lognormal: sigma
+    tokens_per_second: float = 0.0  # Completion speed; 0 sends the whole answer at once
+    error_rate: float = 0.0  # Share of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0  # Share of requests answered with HTTP 429
+    retry_after: float = 1.0  # Retry-After seconds on 429
+    max_concurrency: int = 0  # In-flight requests above this get 429 (0 = unlimited)
+    stream_chunk_chars: int = 24  # Characters per streamed chunk
+    seed: int = 42
+
+
+def classify(system: str, user: str) -> str:
+    """
+    Prompt kind of a request (see module docstring)
+    请求的提示词类型（见模块文档）
+    """
+    text = f"{system}\n{user}"
+    if "Your previous answer could not be used" in user:
+        return "repair"
+    if _TASK_ID.search(system):
+        return "fused_analysis"
+    if "Identify the MAIN SECTIONS" in text:
+        return "section_structure"
+    if '"modified_text"' in text:
+        return "rewrite"
+    if "<document>" in text and "document text only" in text:
+        return "rewrite_text"
+    if '"rewritten"' in text:
+        return "suggestion_batch" if _BATCH_SENTENCE.search(text) else "suggestion"
+    if text.lstrip().startswith("Translate") and "Only output the translation" in text:
+        return "translation"
+    if '"risk_score"' in text:
+        return "analysis"
+    if "JSON" in text or "json" in text:
+        return "json"
+    return "text"
+
+
+def _rewrite(text: str) -> str:
+    for old, new in _EDITS:
+        text = text.replace(old, new)
+    return text
+
+
+def _document(user: str) -> str:
+    """
+    Best-effort document text of a user message
+    尽量提取用户消息中的文档文本
+    """
+    match = _DOCUMENT_TAG.search(user)
+    if match:
+        return match.group(1)
+    # "## ORIGINAL DOCUMENT:" / "## DOCUMENT TEXT:" sections of the substep templates
+    # 子步骤模板中的 "## ORIGINAL DOCUMENT:" / "## DOCUMENT TEXT:" 段
+    headers = list(_SECTION_HEADER.finditer(user))
+    for index, header in enumerate(headers):
+        if "DOCUMENT" in header.group(1).upper():
+            end = headers[index + 1].start() if index + 1 < len(headers) else len(user)
+            return user[header.end():end].strip("\n")
+    lines = [line for line in user.split("\n") if not _SCAFFOLD_LINE.match(line.strip())]
+    return "\n".join(lines).strip()
+
+
+def _risk_level(score: int) -> str:
+    return "high" if score >= 60 else "medium" if score >= 30 else "low"
+
+
+class FakeResponder:
+    """
+    Schema-valid answers per prompt kind, seeded by the prompt text
+    按提示词类型生成符合结构的回答，以提示词文本为种子
+    """
+
+    def answer(self, kind: str, system: str, user: str) -> str:
+        rng = random.Random(hashlib.sha256(f"{system}\x00{user}".encode("utf-8")).digest())
+        if kind == "translation":
+            match = _TRANSLATE_SENTENCE.search(user) or _TRANSLATE_SENTENCE.search(system)
+            return f"【译文】{match.group(1).strip() if match else user.strip()[:200]}"
+        if kind == "rewrite_text":
+            return _rewrite(_document(user))
+        if kind == "text":
+            return "OK"
+        return json.dumps(getattr(self, f"_{kind}")(rng, system, user), ensure_ascii=False)
+
+    def _analysis(self, rng: random.Random, system: str = "", user: str = "") -> Dict[str, Any]:
+        score = rng.randint(10, 90)
+        issues = [
+            {
+                "type": rng.choice(["uniform_length", "formulaic_transition", "predictable_structure"]),
+                "description": f"Synthetic issue {i + 1} from the fake LLM",
+                "description_zh": f"模拟LLM生成的问题 {i + 1}",
+                "severity": rng.choice(["low", "medium", "high"]),
+                "affected_positions": [f"P{rng.randint(1, 9)}"],
+                "fix_suggestions": ["Vary the sentence rhythm"],
+                "fix_suggestions_zh": ["调整句子节奏"],
+            }
+            for i in range(rng.randint(0, 3))
+        ]
+        return {
+            "risk_score": score,
+            "risk_level": _risk_level(score),
+            "issues": issues,
+            "recommendations": ["Synthetic recommendation from the fake LLM"],
+            "recommendations_zh": ["模拟LLM生成的建议"],
+        }
+
+    def _fused_analysis(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        return {step: self._analysis(rng) for step in _TASK_ID.findall(system)}
+
+    def _section_structure(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        lines = _document(user).split("\n")
+        sections = [
+            {"role": line.strip().lstrip("0123456789. ").lower().split(" ")[0] or "body",
+             "title": line.strip(), "start_line": index}
+            for index, line in enumerate(lines)
+            if line.strip() and len(line.strip()) <= 80 and _HEADING.match(line.strip())
+        ][:8]
+        if not sections:
+            sections = [{"role": "body", "title": "", "start_line": 0}]
+        title = next((line.strip() for line in lines if line.strip()), "")
+        return {"document_title": title[:120], "sections": sections}
+
+    def _rewrite(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        document = _document(user)
+        modified = _rewrite(document)
+        return {
+            "modified_text": modified,
+            "changes_summary_zh": "模拟LLM完成的确定性修改",
+            "changes_count": sum(document.count(old) for old, _ in _EDITS),
+            "issues_addressed": [],
+        }
+
+    def _suggestion_item(self, sentence: str) -> Dict[str, Any]:
+        rewritten = _rewrite(sentence)
+        return {
+            "rewritten": rewritten,
+            "changes": [
+                {"original": old.strip(", "), "replacement": new.strip(", "),
+                 "reason": "plainer wording", "reason_zh": "更朴素的措辞"}
+                for old, new in _EDITS if old in sentence
+            ],
+            "explanation": "Deterministic fake rewrite",
+            "explanation_zh": "确定性的模拟改写",
+            "risk_reduction": "medium",
+        }
+
+    def _suggestion(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        match = _ORIGINAL_SENTENCE.search(f"{system}\n{user}")
+        return self._suggestion_item(match.group(1).strip() if match else "")
+
+    def _suggestion_batch(self, rng: random.Random, system: str, user: str) -> List[Dict[str, Any]]:
+        return [
+            {"id": int(index), **self._suggestion_item(sentence.strip())}
+            for index, sentence in _BATCH_SENTENCE.findall(f"{system}\n{user}")
+        ]
+
+    def _repair(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        match = _REPAIR_KEYS.search(user)
+        keys = [key.strip() for key in match.group(1).split(",")] if match else []
+        analysis = self._analysis(rng)
+        answer: Dict[str, Any] = {}
+        for key in keys:
+            if _TASK_ID.match(f"=== TASK {key} ==="):
+                answer[key] = self._analysis(rng)
+            elif key in analysis:
+                answer[key] = analysis[key]
+            elif key == "modified_text":
+                answer[key] = _rewrite(_document(user.split("Your previous answer")[0]))
+            elif key == "sections":
+                answer[key] = []
+            else:
+                answer[key] = ""
+        return answer
+
+    def _json(self, rng: random.Random, system: str, user: str) -> Dict[str, Any]:
+        return {}
+
+
+class FakeLLM:
+    """
+    Request handling, latency/fault injection and counters
+    请求处理、延迟/故障注入与计数
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self.responder = FakeResponder()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.rng = random.Random(self.config.seed)
+            self.in_flight = 0
+            self.kinds: Counter = Counter()
+            self.statuses: Counter = Counter()
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cached_tokens = 0
+            self._prefixes: set = set()
+
+    def update(self, changes: Dict[str, Any]) -> FakeLLMConfig:
+        """Apply a partial config update 应用部分配置更新"""
+        known = {f.name: f.type for f in fields(FakeLLMConfig)}
+        for name, value in changes.items():
+            if name not in known:
+                raise ValueError(f"Unknown option: {name}")
+            if name == "latency" and value not in LATENCY_DISTRIBUTIONS:
+                raise ValueError(f"latency must be one of {LATENCY_DISTRIBUTIONS}")
+            setattr(self.config, name, type(getattr(self.config, name))(value))
+        if "seed" in changes:
+            self.rng = random.Random(self.config.seed)
+        return self.config
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "config": asdict(self.config),
+            "in_flight": self.in_flight,
+            "kinds": dict(self.kinds),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+    # ------------------------------------------------------------------
+    # Latency and faults
+    # 延迟与故障
+    # ------------------------------------------------------------------
+
+    def _first_token_seconds(self) -> float:
+        config = self.config
+        base = config.latency_ms
+        with self._lock:
+            if config.latency == "uniform":
+                value = self.rng.uniform(base * (1 - config.latency_spread), base * (1 + config.latency_spread))
+            elif config.latency == "normal":
+                value = self.rng.gauss(base, base * config.latency_spread)
+            elif config.latency == "lognormal":
+                value = base * self.rng.lognormvariate(0.0, config.latency_spread)
+            else:
+                value = base
+        return max(value, 0.0) / 1000
+
+    def _fault(self) -> Optional[JSONResponse]:
+        config = self.config
+        if config.max_concurrency and self.in_flight > config.max_concurrency:
+            return self._error(429, "rate_limit_exceeded", "Too many concurrent requests")
+        with self._lock:
+            draw = self.rng.random()
+        if draw < config.rate_limit_rate:
+            return self._error(429, "rate_limit_exceeded", "Rate limit reached (injected)")
+        if draw < config.rate_limit_rate + config.error_rate:
+            return self._error(500, "server_error", "Internal error (injected)")
+        return None
+
+    def _error(self, status: int, code: str, message: str) -> JSONResponse:
+        self.statuses[status] += 1
+        headers = {"Retry-After": f"{self.config.retry_after:g}"} if status == 429 else None
+        error_type = "rate_limit_error" if status == 429 else "server_error"
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": message, "type": error_type, "code": code}},
+            headers=headers,
+        )
+
+    # ------------------------------------------------------------------
+    # Completions
+    # 补全
+    # ------------------------------------------------------------------
+
+    def _usage(self, system: str, user: str, content: str) -> Dict[str, Any]:
+        budgeter = get_token_budgeter()
+        system_tokens = budgeter.count(system) if system else 0
+        prompt_tokens = system_tokens + budgeter.count(user)
+        completion_tokens = budgeter.count(content)
+        with self._lock:
+            cached = system_tokens if system and system in self._prefixes else 0
+            self._prefixes.add(system)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_tokens += cached
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    async def complete(self, body: Dict[str, Any]):
+        """
+        Answer one /chat/completions request
+        响应一次 /chat/completions 请求
+        """
+        self.in_flight += 1
+        try:
+            fault = self._fault()
+            if fault is not None:
+                return fault
+
+            system, user = _split_messages(body.get("messages") or [])
+            kind = classify(system, user)
+            self.kinds[kind] += 1
+            content = self.responder.answer(kind, system, user)
+            usage = self._usage(system, user, content)
+            model = body.get("model") or "fake-llm"
+            completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+            first_token = self._first_token_seconds()
+            generation = (
+                usage["completion_tokens"] / self.config.tokens_per_second
+                if self.config.tokens_per_second > 0 else 0.0
+            )
+
+            if body.get("stream"):
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self.statuses[200] += 1
+                return StreamingResponse(
+                    self._stream(completion_id, model, content, usage if include_usage else None,
+                                 first_token, generation),
+                    media_type="text/event-stream",
+                )
+
+            await asyncio.sleep(first_token + generation)
+            self.statuses[200] += 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(
+        self,
+        completion_id: str,
+        model: str,
+        content: str,
+        usage: Optional[Dict[str, Any]],
+        first_token: float,
+        generation: float,
+    ) -> AsyncIterator[str]:
+        size = max(self.config.stream_chunk_chars, 1)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+        pause = generation / len(pieces)
+        created = int(time.time())
+
+        def event(choices: List[Dict[str, Any]], **extra: Any) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            return event([{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+        await asyncio.sleep(first_token)
+        yield chunk({"role": "assistant", "content": ""})
+        for piece in pieces:
+            if pause:
+                await asyncio.sleep(pause)
+            yield chunk({"content": piece})
+        yield chunk({}, "stop")
+        if usage is not None:
+            yield event([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+
+def _split_messages(messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    (system text, user text) of an OpenAI message list
+    OpenAI 消息列表的（系统文本，用户文本）
+    """
+    system, user = [], []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        (system if message.get("role") == "system" else user).append(content)
+    return "\n\n".join(system), "\n\n".join(user)
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    """
+    FastAPI app serving the fake provider
+    提供模拟提供商服务的 FastAPI 应用
+    """
+    fake = FakeLLM(config)
+    app = FastAPI(title="Fake LLM", docs_url=None, redoc_url=None)
+    app.state.fake_llm = fake
+
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return fake._error(400, "invalid_request_error", "Body must be JSON")
+        return await fake.complete(body)
+
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/{prefix:path}/chat/completions", chat_completions, methods=["POST"])
+
+    async def models():
+        return {"object": "list", "data": [{"id": "fake-llm", "object": "model", "owned_by": "fake"}]}
+
+    app.add_api_route("/models", models, methods=["GET"])
+    app.add_api_route("/{prefix:path}/models", models, methods=["GET"])
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/fake/stats")
+    async def stats():
+        return fake.stats()
+
+    @app.put("/fake/config")
+    async def update_config(request: Request):
+        try:
+            config = fake.update(await request.json())
+        except (ValueError, TypeError) as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        return asdict(config)
+
+    @app.post("/fake/reset")
+    async def reset():
+        fake.reset()
+        return fake.stats()
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    defaults = FakeLLMConfig()
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible LLM stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency,
+                        help="Time-to-first-token distribution")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread,
+                        help="uniform/normal: share of latency-ms; lognormal: sigma")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="Completion speed (0 = answer at once)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of HTTP 500 answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate,
+                        help="Share of HTTP 429 answers")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--max-concurrency", type=int, default=defaults.max_concurrency,
+                        help="429 above this many in-flight requests (0 = unlimited)")
+    parser.add_argument("--stream-chunk-chars", type=int, default=defaults.stream_chunk_chars)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    config = FakeLLMConfig(**{f.name: getattr(args, f.name) for f in fields(FakeLLMConfig)})
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()